@@ -39,6 +39,8 @@ def create_index():
             type=SearchFieldDataType.String,
             key=True,
             filterable=True,
+            # reconcile_index enumerates keys with ordered range scans.
+            sortable=True,
         ),
         SearchField(name="content", type=SearchFieldDataType.String, searchable=True),
         # Vector field for hybrid search
@@ -0,0 +1,173 @@
+import json
+import os
+import sqlite3
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from ingest_all import compute_doc_hash
+
+
+def iter_records(file_path: str) -> Iterator[Tuple[int, dict]]:
+    """
+    Yields (byte offset, record) for every valid JSONL line.
+    """
+    offset = 0
+    with open(file_path, "rb") as f:
+        for line in f:
+            start = offset
+            offset += len(line)
+            if not line.strip():
+                continue
+            try:
+                yield start, json.loads(line)
+            except (json.JSONDecodeError, UnicodeDecodeError) as e:
+                print(f"Skipping invalid line at byte {start} of {file_path}: {e}")
+
+
+class HashStore:
+    """
+    Persistent (document_id, content hash, file, byte offset) index over the
+    JSONL files, kept in SQLite next to the data.
+
+    `refresh` rescans only files whose size or mtime changed since the last
+    run (and drops files that disappeared), so a reconcile hashes new data
+    only; `read_document` seeks straight to a document's line. Every
+    (document_id, file) row is kept; for duplicate IDs the file that sorts
+    first wins, as in a full scan, so deleting it uncovers the next one.
+    """
+
+    def __init__(self, path: str):
+        parent = os.path.dirname(path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        self.path = path
+        self._conn = sqlite3.connect(path)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            pk = [
+                row[1]
+                for row in self._conn.execute("PRAGMA table_info(docs)")
+                if row[5]
+            ]
+            if pk == ["doc_id"]:
+                # Older stores kept only the winning row per ID; rescan.
+                self._conn.execute("DROP TABLE docs")
+                self._conn.execute("DELETE FROM files")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS files ("
+                " path TEXT PRIMARY KEY,"
+                " size INTEGER NOT NULL,"
+                " mtime_ns INTEGER NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS docs ("
+                " doc_id TEXT NOT NULL,"
+                " sha256 TEXT NOT NULL,"
+                " path TEXT NOT NULL,"
+                " offset INTEGER NOT NULL,"
+                " PRIMARY KEY (doc_id, path))"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS docs_by_path ON docs (path, offset)"
+            )
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def clear(self) -> None:
+        with self._conn:
+            self._conn.execute("DELETE FROM docs")
+            self._conn.execute("DELETE FROM files")
+
+    def _is_current(self, path: str, stat: os.stat_result) -> bool:
+        row = self._conn.execute(
+            "SELECT size, mtime_ns FROM files WHERE path = ?", (path,)
+        ).fetchone()
+        return row is not None and row == (stat.st_size, stat.st_mtime_ns)
+
+    def _scan_file(self, path: str, stat: os.stat_result) -> int:
+        rows = 0
+        with self._conn:
+            self._conn.execute("DELETE FROM docs WHERE path = ?", (path,))
+            for offset, doc in iter_records(path):
+                doc_id = doc.get("document_id")
+                if doc_id is None:
+                    continue
+                # First row wins within a file; readers pick the
+                # earliest-sorting file across files.
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO docs (doc_id, sha256, path, offset)"
+                    " VALUES (?, ?, ?, ?)",
+                    (str(doc_id), compute_doc_hash(doc), path, offset),
+                )
+                rows += 1
+            self._conn.execute(
+                "INSERT OR REPLACE INTO files (path, size, mtime_ns) VALUES (?, ?, ?)",
+                (path, stat.st_size, stat.st_mtime_ns),
+            )
+        return rows
+
+    def refresh(self, file_paths: Iterable[str]) -> List[str]:
+        """
+        Brings the store in line with `file_paths`; returns the files that
+        were (re)scanned.
+        """
+        paths = sorted(os.path.abspath(p) for p in file_paths)
+        known = {row[0] for row in self._conn.execute("SELECT path FROM files")}
+        with self._conn:
+            for gone in known - set(paths):
+                self._conn.execute("DELETE FROM docs WHERE path = ?", (gone,))
+                self._conn.execute("DELETE FROM files WHERE path = ?", (gone,))
+
+        scanned: List[str] = []
+        for path in paths:
+            stat = os.stat(path)
+            if self._is_current(path, stat):
+                continue
+            rows = self._scan_file(path, stat)
+            print(f"Hash store: scanned {os.path.basename(path)} ({rows} rows).")
+            scanned.append(path)
+        return scanned
+
+    def hashes(self) -> Dict[str, str]:
+        # SQLite takes bare columns from the row that MIN() picked.
+        return {
+            doc_id: sha256
+            for doc_id, sha256, _ in self._conn.execute(
+                "SELECT doc_id, sha256, MIN(path) FROM docs GROUP BY doc_id"
+            )
+        }
+
+    def read_document(self, doc_id: str) -> Optional[dict]:
+        row = self._conn.execute(
+            "SELECT MIN(path), offset FROM docs WHERE doc_id = ?", (doc_id,)
+        ).fetchone()
+        if row[0] is None:
+            return None
+        with open(row[0], "rb") as f:
+            f.seek(row[1])
+            return json.loads(f.readline())
+
+    def iter_documents(self, wanted: Set[str]) -> Iterator[dict]:
+        """
+        Yields the stored row of each wanted ID, reading files in offset
+        order so the seeks move forward through each file.
+        """
+        current_path: Optional[str] = None
+        handle = None
+        try:
+            for doc_id, path, offset in self._conn.execute(
+                "SELECT doc_id, MIN(path) AS path, offset FROM docs"
+                " GROUP BY doc_id ORDER BY path, offset"
+            ):
+                if doc_id not in wanted:
+                    continue
+                if path != current_path:
+                    if handle is not None:
+                        handle.close()
+                    handle = open(path, "rb")
+                    current_path = path
+                handle.seek(offset)
+                yield json.loads(handle.readline())
+        finally:
+            if handle is not None:
+                handle.close()
@@ -9,17 +9,21 @@ import json
 import os
 import shutil
 import sys
+import threading
 import time
 from datetime import timedelta
 
 # Ensure src is in python path
 sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
 
-from reindex_data import flatten_document, load_data
+from ingest_pipeline import (DEFAULT_EMBED_WORKERS, DEFAULT_QUEUE_SIZE,
+                             DEFAULT_UPLOAD_WORKERS, run_pipeline)
+from reindex_data import DEFAULT_EMBED_BATCH_SIZE, flatten_documents, iter_data
 
 from shipment_qna_bot.tools.azure_ai_search import AzureAISearchTool
 from shipment_qna_bot.tools.azure_openai_embeddings import \
     AzureOpenAIEmbeddingsClient
+from shipment_qna_bot.tools.retrieval_cache import bump_index_generation
 
 
 def robust_upload(tool, docs, batch_size=100, max_retries=3):
@@ -96,14 +100,54 @@ def write_deadletter(data_dir: str, file_name: str, errors: list[dict]) -> str:
     return path
 
 
-def ingest_all(*, allow_partial: bool = False) -> None:
+class ManifestCheckpointer:
+    """
+    Records the hash of every uploaded doc and saves the manifest (atomic
+    replace) at most every `every_s` seconds, so a crash loses at most that
+    window and never records a doc that was not uploaded.
+    """
+
+    def __init__(self, processed_dir: str, manifest: dict, every_s: float = 5.0):
+        self.processed_dir = processed_dir
+        self.manifest = manifest
+        self.every_s = every_s
+        self._dirty = False
+        self._last_save = time.monotonic()
+        self._lock = threading.Lock()
+
+    def record(self, hashes: dict) -> None:
+        with self._lock:
+            self.manifest.update(hashes)
+            self._dirty = True
+            if time.monotonic() - self._last_save >= self.every_s:
+                self._save()
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._dirty:
+                self._save()
+
+    def _save(self) -> None:
+        save_manifest(self.processed_dir, self.manifest)
+        self._dirty = False
+        self._last_save = time.monotonic()
+
+
+def ingest_all(
+    *,
+    allow_partial: bool = False,
+    embed_batch_size: int = DEFAULT_EMBED_BATCH_SIZE,
+    embed_workers: int = DEFAULT_EMBED_WORKERS,
+    upload_workers: int = DEFAULT_UPLOAD_WORKERS,
+    queue_size: int = DEFAULT_QUEUE_SIZE,
+) -> None:
     start_time = time.perf_counter()
     data_dir = os.path.abspath(
         os.path.join(os.path.dirname(__file__), "..", "..", "data")
     )
     processed_dir = os.path.join(data_dir, "processed")
     os.makedirs(processed_dir, exist_ok=True)
-    manifest = load_manifest(processed_dir)
+    checkpointer = ManifestCheckpointer(processed_dir, load_manifest(processed_dir))
 
     jsonl_files = glob.glob(os.path.join(data_dir, "*.jsonl"))
 
@@ -117,48 +161,71 @@ def ingest_all(*, allow_partial: bool = False) -> None:
     embedder = AzureOpenAIEmbeddingsClient()
     tool = AzureAISearchTool()
 
+    def _embed(batch: list[dict]) -> tuple[list[dict], list[dict]]:
+        return flatten_documents(
+            batch, embedder, batch_size=embed_batch_size, progress=False
+        )
+
+    def _upload(batch: list[dict]) -> None:
+        robust_upload(tool, batch)
+
     for file_path in jsonl_files:
         file_name = os.path.basename(file_path)
         print(f"\n--- Starting ingestion for {file_name} ---")
 
-        try:
-            raw_docs = load_data(file_path)
-        except Exception as e:
-            print(f"Failed to read {file_name}: {e}. Skipping.")
-            continue
-
-        print(f"Loaded {len(raw_docs)} documents.")
-
-        processed_docs = []
-        pending_manifest = dict(manifest)
-        skipped = 0
+        counts = {"read": 0, "skipped": 0}
         errors: list[dict] = []
-        print(f"Processing and embedding...")
-        for i, d in enumerate(raw_docs):
-            try:
+        # Hashes of docs still in flight; popped once their batch is uploaded.
+        hashes: dict[str, str] = {}
+
+        def _pending_docs():
+            for d in iter_data(file_path):
+                counts["read"] += 1
                 doc_id = d.get("document_id")
                 if not doc_id:
-                    raise ValueError("Missing document_id")
+                    errors.append(
+                        {
+                            "document_id": None,
+                            "error": "Missing document_id",
+                            "document": d,
+                        }
+                    )
+                    print("Failed to process doc None: Missing document_id")
+                    continue
                 content_hash = compute_doc_hash(d)
-                if pending_manifest.get(str(doc_id)) == content_hash:
-                    skipped += 1
+                if checkpointer.manifest.get(str(doc_id)) == content_hash:
+                    counts["skipped"] += 1
                     continue
-                processed_docs.append(flatten_document(d, embedder))
-                pending_manifest[str(doc_id)] = content_hash
-                if (i + 1) % 100 == 0:
-                    print(f"Processed {i+1}/{len(raw_docs)} docs...")
-            except Exception as e:
-                errors.append(
-                    {
-                        "document_id": d.get("document_id"),
-                        "error": str(e),
-                        "document": d,
-                    }
-                )
-                print(f"Failed to process doc {d.get('document_id')}: {e}")
+                hashes[str(doc_id)] = content_hash
+                yield d
+
+        print("Streaming, embedding and uploading new or changed docs...")
+        try:
+            result = run_pipeline(
+                _pending_docs(),
+                _embed,
+                _upload,
+                batch_size=embed_batch_size,
+                embed_workers=embed_workers,
+                upload_workers=upload_workers,
+                queue_size=queue_size,
+                on_uploaded=lambda batch: checkpointer.record(
+                    {d["document_id"]: hashes.pop(d["document_id"]) for d in batch}
+                ),
+                stop_on_error=not allow_partial,
+            )
+        except OSError as e:
+            checkpointer.flush()
+            print(f"Failed to read {file_name}: {e}. Skipping.")
+            continue
+        checkpointer.flush()
+        if result.uploaded:
+            # Tell running API processes to drop cached retrieval results.
+            bump_index_generation()
+        errors.extend(result.errors)
+        skipped = counts["skipped"]
+        print(f"Read {counts['read']} documents (skipped {skipped} unchanged).")
 
-        total_expected = len(raw_docs)
-        total_handled = skipped + len(processed_docs)
         if errors:
             deadletter = write_deadletter(data_dir, file_name, errors)
             print(
@@ -168,42 +235,25 @@ def ingest_all(*, allow_partial: bool = False) -> None:
                 raise RuntimeError(
                     f"Aborting ingestion for {file_name}; fix errors and retry."
                 )
+        if result.upload_failures:
+            print(
+                f"ERROR: {len(result.upload_failures)} docs failed to upload for {file_name}."
+            )
+            print(f"File {file_name} remains in data folder for retry.")
+            continue
 
-        if processed_docs:
-            print(f"Uploading {len(processed_docs)} docs in batches...")
-            try:
-                robust_upload(tool, processed_docs)
-                print(f"Finished ingestion for {file_name}")
-
-                if total_handled == total_expected and not errors:
-                    # Move to processed folder
-                    dest_path = os.path.join(processed_dir, file_name)
-                    shutil.move(file_path, dest_path)
-                    print(f"Moved {file_name} to 'processed' folder.")
-                    manifest = pending_manifest
-                    save_manifest(processed_dir, manifest)
-                else:
-                    print(
-                        f"WARNING: {file_name} not moved to processed; counts mismatch or errors present."
-                    )
-            except Exception as e:
-                print(f"ERROR: Complete ingestion failed for {file_name}: {e}")
-                print(f"File {file_name} remains in data folder for retry.")
-        else:
-            print(f"No documents to upload for {file_name} (skipped {skipped}).")
-            try:
-                if total_handled == total_expected and not errors:
-                    dest_path = os.path.join(processed_dir, file_name)
-                    shutil.move(file_path, dest_path)
-                    print(f"Moved {file_name} to 'processed' folder.")
-                    manifest = pending_manifest
-                    save_manifest(processed_dir, manifest)
-                else:
-                    print(
-                        f"WARNING: {file_name} not moved to processed; counts mismatch or errors present."
-                    )
-            except Exception as e:
-                print(f"Failed to move {file_name} to processed: {e}")
+        print(f"Finished ingestion for {file_name} (uploaded {result.uploaded}).")
+        try:
+            if skipped + result.uploaded == counts["read"] and not errors:
+                dest_path = os.path.join(processed_dir, file_name)
+                shutil.move(file_path, dest_path)
+                print(f"Moved {file_name} to 'processed' folder.")
+            else:
+                print(
+                    f"WARNING: {file_name} not moved to processed; counts mismatch or errors present."
+                )
+        except Exception as e:
+            print(f"Failed to move {file_name} to processed: {e}")
 
     end_time = time.perf_counter()
     delta = end_time - start_time
@@ -224,6 +274,36 @@ if __name__ == "__main__":
         help="Upload docs that processed successfully even if some failed. "
         "Files with errors stay in data/ for retry.",
     )
+    parser.add_argument(
+        "--embed-batch-size",
+        type=int,
+        default=DEFAULT_EMBED_BATCH_SIZE,
+        help="Documents per embedding request.",
+    )
+    parser.add_argument(
+        "--embed-workers",
+        type=int,
+        default=DEFAULT_EMBED_WORKERS,
+        help="Threads embedding batches concurrently.",
+    )
+    parser.add_argument(
+        "--upload-workers",
+        type=int,
+        default=DEFAULT_UPLOAD_WORKERS,
+        help="Threads uploading embedded batches concurrently.",
+    )
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        default=DEFAULT_QUEUE_SIZE,
+        help="Batches buffered between stages before the earlier stage waits.",
+    )
     args = parser.parse_args()
 
-    ingest_all(allow_partial=args.allow_partial)
+    ingest_all(
+        allow_partial=args.allow_partial,
+        embed_batch_size=args.embed_batch_size,
+        embed_workers=args.embed_workers,
+        upload_workers=args.upload_workers,
+        queue_size=args.queue_size,
+    )
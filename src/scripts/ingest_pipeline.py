@@ -0,0 +1,194 @@
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_EMBED_WORKERS = 4
+DEFAULT_UPLOAD_WORKERS = 2
+DEFAULT_QUEUE_SIZE = 4
+
+_DONE = object()
+
+EmbedFn = Callable[[List[dict]], Tuple[List[dict], List[dict]]]
+UploadFn = Callable[[List[dict]], None]
+
+
+class StageMeter:
+    """
+    Counts the docs a stage finished and its wall-clock rate since the stage
+    first picked up work.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.docs = 0
+        self._started: Optional[float] = None
+        self._finished: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        with self._lock:
+            if self._started is None:
+                self._started = time.perf_counter()
+
+    def add(self, n: int) -> None:
+        with self._lock:
+            self.docs += n
+            self._finished = time.perf_counter()
+
+    def rate(self) -> float:
+        with self._lock:
+            if self._started is None or self._finished is None:
+                return 0.0
+            elapsed = self._finished - self._started
+            return self.docs / elapsed if elapsed > 0 else 0.0
+
+    def describe(self) -> str:
+        return f"{self.name}: {self.docs} docs ({self.rate():.1f} docs/sec)"
+
+
+@dataclass
+class PipelineResult:
+    uploaded: int = 0
+    errors: List[dict] = field(default_factory=list)
+    upload_failures: List[str] = field(default_factory=list)
+    stages: Dict[str, StageMeter] = field(default_factory=dict)
+
+
+def _chunks(docs: Iterable[dict], size: int) -> Iterable[List[dict]]:
+    chunk: List[dict] = []
+    for doc in docs:
+        chunk.append(doc)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def run_pipeline(
+    docs: Iterable[dict],
+    embed: EmbedFn,
+    upload: UploadFn,
+    *,
+    batch_size: int,
+    embed_workers: int = DEFAULT_EMBED_WORKERS,
+    upload_workers: int = DEFAULT_UPLOAD_WORKERS,
+    queue_size: int = DEFAULT_QUEUE_SIZE,
+    on_uploaded: Optional[Callable[[List[dict]], None]] = None,
+    stop_on_error: bool = False,
+    report_every_s: float = 10.0,
+) -> PipelineResult:
+    """
+    Runs read -> embed -> upload as a staged pipeline.
+
+    The caller's thread chunks `docs` into batches and feeds a bounded queue
+    read by `embed_workers` threads; embedded batches go through a second
+    bounded queue to `upload_workers` threads, so embedding batch N+1
+    overlaps uploading batch N and a slow stage blocks the one before it
+    instead of buffering the corpus. `on_uploaded` runs (serialized) after
+    each successful upload, which is the only point a doc is known to be in
+    the index. With `stop_on_error`, the first embed error or failed upload
+    stops feeding new batches; batches in flight are dropped.
+    """
+    embed_q: "queue.Queue[Any]" = queue.Queue(maxsize=queue_size)
+    upload_q: "queue.Queue[Any]" = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    lock = threading.Lock()
+    result = PipelineResult(
+        stages={name: StageMeter(name) for name in ("read", "embed", "upload")}
+    )
+    meters = result.stages
+    last_report = [time.perf_counter()]
+
+    def _report(force: bool = False) -> None:
+        now = time.perf_counter()
+        if not force and now - last_report[0] < report_every_s:
+            return
+        last_report[0] = now
+        print("  " + " | ".join(m.describe() for m in meters.values()))
+
+    def _embed_worker() -> None:
+        while True:
+            batch = embed_q.get()
+            if batch is _DONE:
+                return
+            if stop.is_set():
+                continue
+            meters["embed"].start()
+            try:
+                processed, errors = embed(batch)
+            except Exception as e:
+                processed = []
+                errors = [
+                    {
+                        "document_id": d.get("document_id"),
+                        "error": str(e),
+                        "document": d,
+                    }
+                    for d in batch
+                ]
+            meters["embed"].add(len(batch))
+            if errors:
+                with lock:
+                    result.errors.extend(errors)
+                if stop_on_error:
+                    stop.set()
+            if processed:
+                upload_q.put(processed)
+
+    def _upload_worker() -> None:
+        while True:
+            batch = upload_q.get()
+            if batch is _DONE:
+                return
+            if stop.is_set():
+                continue
+            meters["upload"].start()
+            try:
+                upload(batch)
+            except Exception as e:
+                print(f"  Upload of {len(batch)} docs failed: {e}")
+                with lock:
+                    result.upload_failures.extend(str(d["document_id"]) for d in batch)
+                if stop_on_error:
+                    stop.set()
+                continue
+            meters["upload"].add(len(batch))
+            with lock:
+                result.uploaded += len(batch)
+                if on_uploaded is not None:
+                    on_uploaded(batch)
+                _report()
+
+    embedders = [
+        threading.Thread(target=_embed_worker, name=f"embed-{i}", daemon=True)
+        for i in range(max(1, embed_workers))
+    ]
+    uploaders = [
+        threading.Thread(target=_upload_worker, name=f"upload-{i}", daemon=True)
+        for i in range(max(1, upload_workers))
+    ]
+    for t in embedders + uploaders:
+        t.start()
+
+    try:
+        meters["read"].start()
+        for batch in _chunks(docs, batch_size):
+            if stop.is_set():
+                break
+            meters["read"].add(len(batch))
+            embed_q.put(batch)
+    finally:
+        for _ in embedders:
+            embed_q.put(_DONE)
+        for t in embedders:
+            t.join()
+        for _ in uploaders:
+            upload_q.put(_DONE)
+        for t in uploaders:
+            t.join()
+
+    _report(force=True)
+    return result
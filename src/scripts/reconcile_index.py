@@ -4,9 +4,11 @@ import json
 import os
 import sys
 import time
-from typing import Dict, Iterable, List, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Optional, Sequence, Tuple
 
 from azure.core.credentials import AzureKeyCredential
+from azure.core.exceptions import HttpResponseError
 from azure.identity import DefaultAzureCredential
 from azure.search.documents import SearchClient
 from dotenv import find_dotenv, load_dotenv
@@ -16,13 +18,16 @@ load_dotenv(find_dotenv(), override=True)
 # Ensure src is in python path
 sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
 
+from hash_store import HashStore
 from ingest_all import (compute_doc_hash, load_manifest, save_manifest,
                         write_deadletter)
-from reindex_data import flatten_document, load_data
+from ingest_pipeline import run_pipeline
+from reindex_data import DEFAULT_EMBED_BATCH_SIZE, flatten_documents
 
 from shipment_qna_bot.tools.azure_ai_search import AzureAISearchTool
 from shipment_qna_bot.tools.azure_openai_embeddings import \
     AzureOpenAIEmbeddingsClient
+from shipment_qna_bot.tools.retrieval_cache import bump_index_generation
 
 
 def _get_search_client() -> Tuple[SearchClient, str]:
@@ -41,7 +46,13 @@ def _get_search_client() -> Tuple[SearchClient, str]:
     )
 
 
-def _fetch_index_ids(client: SearchClient, id_field: str, batch_size: int) -> List[str]:
+# Largest page the service returns for one query.
+_MAX_PAGE_SIZE = 1000
+
+
+def _fetch_index_ids_by_skip(
+    client: SearchClient, id_field: str, batch_size: int
+) -> List[str]:
     results = client.search(
         search_text="*",
         select=[id_field],
@@ -61,26 +72,99 @@ def _fetch_index_ids(client: SearchClient, id_field: str, batch_size: int) -> Li
     return ids
 
 
-def _load_jsonl_docs(data_dir: str) -> Dict[str, dict]:
+def _odata_string(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _scan_key_range(
+    client: SearchClient,
+    id_field: str,
+    lower: Optional[str],
+    upper: Optional[str],
+    page_size: int,
+) -> List[str]:
+    """
+    Enumerates keys in (lower, upper] in key order, resuming each page after
+    the last key seen instead of skipping, so every page costs the same.
+    """
+    ids: List[str] = []
+    last = lower
+    while True:
+        clauses = []
+        if last is not None:
+            clauses.append(f"{id_field} gt {_odata_string(last)}")
+        if upper is not None:
+            clauses.append(f"{id_field} le {_odata_string(upper)}")
+        page = [
+            str(r[id_field])
+            for r in client.search(
+                search_text="*",
+                select=[id_field],
+                filter=" and ".join(clauses) or None,
+                order_by=[f"{id_field} asc"],
+                top=page_size,
+            )
+        ]
+        ids.extend(page)
+        if len(page) < page_size:
+            return ids
+        last = page[-1]
+
+
+def _partition_bounds(
+    sorted_sample: Sequence[str], partitions: int
+) -> List[Tuple[Optional[str], Optional[str]]]:
+    """
+    Splits the key space at quantiles of a sorted key sample (the local JSONL
+    IDs) into ranges (lower, upper]; the first and last are open-ended so
+    keys missing from the sample are still covered.
+    """
+    cuts: List[str] = []
+    if sorted_sample and partitions > 1:
+        for k in range(1, partitions):
+            cut = sorted_sample[k * len(sorted_sample) // partitions]
+            if not cuts or cut > cuts[-1]:
+                cuts.append(cut)
+    edges: List[Optional[str]] = [None, *cuts, None]
+    return list(zip(edges[:-1], edges[1:]))
+
+
+def _fetch_index_ids(
+    client: SearchClient,
+    id_field: str,
+    batch_size: int,
+    sample_ids: Iterable[str] = (),
+    partitions: int = 1,
+) -> List[str]:
+    """
+    Key-ordered range scan over `partitions` concurrent key ranges. Falls
+    back to skip paging when the key field is not sortable (indexes created
+    before it was marked sortable).
+    """
+    page_size = max(1, min(batch_size, _MAX_PAGE_SIZE))
+    bounds = _partition_bounds(sorted(sample_ids), partitions)
+    try:
+        with ThreadPoolExecutor(max_workers=len(bounds)) as pool:
+            parts = list(
+                pool.map(
+                    lambda b: _scan_key_range(client, id_field, b[0], b[1], page_size),
+                    bounds,
+                )
+            )
+    except HttpResponseError as e:
+        print(
+            f"WARNING: key range scan failed ({e}); falling back to skip paging. "
+            "Recreate the index with create_index.py to make the key sortable."
+        )
+        return _fetch_index_ids_by_skip(client, id_field, batch_size)
+    return [doc_id for part in parts for doc_id in part]
+
+
+def _jsonl_files(data_dir: str) -> List[str]:
     files = sorted(glob.glob(os.path.join(data_dir, "*.jsonl")))
     if not files:
         raise RuntimeError(f"No .jsonl files found in {data_dir}")
-
-    docs_by_id: Dict[str, dict] = {}
-    duplicates = 0
-    for path in files:
-        for doc in load_data(path):
-            doc_id = doc.get("document_id")
-            if doc_id is None:
-                continue
-            doc_id_str = str(doc_id)
-            if doc_id_str in docs_by_id:
-                duplicates += 1
-                continue
-            docs_by_id[doc_id_str] = doc
-    if duplicates:
-        print(f"WARNING: {duplicates} duplicate document_id rows ignored.")
-    return docs_by_id
+    return files
 
 
 def _write_id_list(path: str, ids: Iterable[str]) -> None:
@@ -141,12 +225,34 @@ def main() -> None:
         default=1000,
         help="Batch size for fetching index IDs.",
     )
+    parser.add_argument(
+        "--hash-store",
+        default=None,
+        help="SQLite hash store path (default: <data-dir>/hash_store.sqlite).",
+    )
+    parser.add_argument(
+        "--rebuild-hash-store",
+        action="store_true",
+        help="Rescan every JSONL file instead of only new or changed ones.",
+    )
+    parser.add_argument(
+        "--scan-partitions",
+        type=int,
+        default=8,
+        help="Concurrent key ranges used to enumerate index IDs.",
+    )
     parser.add_argument(
         "--upload-batch-size",
         type=int,
         default=100,
         help="Batch size for uploading missing documents.",
     )
+    parser.add_argument(
+        "--embed-batch-size",
+        type=int,
+        default=DEFAULT_EMBED_BATCH_SIZE,
+        help="Documents per embedding request.",
+    )
     parser.add_argument(
         "--no-upload",
         action="store_true",
@@ -173,18 +279,29 @@ def main() -> None:
     report_dir = os.path.abspath(args.report_dir)
     os.makedirs(report_dir, exist_ok=True)
 
-    docs_by_id = _load_jsonl_docs(data_dir)
-    jsonl_ids = set(docs_by_id.keys())
-    current_hash_by_id = {
-        doc_id: compute_doc_hash(doc) for doc_id, doc in docs_by_id.items()
-    }
+    store = HashStore(args.hash_store or os.path.join(data_dir, "hash_store.sqlite"))
+    if args.rebuild_hash_store:
+        store.clear()
+    files = _jsonl_files(data_dir)
+    scanned = store.refresh(files)
+    print(f"Hash store: {len(scanned)} of {len(files)} files new or changed.")
+    current_hash_by_id = store.hashes()
+    jsonl_ids = set(current_hash_by_id.keys())
 
     manifest = load_manifest(data_dir)
     manifest_ids = set(manifest.keys())
 
     id_field = os.getenv("AZURE_SEARCH_ID_FIELD", "document_id")
     client, index_name = _get_search_client()
-    index_ids = set(_fetch_index_ids(client, id_field, args.batch_size))
+    index_ids = set(
+        _fetch_index_ids(
+            client,
+            id_field,
+            args.batch_size,
+            sample_ids=jsonl_ids,
+            partitions=args.scan_partitions,
+        )
+    )
 
     missing_in_index = sorted(jsonl_ids - index_ids)
     extra_in_index = sorted(index_ids - jsonl_ids)
@@ -239,47 +356,52 @@ def main() -> None:
     )
     embedder = AzureOpenAIEmbeddingsClient()
     tool = AzureAISearchTool()
-    processed_docs: List[dict] = []
-    errors: List[dict] = []
-
-    for i, doc_id in enumerate(upload_candidates, start=1):
-        doc = docs_by_id[doc_id]
-        try:
-            processed_docs.append(flatten_document(doc, embedder))
-            if i % 50 == 0:
-                print(f"Processed {i}/{len(upload_candidates)} upsert docs...")
-        except Exception as e:
-            errors.append(
-                {
-                    "document_id": doc_id,
-                    "error": str(e),
-                    "document": doc,
-                }
-            )
+    result = run_pipeline(
+        store.iter_documents(set(upload_candidates)),
+        lambda batch: flatten_documents(
+            batch, embedder, batch_size=args.embed_batch_size, progress=False
+        ),
+        lambda batch: _robust_upload(
+            tool, batch, batch_size=args.upload_batch_size, max_retries=3
+        ),
+        batch_size=args.embed_batch_size,
+        stop_on_error=not args.allow_partial,
+    )
 
-    if errors:
+    if result.uploaded:
+        # Tell running API processes to drop cached retrieval results.
+        bump_index_generation()
+
+    if result.errors:
         base_data_dir = (
             os.path.dirname(data_dir)
             if os.path.basename(data_dir) == "processed"
             else data_dir
         )
-        deadletter = write_deadletter(base_data_dir, "reconcile_missing.jsonl", errors)
-        print(f"ERROR: {len(errors)} docs failed. Wrote dead-letter to {deadletter}.")
+        deadletter = write_deadletter(
+            base_data_dir, "reconcile_missing.jsonl", result.errors
+        )
+        print(
+            f"ERROR: {len(result.errors)} docs failed. Wrote dead-letter to {deadletter}."
+        )
         if not args.allow_partial:
             return
-
-    if processed_docs:
-        _robust_upload(
-            tool,
-            processed_docs,
-            batch_size=args.upload_batch_size,
-            max_retries=3,
-        )
+    if result.upload_failures:
+        print(f"ERROR: {len(result.upload_failures)} docs failed to upload.")
+        return
 
     if args.no_verify:
         return
 
-    index_ids_after = set(_fetch_index_ids(client, id_field, args.batch_size))
+    index_ids_after = set(
+        _fetch_index_ids(
+            client,
+            id_field,
+            args.batch_size,
+            sample_ids=jsonl_ids,
+            partitions=args.scan_partitions,
+        )
+    )
     missing_after = sorted(jsonl_ids - index_ids_after)
     if missing_after:
         missing_after_path = os.path.join(report_dir, "missing_after_upload.txt")
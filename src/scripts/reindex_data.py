@@ -5,7 +5,7 @@ import os
 import re
 import sys
 from datetime import datetime, timezone
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 # Ensure src is in python path
 sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
@@ -15,23 +15,32 @@ from shipment_qna_bot.tools.azure_openai_embeddings import \
     AzureOpenAIEmbeddingsClient
 
 
-def load_data(file_path: str) -> List[Dict[str, Any]]:
-    documents = []
+def iter_data(file_path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Yields the JSONL records one at a time so callers hold at most the batch
+    they are working on.
+    """
     with open(file_path, "r", encoding="utf-8") as f:
         for line in f:
             if not line.strip():
                 continue
             try:
-                record = json.loads(line)
-                documents.append(record)
+                yield json.loads(line)
             except json.JSONDecodeError as e:
                 print(f"Skipping invalid line: {e}")
-    return documents
 
 
-def flatten_document(
-    doc: Dict[str, Any], embedder: AzureOpenAIEmbeddingsClient
-) -> Dict[str, Any]:
+def load_data(file_path: str) -> List[Dict[str, Any]]:
+    return list(iter_data(file_path))
+
+
+DEFAULT_EMBED_BATCH_SIZE = 64
+
+
+def _validate_document(doc: Dict[str, Any]) -> List[Any]:
+    """
+    Checks the JSONL schema and returns the consignee codes used for RLS.
+    """
     metadata = doc.get("metadata", {})
     content = doc.get("content", "")
     doc_id = doc.get("document_id")
@@ -52,10 +61,31 @@ def flatten_document(
                 consignee_codes = [raw]
     if not consignee_codes:
         raise ValueError("Missing consignee_codes for RLS.")
+    return consignee_codes
+
+
+def flatten_document(
+    doc: Dict[str, Any],
+    embedder: Optional[AzureOpenAIEmbeddingsClient] = None,
+    vector: Optional[List[float]] = None,
+) -> Dict[str, Any]:
+    """
+    Maps a JSONL record to the index schema. Pass `vector` when the embedding
+    was computed in a batch (see `flatten_documents`); otherwise `embedder`
+    embeds the content here.
+    """
+    consignee_codes = _validate_document(doc)
+    metadata = doc.get("metadata", {})
+    content = doc.get("content", "")
+    doc_id = doc.get("document_id")
 
-    # Geenerate embedding
-    print(f"Generating embedding for doc {doc_id}...")
-    vector = embedder.embed_query(content)
+    if vector is None:
+        if embedder is None:
+            raise ValueError("flatten_document needs an embedder or a vector.")
+        print(f"Generating embedding for doc {doc_id}...")
+        # embed_query goes through the query cache, which folds case and
+        # whitespace; document vectors must embed the exact content.
+        vector = embedder.embed_batch([content])[0]
 
     def to_list(val):
         if val is None:
@@ -180,6 +210,75 @@ def flatten_document(
     return flattened
 
 
+def _error_entry(doc: Dict[str, Any], err: Exception) -> Dict[str, Any]:
+    return {"document_id": doc.get("document_id"), "error": str(err), "document": doc}
+
+
+def _embed_chunk(
+    docs: List[Dict[str, Any]],
+    embedder: AzureOpenAIEmbeddingsClient,
+    batch_size: int,
+) -> List[Optional[List[float]] | Exception]:
+    """
+    One batched request for the chunk; if it fails, falls back to per-doc
+    calls so a single bad document only fails itself. Neither path uses the
+    query-embedding cache.
+    """
+    contents = [d.get("content", "") for d in docs]
+    try:
+        return list(embedder.embed_batch(contents, max_inputs=batch_size))
+    except Exception as e:
+        print(f"Batch embedding failed ({e}); retrying {len(docs)} docs one by one.")
+
+    results: List[Optional[List[float]] | Exception] = []
+    for content in contents:
+        try:
+            results.append(embedder.embed_batch([content])[0])
+        except Exception as e:
+            results.append(e)
+    return results
+
+
+def flatten_documents(
+    docs: List[Dict[str, Any]],
+    embedder: AzureOpenAIEmbeddingsClient,
+    batch_size: int = DEFAULT_EMBED_BATCH_SIZE,
+    progress: bool = True,
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Validates, embeds in batches of `batch_size` and flattens the documents.
+    Returns (processed, errors); errors use the dead-letter entry format.
+    """
+    processed: List[Dict[str, Any]] = []
+    errors: List[Dict[str, Any]] = []
+
+    valid: List[Dict[str, Any]] = []
+    for d in docs:
+        try:
+            _validate_document(d)
+            valid.append(d)
+        except Exception as e:
+            errors.append(_error_entry(d, e))
+            print(f"Failed to process doc {d.get('document_id')}: {e}")
+
+    for start in range(0, len(valid), batch_size):
+        chunk = valid[start : start + batch_size]
+        for d, vector in zip(chunk, _embed_chunk(chunk, embedder, batch_size)):
+            try:
+                if isinstance(vector, Exception):
+                    raise vector
+                processed.append(flatten_document(d, vector=vector))
+            except Exception as e:
+                errors.append(_error_entry(d, e))
+                print(f"Failed to process doc {d.get('document_id')}: {e}")
+        if progress:
+            print(
+                f"Embedded {min(start + batch_size, len(valid))}/{len(valid)} docs..."
+            )
+
+    return processed, errors
+
+
 def _deadletter_path(data_dir: str, file_name: str) -> str:
     failed_dir = os.path.join(data_dir, "failed")
     os.makedirs(failed_dir, exist_ok=True)
@@ -213,6 +312,12 @@ def main():
         help="Upload docs that processed successfully even if some failed. "
         "Writes dead-letter for failures.",
     )
+    parser.add_argument(
+        "--embed-batch-size",
+        type=int,
+        default=DEFAULT_EMBED_BATCH_SIZE,
+        help="Documents per embedding request.",
+    )
     args = parser.parse_args()
 
     data_path = os.path.join(
@@ -227,26 +332,12 @@ def main():
 
     embedder = AzureOpenAIEmbeddingsClient()
 
-    processed_docs = []
-    errors: list[dict] = []
     print(
         f"Starting processing and embedding (this may take a few minutes for {len(raw_docs)} docs)..."
     )
-
-    for i, d in enumerate(raw_docs):
-        try:
-            processed_docs.append(flatten_document(d, embedder))
-            if (i + 1) % 100 == 0:
-                print(f"Processed {i+1}/{len(raw_docs)} docs...")
-        except Exception as e:
-            errors.append(
-                {
-                    "document_id": d.get("document_id"),
-                    "error": str(e),
-                    "document": d,
-                }
-            )
-            print(f"Failed to process doc {d.get('document_id')}: {e}")
+    processed_docs, errors = flatten_documents(
+        raw_docs, embedder, batch_size=args.embed_batch_size
+    )
 
     if errors:
         deadletter = write_deadletter(
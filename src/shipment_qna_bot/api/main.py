@@ -4,8 +4,10 @@
 # uv run uvicorn shipment_qna_bot.api.main:app --reload --host=127.0.0.1 --port=8000
 # https://shipmentqnabot-dgh3cjgzdzbyc3f0.eastus2-01.azurewebsites.net/
 #################
+import asyncio
 import os
 import uuid
+from contextlib import asynccontextmanager
 from datetime import datetime, timezone
 
 from fastapi import FastAPI
@@ -14,9 +16,30 @@ from fastapi.staticfiles import StaticFiles
 
 from shipment_qna_bot.api.routes_chat import \
     router as chat_router  # type: ignore
+from shipment_qna_bot.logging.logger import logger
 from shipment_qna_bot.logging.middleware_log import RequestLoggingMiddleware
+from shipment_qna_bot.tools.azure_ai_search import search_stats
+from shipment_qna_bot.tools.search_transport import get_search_transport
+from shipment_qna_bot.tools.tokenizer import load_encoding
+from shipment_qna_bot.utils import metrics
 
-app = FastAPI(title="MCS Shipment Chat Bot")
+
+@asynccontextmanager
+async def _lifespan(app: FastAPI):
+    # Load the answer tokenizer before serving so no request waits on the
+    # tiktoken download; on timeout it keeps loading in the background and
+    # token counts use the character estimate until it is ready.
+    timeout_s = float(os.getenv("ANSWER_TOKENIZER_LOAD_TIMEOUT_S", "10"))
+    try:
+        await asyncio.wait_for(asyncio.to_thread(load_encoding), timeout_s)
+    except asyncio.TimeoutError:
+        logger.warning("Tokenizer still loading after %.0fs; serving anyway", timeout_s)
+    yield
+    # Close the pooled Azure Search connections on the server's loop.
+    await get_search_transport().aclose()
+
+
+app = FastAPI(title="MCS Shipment Chat Bot", lifespan=_lifespan)
 _APP_INSTANCE_ID = str(uuid.uuid4())
 _APP_STARTED_AT = datetime.now(timezone.utc).isoformat()
 
@@ -49,6 +72,29 @@ async def health_check():
         "status": "ok",
         "instance_id": _APP_INSTANCE_ID,
         "started_at": _APP_STARTED_AT,
+        "intent_fast_path_ratio": round(
+            metrics.ratio("intent.fast_path", ["intent.fast_path", "intent.llm"]), 4
+        ),
+        "judge_skip_rate": round(
+            metrics.ratio("judge.skipped", ["judge.skipped", "judge.llm"]), 4
+        ),
+        "judge_retry_rate": round(
+            metrics.ratio("judge.retry", ["judge.skipped", "judge.llm"]), 4
+        ),
+        "normalizer_local_rate": round(
+            metrics.ratio("normalizer.local", ["normalizer.local", "normalizer.llm"]),
+            4,
+        ),
+        "answer_templated_rate": round(
+            metrics.ratio("answer.templated", ["answer.templated", "answer.llm"]), 4
+        ),
+        "retrieval_cache_hit_rate": round(
+            metrics.ratio(
+                "retrieval_cache.hit", ["retrieval_cache.hit", "retrieval_cache.miss"]
+            ),
+            4,
+        ),
+        "search": search_stats(),
     }
 
 
@@ -1,11 +1,14 @@
 # src/shipment_qna_bot/api/routes_chat.py
 
+import json
+import time
 import uuid
-from typing import List  # type: ignore
+from typing import Any, AsyncIterator, Dict, List, Tuple  # type: ignore
 
 from fastapi import APIRouter, Request
+from fastapi.responses import StreamingResponse
 
-from shipment_qna_bot.graph.builder import run_graph
+from shipment_qna_bot.graph.builder import arun_graph, astream_graph
 from shipment_qna_bot.logging.logger import logger, set_log_context
 from shipment_qna_bot.models.schemas import (ChartSpec, ChatAnswer,
                                              ChatRequest, EvidenceItem,
@@ -27,21 +30,11 @@ async def get_session(request: Request):
     }
 
 
-@router.post("/chat", response_model=ChatAnswer)
-async def chat_endpoint(payload: ChatRequest, request: Request) -> ChatAnswer:
+def _resolve_scope(payload: ChatRequest, request: Request) -> Tuple[str, List[str]]:
     """
-    Main `chat` endpoint to handle chat requests related to shipment queries.
-
-    Responsibilities (current stage):
-    - Ensure we always have a conversation_id (for session/memory).
-    - Normalize and log consignee codes coming from the payload.
-    - Derive an *effective* consignee scope via `resolve_allowed_scope` (RLS plumbing hook).
-    - Set structured logging context (conversation_id, consignee scope, intent).
-    - Call the LangGraph runner with a clean initial state.
-    - Map graph result into the public `ChatAnswer` schema, including
-      evidence items and (optionally, in future) chart/table data.
+    Resolves the conversation id and the effective consignee scope for a
+    request, persisting both in the session and the logging context.
     """
-
     # 1) Conversation/session handling
     # ensure payload always have convesation_id and its always has a value associated with it
     # server generates conversation id if missing, check session first, then payload, then generate.
@@ -102,41 +95,39 @@ async def chat_endpoint(payload: ChatRequest, request: Request) -> ChatAnswer:
         extra={"step": "API:/chat"},
     )
 
-    # 4) Run the langGraph with a clean initial state
-    # important we pass *effective* consignee codes only, the graph/tooling
-    # must never see unvalidated raw payload values.
-
-    # TODO: call LangGraph execution here.
-    # For now, stub response to verify logs pipeline.
-    # Placeholder logic for processing the chat request
-    # In a production implementation, this would involve NLP processing, database queries, etc.
+    return conversation_id, allowed_consignee_codes
 
-    import time
-
-    start_time = time.time()
 
-    # run graph
-    result = run_graph(
-        {
-            "conversation_id": conversation_id,
-            "question_raw": payload.question,
-            "consignee_codes": allowed_consignee_codes,
-            "usage_metadata": {
-                "prompt_tokens": 0,
-                "completion_tokens": 0,
-                "total_tokens": 0,
-            },
-        }
-    )
+def _initial_state(
+    payload: ChatRequest, conversation_id: str, allowed_consignee_codes: List[str]
+) -> Dict[str, Any]:
+    # important we pass *effective* consignee codes only, the graph/tooling
+    # must never see unvalidated raw payload values.
+    return {
+        "conversation_id": conversation_id,
+        "question_raw": payload.question,
+        "consignee_codes": allowed_consignee_codes,
+        "usage_metadata": {
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "total_tokens": 0,
+        },
+    }
 
-    end_time = time.time()
-    latency_ms = int((end_time - start_time) * 1000)
 
+def _build_chat_answer(
+    result: Dict[str, Any], conversation_id: str, request: Request, latency_ms: int
+) -> ChatAnswer:
+    """
+    Maps the final graph state into the public `ChatAnswer` envelope.
+    """
     # Calculate costs
     usage = result.get("usage_metadata") or {}
     prompt_tokens = usage.get("prompt_tokens", 0)
     completion_tokens = usage.get("completion_tokens", 0)
     total_tokens = usage.get("total_tokens", 0)
+    cache_hits = usage.get("cache_hits", 0)
+    cache_misses = usage.get("cache_misses", 0)
 
     # GPT-4o pricing (approximate)
     cost_usd = (prompt_tokens * 0.000005) + (completion_tokens * 0.000015)
@@ -158,7 +149,7 @@ async def chat_endpoint(payload: ChatRequest, request: Request) -> ChatAnswer:
         "Graph execution completed: intent=%s, answer_preview='%s...'",
         final_intent,
         # answer_text.replace("\n", " ")[:120],
-        f"Responding with answer: {answer_text[:100]}... | Tokens: {total_tokens} | Cost: ${cost_usd:.4f} | Latency: {latency_ms}ms",
+        f"Responding with answer: {answer_text[:100]}... | Tokens: {total_tokens} | Cost: ${cost_usd:.4f} | LLM cache: {cache_hits} hit / {cache_misses} miss | Latency: {latency_ms}ms",
         extra={"step": "API:/chat"},
     )
 
@@ -225,3 +216,82 @@ async def chat_endpoint(payload: ChatRequest, request: Request) -> ChatAnswer:
     )
 
     return response
+
+
+@router.post("/chat", response_model=ChatAnswer)
+async def chat_endpoint(payload: ChatRequest, request: Request) -> ChatAnswer:
+    """
+    Main `chat` endpoint to handle chat requests related to shipment queries.
+
+    Responsibilities (current stage):
+    - Ensure we always have a conversation_id (for session/memory).
+    - Normalize and log consignee codes coming from the payload.
+    - Derive an *effective* consignee scope via `resolve_allowed_scope` (RLS plumbing hook).
+    - Set structured logging context (conversation_id, consignee scope, intent).
+    - Call the LangGraph runner with a clean initial state.
+    - Map graph result into the public `ChatAnswer` schema, including
+      evidence items and (optionally, in future) chart/table data.
+    """
+
+    conversation_id, allowed_consignee_codes = _resolve_scope(payload, request)
+
+    # 4) Run the langGraph with a clean initial state
+    start_time = time.time()
+    result = await arun_graph(
+        _initial_state(payload, conversation_id, allowed_consignee_codes)
+    )
+    latency_ms = int((time.time() - start_time) * 1000)
+
+    return _build_chat_answer(result, conversation_id, request, latency_ms)
+
+
+def _sse(event: str, data: Any) -> str:
+    payload = data if isinstance(data, str) else json.dumps(data, ensure_ascii=False)
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+@router.post("/chat/stream")
+async def chat_stream_endpoint(payload: ChatRequest, request: Request):
+    """
+    Server-Sent Events variant of `/chat`.
+
+    Events, in order:
+    - `start`: conversation_id, sent before the graph runs.
+    - `node`: one per completed graph node (progress).
+    - `token`: answer text deltas as the LLM produces them.
+    - `reset`: the judge asked for a retry; discard the streamed tokens.
+    - `final`: the same `ChatAnswer` envelope `/chat` returns.
+    - `error`: the graph failed; no `final` follows.
+    """
+    conversation_id, allowed_consignee_codes = _resolve_scope(payload, request)
+    initial_state = _initial_state(payload, conversation_id, allowed_consignee_codes)
+
+    async def _events() -> AsyncIterator[str]:
+        start_time = time.time()
+        yield _sse("start", {"conversation_id": conversation_id})
+        try:
+            async for event in astream_graph(initial_state):
+                kind = event.get("type")
+                if kind == "final":
+                    latency_ms = int((time.time() - start_time) * 1000)
+                    # Headers are already sent, so session changes made here
+                    # (e.g. clearing on the "end" intent) do not reach the cookie.
+                    answer = _build_chat_answer(
+                        event["state"], conversation_id, request, latency_ms
+                    )
+                    yield _sse("final", answer.model_dump_json())
+                else:
+                    yield _sse(kind, {k: v for k, v in event.items() if k != "type"})
+        except Exception as e:
+            logger.error(
+                f"Streaming chat failed: {e}",
+                exc_info=True,
+                extra={"step": "API:/chat/stream"},
+            )
+            yield _sse("error", {"detail": "The request could not be completed."})
+
+    return StreamingResponse(
+        _events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,23 +1,32 @@
 import os
 from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict
 
-from langgraph.checkpoint.memory import MemorySaver
+from langchain_core.messages import HumanMessage
+from langchain_core.runnables import RunnableLambda
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
 from langgraph.graph import END, StateGraph
 
+from shipment_qna_bot.graph.checkpointer import build_checkpointer
 from shipment_qna_bot.graph.nodes.analytics_planner import \
     analytics_planner_node
-from shipment_qna_bot.graph.nodes.answer import answer_node
+from shipment_qna_bot.graph.nodes.answer import aanswer_node, answer_node
 from shipment_qna_bot.graph.nodes.clarification import clarification_node
-from shipment_qna_bot.graph.nodes.extractor import extractor_node
-from shipment_qna_bot.graph.nodes.intent import intent_node
-from shipment_qna_bot.graph.nodes.judge import judge_node
-from shipment_qna_bot.graph.nodes.normalizer import normalize_node
-from shipment_qna_bot.graph.nodes.planner import planner_node
-from shipment_qna_bot.graph.nodes.retrieve import retrieve_node
+from shipment_qna_bot.graph.nodes.extractor import (aextractor_node,
+                                                    extractor_node)
+from shipment_qna_bot.graph.nodes.intent import aintent_node, intent_node
+from shipment_qna_bot.graph.nodes.judge import ajudge_node, judge_node
+from shipment_qna_bot.graph.nodes.normalizer import (anormalize_node,
+                                                     normalize_node)
+from shipment_qna_bot.graph.nodes.planner import aplanner_node, planner_node
+from shipment_qna_bot.graph.nodes.retrieve import aretrieve_node, retrieve_node
 from shipment_qna_bot.graph.nodes.router import route_node
 from shipment_qna_bot.graph.nodes.static_greet_info_handler import \
     static_greet_info_node
+from shipment_qna_bot.graph.nodes.understand import (aunderstand_node,
+                                                     understand_node)
 from shipment_qna_bot.graph.state import GraphState
+from shipment_qna_bot.models.shipment_hit import ShipmentHit
 from shipment_qna_bot.tools.date_tools import get_today_date
 
 
@@ -41,6 +50,33 @@ def should_continue(state: GraphState):
     return "retry_retrieval"
 
 
+UNDERSTANDING_MODES = ("parallel", "sequential", "combined")
+
+
+def get_understanding_mode() -> str:
+    """
+    GRAPH_UNDERSTANDING_MODE selects how the question is understood before
+    routing: normalizer then extractor/intent side by side (parallel) or
+    chained (sequential), or one structured-output call (combined).
+    """
+    mode = os.getenv("GRAPH_UNDERSTANDING_MODE", "parallel").strip().lower()
+    return mode if mode in UNDERSTANDING_MODES else "parallel"
+
+
+def understand_join_node(state: GraphState) -> dict:
+    """
+    Barrier after the parallel extractor/intent branches; routing happens here.
+    """
+    return {}
+
+
+def _dual(sync_fn, async_fn) -> RunnableLambda:
+    """
+    Wraps a node so `invoke` runs the sync body and `ainvoke` awaits the async one.
+    """
+    return RunnableLambda(sync_fn, afunc=async_fn, name=sync_fn.__name__)
+
+
 def build_graph():
     """
     Constructs the shipment QnA graph.
@@ -48,30 +84,45 @@ def build_graph():
     workflow = StateGraph(GraphState)
 
     # --- Add Nodes ---
-    workflow.add_node("normalizer", normalize_node)
-    workflow.add_node("extractor", extractor_node)
-    workflow.add_node("intent", intent_node)
-    workflow.add_node("planner", planner_node)
+    workflow.add_node("planner", _dual(planner_node, aplanner_node))
     workflow.add_node("analytics_planner", analytics_planner_node)
-    workflow.add_node("retrieve", retrieve_node)
-    workflow.add_node("answer", answer_node)
-    workflow.add_node("judge", judge_node)
+    workflow.add_node("retrieve", _dual(retrieve_node, aretrieve_node))
+    workflow.add_node("answer", _dual(answer_node, aanswer_node))
+    workflow.add_node("judge", _dual(judge_node, ajudge_node))
     workflow.add_node("static_info", static_greet_info_node)
     workflow.add_node("clarification", clarification_node)
 
     # --- Add Edges ---
-    # Start -> Normalizer
-    workflow.set_entry_point("normalizer")
+    mode = get_understanding_mode()
+    if mode == "combined":
+        # Start -> Understand (rewrite + entities + intent in one call)
+        workflow.add_node("understand", _dual(understand_node, aunderstand_node))
+        workflow.set_entry_point("understand")
+        route_from = "understand"
+    else:
+        # Start -> Normalizer
+        workflow.add_node("normalizer", _dual(normalize_node, anormalize_node))
+        workflow.add_node("extractor", _dual(extractor_node, aextractor_node))
+        workflow.add_node("intent", _dual(intent_node, aintent_node))
+        workflow.set_entry_point("normalizer")
 
-    # Normalizer -> Extractor
-    workflow.add_edge("normalizer", "extractor")
-
-    # Extractor -> Intent
-    workflow.add_edge("extractor", "intent")
+    if mode == "sequential":
+        # Normalizer -> Extractor -> Intent
+        workflow.add_edge("normalizer", "extractor")
+        workflow.add_edge("extractor", "intent")
+        route_from = "intent"
+    elif mode == "parallel":
+        # Normalizer -> (Extractor || Intent) -> Join
+        # Both only read normalized_question, so their LLM calls overlap.
+        workflow.add_node("understand_join", understand_join_node)
+        workflow.add_edge("normalizer", "extractor")
+        workflow.add_edge("normalizer", "intent")
+        workflow.add_edge(["extractor", "intent"], "understand_join")
+        route_from = "understand_join"
 
     # Intent -> Router (Conditional)
     workflow.add_conditional_edges(
-        "intent",
+        route_from,
         route_node,
         {
             "retrieval": "planner",
@@ -104,8 +155,13 @@ def build_graph():
     )
 
     # --- Checkpointer ---
-    # Using MemorySaver for in-memory durable execution (Session scope)
-    checkpointer = MemorySaver()
+    # SQLite-backed and bounded (see graph/checkpointer.py); MemorySaver in tests.
+    # Hits are ShipmentHit records; register them so checkpoints round-trip.
+    checkpointer = build_checkpointer(
+        serde=JsonPlusSerializer(
+            allowed_msgpack_modules=[(ShipmentHit.__module__, ShipmentHit.__name__)]
+        )
+    )
 
     return workflow.compile(checkpointer=checkpointer)
 
@@ -114,9 +170,10 @@ def build_graph():
 graph_app = build_graph()
 
 
-def run_graph(input_state: dict) -> dict:
+def _prepare_input(input_state: dict) -> tuple[dict, dict]:
     """
-    Synchronous wrapper to run the graph.
+    Fills control-flow defaults and resets transient fields for a new turn.
+    Returns the prepared state and the checkpointer config.
     """
     thread_id = input_state.get("conversation_id", "default")
     config = {"configurable": {"thread_id": thread_id}}
@@ -154,11 +211,50 @@ def run_graph(input_state: dict) -> dict:
     input_state.setdefault("sentiment", None)
     input_state.setdefault("reflection_feedback", None)
 
-    # Convert question_raw to a message for history persistence
-    from langchain_core.messages import HumanMessage
-
     # We always append the current question to the message history if it's a new turn.
     # In LangGraph, if we use add_messages, we just provide the new message.
     input_state["messages"] = [HumanMessage(content=input_state["question_raw"])]
 
+    return input_state, config
+
+
+def run_graph(input_state: dict) -> dict:
+    """
+    Synchronous wrapper to run the graph.
+    """
+    input_state, config = _prepare_input(input_state)
     return graph_app.invoke(input_state, config=config)
+
+
+async def arun_graph(input_state: dict) -> dict:
+    """
+    Async wrapper to run the graph on the caller's event loop.
+
+    LLM, embedding and search calls are awaited, so concurrent requests do not
+    hold a worker thread each while waiting on Azure.
+    """
+    input_state, config = _prepare_input(input_state)
+    return await graph_app.ainvoke(input_state, config=config)
+
+
+async def astream_graph(input_state: dict) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Runs the graph like `arun_graph` but yields events while it runs:
+    `{"type": "node", "node": name}` as each node completes, the answer
+    node's `token` / `reset` events, and finally `{"type": "final", "state": ...}`
+    with the same state `arun_graph` would return.
+    """
+    input_state, config = _prepare_input(input_state)
+    config["configurable"]["stream_answer"] = True
+
+    async for mode, chunk in graph_app.astream(
+        input_state, config=config, stream_mode=["updates", "custom"]
+    ):
+        if mode == "custom":
+            yield chunk
+            continue
+        for node in chunk:
+            yield {"type": "node", "node": node}
+
+    snapshot = await graph_app.aget_state(config)
+    yield {"type": "final", "state": dict(snapshot.values)}
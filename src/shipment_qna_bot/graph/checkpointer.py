@@ -0,0 +1,527 @@
+# src/shipment_qna_bot/graph/checkpointer.py
+
+from __future__ import annotations
+
+import asyncio
+import os
+import random
+import sqlite3
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from typing import (Any, AsyncIterator, Dict, Iterator, List, Optional,
+                    Sequence, Tuple)
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (WRITES_IDX_MAP, BaseCheckpointSaver,
+                                       ChannelVersions, Checkpoint,
+                                       CheckpointMetadata, CheckpointTuple,
+                                       SerializerProtocol, get_checkpoint_id,
+                                       get_checkpoint_metadata)
+from langgraph.checkpoint.memory import MemorySaver
+
+from shipment_qna_bot.graph.state import last_turns
+from shipment_qna_bot.logging.logger import logger
+from shipment_qna_bot.utils.runtime import is_test_mode
+
+DEFAULT_CHECKPOINT_PATH = os.path.join("data_cache", "checkpoints.sqlite")
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS threads ("
+    " thread_id TEXT PRIMARY KEY,"
+    " accessed_at REAL NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS threads_accessed ON threads (accessed_at)",
+    "CREATE TABLE IF NOT EXISTS checkpoints ("
+    " thread_id TEXT NOT NULL,"
+    " checkpoint_ns TEXT NOT NULL,"
+    " checkpoint_id TEXT NOT NULL,"
+    " parent_id TEXT,"
+    " type TEXT NOT NULL,"
+    " checkpoint BLOB NOT NULL,"
+    " metadata_type TEXT NOT NULL,"
+    " metadata BLOB NOT NULL,"
+    " PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id))",
+    "CREATE TABLE IF NOT EXISTS writes ("
+    " thread_id TEXT NOT NULL,"
+    " checkpoint_ns TEXT NOT NULL,"
+    " checkpoint_id TEXT NOT NULL,"
+    " task_id TEXT NOT NULL,"
+    " idx INTEGER NOT NULL,"
+    " channel TEXT NOT NULL,"
+    " type TEXT NOT NULL,"
+    " value BLOB NOT NULL,"
+    " task_path TEXT NOT NULL,"
+    " PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx))",
+)
+
+
+# A SQLite connection must not be used or closed across fork: closing it in
+# the child releases that process's file locks and can checkpoint away the
+# WAL under other processes. Savers connect lazily, so one built but unused
+# before a fork holds nothing; a connection that is open at fork is parked
+# here (never closed) and the child reconnects on first use.
+_SAVERS: "weakref.WeakSet[SQLiteCheckpointSaver]" = weakref.WeakSet()
+_INHERITED_CONNECTIONS: List[sqlite3.Connection] = []
+
+
+def _park_connections_after_fork() -> None:
+    for saver in list(_SAVERS):
+        if saver._conn is not None:
+            _INHERITED_CONNECTIONS.append(saver._conn)
+            saver._conn = None
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_park_connections_after_fork)
+
+
+class SQLiteCheckpointSaver(BaseCheckpointSaver[str]):
+    """
+    Conversation checkpoints in a local SQLite file, shared by every worker
+    process on the host (WAL mode; writers queue on SQLite's file lock).
+
+    Storage stays bounded:
+    - only the newest `keep_checkpoints` checkpoints of a thread are kept
+      (the graph resumes from the latest one; it uses no DeltaChannel, so
+      older steps are not needed to rebuild state);
+    - the stored `messages` channel is cut to the last `max_turns` turns;
+    - threads idle for `ttl_s` expire, and beyond `max_threads` the least
+      recently used threads are evicted (checked at most every
+      `sweep_interval_s` per process).
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        serde: Optional[SerializerProtocol] = None,
+        ttl_s: float = 7 * 86400.0,
+        max_threads: int = 10_000,
+        max_turns: int = 20,
+        keep_checkpoints: int = 2,
+        sweep_interval_s: float = 60.0,
+    ):
+        super().__init__(serde=serde)
+        self.path = path
+        self.ttl_s = float(ttl_s)
+        self.max_threads = int(max_threads)
+        self.max_turns = int(max_turns)
+        self.keep_checkpoints = max(1, int(keep_checkpoints))
+        self.sweep_interval_s = float(sweep_interval_s)
+        self.evicted = 0
+        self._last_sweep = 0.0
+
+        # The file is created on first use, not here: the graph is built at
+        # import time and must not touch the disk until a turn is stored.
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        _SAVERS.add(self)
+
+    def _open(self) -> sqlite3.Connection:
+        parent = os.path.dirname(self.path)
+        if parent and not os.path.exists(parent):
+            os.makedirs(parent, exist_ok=True)
+        conn = sqlite3.connect(
+            self.path, check_same_thread=False, timeout=10.0, isolation_level=None
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("BEGIN IMMEDIATE")
+        for statement in _SCHEMA:
+            conn.execute(statement)
+        conn.execute("COMMIT")
+        return conn
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        if self._pid != os.getpid():
+            # Forked worker (e.g. a preloaded app); see _INHERITED_CONNECTIONS.
+            self._pid = os.getpid()
+            self._lock = threading.Lock()
+        with self._lock:
+            if self._conn is None:
+                self._conn = self._open()
+            yield
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        # BEGIN IMMEDIATE takes the write lock up front, so concurrent
+        # processes queue on it instead of failing on lock upgrade.
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield self._conn
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+
+    def close(self) -> None:
+        _SAVERS.discard(self)
+        with self._lock:
+            # In a forked child an inherited connection was already parked.
+            if self._conn is not None and self._pid == os.getpid():
+                self._conn.close()
+                self._conn = None
+
+    # --- housekeeping ---
+
+    def _touch(self, thread_id: str, now: float) -> None:
+        self._conn.execute(
+            "INSERT INTO threads (thread_id, accessed_at) VALUES (?, ?)"
+            " ON CONFLICT(thread_id) DO UPDATE SET accessed_at = excluded.accessed_at",
+            (thread_id, now),
+        )
+
+    def _delete_threads(self, thread_ids: Sequence[str]) -> None:
+        for table in ("writes", "checkpoints", "threads"):
+            self._conn.executemany(
+                f"DELETE FROM {table} WHERE thread_id = ?",
+                [(t,) for t in thread_ids],
+            )
+
+    def _is_expired(self, thread_id: str, now: float) -> bool:
+        row = self._conn.execute(
+            "SELECT accessed_at FROM threads WHERE thread_id = ?", (thread_id,)
+        ).fetchone()
+        return row is not None and self.ttl_s > 0 and row[0] < now - self.ttl_s
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """
+        Drops expired threads and the least recently used ones beyond
+        `max_threads`. Returns how many threads were removed.
+        """
+        now = time.time() if now is None else now
+        cutoff = now - self.ttl_s if self.ttl_s > 0 else float("-inf")
+        with self._locked(), self._transaction():
+            stale = [
+                r[0]
+                for r in self._conn.execute(
+                    "SELECT thread_id FROM threads WHERE accessed_at < ?", (cutoff,)
+                )
+            ]
+            if self.max_threads > 0:
+                stale += [
+                    r[0]
+                    for r in self._conn.execute(
+                        "SELECT thread_id FROM threads WHERE accessed_at >= ?"
+                        " ORDER BY accessed_at DESC LIMIT -1 OFFSET ?",
+                        (cutoff, self.max_threads),
+                    )
+                ]
+            self._delete_threads(stale)
+            self.evicted += len(stale)
+            self._last_sweep = now
+        if stale:
+            logger.info("Checkpointer evicted %s threads", len(stale))
+        return len(stale)
+
+    def stats(self) -> Dict[str, int]:
+        with self._locked():
+            threads = self._conn.execute("SELECT COUNT(*) FROM threads").fetchone()[0]
+            checkpoints = self._conn.execute(
+                "SELECT COUNT(*) FROM checkpoints"
+            ).fetchone()[0]
+        return {"threads": threads, "checkpoints": checkpoints, "evicted": self.evicted}
+
+    # --- reads ---
+
+    def _row_to_tuple(self, thread_id: str, row: Tuple[Any, ...]) -> CheckpointTuple:
+        checkpoint_ns, checkpoint_id, parent_id, type_, blob, meta_type, meta = row
+        writes = self._conn.execute(
+            "SELECT task_id, channel, type, value FROM writes"
+            " WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?"
+            " ORDER BY task_path, task_id, idx",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint=self.serde.loads_typed((type_, blob)),
+            metadata=self.serde.loads_typed((meta_type, meta)),
+            pending_writes=[
+                (task_id, channel, self.serde.loads_typed((t, v)))
+                for task_id, channel, t, v in writes
+            ],
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": parent_id,
+                    }
+                }
+                if parent_id
+                else None
+            ),
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = str(config["configurable"]["thread_id"])
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = get_checkpoint_id(config)
+        now = time.time()
+        columns = (
+            "checkpoint_ns, checkpoint_id, parent_id, type, checkpoint,"
+            " metadata_type, metadata"
+        )
+        with self._locked():
+            if self._is_expired(thread_id, now):
+                with self._transaction():
+                    self._delete_threads([thread_id])
+                self.evicted += 1
+                return None
+            if checkpoint_id:
+                row = self._conn.execute(
+                    f"SELECT {columns} FROM checkpoints WHERE thread_id = ?"
+                    " AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    (thread_id, checkpoint_ns, checkpoint_id),
+                ).fetchone()
+            else:
+                row = self._conn.execute(
+                    f"SELECT {columns} FROM checkpoints WHERE thread_id = ?"
+                    " AND checkpoint_ns = ? ORDER BY checkpoint_id DESC LIMIT 1",
+                    (thread_id, checkpoint_ns),
+                ).fetchone()
+            if row is None:
+                return None
+            return self._row_to_tuple(thread_id, row)
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        where, params = [], []
+        if config:
+            where.append("thread_id = ?")
+            params.append(str(config["configurable"]["thread_id"]))
+            if config["configurable"].get("checkpoint_ns") is not None:
+                where.append("checkpoint_ns = ?")
+                params.append(config["configurable"]["checkpoint_ns"])
+            if checkpoint_id := get_checkpoint_id(config):
+                where.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before and (before_id := get_checkpoint_id(before)):
+            where.append("checkpoint_id < ?")
+            params.append(before_id)
+        sql = (
+            "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_id, type,"
+            " checkpoint, metadata_type, metadata FROM checkpoints"
+        )
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY checkpoint_id DESC"
+
+        with self._locked():
+            rows = self._conn.execute(sql, params).fetchall()
+            results = []
+            for thread_id, *row in rows:
+                if limit is not None and len(results) >= limit:
+                    break
+                item = self._row_to_tuple(thread_id, tuple(row))
+                if filter and not all(
+                    item.metadata.get(k) == v for k, v in filter.items()
+                ):
+                    continue
+                results.append(item)
+        yield from results
+
+    # --- writes ---
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = str(config["configurable"]["thread_id"])
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        values = checkpoint.get("channel_values") or {}
+        messages = values.get("messages")
+        if self.max_turns > 0 and isinstance(messages, list):
+            trimmed = last_turns(messages, self.max_turns)
+            if len(trimmed) < len(messages):
+                checkpoint = {
+                    **checkpoint,
+                    "channel_values": {**values, "messages": trimmed},
+                }
+        type_, blob = self.serde.dumps_typed(checkpoint)
+        meta_type, meta = self.serde.dumps_typed(
+            get_checkpoint_metadata(config, metadata)
+        )
+        now = time.time()
+        with self._locked(), self._transaction():
+            self._conn.execute(
+                "INSERT OR REPLACE INTO checkpoints (thread_id, checkpoint_ns,"
+                " checkpoint_id, parent_id, type, checkpoint, metadata_type, metadata)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    thread_id,
+                    checkpoint_ns,
+                    checkpoint["id"],
+                    config["configurable"].get("checkpoint_id"),
+                    type_,
+                    blob,
+                    meta_type,
+                    meta,
+                ),
+            )
+            stale = [
+                r[0]
+                for r in self._conn.execute(
+                    "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ?"
+                    " AND checkpoint_ns = ? ORDER BY checkpoint_id DESC"
+                    " LIMIT -1 OFFSET ?",
+                    (thread_id, checkpoint_ns, self.keep_checkpoints),
+                )
+            ]
+            for table in ("checkpoints", "writes"):
+                self._conn.executemany(
+                    f"DELETE FROM {table} WHERE thread_id = ? AND checkpoint_ns = ?"
+                    " AND checkpoint_id = ?",
+                    [(thread_id, checkpoint_ns, c) for c in stale],
+                )
+            self._touch(thread_id, now)
+        if now - self._last_sweep >= self.sweep_interval_s:
+            self.sweep(now)
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        thread_id = str(config["configurable"]["thread_id"])
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        rows = []
+        for i, (channel, value) in enumerate(writes):
+            idx = WRITES_IDX_MAP.get(channel, i)
+            type_, blob = self.serde.dumps_typed(value)
+            rows.append(
+                (
+                    "OR REPLACE" if idx < 0 else "OR IGNORE",
+                    (
+                        thread_id,
+                        checkpoint_ns,
+                        checkpoint_id,
+                        task_id,
+                        idx,
+                        channel,
+                        type_,
+                        blob,
+                        task_path,
+                    ),
+                )
+            )
+        with self._locked(), self._transaction():
+            for conflict, params in rows:
+                self._conn.execute(
+                    f"INSERT {conflict} INTO writes (thread_id, checkpoint_ns,"
+                    " checkpoint_id, task_id, idx, channel, type, value, task_path)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    params,
+                )
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._locked(), self._transaction():
+            self._delete_threads([str(thread_id)])
+
+    # --- async: SQLite calls run on a worker thread so a busy file lock
+    # never stalls the event loop ---
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        items = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for item in items:
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await asyncio.to_thread(
+            self.put, config, checkpoint, metadata, new_versions
+        )
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+    def get_next_version(self, current: Optional[str], channel: None) -> str:
+        # Same scheme as MemorySaver: zero-padded counter plus a random tail.
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+
+def build_checkpointer(
+    serde: Optional[SerializerProtocol] = None,
+) -> BaseCheckpointSaver:
+    """
+    CHECKPOINT_BACKEND=sqlite (default; memory in test mode) stores threads
+    in CHECKPOINT_DB_PATH, bounded by CHECKPOINT_TTL_S,
+    CHECKPOINT_MAX_THREADS and CHECKPOINT_MAX_TURNS. CHECKPOINT_BACKEND=memory
+    keeps the previous in-process MemorySaver. The database file is only
+    created when the first checkpoint is read or written.
+    """
+    default_backend = "memory" if is_test_mode() else "sqlite"
+    backend = os.getenv("CHECKPOINT_BACKEND", default_backend).strip().lower()
+    if backend == "sqlite":
+        path = os.getenv("CHECKPOINT_DB_PATH", DEFAULT_CHECKPOINT_PATH)
+        try:
+            return SQLiteCheckpointSaver(
+                path,
+                serde=serde,
+                ttl_s=float(os.getenv("CHECKPOINT_TTL_S", str(7 * 86400))),
+                max_threads=int(os.getenv("CHECKPOINT_MAX_THREADS", "10000")),
+                max_turns=int(os.getenv("CHECKPOINT_MAX_TURNS", "20")),
+            )
+        except Exception as e:
+            logger.warning(f"SQLite checkpointer unavailable ({e}); using memory.")
+    return MemorySaver(serde=serde)
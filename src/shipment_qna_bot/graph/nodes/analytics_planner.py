@@ -9,6 +9,7 @@ from shipment_qna_bot.tools.analytics_metadata import (ANALYTICS_METADATA,
 from shipment_qna_bot.tools.azure_openai_chat import AzureOpenAIChatTool
 from shipment_qna_bot.tools.blob_manager import BlobAnalyticsManager
 from shipment_qna_bot.tools.pandas_engine import PandasAnalyticsEngine
+from shipment_qna_bot.tools.prompt_registry import PROMPTS
 from shipment_qna_bot.utils.runtime import is_test_mode
 
 _CHAT_TOOL: Optional[AzureOpenAIChatTool] = None
@@ -37,6 +38,110 @@ def _get_pandas_engine() -> PandasAnalyticsEngine:
     return _PANDAS_ENG
 
 
+# Columns the prompt rules and the engine's date sort rely on beyond ANALYTICS_METADATA.
+_EXTRA_ANALYTICS_COLUMNS = ["best_eta_dp_date", "best_eta_fd_date"]
+
+_CODE_NAME_RE = re.compile(
+    r"""['"]([A-Za-z_][A-Za-z0-9_]*)['"]|\.([A-Za-z_][A-Za-z0-9_]*)"""
+)
+
+
+def _render_system_prompt(ready_ref_content: str) -> str:
+    return f"""
+You are a Pandas Data Analyst. You have access to a DataFrame `df` containing shipment data.
+Your goal is to write Python code to answer the user's question using `df`.
+The dataset schema, a sample and today's date are given at the end.
+
+## Instructions
+1. Write valid Python/Pandas code.
+2. Assign the final answer (string, number, list, or dataframe) to the variable `result`.
+3. For "How many" or "Total" questions, `result` should be a single number.
+4. For "List" or "Which" questions, `result` should be a unique list or a DataFrame.
+5. **STRICT RULE:** Never include internal technical columns like {INTERNAL_COLUMNS} in the final `result`.
+6. **RELEVANCE:** When returning a DataFrame/table, select only the columns relevant to the user's question.
+7. **DATE FORMATTING:** Whenever displaying or returning a datetime column in a result, ALWAYS use `.dt.strftime('%d-%b-%Y')` to ensure a clean, user-friendly format (e.g., '22-Jul-2025').
+8. **COLUMN SELECTION:**
+   - For discharge-port ETA/arrival windows and overdue checks, use `best_eta_dp_date` (fallback: `eta_dp_date`).
+   - For actual DP-arrival checks, use `ata_dp_date` (fallback: `derived_ata_dp_date` if needed).
+   - If user asks "not yet arrived at DP": filter `ata_dp_date.isna()`.
+   - If user asks "failed/missed ETA at DP": filter `(ata_dp_date.isna()) & (best_eta_dp_date <= today)`.
+   - For final destination ETA logic, use `best_eta_fd_date` (fallback: `eta_fd_date`).
+9. Use `str.contains(..., na=False, case=False, regex=True)` for flexible text filtering.
+10. **SORTING RULE:** For DataFrame/list outputs containing date columns, sort by latest date first (descending) BEFORE date formatting. Prefer date columns in this order: `best_eta_dp_date`, `best_eta_fd_date`, `ata_dp_date`, `derived_ata_dp_date`, `eta_dp_date`, `eta_fd_date`.
+11. Return ONLY the code inside a ```python``` block. Explain your logic briefly outside the block.
+
+## Examples:
+User: "How many delivered shipments?"
+Code:
+```python
+result = df[df['shipment_status'] == 'DELIVERED'].shape[0]
+```
+
+User: "What is the total weight of my shipments?"
+Code:
+```python
+result = df['cargo_weight_kg'].sum()
+```
+
+User: "Which carriers are involved?"
+Code:
+```python
+result = df['final_carrier_name'].dropna().unique().tolist()
+```
+
+User: "Show me shipments with more than 5 days delay."
+Code:
+```python
+# Select only relevant columns and format dates
+cols = ['container_number', 'po_numbers', 'eta_dp_date', 'best_eta_dp_date', 'dp_delayed_dur', 'discharge_port']
+df_filtered = df[df['dp_delayed_dur'] > 5].copy()
+# Sort latest first prior to formatting
+df_filtered = df_filtered.sort_values('best_eta_dp_date', ascending=False)
+# Apply date formatting
+df_filtered['eta_dp_date'] = df_filtered['eta_dp_date'].dt.strftime('%d-%b-%Y')
+df_filtered['best_eta_dp_date'] = df_filtered['best_eta_dp_date'].dt.strftime('%d-%b-%Y')
+result = df_filtered[cols]
+```
+
+User: "List shipments departing next week."
+Code:
+```python
+# Use etd_lp_date for estimated departures
+cols = ['container_number', 'po_numbers', 'etd_lp_date', 'load_port']
+df_filtered = df[df['etd_lp_date'].dt.isocalendar().week == (today_week + 1)].copy()
+df_filtered['etd_lp_date'] = df_filtered['etd_lp_date'].dt.strftime('%d-%b-%Y')
+result = df_filtered[cols]
+```
+
+## Operational Reference (Ready Ref)
+{ready_ref_content}
+""".strip()
+
+
+PROMPTS.register("analytics.system", _render_system_prompt, docs=("ready_ref.md",))
+
+
+def _base_columns(available: List[str]) -> Optional[List[str]]:
+    """
+    Projection used for the first load; None (all columns) if nothing is known.
+    """
+    base = [
+        c for c in available if c in ANALYTICS_METADATA or c in _EXTRA_ANALYTICS_COLUMNS
+    ]
+    return base or None
+
+
+def _referenced_columns(
+    code: str, available: List[str], loaded: List[str]
+) -> List[str]:
+    """
+    Dataset columns the generated code mentions that are not loaded yet.
+    """
+    names = {a or b for a, b in _CODE_NAME_RE.findall(code)}
+    loaded_set = set(loaded)
+    return [c for c in available if c in names and c not in loaded_set]
+
+
 def analytics_planner_node(state: Dict[str, Any]) -> Dict[str, Any]:
     """
     Pandas Analyst Agent Node.
@@ -69,7 +174,10 @@ def analytics_planner_node(state: Dict[str, Any]) -> Dict[str, Any]:
         # 1. Load Data
         try:
             blob_mgr = _get_blob_manager()
-            df = blob_mgr.load_filtered_data(consignee_codes)  # type: ignore
+            available_columns = blob_mgr.available_columns()
+            df = blob_mgr.load_filtered_data(
+                consignee_codes, columns=_base_columns(available_columns)
+            )  # type: ignore
 
             if df.empty:
                 state["answer_text"] = (
@@ -89,51 +197,20 @@ def analytics_planner_node(state: Dict[str, Any]) -> Dict[str, Any]:
             return state
 
         # 2. Prepare Context for LLM
-        columns = list(df.columns)
+        # Advertise the full schema; unloaded columns are fetched once the code needs them.
+        columns = available_columns or list(df.columns)
         # Head sample (first 5 rows) to help LLM understand values
         head_sample = df.head(5).to_markdown(index=False)
         shape_info = f"Rows: {df.shape[0]}, Columns: {df.shape[1]}"
 
-        # Dynamic Column Reference
-        # Load Ready Reference if available
-        ready_ref_content = ""
-        try:
-            # Assuming docs is at the root of the project, relative to this file path
-            # This file is in src/shipment_qna_bot/graph/nodes/
-            # docs is in docs/
-            # So we need to go up 4 levels: .../src/shipment_qna_bot/graph/nodes/../../../../docs/ready_ref.md
-            # Better to use a relative path from the CWD if we assume running from root
-            import os
-
-            ready_ref_path = "docs/ready_ref.md"
-            if os.path.exists(ready_ref_path):
-                with open(ready_ref_path, "r") as f:
-                    ready_ref_content = f.read()
-            else:
-                # Fallback: try absolute path based on file location
-                base_dir = os.path.abspath(
-                    os.path.join(os.path.dirname(__file__), "../../../../")
-                )
-                ready_ref_path = os.path.join(base_dir, "docs", "ready_ref.md")
-                if os.path.exists(ready_ref_path):
-                    with open(ready_ref_path, "r") as f:
-                        ready_ref_content = f.read()
-        except Exception as e:
-            logger.warning(f"Could not load ready_ref.md: {e}")
-
         col_ref = ""
-        # We have ready_ref, we might not need the auto-generated list,
-        # but let's keep the auto-generated one for now as a fallback or concise list if ready_ref is missing columns.
-        # Actually, the ready_ref to be THE source for LLM understanding.
-        # Now, let's append the ready ref to the context.
-
         for k, v in ANALYTICS_METADATA.items():
             if k in columns:
                 col_ref += f"- `{k}`: {v['desc']} (Type: {v['type']})\n"
 
-        system_prompt = f"""
-You are a Pandas Data Analyst. You have access to a DataFrame `df` containing shipment data.
-Your goal is to write Python code to answer the user's question using `df`.
+        # The instructions, examples and ready ref are rendered once and lead
+        # the prompt; the scope-specific schema and sample follow them.
+        system_prompt = PROMPTS.render("analytics.system") + f"""
 
 ## Context
 Today's Date: {state.get('today_date')}
@@ -141,75 +218,11 @@ Today's Date: {state.get('today_date')}
 ## Key Column Reference
 {col_ref}
 
-## Operational Reference (Ready Ref)
-{ready_ref_content}
-
 ## Dataset Schema
 Columns: {columns}
 Shape: {shape_info}
 Sample Data:
 {head_sample}
-
-## Instructions
-1. Write valid Python/Pandas code.
-2. Assign the final answer (string, number, list, or dataframe) to the variable `result`.
-3. For "How many" or "Total" questions, `result` should be a single number.
-4. For "List" or "Which" questions, `result` should be a unique list or a DataFrame.
-5. **STRICT RULE:** Never include internal technical columns like {INTERNAL_COLUMNS} in the final `result`.
-6. **RELEVANCE:** When returning a DataFrame/table, select only the columns relevant to the user's question.
-7. **DATE FORMATTING:** Whenever displaying or returning a datetime column in a result, ALWAYS use `.dt.strftime('%d-%b-%Y')` to ensure a clean, user-friendly format (e.g., '22-Jul-2025').
-8. **COLUMN SELECTION:**
-   - For discharge-port ETA/arrival windows and overdue checks, use `best_eta_dp_date` (fallback: `eta_dp_date`).
-   - For actual DP-arrival checks, use `ata_dp_date` (fallback: `derived_ata_dp_date` if needed).
-   - If user asks "not yet arrived at DP": filter `ata_dp_date.isna()`.
-   - If user asks "failed/missed ETA at DP": filter `(ata_dp_date.isna()) & (best_eta_dp_date <= today)`.
-   - For final destination ETA logic, use `best_eta_fd_date` (fallback: `eta_fd_date`).
-9. Use `str.contains(..., na=False, case=False, regex=True)` for flexible text filtering.
-10. **SORTING RULE:** For DataFrame/list outputs containing date columns, sort by latest date first (descending) BEFORE date formatting. Prefer date columns in this order: `best_eta_dp_date`, `best_eta_fd_date`, `ata_dp_date`, `derived_ata_dp_date`, `eta_dp_date`, `eta_fd_date`.
-11. Return ONLY the code inside a ```python``` block. Explain your logic briefly outside the block.
-
-## Examples:
-User: "How many delivered shipments?"
-Code:
-```python
-result = df[df['shipment_status'] == 'DELIVERED'].shape[0]
-```
-
-User: "What is the total weight of my shipments?"
-Code:
-```python
-result = df['cargo_weight_kg'].sum()
-```
-
-User: "Which carriers are involved?"
-Code:
-```python
-result = df['final_carrier_name'].dropna().unique().tolist()
-```
-
-User: "Show me shipments with more than 5 days delay."
-Code:
-```python
-# Select only relevant columns and format dates
-cols = ['container_number', 'po_numbers', 'eta_dp_date', 'best_eta_dp_date', 'dp_delayed_dur', 'discharge_port']
-df_filtered = df[df['dp_delayed_dur'] > 5].copy()
-# Sort latest first prior to formatting
-df_filtered = df_filtered.sort_values('best_eta_dp_date', ascending=False)
-# Apply date formatting
-df_filtered['eta_dp_date'] = df_filtered['eta_dp_date'].dt.strftime('%d-%b-%Y')
-df_filtered['best_eta_dp_date'] = df_filtered['best_eta_dp_date'].dt.strftime('%d-%b-%Y')
-result = df_filtered[cols]
-```
-
-User: "List shipments departing next week."
-Code:
-```python
-# Use etd_lp_date for estimated departures
-cols = ['container_number', 'po_numbers', 'etd_lp_date', 'load_port']
-df_filtered = df[df['etd_lp_date'].dt.isocalendar().week == (today_week + 1)].copy()
-df_filtered['etd_lp_date'] = df_filtered['etd_lp_date'].dt.strftime('%d-%b-%Y')
-result = df_filtered[cols]
-```
 """
 
         messages = [
@@ -228,6 +241,15 @@ result = df_filtered[cols]
                 resp = chat.chat_completion(messages, temperature=0.0)
                 content = resp.get("content", "")
 
+                usage_metadata = state.get("usage_metadata") or {
+                    "prompt_tokens": 0,
+                    "completion_tokens": 0,
+                    "total_tokens": 0,
+                }
+                for k, v in (resp.get("usage") or {}).items():
+                    usage_metadata[k] = usage_metadata.get(k, 0) + v
+                state["usage_metadata"] = usage_metadata
+
                 # Extract code block
                 match = re.search(r"```python\s*(.*?)```", content, re.DOTALL)
                 if match:
@@ -255,6 +277,21 @@ result = df_filtered[cols]
             state["is_satisfied"] = True
             return state
 
+        missing_columns = _referenced_columns(
+            generated_code, available_columns, list(df.columns)
+        )
+        if missing_columns:
+            logger.info(
+                f"Reloading analytics data with extra columns: {missing_columns}",
+                extra={"step": "NODE:AnalyticsPlanner"},
+            )
+            try:
+                df = blob_mgr.load_filtered_data(
+                    consignee_codes, columns=list(df.columns) + missing_columns
+                )  # type: ignore
+            except Exception as e:
+                logger.warning(f"Extra column load failed: {e}")
+
         engine = _get_pandas_engine()
         exec_result = engine.execute_code(df, generated_code)
 
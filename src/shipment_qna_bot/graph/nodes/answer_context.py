@@ -0,0 +1,207 @@
+# src/shipment_qna_bot/graph/nodes/answer_context.py
+
+from __future__ import annotations
+
+import json
+import os
+import re
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Set
+
+from shipment_qna_bot.models.shipment_hit import ShipmentHit
+from shipment_qna_bot.tools.tokenizer import count_tokens
+
+DEFAULT_TOKEN_BUDGET = 3000
+MAX_DOCUMENTS = 10
+
+# Rendered for every document, in this order.
+CORE_FIELDS = (
+    "container_number",
+    "shipment_status",
+    "po_numbers",
+    "booking_numbers",
+    # Discharge Port Columns
+    "discharge_port",
+    "best_eta_dp_date",
+    "derived_ata_dp_date",
+    "eta_dp_date",
+    "ata_dp_date",
+    "delayed_dp",
+    "dp_delayed_dur",
+    # Final Destination Columns
+    "final_destination",
+    "best_eta_fd_date",
+    "eta_fd_date",
+    "optimal_eta_fd_date",
+    "delayed_fd",
+    "fd_delayed_dur",
+    # Priority Flags
+    "hot_container_flag",
+)
+
+CARRIER_FIELDS = (
+    "true_carrier_scac_name",
+    "final_carrier_name",
+    "first_vessel_name",
+    "final_vessel_name",
+)
+
+CARGO_FIELDS = (
+    "cargo_weight_kg",
+    "cargo_measure_cubic_meter",
+    "cargo_count",
+    "cargo_detail_count",
+    "empty_container_return_date",
+)
+
+# Detail dropped from a document when over budget, lowest value first. A
+# document at level n omits the first n tiers.
+DETAIL_TIERS = ("cargo", "milestones", "content", "carrier")
+
+_SEGMENT_RE = re.compile(r"(?<=[.;])\s+|\n+")
+_WORD_RE = re.compile(r"[a-z0-9_\-:/.]+")
+_DATE_RE = re.compile(r"\d{4}-\d{2}-\d{2}")
+_STOPWORDS = frozenset(
+    "a an and are as at by for from has in is it of on or the to was were with".split()
+)
+
+
+def token_budget() -> int:
+    try:
+        return int(os.getenv("ANSWER_CONTEXT_TOKEN_BUDGET", str(DEFAULT_TOKEN_BUDGET)))
+    except ValueError:
+        return DEFAULT_TOKEN_BUDGET
+
+
+def _words(text: str) -> Set[str]:
+    text = text.lower()
+    words = {w.strip(".:/-") for w in _WORD_RE.findall(text)}
+    # ISO timestamps also match their bare date ("2025-03-12T00:00:00").
+    words.update(_DATE_RE.findall(text))
+    return words - _STOPWORDS - {""}
+
+
+def residual_content(content: str, lines: Sequence[str]) -> str:
+    """
+    The parts of `content` not already said by the structured `lines`.
+
+    Content is split into sentences/lines; one is dropped when it repeats an
+    earlier one or when every word in it (field names split on "_", values,
+    minus stopwords) already appears in the structured lines.
+    """
+    known: Set[str] = set()
+    for line in lines:
+        known |= _words(line.replace("_", " "))
+        known |= _words(line)
+    kept: List[str] = []
+    seen: Set[str] = set()
+    for segment in _SEGMENT_RE.split(content or ""):
+        segment = segment.strip()
+        norm = " ".join(segment.lower().split())
+        if not norm or norm in seen:
+            continue
+        seen.add(norm)
+        if _words(segment) <= known:
+            continue
+        kept.append(segment)
+    return " ".join(kept)
+
+
+def render_document(hit: ShipmentHit, number: int, level: int = 0) -> str:
+    dropped = set(DETAIL_TIERS[:level])
+    fields = list(CORE_FIELDS)
+    if "carrier" not in dropped:
+        fields[4:4] = CARRIER_FIELDS
+    if "cargo" not in dropped:
+        fields.extend(CARGO_FIELDS)
+
+    lines = [f"{f}: {hit[f]}" for f in fields if f in hit]
+    out = [f"\n--- Document {number} ---\n"]
+    out.extend(line + "\n" for line in lines)
+    if "content" not in dropped and "content" in hit:
+        content = residual_content(str(hit["content"]), lines)
+        if content:
+            out.append(f"Content: {content}\n")
+    if "milestones" not in dropped and "milestones" in hit.metadata:
+        milestones = json.dumps(hit.metadata["milestones"], separators=(",", ":"))
+        out.append(f"Milestones: {milestones}\n")
+    return "".join(out)
+
+
+def _relevance(hit: ShipmentHit) -> float:
+    for key in ("reranker_score", "score"):
+        value = hit.get(key)
+        if isinstance(value, (int, float)):
+            return float(value)
+    return 0.0
+
+
+@dataclass
+class DocumentContext:
+    text: str
+    tokens: int
+    documents: int
+    # How many documents were cut down at each tier, plus "omitted" for
+    # documents left out entirely.
+    trimmed: Dict[str, int]
+
+
+def pack_documents(
+    hits: Sequence[ShipmentHit],
+    budget: Optional[int] = None,
+    *,
+    max_documents: int = MAX_DOCUMENTS,
+    count: Callable[[str], int] = count_tokens,
+) -> DocumentContext:
+    """
+    Renders up to `max_documents` hits as "--- Document n ---" blocks within
+    `budget` tokens.
+
+    Over budget, detail tiers are dropped one at a time across documents,
+    least relevant (search score) first; only when every document is down to
+    its core fields are the least relevant documents left out. The first
+    document is always kept. Documents stay in retrieval order.
+    """
+    budget = token_budget() if budget is None else budget
+    hits = list(hits[:max_documents])
+    if not hits:
+        return DocumentContext("", 0, 0, {})
+
+    levels = [0] * len(hits)
+    blocks = [render_document(h, i + 1) for i, h in enumerate(hits)]
+    costs = [count(b) for b in blocks]
+    total = sum(costs)
+
+    # Most relevant first; ties keep retrieval order.
+    ranked = sorted(range(len(hits)), key=lambda i: (-_relevance(hits[i]), i))
+    for level in range(1, len(DETAIL_TIERS) + 1):
+        for i in reversed(ranked):
+            if total <= budget:
+                break
+            blocks[i] = render_document(hits[i], i + 1, level)
+            cost = count(blocks[i])
+            total += cost - costs[i]
+            costs[i], levels[i] = cost, level
+
+    kept = set(range(len(hits)))
+    for i in reversed(ranked[1:]):
+        if total <= budget:
+            break
+        kept.discard(i)
+        total -= costs[i]
+
+    trimmed: Dict[str, int] = {}
+    for i in kept:
+        for tier in DETAIL_TIERS[: levels[i]]:
+            trimmed[tier] = trimmed.get(tier, 0) + 1
+    if len(kept) < len(hits):
+        trimmed["omitted"] = len(hits) - len(kept)
+        # Renumber so the prompt has no gaps.
+        blocks = [
+            render_document(hits[i], n, levels[i])
+            for n, i in enumerate(sorted(kept), start=1)
+        ]
+        total = sum(count(b) for b in blocks)
+    else:
+        blocks = [blocks[i] for i in sorted(kept)]
+    return DocumentContext("".join(blocks), total, len(kept), trimmed)
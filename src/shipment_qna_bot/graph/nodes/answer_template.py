@@ -0,0 +1,169 @@
+# src/shipment_qna_bot/graph/nodes/answer_template.py
+
+from __future__ import annotations
+
+import os
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Sequence
+
+from shipment_qna_bot.graph.nodes.intent_rules import (
+    ANALYTICS_WORDS, classify_by_rules, fast_path_min_confidence)
+from shipment_qna_bot.models.shipment_hit import ShipmentHit
+
+# Questions that need the model to reason, not just report fields.
+REASONING_WORDS = {
+    "advise",
+    "analyse",
+    "analyze",
+    "compare",
+    "difference",
+    "explain",
+    "expect",
+    "how",
+    "if",
+    "impact",
+    "likely",
+    "predict",
+    "reason",
+    "recommend",
+    "risk",
+    "should",
+    "suggest",
+    "summarise",
+    "summarize",
+    "why",
+}
+
+_LIST_RE = re.compile(
+    r"^(?:please\s+)?(?:list|show(?:\s+me)?|give\s+me|display|which|what)\b"
+)
+_LIST_NOUNS = {"container", "containers", "shipment", "shipments"}
+# Everything else a list query may say. The summary and table only cover
+# status, hot flag, delay, port and ETA, so any other word (vessel, carrier,
+# weight, PO, a location, ...) means the question asks for something the
+# template cannot show.
+_LIST_WORDS = frozenset(
+    # list verbs and filler
+    "please list show me give display which what where are is the my our all"
+    " any i we do have of for in on at to that will be being currently"
+    # status, priority and arrival wording
+    " status hot delayed late arriving arrive arrives arrived due eta expected"
+    " coming delivered transit ocean water port discharge final destination"
+    # time windows
+    " today tomorrow this next week month days".split()
+)
+_TOKEN_RE = re.compile(r"[a-z0-9']+")
+
+_DP_ACTUAL = ("derived_ata_dp_date", "ata_dp_date")
+_DP_ESTIMATED = ("best_eta_dp_date", "eta_dp_date", "optimal_ata_dp_date")
+_FD_ESTIMATED = ("best_eta_fd_date", "eta_fd_date", "optimal_eta_fd_date")
+
+
+def templated_answers_enabled() -> bool:
+    return os.getenv("ANSWER_TEMPLATED", "1").strip().lower() not in {
+        "0",
+        "false",
+        "no",
+        "off",
+    }
+
+
+def template_kind(
+    question: str, intent: Optional[str], requested_ids: Dict[str, List[str]]
+) -> Optional[str]:
+    """
+    "id_lookup" or "list" when the answer can be rendered straight from the
+    hits, None when the question needs the LLM.
+
+    ID lookups must be bare (the rule classifier's id_lookup at fast-path
+    confidence); list queries are "list/show/which ... containers" requests
+    without IDs that only ask about status, hot flag, delay or arrival.
+    Anything with reasoning or chart words goes to the LLM.
+    """
+    if not templated_answers_enabled() or intent != "retrieval":
+        return None
+    text = (question or "").strip().lower()
+    tokens = set(_TOKEN_RE.findall(text))
+    if tokens & (REASONING_WORDS | ANALYTICS_WORDS):
+        return None
+    if any(requested_ids.values()):
+        decision = classify_by_rules(text)
+        if (
+            decision.rule == "id_lookup"
+            and decision.confidence >= fast_path_min_confidence()
+        ):
+            return "id_lookup"
+        return None
+    if (
+        _LIST_RE.match(text)
+        and tokens & _LIST_NOUNS
+        and all(t in _LIST_WORDS or t in _LIST_NOUNS or t.isdigit() for t in tokens)
+    ):
+        return "list"
+    return None
+
+
+def _fmt(dt) -> str:
+    return dt.strftime("%d-%b-%y")
+
+
+def _describe_one(hit: ShipmentHit, is_fd: bool) -> str:
+    container = hit.get("container_number")
+    status = hit.get("shipment_status")
+    sentence = f"Container {container}" if container else "This shipment"
+    sentence += f" is {status}" if status else " has no status yet"
+    if hit.hot:
+        sentence += " and is flagged hot"
+    sentence += "."
+
+    if is_fd:
+        place = hit.get("final_destination") or "the final destination"
+        actual, estimated = None, hit.first_date(*_FD_ESTIMATED)
+        delay = hit.delay("fd_delayed_dur")
+    else:
+        place = hit.get("discharge_port") or "the discharge port"
+        actual = hit.first_date(*_DP_ACTUAL)
+        estimated = hit.first_date(*_DP_ESTIMATED)
+        delay = hit.delay("dp_delayed_dur")
+
+    if actual is not None:
+        sentence += f" Arrived at {place} on {_fmt(actual)}"
+    elif estimated is not None:
+        sentence += f" Expected at {place} on {_fmt(estimated)}"
+    else:
+        sentence += f" No arrival date at {place} yet"
+    if delay > 0:
+        sentence += f", {delay:g} days late"
+    return sentence + "."
+
+
+def render_summary(hits: Sequence[ShipmentHit], *, is_fd: bool) -> str:
+    """
+    Short factual summary of `hits` (one row per container) to go above
+    the status table; every value comes from the hits.
+    """
+    unique: List[ShipmentHit] = []
+    seen = set()
+    for hit in hits:
+        key = hit.get("container_number") or hit.get("document_id")
+        if key not in seen:
+            seen.add(key)
+            unique.append(hit)
+    if not unique:
+        return ""
+    if len(unique) == 1:
+        return _describe_one(unique[0], is_fd)
+
+    statuses = Counter(h.get("shipment_status") or "no status" for h in unique)
+    breakdown = ", ".join(f"{n} {status}" for status, n in statuses.most_common())
+    lines = [f"{len(unique)} containers: {breakdown}."]
+    hot = sum(1 for h in unique if h.hot)
+    if hot:
+        lines.append(f"{hot} flagged hot.")
+    delay_field = "fd_delayed_dur" if is_fd else "dp_delayed_dur"
+    delayed = sum(1 for h in unique if h.delay(delay_field) > 0)
+    if delayed:
+        place = "final destination" if is_fd else "discharge port"
+        lines.append(f"{delayed} delayed at the {place}.")
+    return " ".join(lines)
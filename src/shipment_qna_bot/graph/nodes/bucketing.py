@@ -0,0 +1,59 @@
+# src/shipment_qna_bot/graph/nodes/bucketing.py
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Dict, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from shipment_qna_bot.graph.nodes.post_filter import to_datetime64
+
+# (label, days) windows starting at "now"; any set can be passed instead.
+ARRIVAL_WINDOWS: Tuple[Tuple[str, int], ...] = (
+    ("today", 1),
+    ("this_week", 7),
+    ("this_fortnight", 14),
+    ("this_month", 30),
+)
+
+
+class WindowCounter:
+    """
+    Counts arrivals per category inside time windows.
+
+    Each category's arrival times are sorted once; every window is then two
+    binary searches, so a chart costs O(n log n) however many windows and
+    categories it has.
+    """
+
+    def __init__(
+        self,
+        times: np.ndarray,
+        categories: Optional[Mapping[str, np.ndarray]] = None,
+    ):
+        valid = ~np.isnat(times)
+        if categories is None:
+            categories = {"all": np.ones(len(times), dtype=bool)}
+        self._sorted: Dict[str, np.ndarray] = {
+            name: np.sort(times[valid & mask]) for name, mask in categories.items()
+        }
+
+    @property
+    def categories(self) -> Tuple[str, ...]:
+        return tuple(self._sorted)
+
+    def counts(
+        self, now: datetime, windows: Sequence[Tuple[str, int]] = ARRIVAL_WINDOWS
+    ) -> Dict[str, np.ndarray]:
+        """
+        Per category, the number of arrivals with now <= t < now + days for
+        each window, in window order.
+        """
+        start = to_datetime64(now)
+        ends = start + np.array([days for _, days in windows], dtype="timedelta64[D]")
+        out: Dict[str, np.ndarray] = {}
+        for name, times in self._sorted.items():
+            first = np.searchsorted(times, start, side="left")
+            out[name] = np.searchsorted(times, ends, side="left") - first
+        return out
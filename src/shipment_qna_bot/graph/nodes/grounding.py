@@ -0,0 +1,126 @@
+import re
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Any, Iterable, List, Optional, Set
+
+from shipment_qna_bot.graph.nodes.extractor import extract_regex_ids
+
+_TOKEN_RE = re.compile(r"[A-Za-z0-9]+")
+_ISO_DATE_RE = re.compile(r"\b(\d{4}-\d{2}-\d{2})")
+# Formats the answer node emits or the model tends to echo back.
+_ANSWER_DATE_PATTERNS = (
+    (re.compile(r"\b\d{4}-\d{2}-\d{2}\b"), ("%Y-%m-%d",)),
+    (re.compile(r"\b\d{1,2}-[A-Za-z]{3}-\d{2,4}\b"), ("%d-%b-%y", "%d-%b-%Y")),
+    (
+        re.compile(r"\b[A-Za-z]{3,9} \d{1,2}, \d{4}\b"),
+        ("%b %d, %Y", "%B %d, %Y"),
+    ),
+    (re.compile(r"\b\d{1,2} [A-Za-z]{3,9} \d{4}\b"), ("%d %b %Y", "%d %B %Y")),
+)
+
+GROUNDED = "grounded"
+UNGROUNDED = "ungrounded"
+INCONCLUSIVE = "inconclusive"
+
+
+@dataclass(frozen=True)
+class GroundingCheck:
+    """
+    Result of checking the identifiers and dates cited in an answer against
+    the retrieved hits.
+    """
+
+    verdict: str
+    cited: int
+    missing_ids: List[str] = field(default_factory=list)
+    missing_dates: List[str] = field(default_factory=list)
+
+
+def _flatten(value: Any) -> Iterable[str]:
+    if value is None:
+        return
+    if isinstance(value, Mapping):
+        for v in value.values():
+            yield from _flatten(v)
+    elif isinstance(value, (list, tuple, set)):
+        for v in value:
+            yield from _flatten(v)
+    else:
+        yield str(value)
+
+
+def _hit_vocabulary(hits: List[dict]) -> tuple[Set[str], Set[date]]:
+    tokens: Set[str] = set()
+    dates: Set[date] = set()
+    for hit in hits:
+        for text in _flatten(hit):
+            tokens.update(t.upper() for t in _TOKEN_RE.findall(text))
+            for iso in _ISO_DATE_RE.findall(text):
+                try:
+                    dates.add(date.fromisoformat(iso))
+                except ValueError:
+                    continue
+    return tokens, dates
+
+
+def _parse_answer_date(raw: str, formats: Iterable[str]) -> Optional[date]:
+    for fmt in formats:
+        try:
+            return datetime.strptime(raw, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def _cited_dates(text: str) -> List[tuple[str, date]]:
+    found = []
+    for pattern, formats in _ANSWER_DATE_PATTERNS:
+        for raw in pattern.findall(text):
+            parsed = _parse_answer_date(raw, formats)
+            if parsed is not None:
+                found.append((raw, parsed))
+    return found
+
+
+def check_grounding(
+    answer: str,
+    hits: List[dict],
+    question: str = "",
+    known_dates: Iterable[str] = (),
+) -> GroundingCheck:
+    """
+    Verifies every container/PO/booking/OBL number and date cited in the
+    answer against the hits.
+
+    - grounded: something was cited and all of it appears in the hits.
+    - ungrounded: a container or OBL number appears in neither the hits nor
+      the question, which means the answer invented it.
+    - inconclusive: nothing checkable was cited, or a looser match (PO,
+      booking, date) was not found; the LLM judge decides.
+    """
+    tokens, dates = _hit_vocabulary(hits)
+    for raw in known_dates:
+        try:
+            dates.add(date.fromisoformat(str(raw)[:10]))
+        except ValueError:
+            continue
+    question_tokens = {t.upper() for t in _TOKEN_RE.findall(question or "")}
+
+    ids = extract_regex_ids(answer or "")
+    strict = set(ids["container_number"]) | set(ids["obl_nos"])
+    loose = (set(ids["po_numbers"]) | set(ids["booking_numbers"])) - strict
+
+    invented = sorted(i for i in strict if i not in tokens and i not in question_tokens)
+    missing_ids = sorted(i for i in (strict | loose) if i not in tokens)
+    cited_dates = _cited_dates(answer or "")
+    missing_dates = sorted({raw for raw, d in cited_dates if d not in dates})
+    cited = len(strict | loose) + len(cited_dates)
+
+    if invented:
+        verdict = UNGROUNDED
+    elif cited == 0 or missing_ids or missing_dates:
+        verdict = INCONCLUSIVE
+    else:
+        verdict = GROUNDED
+    return GroundingCheck(verdict, cited, missing_ids, missing_dates)
@@ -0,0 +1,226 @@
+# src/shipment_qna_bot/graph/nodes/history.py
+
+from __future__ import annotations
+
+import os
+import re
+from typing import Any, Dict, List, Optional
+
+from shipment_qna_bot.graph.state import last_turns
+
+DEFAULT_HISTORY_TURNS = 3
+# Prior messages are clipped before they go into the rewrite prompt; answers
+# can carry whole tables.
+MAX_MESSAGE_CHARS = 600
+MAX_REMEMBERED = 5
+
+ID_KINDS = ("container_number", "po_numbers", "booking_numbers", "obl_nos")
+_ID_LABELS = {
+    "container_number": "container",
+    "po_numbers": "PO",
+    "booking_numbers": "booking",
+    "obl_nos": "OBL",
+}
+
+TIME_WINDOW_RE = re.compile(
+    r"\b(?:next|in)\s+\d+\s+days?\b"
+    r"|\b(?:next|this)\s+(?:week|month)\b"
+    r"|\btoday\b|\btomorrow\b|\byesterday\b"
+    r"|\b\d{4}-\d{2}-\d{2}\b"
+    r"|\b\d{1,2}-[a-z]{3}-\d{2,4}\b"
+)
+
+# References the entity memory can fill in: personal pronouns and
+# demonstrative noun phrases about shipments.
+_REFERENCE_RE = re.compile(
+    r"\b(?:(?:that|this|those|these|the\s+same)\s+"
+    r"(?:containers?|shipments?|pos?|purchase\s+orders?|orders?|bookings?)"
+    r"|its|it|they|them|their)\b"
+)
+_POSSESSIVES = {"its", "their"}
+# Anything else that points back into the conversation needs the LLM.
+_OTHER_REFERENCES_RE = re.compile(
+    r"\b(?:that|this|those|these|same|previous|earlier|above|again|continue"
+    r"|former|latter)\b"
+)
+# Local resolution only covers short follow-ups about one shipment attribute.
+MAX_LOCAL_WORDS = 8
+# The pronoun may point at a noun in the same question ("hot containers and
+# when they arrive") ...
+_ANTECEDENT_RE = re.compile(
+    r"\b(?:containers?|shipments?|pos|purchase\s+orders?|orders?|bookings?)\b"
+)
+# ... or the question lists, aggregates or joins several asks.
+_LIST_OR_AGGREGATE_RE = re.compile(
+    r"\b(?:list|all|show|every|each|any|which|how\s+many|count|total|sum"
+    r"|average|and)\b"
+)
+# Expletive "it" refers to nothing ("what time is it", "is it possible").
+_EXPLETIVE_RE = re.compile(
+    r"\bwhat\s+time\s+is\s+it\b"
+    r"|\b(?:is|was|would\s+it\s+be|it\s+is|it's)\s+(?:it\s+)?"
+    r"(?:possible|ok|okay|true|fine|necessary|likely)\b"
+    r"|\bit\s+(?:seems|looks|appears)\b"
+)
+# The rest of the question must ask about a shipment attribute.
+_ATTRIBUTE_RE = re.compile(
+    r"\b(?:eta|etd|arriv\w*|deliver\w*|depart\w*|delay\w*|late|status|where"
+    r"|located|hot|vessel|carrier|port|destination|weight|milestones?|track\w*"
+    r"|ship(?:ped|ping)?|reach\w*|due|discharge\w*|cargo|gate\w*)\b"
+)
+_ID_RE = re.compile(r"\b[a-z]{4}\d{7}\b|\b[a-z0-9]*\d{5,}[a-z0-9]*\b")
+
+
+def history_turns() -> int:
+    try:
+        turns = int(os.getenv("NORMALIZER_HISTORY_TURNS", str(DEFAULT_HISTORY_TURNS)))
+    except ValueError:
+        return DEFAULT_HISTORY_TURNS
+    return max(1, turns)
+
+
+def local_resolution_enabled() -> bool:
+    return os.getenv("NORMALIZER_LOCAL_COREF", "1").strip().lower() not in {
+        "0",
+        "false",
+        "no",
+        "off",
+    }
+
+
+def recent_history(messages: List[Any], turns: Optional[int] = None) -> List[Any]:
+    """
+    The prior messages the rewrite prompt quotes verbatim: the last `turns`
+    turns (NORMALIZER_HISTORY_TURNS by default).
+    """
+    return last_turns(messages, history_turns() if turns is None else turns)
+
+
+def clip_message(text: str, limit: int = MAX_MESSAGE_CHARS) -> str:
+    text = (text or "").strip()
+    if len(text) <= limit:
+        return text
+    return text[:limit].rstrip() + " ..."
+
+
+def empty_memory() -> Dict[str, Any]:
+    return {"ids": {}, "focus": {}, "time_window": None, "locations": []}
+
+
+def remember(
+    memory: Optional[Dict[str, Any]],
+    question: str,
+    extracted: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Folds one resolved turn into the entity memory. IDs of a kind replace the
+    remembered ones only when the turn names some; `focus` holds the IDs the
+    turn named (empty when it named none), which is what a pronoun in the
+    next question can refer to.
+    """
+    updated = {**empty_memory(), **(memory or {})}
+    updated["ids"] = dict(updated["ids"])
+    extracted = extracted or {}
+
+    containers = {str(c).upper() for c in extracted.get("container_number") or []}
+    focus: Dict[str, List[str]] = {}
+    for kind in ID_KINDS:
+        ids = {str(x).upper() for x in extracted.get(kind) or []}
+        if kind != "container_number":
+            # The booking pattern also matches container numbers.
+            ids -= containers
+        if ids:
+            focus[kind] = sorted(ids)[:MAX_REMEMBERED]
+            updated["ids"][kind] = focus[kind]
+    updated["focus"] = focus
+
+    window = TIME_WINDOW_RE.search((question or "").lower())
+    if window:
+        updated["time_window"] = window.group(0)
+    locations = [str(loc) for loc in extracted.get("location") or [] if loc]
+    if locations:
+        updated["locations"] = locations[:MAX_REMEMBERED]
+    return updated
+
+
+def fold_previous_turn(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Brings `state["entity_memory"]` up to date with the previous turn. Runs at
+    the start of a turn, while `normalized_question` and `extracted_ids` still
+    hold the previous turn's values (they persist in the checkpoint).
+    """
+    memory = state.get("entity_memory") or empty_memory()
+    previous = state.get("normalized_question")
+    if previous:
+        memory = remember(memory, previous, state.get("extracted_ids"))
+    state["entity_memory"] = memory
+    return memory
+
+
+def _phrase(kind: str, ids: List[str]) -> str:
+    label = _ID_LABELS[kind]
+    if len(ids) == 1:
+        return f"{label} {ids[0]}"
+    return f"{label}s {', '.join(ids[:-1])} and {ids[-1]}"
+
+
+def render_memory(memory: Optional[Dict[str, Any]]) -> Optional[str]:
+    """
+    One line for the rewrite prompt standing in for the turns that are no
+    longer quoted.
+    """
+    if not memory:
+        return None
+    parts = [
+        _phrase(kind, ids)
+        for kind in ID_KINDS
+        if (ids := (memory.get("ids") or {}).get(kind))
+    ]
+    if memory.get("time_window"):
+        parts.append(f"time window {memory['time_window']}")
+    if memory.get("locations"):
+        parts.append(f"locations {', '.join(memory['locations'])}")
+    if not parts:
+        return None
+    return "Entities mentioned earlier in this conversation: " + "; ".join(parts) + "."
+
+
+def resolve_locally(question: str, memory: Optional[Dict[str, Any]]) -> Optional[str]:
+    """
+    Rewrites a short follow-up whose pronoun can only mean the IDs of the
+    previous turn ("when will it arrive?" after a container lookup). Returns
+    None, leaving the question to the LLM rewrite, when the memory cannot
+    settle it: the question names its own IDs or a noun the pronoun may refer
+    to, lists or aggregates, uses an expletive "it", asks about no shipment
+    attribute, the previous turn named none or more than one kind of ID, or
+    it refers back in a way other than a pronoun.
+    """
+    if not local_resolution_enabled() or not memory:
+        return None
+    focus = memory.get("focus") or {}
+    if len(focus) != 1:
+        return None
+    lowered = (question or "").strip().lower()
+    if not _REFERENCE_RE.search(lowered) or _ID_RE.search(lowered):
+        return None
+    if len(lowered.split()) > MAX_LOCAL_WORDS:
+        return None
+    rest = _REFERENCE_RE.sub(" ", lowered)
+    if (
+        _ANTECEDENT_RE.search(rest)
+        or _LIST_OR_AGGREGATE_RE.search(rest)
+        or _EXPLETIVE_RE.search(lowered)
+        or not _ATTRIBUTE_RE.search(rest)
+    ):
+        return None
+
+    kind, ids = next(iter(focus.items()))
+    phrase = _phrase(kind, ids).lower()
+
+    def _substitute(match: re.Match) -> str:
+        return f"{phrase}'s" if match.group(0) in _POSSESSIVES else phrase
+
+    resolved = _REFERENCE_RE.sub(_substitute, lowered)
+    if _OTHER_REFERENCES_RE.search(TIME_WINDOW_RE.sub(" ", resolved)):
+        return None
+    return resolved
@@ -0,0 +1,168 @@
+import os
+import re
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from shipment_qna_bot.graph.nodes.extractor import extract_regex_ids
+
+# Keyword sets shared with the test-mode classifier in intent.py.
+GREETING_WORDS = {"hi", "hello", "hey", "good morning", "good afternoon"}
+ANALYTICS_WORDS = {"chart", "graph", "analytics", "breakdown", "bucket"}
+EXIT_WORDS = {"bye", "goodbye", "quit", "exit", "end", "thank you", "thanks"}
+
+# Whole-message phrases that are unambiguous on their own.
+_GREETING_PHRASES = GREETING_WORDS | {
+    "good evening",
+    "hi there",
+    "hello there",
+    "hey there",
+}
+_EXIT_PHRASES = EXIT_WORDS | {
+    "bye bye",
+    "ok bye",
+    "ok thanks",
+    "ok thank you",
+    "thanks bye",
+    "thank you bye",
+    "thanks a lot",
+    "thank you so much",
+    "that's all",
+    "thats all",
+}
+
+# Words that may surround an ID without changing a lookup into something else.
+_LOOKUP_FILLER = {
+    "a",
+    "about",
+    "and",
+    "booking",
+    "bl",
+    "check",
+    "container",
+    "containers",
+    "details",
+    "eta",
+    "for",
+    "info",
+    "is",
+    "me",
+    "my",
+    "no",
+    "number",
+    "obl",
+    "of",
+    "please",
+    "po",
+    "show",
+    "status",
+    "the",
+    "track",
+    "what",
+    "what's",
+    "whats",
+    "where",
+    "where's",
+    "wheres",
+}
+
+_AGGREGATE_RE = re.compile(
+    r"^(?:how many|how much|count|total|number of|what is the total|what's the total)\b"
+)
+_TOKEN_RE = re.compile(r"[a-z0-9']+")
+
+_SUB_INTENT_KEYWORDS = (
+    ("eta", ("eta", "arrive", "arrival")),
+    ("delay", ("delay", "delays", "delayed", "late")),
+    ("status", ("status", "where")),
+    ("hot", ("hot",)),
+)
+
+DEFAULT_MIN_CONFIDENCE = 0.85
+
+
+@dataclass(frozen=True)
+class RuleDecision:
+    """
+    Outcome of the rule classifier. `intent` is None when no rule fired.
+    """
+
+    intent: Optional[str]
+    confidence: float
+    rule: str
+    sub_intents: List[str] = field(default_factory=list)
+
+
+def fast_path_min_confidence() -> float:
+    """
+    INTENT_FAST_PATH_MIN_CONFIDENCE; values above 1 disable the fast path.
+    """
+    try:
+        return float(
+            os.getenv("INTENT_FAST_PATH_MIN_CONFIDENCE", str(DEFAULT_MIN_CONFIDENCE))
+        )
+    except ValueError:
+        return DEFAULT_MIN_CONFIDENCE
+
+
+def keyword_sub_intents(text: str, intent: str) -> List[str]:
+    tokens = set(_TOKEN_RE.findall(text.lower()))
+    sub_intents = [intent]
+    for name, words in _SUB_INTENT_KEYWORDS:
+        if name not in sub_intents and any(w in tokens for w in words):
+            sub_intents.append(name)
+    return sub_intents
+
+
+def _contains_phrase(text: str, phrases) -> bool:
+    return any(re.search(rf"\b{re.escape(p)}\b", text) for p in phrases)
+
+
+def classify_by_rules(text: str) -> RuleDecision:
+    """
+    Scores the obvious turns (greetings, goodbyes, bare ID lookups, aggregate
+    questions without IDs). Anything else comes back with confidence 0.
+    """
+    lowered = (text or "").strip().lower()
+    tokens = _TOKEN_RE.findall(lowered)
+    if not tokens:
+        return RuleDecision(None, 0.0, "empty")
+    phrase = " ".join(tokens)
+
+    if phrase in _GREETING_PHRASES:
+        return RuleDecision("greeting", 0.97, "greeting_phrase", ["greeting"])
+    if phrase in _EXIT_PHRASES:
+        return RuleDecision("end", 0.97, "exit_phrase", ["end"])
+
+    ids = extract_regex_ids(lowered)
+    id_tokens = {i.lower() for values in ids.values() for i in values}
+    wants_aggregate = bool(_AGGREGATE_RE.search(phrase)) or _contains_phrase(
+        phrase, ANALYTICS_WORDS
+    )
+
+    if id_tokens:
+        if wants_aggregate:
+            return RuleDecision(None, 0.4, "ids_with_aggregate")
+        rest = [t for t in tokens if t not in id_tokens and t not in _LOOKUP_FILLER]
+        if not rest:
+            return RuleDecision(
+                "retrieval",
+                0.95,
+                "id_lookup",
+                keyword_sub_intents(lowered, "retrieval"),
+            )
+        return RuleDecision(
+            "retrieval",
+            0.6,
+            "ids_with_context",
+            keyword_sub_intents(lowered, "retrieval"),
+        )
+
+    if wants_aggregate:
+        return RuleDecision(
+            "analytics",
+            0.9,
+            "aggregate_no_ids",
+            keyword_sub_intents(lowered, "analytics"),
+        )
+
+    return RuleDecision(None, 0.0, "no_match")
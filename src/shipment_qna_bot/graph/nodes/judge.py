@@ -1,10 +1,14 @@
 import json
-from typing import Any, Dict
+import os
+from typing import Any, Dict, List, Optional
 
+from shipment_qna_bot.graph.nodes.grounding import (GROUNDED, UNGROUNDED,
+                                                    check_grounding)
 from shipment_qna_bot.logging.graph_tracing import log_node_execution
 from shipment_qna_bot.logging.logger import logger, set_log_context
 from shipment_qna_bot.tools.azure_openai_chat import AzureOpenAIChatTool
 from shipment_qna_bot.tools.date_tools import get_today_date
+from shipment_qna_bot.utils import metrics
 from shipment_qna_bot.utils.runtime import is_test_mode
 
 _CHAT_TOOL = None
@@ -17,47 +21,32 @@ def _get_chat_tool() -> AzureOpenAIChatTool:
     return _CHAT_TOOL
 
 
-def judge_node(state: Dict[str, Any]) -> Dict[str, Any]:
-    """
-    Evaluates if the generated answer is grounded in retrieved documents and answers the question.
-    """
-    set_log_context(
-        conversation_id=state.get("conversation_id", "-"),
-        consignee_codes=state.get("consignee_codes", []),
-        intent=state.get("intent", "-"),
-    )
-
-    with log_node_execution(
-        "Judge",
-        {
-            "intent": state.get("intent", "-"),
-            "retry_count": state.get("retry_count", 0),
-        },
-        state_ref=state,
-    ):
-        question = state.get("question_raw") or ""
-        answer = state.get("answer_text") or ""
-        hits = state.get("hits") or []
-
-        if is_test_mode():
-            state["is_satisfied"] = True
-            state["reflection_feedback"] = None
-            return state
-
-        if not hits:
-            # If no hits, we can't really judge grounding, but we can judge if the "no info" answer is acceptable.
-            state["is_satisfied"] = True
-            state["reflection_feedback"] = None
-            return state
-
-        # Evaluation Prompt
-        system_prompt = """
+# Static instructions as the system message (a cacheable prefix); the
+# documents, question and draft go in the user message.
+_JUDGE_PROMPT = """
 Role:
 You are a quality assurance judge for a logistics chatbot.
 
 Goal:
-Evaluate the drafted answer based on the provided retrieved documents and the user's question.
+Evaluate the drafted answer based on the retrieved documents and the user's question given below.
+
+Task:
+1. Grounding: Is the answer strictly based on the provided documents? (Yes/No)
+2. Completeness: Does the answer address all parts of the user question? (Yes/No)
+3. Accuracy: Are there any hallucinations or incorrect details? (List them if any)
+
+Decision:
+If the answer is grounded, complete, and accurate, set decision="satisfied".
+Otherwise, set decision="retry" and provide specific "feedback" on what needs to be improved in the next retrieval or planning step.
+
+Output MUST be a JSON object:
+{
+  "decision": "satisfied" | "retry",
+  "feedback": "string or null"
+}
+""".strip()
 
+_JUDGE_INPUT = """
 Retrieved Documents:
 {context}
 
@@ -70,83 +59,191 @@ Today's UTC Date:
 Drafted Answer:
 {answer}
 
-Task:
-1. Grounding: Is the answer strictly based on the provided documents? (Yes/No)
-2. Completeness: Does the answer address all parts of the user question? (Yes/No)
-3. Accuracy: Are there any hallucinations or incorrect details? (List them if any)
+Judge the answer now.
+""".strip()
 
-Decision:
-If the answer is grounded, complete, and accurate, set decision="satisfied".
-Otherwise, set decision="retry" and provide specific "feedback" on what needs to be improved in the next retrieval or planning step.
 
-Output MUST be a JSON object:
-{{
-  "decision": "satisfied" | "retry",
-  "feedback": "string or null"
-}}
-""".strip()
+def _judge_log_context(state: Dict[str, Any]) -> Dict[str, Any]:
+    set_log_context(
+        conversation_id=state.get("conversation_id", "-"),
+        consignee_codes=state.get("consignee_codes", []),
+        intent=state.get("intent", "-"),
+    )
+    return {
+        "intent": state.get("intent", "-"),
+        "retry_count": state.get("retry_count", 0),
+    }
+
+
+def _prejudge_enabled() -> bool:
+    return os.getenv("JUDGE_PREJUDGE", "1").strip().lower() not in {
+        "0",
+        "false",
+        "no",
+        "off",
+    }
+
 
-        today_str = state.get("today_date") or get_today_date()
-        context_str = ""
-        for i, hit in enumerate(hits[:10]):
-            context_str += f"\n--- Doc {i+1} ---\n{json.dumps(hit, indent=2)}\n"
-
-        user_prompt = "Judge the answer now."
-
-        llm_messages = [
-            {
-                "role": "system",
-                "content": system_prompt.format(
-                    context=context_str,
-                    question=question,
-                    answer=answer,
-                    today=today_str,
-                ),
-            },
-            {"role": "user", "content": user_prompt},
-        ]
+def _request_retry(state: Dict[str, Any], feedback: Optional[str]) -> None:
+    state["is_satisfied"] = False
+    state["reflection_feedback"] = feedback
+    state["retry_count"] = state.get("retry_count", 0) + 1
+    metrics.increment("judge.retry")
+    logger.info(f"Judge requested retry: {feedback}")
+
+
+def _prejudge(state: Dict[str, Any]) -> bool:
+    """
+    Deterministic grounding check. Returns True when it settled the verdict
+    so the LLM judge can be skipped.
+    """
+    check = check_grounding(
+        state.get("answer_text") or "",
+        state.get("hits") or [],
+        question=state.get("question_raw") or "",
+        known_dates=[state.get("today_date") or get_today_date()],
+    )
+    logger.info(
+        f"Pre-judge verdict: {check.verdict}",
+        extra={
+            "extra_data": {
+                "cited": check.cited,
+                "missing_ids": check.missing_ids[:10],
+                "missing_dates": check.missing_dates[:10],
+            }
+        },
+    )
+    if check.verdict == GROUNDED:
+        metrics.increment("judge.skipped")
+        state["is_satisfied"] = True
+        state["reflection_feedback"] = None
+        return True
+    if check.verdict == UNGROUNDED:
+        metrics.increment("judge.skipped")
+        _request_retry(
+            state,
+            "The answer cites identifiers that are not in the retrieved documents: "
+            + ", ".join(check.missing_ids[:10])
+            + ". Only report shipments present in the results.",
+        )
+        return True
+    return False
+
+
+def _build_judge_messages(state: Dict[str, Any]) -> Optional[List[Dict[str, str]]]:
+    """
+    Returns the judge prompt, or None when the answer is accepted without an LLM call.
+    """
+    question = state.get("question_raw") or ""
+    answer = state.get("answer_text") or ""
+    hits = state.get("hits") or []
+
+    if is_test_mode():
+        state["is_satisfied"] = True
+        state["reflection_feedback"] = None
+        return None
+
+    if not hits:
+        # If no hits, we can't really judge grounding, but we can judge if the "no info" answer is acceptable.
+        state["is_satisfied"] = True
+        state["reflection_feedback"] = None
+        return None
+
+    if _prejudge_enabled() and _prejudge(state):
+        return None
+
+    metrics.increment("judge.llm")
+    today_str = state.get("today_date") or get_today_date()
+    context_str = ""
+    for i, hit in enumerate(hits[:10]):
+        context_str += f"\n--- Doc {i+1} ---\n{json.dumps(dict(hit), indent=2)}\n"
+
+    return [
+        {"role": "system", "content": _JUDGE_PROMPT},
+        {
+            "role": "user",
+            "content": _JUDGE_INPUT.format(
+                context=context_str,
+                question=question,
+                answer=answer,
+                today=today_str,
+            ),
+        },
+    ]
+
+
+def _apply_verdict(state: Dict[str, Any], response: Dict[str, Any]) -> Dict[str, Any]:
+    response_text = response["content"]
+    usage = response["usage"]
+
+    # Accumulate usage
+    usage_metadata = state.get("usage_metadata") or {
+        "prompt_tokens": 0,
+        "completion_tokens": 0,
+        "total_tokens": 0,
+    }
+    for k in usage:
+        usage_metadata[k] = usage_metadata.get(k, 0) + usage[k]
+    state["usage_metadata"] = usage_metadata
+
+    # Extract JSON
+    try:
+        # Find the first { and last }
+        start = response_text.find("{")
+        end = response_text.rfind("}") + 1
+        if start != -1 and end != -1:
+            result = json.loads(response_text[start:end])
+        else:
+            result = {"decision": "satisfied", "feedback": None}
+    except:
+        logger.warning(f"Failed to parse judge JSON: {response_text}")
+        result = {"decision": "satisfied", "feedback": None}
+
+    if result.get("decision") == "satisfied":
+        state["is_satisfied"] = True
+        state["reflection_feedback"] = result.get("feedback")
+        logger.info("Judge satisfied with answer.")
+    else:
+        _request_retry(state, result.get("feedback"))
+    return state
+
+
+def _accept_on_error(state: Dict[str, Any], err: Exception) -> Dict[str, Any]:
+    logger.error(f"Judge node failed: {err}", exc_info=True)
+    state["is_satisfied"] = True  # Default to satisfied on error to avoid loops
+    state["reflection_feedback"] = None
+    return state
+
+
+def judge_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Evaluates if the generated answer is grounded in retrieved documents and answers the question.
+    """
+    with log_node_execution("Judge", _judge_log_context(state), state_ref=state):
+        llm_messages = _build_judge_messages(state)
+        if llm_messages is None:
+            return state
 
         try:
             chat_tool = _get_chat_tool()
             response = chat_tool.chat_completion(llm_messages)
-            response_text = response["content"]
-            usage = response["usage"]
-
-            # Accumulate usage
-            usage_metadata = state.get("usage_metadata") or {
-                "prompt_tokens": 0,
-                "completion_tokens": 0,
-                "total_tokens": 0,
-            }
-            for k in usage:
-                usage_metadata[k] = usage_metadata.get(k, 0) + usage[k]
-            state["usage_metadata"] = usage_metadata
-
-            # Extract JSON
-            try:
-                # Find the first { and last }
-                start = response_text.find("{")
-                end = response_text.rfind("}") + 1
-                if start != -1 and end != -1:
-                    result = json.loads(response_text[start:end])
-                else:
-                    result = {"decision": "satisfied", "feedback": None}
-            except:
-                logger.warning(f"Failed to parse judge JSON: {response_text}")
-                result = {"decision": "satisfied", "feedback": None}
-
-            state["is_satisfied"] = result.get("decision") == "satisfied"
-            state["reflection_feedback"] = result.get("feedback")
-
-            if not state["is_satisfied"]:
-                state["retry_count"] = state.get("retry_count", 0) + 1
-                logger.info(f"Judge requested retry: {state['reflection_feedback']}")
-            else:
-                logger.info("Judge satisfied with answer.")
-
+            return _apply_verdict(state, response)
         except Exception as e:
-            logger.error(f"Judge node failed: {e}", exc_info=True)
-            state["is_satisfied"] = True  # Default to satisfied on error to avoid loops
-            state["reflection_feedback"] = None
+            return _accept_on_error(state, e)
+
 
-        return state
+async def ajudge_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Async variant of `judge_node` used by `arun_graph`.
+    """
+    with log_node_execution("Judge", _judge_log_context(state), state_ref=state):
+        llm_messages = _build_judge_messages(state)
+        if llm_messages is None:
+            return state
+
+        try:
+            chat_tool = _get_chat_tool()
+            response = await chat_tool.achat_completion(llm_messages)
+            return _apply_verdict(state, response)
+        except Exception as e:
+            return _accept_on_error(state, e)
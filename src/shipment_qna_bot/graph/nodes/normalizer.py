@@ -3,10 +3,16 @@ from typing import Any, Dict, List, Optional, Tuple
 
 from langchain_core.messages import BaseMessage, HumanMessage
 
+from shipment_qna_bot.graph.nodes.history import (TIME_WINDOW_RE, clip_message,
+                                                  fold_previous_turn,
+                                                  recent_history,
+                                                  render_memory,
+                                                  resolve_locally)
 from shipment_qna_bot.graph.state import GraphState
 from shipment_qna_bot.logging.graph_tracing import log_node_execution
 from shipment_qna_bot.logging.logger import logger
 from shipment_qna_bot.tools.azure_openai_chat import AzureOpenAIChatTool
+from shipment_qna_bot.utils import metrics
 from shipment_qna_bot.utils.runtime import is_test_mode
 
 _CHAT_TOOL = None
@@ -62,21 +68,7 @@ def _has_anaphora(text: str) -> bool:
 
 
 def _contains_time_window(text: str) -> bool:
-    lowered = (text or "").lower()
-    patterns = [
-        r"\bnext\s+\d+\s+days?\b",
-        r"\bin\s+\d+\s+days?\b",
-        r"\bnext\s+week\b",
-        r"\bnext\s+month\b",
-        r"\bthis\s+week\b",
-        r"\bthis\s+month\b",
-        r"\btoday\b",
-        r"\btomorrow\b",
-        r"\byesterday\b",
-        r"\b\d{4}-\d{2}-\d{2}\b",
-        r"\b\d{1,2}-[a-z]{3}-\d{2,4}\b",
-    ]
-    return any(re.search(p, lowered) for p in patterns)
+    return TIME_WINDOW_RE.search((text or "").lower()) is not None
 
 
 def _contains_ids(text: str) -> bool:
@@ -143,61 +135,72 @@ def _topic_shift_candidate(
     return {"raw": raw_question, "normalized": normalized_question, "added": added}
 
 
-def normalize_node(state: GraphState) -> Dict[str, Any]:
+def _build_rewrite_messages(state: GraphState) -> Optional[List[Dict[str, str]]]:
     """
-    Normalizes the user's question and resolves co-references using conversation history.
+    Runs the deterministic pre-checks (topic-shift replies, test mode, empty history)
+    and returns the co-reference prompt, or None when the state is already final.
+
+    The prompt is bounded: only the last NORMALIZER_HISTORY_TURNS turns are
+    quoted, and the entity memory stands in for everything before them.
     """
-    with log_node_execution(
-        "Normalizer",
-        {"question": (state.get("question_raw") or "")[:120]},
-        state_ref=state,
-    ):
-        question = (state.get("question_raw") or "").strip()
-        question, forced_new_topic = _strip_new_topic_prefix(question)
-        if forced_new_topic:
-            state["question_raw"] = question
-        history: List[BaseMessage] = state.get("messages", [])
-
-        pending = state.get("pending_topic_shift")
-        if pending:
-            choice = _parse_topic_shift_choice(question)
-            if choice:
-                chosen = (
-                    pending.get("normalized")
-                    if choice == "use_previous"
-                    else pending.get("raw")
-                )
-                chosen = (chosen or question).strip()
-                state["question_raw"] = chosen
-                state["normalized_question"] = chosen.lower()
-                state["pending_topic_shift"] = None
-                state["topic_shift_candidate"] = None
-                state.setdefault("messages", []).append(HumanMessage(content=chosen))
-                logger.info(
-                    "Applied topic-shift choice: %s",
-                    choice,
-                    extra={"extra_data": {"chosen": chosen[:120]}},
-                )
-                return state
-
-            # If the user responded with a new question (not a control token),
-            # clear the pending choice and continue normal processing.
-            if not _is_control_reply(question):
-                state["pending_topic_shift"] = None
-
-        if is_test_mode() or forced_new_topic:
-            state["normalized_question"] = question.lower()
+    memory = fold_previous_turn(state)
+    question = (state.get("question_raw") or "").strip()
+    question, forced_new_topic = _strip_new_topic_prefix(question)
+    if forced_new_topic:
+        state["question_raw"] = question
+    history: List[BaseMessage] = state.get("messages", [])
+
+    pending = state.get("pending_topic_shift")
+    if pending:
+        choice = _parse_topic_shift_choice(question)
+        if choice:
+            chosen = (
+                pending.get("normalized")
+                if choice == "use_previous"
+                else pending.get("raw")
+            )
+            chosen = (chosen or question).strip()
+            state["question_raw"] = chosen
+            state["normalized_question"] = chosen.lower()
+            state["pending_topic_shift"] = None
             state["topic_shift_candidate"] = None
-            return state
+            state.setdefault("messages", []).append(HumanMessage(content=chosen))
+            logger.info(
+                "Applied topic-shift choice: %s",
+                choice,
+                extra={"extra_data": {"chosen": chosen[:120]}},
+            )
+            return None
 
-        # If there is no history or only one message (the current one), just return the lowercase question
-        if len(history) <= 1:
-            state["normalized_question"] = question.lower()
-            state["topic_shift_candidate"] = None
-            return state
+        # If the user responded with a new question (not a control token),
+        # clear the pending choice and continue normal processing.
+        if not _is_control_reply(question):
+            state["pending_topic_shift"] = None
+
+    if is_test_mode() or forced_new_topic:
+        state["normalized_question"] = question.lower()
+        state["topic_shift_candidate"] = None
+        return None
+
+    # If there is no history or only one message (the current one), just return the lowercase question
+    if len(history) <= 1:
+        state["normalized_question"] = question.lower()
+        state["topic_shift_candidate"] = None
+        return None
+
+    resolved = resolve_locally(question, memory)
+    if resolved is not None:
+        metrics.increment("normalizer.local")
+        logger.info(
+            f"Resolved standalone question from entity memory: {resolved}",
+            extra={"extra_data": {"original": question}},
+        )
+        state["normalized_question"] = resolved
+        state["topic_shift_candidate"] = None
+        return None
 
-        # Prompt for co-reference resolution
-        system_prompt = """
+    # Prompt for co-reference resolution
+    system_prompt = """
 Role:
 You are an expert at resolving co-references in conversations for a logistics chatbot.
 
@@ -213,51 +216,103 @@ Guidelines:
 - Return ONLY the rewritten question text.
 """.strip()
 
-        llm_messages = [{"role": "system", "content": system_prompt}]
+    llm_messages = [{"role": "system", "content": system_prompt}]
+
+    # history includes the current question as its last item (added in run_graph).
+    prior = history[:-1]
+    window = recent_history(prior)
+    summary = render_memory(memory) if len(window) < len(prior) else None
+    if summary:
+        llm_messages.append({"role": "system", "content": summary})
+
+    for msg in window:
+        content = clip_message(str(getattr(msg, "content", "")))
+        if _is_control_reply(content):
+            continue
+        role = "user" if msg.type == "human" else "assistant"
+        llm_messages.append({"role": role, "content": content})
 
-        # Add history to prompt
-        # history includes current question as the last item (if it was added in run_graph)
-        # Actually builder.py adds it just before invoke.
+    llm_messages.append({"role": "user", "content": f"Follow-up Question: {question}"})
+    metrics.increment("normalizer.llm")
+    return llm_messages
 
-        for msg in history[:-1]:
-            content = str(getattr(msg, "content", "")).strip()
-            if _is_control_reply(content):
-                continue
-            role = "user" if msg.type == "human" else "assistant"
-            llm_messages.append({"role": role, "content": content})
 
-        llm_messages.append(
-            {"role": "user", "content": f"Follow-up Question: {question}"}
+def _apply_rewrite(state: GraphState, response: Optional[Dict[str, Any]]) -> GraphState:
+    """
+    Folds the co-reference LLM response (None on failure) back into the state.
+    """
+    question = (state.get("question_raw") or "").strip()
+    if response is not None:
+        standalone_question = (response.get("content") or "").strip()
+        usage = response["usage"]
+
+        # Accumulate usage
+        usage_metadata = state.get("usage_metadata") or {
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "total_tokens": 0,
+        }
+        for k in usage:
+            usage_metadata[k] = usage_metadata.get(k, 0) + usage[k]
+
+        normalized = standalone_question.lower()
+
+        logger.info(
+            f"Resolved standalone question: {normalized}",
+            extra={"extra_data": {"original": question}},
         )
+    else:
+        normalized = question.lower()
+        usage_metadata = state.get("usage_metadata")
+
+    candidate = _topic_shift_candidate(question, normalized)
+    state["normalized_question"] = normalized
+    state["usage_metadata"] = usage_metadata
+    state["topic_shift_candidate"] = candidate
+    return state
+
+
+def normalize_node(state: GraphState) -> Dict[str, Any]:
+    """
+    Normalizes the user's question and resolves co-references using conversation history.
+    """
+    with log_node_execution(
+        "Normalizer",
+        {"question": (state.get("question_raw") or "")[:120]},
+        state_ref=state,
+    ):
+        llm_messages = _build_rewrite_messages(state)
+        if llm_messages is None:
+            return state
 
         try:
             chat_tool = _get_chat_tool()
             response = chat_tool.chat_completion(llm_messages, temperature=0.0)
-            standalone_question = response["content"].strip()
-            usage = response["usage"]
+        except Exception as e:
+            logger.warning(f"Co-reference resolution failed: {e}")
+            response = None
 
-            # Accumulate usage
-            usage_metadata = state.get("usage_metadata") or {
-                "prompt_tokens": 0,
-                "completion_tokens": 0,
-                "total_tokens": 0,
-            }
-            for k in usage:
-                usage_metadata[k] = usage_metadata.get(k, 0) + usage[k]
+        return _apply_rewrite(state, response)
 
-            normalized = standalone_question.lower()
 
-            logger.info(
-                f"Resolved standalone question: {normalized}",
-                extra={"extra_data": {"original": question}},
-            )
+async def anormalize_node(state: GraphState) -> Dict[str, Any]:
+    """
+    Async variant of `normalize_node` used by `arun_graph`.
+    """
+    with log_node_execution(
+        "Normalizer",
+        {"question": (state.get("question_raw") or "")[:120]},
+        state_ref=state,
+    ):
+        llm_messages = _build_rewrite_messages(state)
+        if llm_messages is None:
+            return state
+
+        try:
+            chat_tool = _get_chat_tool()
+            response = await chat_tool.achat_completion(llm_messages, temperature=0.0)
         except Exception as e:
             logger.warning(f"Co-reference resolution failed: {e}")
-            normalized = question.lower()
-            usage_metadata = state.get("usage_metadata")
-
-        candidate = _topic_shift_candidate(question, normalized)
-        state["normalized_question"] = normalized
-        state["usage_metadata"] = usage_metadata
-        state["topic_shift_candidate"] = candidate
-        return state
+            response = None
+
+        return _apply_rewrite(state, response)
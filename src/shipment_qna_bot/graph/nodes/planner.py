@@ -18,315 +18,352 @@ def _get_chat_tool() -> AzureOpenAIChatTool:
     return _chat_tool
 
 
-def planner_node(state: Dict[str, Any]) -> Dict[str, Any]:
+# Static, built once: the whole system prompt is a shared prefix.
+_LOGISTICS_CONTEXT = """
+Field Mappings in Index:
+- container_number (String): e.g. SEGU5935510. Use: container_number eq '...' or contains(container_number, '...')
+- po_numbers (Collection): e.g. 5302997239. Use: po_numbers/any(p: p eq '...')
+- booking_numbers (Collection): e.g. TH2017996. Use: booking_numbers/any(b: b eq '...')
+- obl_nos (Collection): e.g. OBL123. Use: obl_nos/any(o: o eq '...')
+- shipment_status (String): DELIVERED, IN_OCEAN, AT_DISCHARGE_PORT, READY_FOR_PICKUP, EMPTY_RETURNED. Use: shipment_status eq '...'
+- hot_container_flag (Boolean): true/false. Use: hot_container_flag eq true
+- discharge_port (String): e.g. "Los Angeles". Use: contains(discharge_port, '...')
+- load_port (String): e.g. "Shanghai". Use: contains(load_port, '...')
+- final_destination (String): e.g. "Dallas". Use: contains(final_destination, '...')
+- first_vessel_name (String): e.g. "MAERSK SERANGOON". Use: contains(first_vessel_name, '...')
+- final_vessel_name (String): e.g. "BASLE EXPRESS". Use: contains(final_vessel_name, '...')
+- derived_ata_dp_date (DateTime): Primary discharge-port arrival date for arrival windows.
+- ata_dp_date (DateTime): Fallback actual arrival date at discharge port.
+- optimal_eta_fd_date (DateTime): Use for final-destination arrival windows.
+- dp_delayed_dur (Float): Delay in days at discharge port.
+- fd_delayed_dur (Float): Delay in days at final destination.
+- delayed_dp / delayed_fd (String): "on_time" or "delay".
+
+Synonyms & OData Tips:
+- "on water", "sailing" -> shipment_status eq 'IN_OCEAN'
+- "hot" -> hot_container_flag eq true
+- If the user mentions final destination (FD), in-dc, or distribution center, use final_destination.
+- Otherwise, use discharge_port for "arriving at <location>".
+- For ID Collections (PO, Booking, OBL), ALWAYS use 'any(p: p eq '...')' syntax.
+- For descriptive fields (Port, Vessel), 'contains(field, '...')' is more flexible than 'eq'.
+
+CRITICAL ODATA RULES:
+1. NO DATE MATH: Never use 'now()' or 'add 10 days' in filters. Azure Search does not support this in OData.
+2. NO REDUNDANCY: Do NOT include filters for 'hot_container_flag', 'shipment_status', or 'location' in `extra_filter` if they are already identified in the 'Extracted Entities' section. The system adds these automatically.
+3. DELAY SCOPE: Use 'dp_delayed_dur' for generic "delay" unless "final destination" or "FD" is mentioned.
+""".strip()
+
+_PLANNER_PROMPT = f"""
+You are a Search Planner for a logistics bot. Given a user question and extracted entities, generate an Azure Search Plan.
+
+{_LOGISTICS_CONTEXT}
+
+Output JSON only:
+{{
+    "query_text": "text for hybrid search",
+    "top_k": number (default 20, max 100),
+    "extra_filter": "OData filter string or null",
+    "reason": "short explanation"
+}}
+""".strip()
+
+
+def _build_plan_messages(state: Dict[str, Any]) -> List[Dict[str, str]]:
+    q = (state.get("normalized_question") or state.get("question_raw") or "").strip()
+    extracted = state.get("extracted_ids") or {}
+
+    reflection_feedback = state.get("reflection_feedback")
+    retry_count = state.get("retry_count") or 0
+
+    user_content = f"Question: {q}\nExtracted Entities: {json.dumps(extracted)}"
+
+    if reflection_feedback and retry_count > 0:
+        user_content += f"\n\n--- PREVIOUS ATTEMPT FEEDBACK ---\nThe previous retrieval did not result in a satisfactory answer. \nFeedback from judge: {reflection_feedback}\nPlease refine the search plan to better address the user's question."
+
+    messages = [
+        {"role": "system", "content": _PLANNER_PROMPT},
+        {"role": "user", "content": user_content},
+    ]
+    return messages
+
+
+def _finalize_plan(
+    state: Dict[str, Any],
+    plan_data: Dict[str, Any],
+    usage: Optional[Dict[str, Any]],
+) -> Dict[str, Any]:
     """
-    Generates a RetrievalPlan (query text, top_k, filters) using LLM and extracted metadata.
+    Merges the LLM plan (possibly empty) with the deterministic ID/status/date filters.
     """
+    q = (state.get("normalized_question") or state.get("question_raw") or "").strip()
+    extracted = state.get("extracted_ids") or {}
+    time_window_days = state.get("time_window_days")
+
+    usage_metadata = state.get("usage_metadata") or {
+        "prompt_tokens": 0,
+        "completion_tokens": 0,
+        "total_tokens": 0,
+    }
+    # Accumulate usage
+    for k in usage or {}:
+        usage_metadata[k] = usage_metadata.get(k, 0) + usage[k]
+    state["usage_metadata"] = usage_metadata
+
+    # Construct final plan
+    plan: RetrievalPlan = {
+        "query_text": plan_data.get("query_text") or q,
+        "top_k": plan_data.get("top_k") or 20,
+        "vector_k": 30,
+        "extra_filter": plan_data.get("extra_filter"),
+        "post_filter": None,
+        "reason": plan_data.get(
+            "reason", "test_mode" if is_test_mode() else "fallback"
+        ),
+    }
+
+    def _safe(s: str) -> str:
+        return s.replace("'", "''")
+
+    def _any_in(field: str, values: List[str]) -> str:
+        joined = ",".join(_safe(v) for v in values if v)
+        return f"{field}/any(t: search.in(t, '{joined}', ','))"
+
+    def _mentions_final_destination(text: str) -> bool:
+        lowered = text.lower()
+        if "final destination" in lowered or "final_destination" in lowered:
+            return True
+        if "distribution center" in lowered or "distribution centre" in lowered:
+            return True
+        if re.search(r"\bin-?dc\b", lowered):
+            return True
+        if re.search(r"\bfd\b", lowered):
+            return True
+        return False
+
+    def _extract_delay_days(text: str) -> Optional[int]:
+        lowered = text.lower()
+        if "delay" not in lowered and "delayed" not in lowered:
+            return None
+        match = re.search(r"\b(\d+)\s+days?\b", lowered)
+        if match:
+            try:
+                return int(match.group(1))
+            except ValueError:
+                return None
+        return 0
+
+    def _wants_bucket_chart(text: str) -> bool:
+        lowered = text.lower()
+        bucket_words = ["bucket", "breakdown", "group", "chart", "graph"]
+        window_words = ["today", "week", "fortnight", "month"]
+        return any(w in lowered for w in bucket_words) and any(
+            w in lowered for w in window_words
+        )
+
+    containers = extracted.get("container_number") or []
+    po_numbers = extracted.get("po_numbers") or []
+    booking_numbers = extracted.get("booking_numbers") or []
+    obl_nos = extracted.get("obl_nos") or []
+
+    container_set = {c for c in containers if c}
+    obl_set = {o for o in obl_nos if o}
+
+    # Avoid category overlap to prevent 'and' collisions in filters
+    if container_set:
+        po_numbers = [p for p in po_numbers if p not in container_set]
+        booking_numbers = [b for b in booking_numbers if b not in container_set]
+        obl_nos = [o for o in obl_nos if o not in container_set]
+
+    # If an ID is shared across multiple ID categories (PO, Booking, OBL),
+    # we should search all of them in an 'OR' block to avoid restrictive 'AND' logic.
+    # Overlap detection:
+    ambiguous_ids = (
+        (set(po_numbers) & set(booking_numbers))
+        | (set(po_numbers) & set(obl_nos))
+        | (set(booking_numbers) & set(obl_nos))
+    )
+
+    if ambiguous_ids:
+        po_numbers = [p for p in po_numbers if p not in ambiguous_ids]
+        booking_numbers = [b for b in booking_numbers if b not in ambiguous_ids]
+        obl_nos = [o for o in obl_nos if o not in ambiguous_ids]
+
+    # Booster: if we have specific IDs, make sure they are in query_text
+    all_ids = list(
+        container_set | obl_set | set(po_numbers) | set(booking_numbers) | ambiguous_ids
+    )
+
+    if all_ids:
+        plan["query_text"] = " ".join(all_ids) + " " + plan["query_text"]
+        plan["include_total_count"] = True
+
+    filter_clauses: List[str] = []
+    has_strong_ids = bool(all_ids)
+
+    # Merge LLM extra_filter if it doesn't seem to be a redundant copy of what we'll add deterministically
+    llm_filter = plan.get("extra_filter")
+    if llm_filter and not has_strong_ids:
+        # Simple heuristic: if the LLM filter is exactly 'hot_container_flag eq true'
+        # and we are about to add it anyway, skip it.
+        # But better to just let the LLM generate it and we append safely.
+        # To avoid the doubling seen in logs, we'll prefix it.
+        filter_clauses.append(f"({llm_filter})")
+
+    if containers:
+        parts = [f"container_number eq '{_safe(c)}'" for c in containers]
+        filter_clauses.append("(" + " or ".join(parts) + ")")
+
+    if po_numbers:
+        filter_clauses.append(_any_in("po_numbers", po_numbers))
+
+    if booking_numbers:
+        filter_clauses.append(_any_in("booking_numbers", booking_numbers))
+
+    if obl_nos:
+        filter_clauses.append(_any_in("obl_nos", obl_nos))
+
+    if ambiguous_ids:
+        # Handle IDs that could be any of the ID types with an OR across all 3
+        amb_list = list(ambiguous_ids)
+        po_part = _any_in("po_numbers", amb_list)
+        bk_part = _any_in("booking_numbers", amb_list)
+        ob_part = _any_in("obl_nos", amb_list)
+        filter_clauses.append(f"({po_part} or {bk_part} or {ob_part})")
+
+    status_keywords = [s.lower() for s in (extracted.get("status_keywords") or [])]
+    status_map = {
+        "on water": "IN_OCEAN",
+        "sailing": "IN_OCEAN",
+        "in ocean": "IN_OCEAN",
+        "delivered": "DELIVERED",
+        "ready for pickup": "READY_FOR_PICKUP",
+        "empty returned": "EMPTY_RETURNED",
+        "at discharge port": "AT_DISCHARGE_PORT",
+    }
+    statuses = {status_map[k] for k in status_keywords if k in status_map}
+    if statuses:
+        parts = [f"shipment_status eq '{s}'" for s in sorted(statuses)]
+        filter_clauses.append("(" + " or ".join(parts) + ")")
+
+    if any(k in status_keywords for k in ["hot", "priority"]):
+        filter_clauses.append("hot_container_flag eq true")
+
+    locations = extracted.get("location") or []
+    if locations:
+        location_field = (
+            "final_destination" if _mentions_final_destination(q) else "discharge_port"
+        )
+        parts = [f"contains({location_field}, '{_safe(loc)}')" for loc in locations]
+        filter_clauses.append("(" + " or ".join(parts) + ")")
+
+    if filter_clauses:
+        plan["extra_filter"] = " and ".join(filter_clauses)
+        plan["reason"] = plan.get("reason", "") + " (deterministic filters)"
+
+    post_filter: Dict[str, Any] = {}
+    if time_window_days:
+        is_fd = _mentions_final_destination(q)
+        if is_fd:
+            date_fields = ["optimal_eta_fd_date", "eta_fd_date"]
+        else:
+            date_fields = ["derived_ata_dp_date", "ata_dp_date", "eta_dp_date"]
+        post_filter["date_window"] = {
+            "fields": date_fields,
+            "days": time_window_days,
+            "direction": "next",
+        }
+        if "order_by" not in plan or not plan["order_by"]:
+            plan["order_by"] = "eta_fd_date desc" if is_fd else "eta_dp_date desc"
+        plan["top_k"] = max(plan.get("top_k", 20), 100)
+
+    delay_days = _extract_delay_days(q)
+    if delay_days is not None:
+        # Polyvalent delay logic: if generic, check both DP and FD
+        if _mentions_final_destination(q):
+            delay_field = "fd_delayed_dur"
+        else:
+            # Default to discharge port delay as per user preference
+            delay_field = "dp_delayed_dur"
+
+        if delay_field:
+            post_filter["delay"] = {
+                "field": delay_field,
+                "op": ">=" if delay_days else ">",
+                "days": delay_days,
+            }
+
+    if post_filter:
+        plan["post_filter"] = post_filter
+
+    if _wants_bucket_chart(q):
+        plan["include_total_count"] = True
+        current_top_k = plan.get("top_k")
+        plan["top_k"] = max(current_top_k or 20, 500)
+        if not plan.get("query_text") or plan["query_text"] == q:
+            plan["query_text"] = "*"
+
+    state["retrieval_plan"] = plan
+    logger.info(f"Planned retrieval: {plan}")
+
+    return state
+
+
+def _parse_plan(res: str) -> Dict[str, Any]:
+    json_match = re.search(r"\{.*\}", res, re.DOTALL)
+    if json_match:
+        return json.loads(json_match.group(0))
+    return {}
+
+
+def _plan_log_context(state: Dict[str, Any]) -> Dict[str, Any]:
     set_log_context(
         conversation_id=state.get("conversation_id", "-"),
         consignee_codes=state.get("consignee_codes", []),
         intent=state.get("intent", "-"),
     )
+    return {
+        "intent": state.get("intent", "-"),
+        "question": (state.get("normalized_question") or "-")[:120],
+    }
 
-    with log_node_execution(
-        "Planner",
-        {
-            "intent": state.get("intent", "-"),
-            "question": (state.get("normalized_question") or "-")[:120],
-        },
-        state_ref=state,
-    ):
-        q = (
-            state.get("normalized_question") or state.get("question_raw") or ""
-        ).strip()
-        extracted = state.get("extracted_ids") or {}
-        time_window_days = state.get("time_window_days")
-
-        # Logistics mapping and synonym dictionary for the LLM
-        logistics_context = """
-        Field Mappings in Index:
-        - container_number (String): e.g. SEGU5935510. Use: container_number eq '...' or contains(container_number, '...')
-        - po_numbers (Collection): e.g. 5302997239. Use: po_numbers/any(p: p eq '...')
-        - booking_numbers (Collection): e.g. TH2017996. Use: booking_numbers/any(b: b eq '...')
-        - obl_nos (Collection): e.g. OBL123. Use: obl_nos/any(o: o eq '...')
-        - shipment_status (String): DELIVERED, IN_OCEAN, AT_DISCHARGE_PORT, READY_FOR_PICKUP, EMPTY_RETURNED. Use: shipment_status eq '...'
-        - hot_container_flag (Boolean): true/false. Use: hot_container_flag eq true
-        - discharge_port (String): e.g. "Los Angeles". Use: contains(discharge_port, '...')
-        - load_port (String): e.g. "Shanghai". Use: contains(load_port, '...')
-        - final_destination (String): e.g. "Dallas". Use: contains(final_destination, '...')
-        - first_vessel_name (String): e.g. "MAERSK SERANGOON". Use: contains(first_vessel_name, '...')
-        - final_vessel_name (String): e.g. "BASLE EXPRESS". Use: contains(final_vessel_name, '...')
-        - derived_ata_dp_date (DateTime): Primary discharge-port arrival date for arrival windows.
-        - ata_dp_date (DateTime): Fallback actual arrival date at discharge port.
-        - optimal_eta_fd_date (DateTime): Use for final-destination arrival windows.
-        - dp_delayed_dur (Float): Delay in days at discharge port.
-        - fd_delayed_dur (Float): Delay in days at final destination.
-        - delayed_dp / delayed_fd (String): "on_time" or "delay".
-
-        Synonyms & OData Tips:
-        - "on water", "sailing" -> shipment_status eq 'IN_OCEAN'
-        - "hot" -> hot_container_flag eq true
-        - If the user mentions final destination (FD), in-dc, or distribution center, use final_destination.
-        - Otherwise, use discharge_port for "arriving at <location>".
-        - For ID Collections (PO, Booking, OBL), ALWAYS use 'any(p: p eq '...')' syntax.
-        - For descriptive fields (Port, Vessel), 'contains(field, '...')' is more flexible than 'eq'.
-        
-        CRITICAL ODATA RULES:
-        1. NO DATE MATH: Never use 'now()' or 'add 10 days' in filters. Azure Search does not support this in OData.
-        2. NO REDUNDANCY: Do NOT include filters for 'hot_container_flag', 'shipment_status', or 'location' in `extra_filter` if they are already identified in the 'Extracted Entities' section. The system adds these automatically.
-        3. DELAY SCOPE: Use 'dp_delayed_dur' for generic "delay" unless "final destination" or "FD" is mentioned.
-    """.strip()
-
-        system_prompt = f"""
-        You are a Search Planner for a logistics bot. Given a user question and extracted entities, generate an Azure Search Plan.
-        
-        {logistics_context}
-
-        Output JSON only:
-        {{
-            "query_text": "text for hybrid search",
-            "top_k": number (default 20, max 100),
-            "extra_filter": "OData filter string or null",
-            "reason": "short explanation"
-        }}
-        """
-
-        reflection_feedback = state.get("reflection_feedback")
-        retry_count = state.get("retry_count") or 0
-
-        user_content = f"Question: {q}\nExtracted Entities: {json.dumps(extracted)}"
-
-        if reflection_feedback and retry_count > 0:
-            user_content += f"\n\n--- PREVIOUS ATTEMPT FEEDBACK ---\nThe previous retrieval did not result in a satisfactory answer. \nFeedback from judge: {reflection_feedback}\nPlease refine the search plan to better address the user's question."
-
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_content},
-        ]
-
-        plan_data = {}
-        usage_metadata = state.get("usage_metadata") or {
-            "prompt_tokens": 0,
-            "completion_tokens": 0,
-            "total_tokens": 0,
-        }
+
+def planner_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Generates a RetrievalPlan (query text, top_k, filters) using LLM and extracted metadata.
+    """
+    with log_node_execution("Planner", _plan_log_context(state), state_ref=state):
+        messages = _build_plan_messages(state)
+
+        plan_data: Dict[str, Any] = {}
+        usage = None
         if not is_test_mode():
             try:
                 chat = _get_chat_tool()
                 response = chat.chat_completion(messages, temperature=0.0)
-                res = response["content"]
                 usage = response["usage"]
-
-                # Accumulate usage
-                for k in usage:
-                    usage_metadata[k] = usage_metadata.get(k, 0) + usage[k]
-
-                json_match = re.search(r"\{.*\}", res, re.DOTALL)
-                if json_match:
-                    plan_data = json.loads(json_match.group(0))
+                plan_data = _parse_plan(response["content"])
             except Exception as e:
                 logger.warning(f"Planning LLM failed: {e}")
 
-        # Construct final plan
-        plan: RetrievalPlan = {
-            "query_text": plan_data.get("query_text") or q,
-            "top_k": plan_data.get("top_k") or 20,
-            "vector_k": 30,
-            "extra_filter": plan_data.get("extra_filter"),
-            "post_filter": None,
-            "reason": plan_data.get(
-                "reason", "test_mode" if is_test_mode() else "fallback"
-            ),
-        }
+        return _finalize_plan(state, plan_data, usage)
 
-        def _safe(s: str) -> str:
-            return s.replace("'", "''")
-
-        def _any_in(field: str, values: List[str]) -> str:
-            joined = ",".join(_safe(v) for v in values if v)
-            return f"{field}/any(t: search.in(t, '{joined}', ','))"
-
-        def _mentions_final_destination(text: str) -> bool:
-            lowered = text.lower()
-            if "final destination" in lowered or "final_destination" in lowered:
-                return True
-            if "distribution center" in lowered or "distribution centre" in lowered:
-                return True
-            if re.search(r"\bin-?dc\b", lowered):
-                return True
-            if re.search(r"\bfd\b", lowered):
-                return True
-            return False
-
-        def _extract_delay_days(text: str) -> Optional[int]:
-            lowered = text.lower()
-            if "delay" not in lowered and "delayed" not in lowered:
-                return None
-            match = re.search(r"\b(\d+)\s+days?\b", lowered)
-            if match:
-                try:
-                    return int(match.group(1))
-                except ValueError:
-                    return None
-            return 0
-
-        def _wants_bucket_chart(text: str) -> bool:
-            lowered = text.lower()
-            bucket_words = ["bucket", "breakdown", "group", "chart", "graph"]
-            window_words = ["today", "week", "fortnight", "month"]
-            return any(w in lowered for w in bucket_words) and any(
-                w in lowered for w in window_words
-            )
-
-        containers = extracted.get("container_number") or []
-        po_numbers = extracted.get("po_numbers") or []
-        booking_numbers = extracted.get("booking_numbers") or []
-        obl_nos = extracted.get("obl_nos") or []
-
-        container_set = {c for c in containers if c}
-        obl_set = {o for o in obl_nos if o}
-
-        # Avoid category overlap to prevent 'and' collisions in filters
-        if container_set:
-            po_numbers = [p for p in po_numbers if p not in container_set]
-            booking_numbers = [b for b in booking_numbers if b not in container_set]
-            obl_nos = [o for o in obl_nos if o not in container_set]
-
-        # If an ID is shared across multiple ID categories (PO, Booking, OBL),
-        # we should search all of them in an 'OR' block to avoid restrictive 'AND' logic.
-        # Overlap detection:
-        ambiguous_ids = (
-            (set(po_numbers) & set(booking_numbers))
-            | (set(po_numbers) & set(obl_nos))
-            | (set(booking_numbers) & set(obl_nos))
-        )
 
-        if ambiguous_ids:
-            po_numbers = [p for p in po_numbers if p not in ambiguous_ids]
-            booking_numbers = [b for b in booking_numbers if b not in ambiguous_ids]
-            obl_nos = [o for o in obl_nos if o not in ambiguous_ids]
-
-        # Booster: if we have specific IDs, make sure they are in query_text
-        all_ids = list(
-            container_set
-            | obl_set
-            | set(po_numbers)
-            | set(booking_numbers)
-            | ambiguous_ids
-        )
+async def aplanner_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Async variant of `planner_node` used by `arun_graph`.
+    """
+    with log_node_execution("Planner", _plan_log_context(state), state_ref=state):
+        messages = _build_plan_messages(state)
 
-        if all_ids:
-            plan["query_text"] = " ".join(all_ids) + " " + plan["query_text"]
-            plan["include_total_count"] = True
-
-        filter_clauses: List[str] = []
-        has_strong_ids = bool(all_ids)
-
-        # Merge LLM extra_filter if it doesn't seem to be a redundant copy of what we'll add deterministically
-        llm_filter = plan.get("extra_filter")
-        if llm_filter and not has_strong_ids:
-            # Simple heuristic: if the LLM filter is exactly 'hot_container_flag eq true'
-            # and we are about to add it anyway, skip it.
-            # But better to just let the LLM generate it and we append safely.
-            # To avoid the doubling seen in logs, we'll prefix it.
-            filter_clauses.append(f"({llm_filter})")
-
-        if containers:
-            parts = [f"container_number eq '{_safe(c)}'" for c in containers]
-            filter_clauses.append("(" + " or ".join(parts) + ")")
-
-        if po_numbers:
-            filter_clauses.append(_any_in("po_numbers", po_numbers))
-
-        if booking_numbers:
-            filter_clauses.append(_any_in("booking_numbers", booking_numbers))
-
-        if obl_nos:
-            filter_clauses.append(_any_in("obl_nos", obl_nos))
-
-        if ambiguous_ids:
-            # Handle IDs that could be any of the ID types with an OR across all 3
-            amb_list = list(ambiguous_ids)
-            po_part = _any_in("po_numbers", amb_list)
-            bk_part = _any_in("booking_numbers", amb_list)
-            ob_part = _any_in("obl_nos", amb_list)
-            filter_clauses.append(f"({po_part} or {bk_part} or {ob_part})")
-
-        status_keywords = [s.lower() for s in (extracted.get("status_keywords") or [])]
-        status_map = {
-            "on water": "IN_OCEAN",
-            "sailing": "IN_OCEAN",
-            "in ocean": "IN_OCEAN",
-            "delivered": "DELIVERED",
-            "ready for pickup": "READY_FOR_PICKUP",
-            "empty returned": "EMPTY_RETURNED",
-            "at discharge port": "AT_DISCHARGE_PORT",
-        }
-        statuses = {status_map[k] for k in status_keywords if k in status_map}
-        if statuses:
-            parts = [f"shipment_status eq '{s}'" for s in sorted(statuses)]
-            filter_clauses.append("(" + " or ".join(parts) + ")")
-
-        if any(k in status_keywords for k in ["hot", "priority"]):
-            filter_clauses.append("hot_container_flag eq true")
-
-        locations = extracted.get("location") or []
-        if locations:
-            location_field = (
-                "final_destination"
-                if _mentions_final_destination(q)
-                else "discharge_port"
-            )
-            parts = [f"contains({location_field}, '{_safe(loc)}')" for loc in locations]
-            filter_clauses.append("(" + " or ".join(parts) + ")")
-
-        if filter_clauses:
-            plan["extra_filter"] = " and ".join(filter_clauses)
-            plan["reason"] = plan.get("reason", "") + " (deterministic filters)"
-
-        post_filter: Dict[str, Any] = {}
-        if time_window_days:
-            is_fd = _mentions_final_destination(q)
-            if is_fd:
-                date_fields = ["optimal_eta_fd_date", "eta_fd_date"]
-            else:
-                date_fields = ["derived_ata_dp_date", "ata_dp_date", "eta_dp_date"]
-            post_filter["date_window"] = {
-                "fields": date_fields,
-                "days": time_window_days,
-                "direction": "next",
-            }
-            if "order_by" not in plan or not plan["order_by"]:
-                plan["order_by"] = "eta_fd_date desc" if is_fd else "eta_dp_date desc"
-            plan["top_k"] = max(plan.get("top_k", 20), 100)
-
-        delay_days = _extract_delay_days(q)
-        if delay_days is not None:
-            # Polyvalent delay logic: if generic, check both DP and FD
-            if _mentions_final_destination(q):
-                delay_field = "fd_delayed_dur"
-            else:
-                # Default to discharge port delay as per user preference
-                delay_field = "dp_delayed_dur"
-
-            if delay_field:
-                post_filter["delay"] = {
-                    "field": delay_field,
-                    "op": ">=" if delay_days else ">",
-                    "days": delay_days,
-                }
-
-        if post_filter:
-            plan["post_filter"] = post_filter
-
-        if _wants_bucket_chart(q):
-            plan["include_total_count"] = True
-            current_top_k = plan.get("top_k")
-            plan["top_k"] = max(current_top_k or 20, 500)
-            if not plan.get("query_text") or plan["query_text"] == q:
-                plan["query_text"] = "*"
-
-        state["retrieval_plan"] = plan
-        logger.info(f"Planned retrieval: {plan}")
-
-        return state
+        plan_data: Dict[str, Any] = {}
+        usage = None
+        if not is_test_mode():
+            try:
+                chat = _get_chat_tool()
+                response = await chat.achat_completion(messages, temperature=0.0)
+                usage = response["usage"]
+                plan_data = _parse_plan(response["content"])
+            except Exception as e:
+                logger.warning(f"Planning LLM failed: {e}")
+
+        return _finalize_plan(state, plan_data, usage)
@@ -0,0 +1,181 @@
+# src/shipment_qna_bot/graph/nodes/post_filter.py
+
+from __future__ import annotations
+
+import functools
+import json
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from shipment_qna_bot.models.shipment_hit import ShipmentHit
+
+
+def to_datetime64(dt: datetime) -> np.datetime64:
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return np.datetime64(dt, "us")
+
+
+class HitBatch:
+    """
+    Columnar view over a list of hits. Columns are built on first use from
+    the values each ShipmentHit parsed at normalization, and reused by every
+    rule that reads them.
+    """
+
+    def __init__(self, hits: Sequence[ShipmentHit]):
+        self.hits = list(hits)
+        self._dates: Dict[Tuple[str, ...], np.ndarray] = {}
+        self._floats: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.hits)
+
+    def dates(self, field: str) -> np.ndarray:
+        """
+        datetime64[us] (UTC) column, NaT where the field is missing.
+        """
+        return self.first_dates((field,))
+
+    def first_dates(self, fields: Tuple[str, ...]) -> np.ndarray:
+        """
+        datetime64[us] of the first field that parses, NaT when none do.
+        """
+        col = self._dates.get(fields)
+        if col is not None:
+            return col
+        if len(fields) == 1:
+            col = np.fromiter(
+                (h.timestamp_us(fields[0]) for h in self.hits),
+                dtype=np.int64,
+                count=len(self),
+            ).view("datetime64[us]")
+        elif not fields:
+            col = np.full(len(self), np.datetime64("NaT", "us"))
+        else:
+            col = self.dates(fields[0])
+            for field in fields[1:]:
+                col = np.where(np.isnat(col), self.dates(field), col)
+        self._dates[fields] = col
+        return col
+
+    def floats(self, field: str) -> np.ndarray:
+        col = self._floats.get(field)
+        if col is None:
+            col = np.fromiter(
+                (h.delay(field) for h in self.hits), dtype=np.float64, count=len(self)
+            )
+            self._floats[field] = col
+        return col
+
+    def take(self, mask: np.ndarray) -> List[ShipmentHit]:
+        return [self.hits[i] for i in np.flatnonzero(mask)]
+
+
+# A compiled rule maps a batch (and the turn's clock) to a boolean mask.
+Rule = Callable[[HitBatch, datetime], np.ndarray]
+
+_RULES: Dict[str, Callable[[Dict[str, Any]], Rule]] = {}
+
+
+def register_rule(name: str):
+    """
+    Registers a compiler for the post_filter key `name`. Keys without a
+    compiler are ignored, as the planner may emit hints we do not enforce.
+    """
+
+    def _register(compiler: Callable[[Dict[str, Any]], Rule]):
+        _RULES[name] = compiler
+        return compiler
+
+    return _register
+
+
+def _start_of_day(now_utc: datetime) -> np.datetime64:
+    return to_datetime64(now_utc).astype("datetime64[D]").astype("datetime64[us]")
+
+
+@register_rule("date_window")
+def _date_window(spec: Dict[str, Any]) -> Rule:
+    fields = spec.get("fields")
+    if isinstance(fields, str):
+        fields = [fields]
+    if not fields:
+        legacy_field = spec.get("field")
+        fields = [legacy_field] if legacy_field else []
+    fields = tuple(fields)
+    days = np.timedelta64(int(spec.get("days") or 0), "D")
+    direction = spec.get("direction", "next")
+
+    def _rule(batch: HitBatch, now_utc: datetime) -> np.ndarray:
+        dates = batch.first_dates(fields)
+        if direction != "next":
+            return ~np.isnat(dates)
+        # Calendar-day window: include today, end at start_of_today + N days (exclusive).
+        start = _start_of_day(now_utc)
+        return (dates >= start) & (dates < start + days)
+
+    return _rule
+
+
+@register_rule("delay")
+def _delay(spec: Dict[str, Any]) -> Rule:
+    field = spec.get("field")
+    threshold = float(spec.get("days") or 0.0)
+    strict = spec.get("op", ">=") == ">"
+
+    def _rule(batch: HitBatch, now_utc: datetime) -> np.ndarray:
+        values = batch.floats(field) if field else np.zeros(len(batch))
+        return values > threshold if strict else values >= threshold
+
+    return _rule
+
+
+class PostFilter:
+    """
+    A retrieval plan's `post_filter`, compiled once into rules that are
+    ANDed over a HitBatch.
+    """
+
+    def __init__(self, rules: List[Rule]):
+        self.rules = rules
+
+    @classmethod
+    def compile(cls, post_filter: Dict[str, Any]) -> PostFilter:
+        rules = [
+            _RULES[name](spec)
+            for name, spec in post_filter.items()
+            if spec and name in _RULES
+        ]
+        return cls(rules)
+
+    def mask(self, batch: HitBatch, now_utc: datetime) -> np.ndarray:
+        keep = np.ones(len(batch), dtype=bool)
+        for rule in self.rules:
+            keep &= rule(batch, now_utc)
+            if not keep.any():
+                break
+        return keep
+
+    def apply(
+        self, hits: Sequence[ShipmentHit], now_utc: datetime
+    ) -> List[ShipmentHit]:
+        if not self.rules or not hits:
+            return list(hits)
+        batch = HitBatch(hits)
+        return batch.take(self.mask(batch, now_utc))
+
+
+@functools.lru_cache(maxsize=256)
+def _compile_cached(blob: str) -> PostFilter:
+    return PostFilter.compile(json.loads(blob))
+
+
+def compile_post_filter(post_filter: Dict[str, Any]) -> PostFilter:
+    """
+    Compiled rules for `post_filter`, shared by every turn (and judge retry)
+    that plans the same filter.
+    """
+    return _compile_cached(json.dumps(post_filter, sort_keys=True, default=str))
@@ -2,18 +2,21 @@
 
 from __future__ import annotations
 
-import json
 import os
 import re
-from datetime import datetime, timedelta, timezone
-from typing import Any, Dict, Optional
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
 
+from shipment_qna_bot.graph.nodes.post_filter import compile_post_filter
 from shipment_qna_bot.graph.state import RetrievalPlan  # type: ignore
 from shipment_qna_bot.logging.graph_tracing import log_node_execution
 from shipment_qna_bot.logging.logger import logger, set_log_context
+from shipment_qna_bot.models.shipment_hit import ShipmentHit
 from shipment_qna_bot.tools.azure_ai_search import AzureAISearchTool
 from shipment_qna_bot.tools.azure_openai_embeddings import \
     AzureOpenAIEmbeddingsClient
+from shipment_qna_bot.tools.retrieval_cache import (get_retrieval_cache,
+                                                    make_retrieval_key)
 from shipment_qna_bot.utils.runtime import is_test_mode
 
 _SEARCH: Optional[AzureAISearchTool] = None
@@ -138,6 +141,209 @@ def _get_embedder() -> AzureOpenAIEmbeddingsClient:
     return _EMBED
 
 
+def _get_now_utc(state: Dict[str, Any]) -> datetime:
+    raw = state.get("now_utc")
+    if raw:
+        try:
+            s = str(raw).replace("Z", "+00:00")
+            dt = datetime.fromisoformat(s)
+            if dt.tzinfo is None:
+                dt = dt.replace(tzinfo=timezone.utc)
+            return dt.astimezone(timezone.utc)
+        except Exception:
+            pass
+    return datetime.now(timezone.utc)
+
+
+def _post_filter_hits(
+    hits: list[ShipmentHit], post_filter: Dict[str, Any], now_utc: datetime
+) -> list[ShipmentHit]:
+    if not post_filter:
+        return hits
+    return compile_post_filter(post_filter).apply(hits, now_utc)
+
+
+def _prepare_retrieval(state: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Validates scope and filters for the current plan.
+
+    Returns the resolved search arguments, or None when the state is already final
+    (missing scope or test mode).
+    """
+    plan = state.get("retrieval_plan") or {}  # type: ignore
+    consignee_codes = state.get("consignee_codes") or []  # type: ignore
+    query_text = (  # type: ignore
+        plan.get("query_text") or state.get("normalized_question") or ""  # type: ignore
+    ).strip()  # type: ignore
+    extra_filter = (plan.get("extra_filter") or "").strip() or None  # type: ignore
+    if extra_filter:
+        normalized_filter = _normalize_filter_fields(extra_filter)
+        if normalized_filter != extra_filter:
+            logger.info(
+                f"Normalized filter fields: {extra_filter} -> {normalized_filter}",
+                extra={"step": "NODE:Retriever"},
+            )
+            extra_filter = normalized_filter
+    if extra_filter and not _is_filter_safe(extra_filter):  # type: ignore
+        logger.warning(
+            f"Dropping unsafe filter: {extra_filter}",
+            extra={"step": "NODE:Retriever"},
+        )
+        extra_filter = None
+
+    # fail closed on missing consigneescope
+    if not consignee_codes:
+        state.setdefault("errors", []).append(
+            "Missing consignee scope; cannot retrieve."
+        )
+        state["hits"] = []
+        return None
+
+    if is_test_mode():
+        state["hits"] = []
+        state["idx_analytics"] = {"count": 0, "facets": None}
+        return None
+
+    return {
+        "plan": plan,
+        "consignee_codes": consignee_codes,
+        "query_text": query_text,
+        "extra_filter": extra_filter,
+    }
+
+
+def _search_kwargs(
+    prepared: Dict[str, Any],
+    vector: Optional[List[float]],
+    extra_filter: Optional[str],
+) -> Dict[str, Any]:
+    plan = prepared["plan"]
+    return {
+        "query_text": prepared["query_text"] or "*",
+        "consignee_codes": prepared["consignee_codes"],
+        "top_k": int(plan.get("top_k", 8)),
+        "vector": vector,
+        "vector_k": int(plan.get("vector_k", 30)),
+        "extra_filter": extra_filter,
+        "include_total_count": plan.get("include_total_count", False),
+        "skip": plan.get("skip"),
+        "order_by": plan.get("order_by"),
+    }
+
+
+def _retrieval_cache_key(prepared: Dict[str, Any]) -> str:
+    plan = prepared["plan"]
+    return make_retrieval_key(
+        prepared["consignee_codes"],
+        prepared["query_text"],
+        prepared["extra_filter"],
+        top_k=int(plan.get("top_k", 8)),
+        skip=plan.get("skip"),
+        order_by=plan.get("order_by"),
+        vector_k=int(plan.get("vector_k", 30)),
+        include_total_count=bool(plan.get("include_total_count", False)),
+    )
+
+
+def _cached_response(
+    state: Dict[str, Any], prepared: Dict[str, Any]
+) -> Optional[Dict[str, Any]]:
+    """
+    Serves the turn from the retrieval cache (judge retries with an
+    unchanged plan, repeated questions within the freshness window).
+    """
+    cache = get_retrieval_cache()
+    if cache is None:
+        return None
+    cached = cache.get(_retrieval_cache_key(prepared))
+    if cached is None:
+        return None
+    logger.info("Retrieval cache hit", extra={"step": "NODE:Retriever"})
+    return _apply_search_response(state, prepared, cached)
+
+
+def _store_response(prepared: Dict[str, Any], search_response: Dict[str, Any]) -> None:
+    cache = get_retrieval_cache()
+    if cache is not None:
+        cache.set(_retrieval_cache_key(prepared), search_response)
+
+
+def _apply_search_response(
+    state: Dict[str, Any],
+    prepared: Dict[str, Any],
+    search_response: Dict[str, Any],
+    fallback: bool = False,
+) -> Dict[str, Any]:
+    plan = prepared["plan"]
+    hits = [ShipmentHit.coerce(h) for h in search_response["hits"]]
+    post_filter = plan.get("post_filter") or {}
+    if post_filter:
+        hits = _post_filter_hits(hits, post_filter, _get_now_utc(state))
+    state["hits"] = hits
+    state["idx_analytics"] = {
+        "count": (
+            search_response.get("count")
+            if plan.get("include_total_count")
+            else len(hits)
+        ),
+        "facets": search_response.get("facets"),
+    }
+    label = " (fallback)" if fallback else ""
+    logger.info(
+        f"Retrieved {len(hits)} hits{label} for query=<{prepared['query_text']}>",
+        extra={"step": "NODE:Retriever"},
+    )
+    return state
+
+
+def _is_invalid_filter_error(prepared: Dict[str, Any], err: Exception) -> bool:
+    error_msg = str(err)
+    if prepared["extra_filter"] and (
+        "Invalid expression" in error_msg or "search.in" in error_msg
+    ):
+        logger.warning(
+            f"Search failed with invalid filter '{prepared['extra_filter']}'. Retrying without filter.",
+            extra={"step": "NODE:Retriever"},
+        )
+        return True
+    return False
+
+
+def _record_search_failure(state: Dict[str, Any], err: Exception) -> Dict[str, Any]:
+    state.setdefault("errors", []).append(f"Search failed: {type(err).__name__}: {err}")
+    state["hits"] = []
+    state.setdefault("notices", []).append(
+        f"Note: Search encountered a temporary issue ({type(err).__name__}). Some data might be missing."
+    )
+    logger.exception(
+        f"Search failed completely. err={err}",
+        extra={"step": "NODE:Retriever"},
+    )
+    return state
+
+
+def _skip_for_analytics(state: Dict[str, Any]) -> bool:
+    if state.get("intent") != "analytics":
+        return False
+    logger.info(
+        "Skipping Azure Search because intent=analytics",
+        extra={"step": "NODE:Retriever"},
+    )
+    state["hits"] = []
+    state["idx_analytics"] = {"count": 0, "facets": None}
+    return True
+
+
+def _retrieve_log_context(state: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "intent": state.get("intent", "-"),
+        "consignee_codes": state.get("consignee_codes", []),
+        "query_text": ((state.get("retrieval_plan") or {}).get("query_text") or "")[  # type: ignore
+            :120
+        ],
+    }
+
+
 def retrieve_node(state: Dict[str, Any]) -> Dict[str, Any]:
     """
     Fetch docs from vectorDB for top k, filters, hybrid weights, etc.
@@ -146,63 +352,73 @@ def retrieve_node(state: Dict[str, Any]) -> Dict[str, Any]:
     """
     _sync_ctx(state)
 
-    if state.get("intent") == "analytics":
-        logger.info(
-            "Skipping Azure Search because intent=analytics",
-            extra={"step": "NODE:Retriever"},
-        )
-        state["hits"] = []
-        state["idx_analytics"] = {"count": 0, "facets": None}
+    if _skip_for_analytics(state):
         return state
 
-    with log_node_execution(
-        "Retrieve",
-        {
-            "intent": state.get("intent", "-"),
-            "consignee_codes": state.get("consignee_codes", []),
-            "query_text": ((state.get("retrieval_plan") or {}).get("query_text") or "")[  # type: ignore
-                :120
-            ],
-        },
-        state_ref=state,
-    ):
-        plan = state.get("retrieval_plan") or {}  # type: ignore
-        consignee_codes = state.get("consignee_codes") or []  # type: ignore
-        query_text = (  # type: ignore
-            plan.get("query_text") or state.get("normalized_question") or ""  # type: ignore
-        ).strip()  # type: ignore
-        extra_filter = (plan.get("extra_filter") or "").strip() or None  # type: ignore
-        if extra_filter:
-            normalized_filter = _normalize_filter_fields(extra_filter)
-            if normalized_filter != extra_filter:
-                logger.info(
-                    f"Normalized filter fields: {extra_filter} -> {normalized_filter}",
-                    extra={"step": "NODE:Retriever"},
-                )
-                extra_filter = normalized_filter
-        if extra_filter and not _is_filter_safe(extra_filter):  # type: ignore
+    with log_node_execution("Retrieve", _retrieve_log_context(state), state_ref=state):
+        prepared = _prepare_retrieval(state)
+        if prepared is None:
+            return state
+        if _cached_response(state, prepared) is not None:
+            return state
+
+        try:
+            embedder = _get_embedder()
+            vector = embedder.embed_query(prepared["query_text"])  # type: ignore
+        except Exception as e:
+            # if embeddings fail, use semantic search with BM25-only.
             logger.warning(
-                f"Dropping unsafe filter: {extra_filter}",
+                f"Embedding failed; falling back to keyword-only; err={e}",
                 extra={"step": "NODE:Retriever"},
             )
-            extra_filter = None
+            vector = None
 
-        # fail closed on missing consigneescope
-        if not consignee_codes:
-            state.setdefault("errors", []).append(
-                "Missing consignee scope; cannot retrieve."
+        try:
+            tool = _get_search()
+            search_response = tool.search(
+                **_search_kwargs(prepared, vector, prepared["extra_filter"])
             )
-            state["hits"] = []
-            return state
+            if vector is not None:
+                # Keyword-only results after an embedding failure are not kept.
+                _store_response(prepared, search_response)
+            _apply_search_response(state, prepared, search_response)
+        except Exception as e:
+            if _is_invalid_filter_error(prepared, e):
+                try:
+                    # Retry without the bad filter
+                    search_response = tool.search(
+                        **_search_kwargs(prepared, vector, None)
+                    )
+                    return _apply_search_response(
+                        state, prepared, search_response, fallback=True
+                    )
+                except Exception as retry_e:
+                    logger.error(f"Fallback search also failed: {retry_e}")
 
-        if is_test_mode():
-            state["hits"] = []
-            state["idx_analytics"] = {"count": 0, "facets": None}
+            _record_search_failure(state, e)
+
+        return state
+
+
+async def aretrieve_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Async variant of `retrieve_node` used by `arun_graph`.
+    """
+    _sync_ctx(state)
+
+    if _skip_for_analytics(state):
+        return state
+
+    with log_node_execution("Retrieve", _retrieve_log_context(state), state_ref=state):
+        prepared = _prepare_retrieval(state)
+        if prepared is None:
+            return state
+        if _cached_response(state, prepared) is not None:
             return state
 
         try:
             embedder = _get_embedder()
-            vector = embedder.embed_query(query_text)  # type: ignore
+            vector = await embedder.aembed_query(prepared["query_text"])  # type: ignore
         except Exception as e:
             # if embeddings fail, use semantic search with BM25-only.
             logger.warning(
@@ -211,205 +427,28 @@ def retrieve_node(state: Dict[str, Any]) -> Dict[str, Any]:
             )
             vector = None
 
-        def _parse_dt(val: Any) -> Optional[datetime]:
-            if not val or val == "NaT":
-                return None
-            try:
-                s = str(val).replace("Z", "+00:00")
-                dt = datetime.fromisoformat(s)
-                if dt.tzinfo is None:
-                    dt = dt.replace(tzinfo=timezone.utc)
-                return dt
-            except Exception:
-                return None
-
-        def _get_now_utc() -> datetime:
-            raw = state.get("now_utc")
-            if raw:
-                try:
-                    s = str(raw).replace("Z", "+00:00")
-                    dt = datetime.fromisoformat(s)
-                    if dt.tzinfo is None:
-                        dt = dt.replace(tzinfo=timezone.utc)
-                    return dt.astimezone(timezone.utc)
-                except Exception:
-                    pass
-            return datetime.now(timezone.utc)
-
-        now_utc = _get_now_utc()
-        start_of_today = now_utc.replace(hour=0, minute=0, second=0, microsecond=0)
-
-        def _load_metadata(hit: Dict[str, Any]) -> Dict[str, Any]:
-            raw = hit.get("metadata_json")
-            if isinstance(raw, dict):
-                return raw  # type: ignore
-            if isinstance(raw, str):
-                try:
-                    return json.loads(raw)
-                except Exception:
-                    return {}
-            return {}
-
-        def _hydrate_hit(hit: Dict[str, Any]) -> None:
-            meta = _load_metadata(hit)
-            for key in [
-                "derived_ata_dp_date",
-                "optimal_eta_fd_date",
-                "dp_delayed_dur",
-                "fd_delayed_dur",
-                "delayed_dp",
-                "delayed_fd",
-                "empty_container_return_date",
-                "eta_dp_date",
-                "eta_fd_date",
-                "ata_dp_date",
-                "optimal_ata_dp_date",
-            ]:
-                if key not in hit and key in meta:
-                    hit[key] = meta.get(key)
-
-        def _post_filter_hits(
-            hits: list[Dict[str, Any]], post_filter: Dict[str, Any]
-        ) -> list[Dict[str, Any]]:
-            if not post_filter:
-                return hits
-            filtered = []
-            for h in hits:
-                _hydrate_hit(h)
-                meta = _load_metadata(h)
-
-                def _get_field(name: str) -> Any:
-                    if name in h:
-                        return h.get(name)
-                    return meta.get(name)
-
-                ok = True
-                date_window = post_filter.get("date_window")
-                if date_window:
-                    fields = date_window.get("fields")
-                    if isinstance(fields, str):
-                        fields = [fields]
-                    if not fields:
-                        legacy_field = date_window.get("field")
-                        fields = [legacy_field] if legacy_field else []
-                    days = int(date_window.get("days") or 0)
-                    direction = date_window.get("direction", "next")
-                    dt_val: Optional[datetime] = None
-                    for field in fields:
-                        dt_val = _parse_dt(_get_field(field))
-                        if dt_val:
-                            break
-                    if not dt_val:
-                        ok = False
-                    elif direction == "next":
-                        # Calendar-day window: include today, end at start_of_today + N days (exclusive).
-                        window_end = start_of_today + timedelta(days=days)
-                        ok = dt_val >= start_of_today and dt_val < window_end
-
-                delay_rule = post_filter.get("delay")
-                if ok and delay_rule:
-                    field = delay_rule.get("field")
-                    op = delay_rule.get("op", ">=")
-                    try:
-                        val = float(_get_field(field) or 0.0)
-                    except Exception:
-                        val = 0.0
-                    threshold = float(delay_rule.get("days") or 0.0)
-                    if op == ">":
-                        ok = val > threshold
-                    else:
-                        ok = val >= threshold
-
-                if ok:
-                    filtered.append(h)
-            return filtered
-
         try:
             tool = _get_search()
-            search_response = tool.search(
-                query_text=query_text or "*",
-                consignee_codes=consignee_codes,
-                top_k=int(plan.get("top_k", 8)),
-                vector=vector,
-                vector_k=int(plan.get("vector_k", 30)),
-                extra_filter=extra_filter,
-                include_total_count=plan.get("include_total_count", False),
-                skip=plan.get("skip"),
-                order_by=plan.get("order_by"),
-            )
-            hits = search_response["hits"]
-            for h in hits:
-                _hydrate_hit(h)
-            post_filter = plan.get("post_filter") or {}
-            if post_filter:
-                hits = _post_filter_hits(hits, post_filter)
-            state["hits"] = hits
-            state["idx_analytics"] = {
-                "count": (
-                    search_response.get("count")
-                    if plan.get("include_total_count")
-                    else len(hits)
-                ),
-                "facets": search_response.get("facets"),
-            }
-            logger.info(
-                f"Retrieved {len(hits)} hits for query=<{query_text}>",
-                extra={"step": "NODE:Retriever"},
+            search_response = await tool.asearch(
+                **_search_kwargs(prepared, vector, prepared["extra_filter"])
             )
+            if vector is not None:
+                # Keyword-only results after an embedding failure are not kept.
+                _store_response(prepared, search_response)
+            _apply_search_response(state, prepared, search_response)
         except Exception as e:
-            error_msg = str(e)
-            if extra_filter and (
-                "Invalid expression" in error_msg or "search.in" in error_msg
-            ):
-                logger.warning(
-                    f"Search failed with invalid filter '{extra_filter}'. Retrying without filter.",
-                    extra={"step": "NODE:Retriever"},
-                )
+            if _is_invalid_filter_error(prepared, e):
                 try:
-                    search_response = tool.search(
-                        query_text=query_text or "*",
-                        consignee_codes=consignee_codes,
-                        top_k=int(plan.get("top_k", 8)),
-                        vector=vector,
-                        vector_k=int(plan.get("vector_k", 30)),
-                        extra_filter=None,  # Retry without the bad filter
-                        include_total_count=plan.get("include_total_count", False),
-                        skip=plan.get("skip"),
-                        order_by=plan.get("order_by"),
+                    # Retry without the bad filter
+                    search_response = await tool.asearch(
+                        **_search_kwargs(prepared, vector, None)
                     )
-                    hits = search_response["hits"]
-                    for h in hits:
-                        _hydrate_hit(h)
-                    post_filter = plan.get("post_filter") or {}
-                    if post_filter:
-                        hits = _post_filter_hits(hits, post_filter)
-                    state["hits"] = hits
-                    state["idx_analytics"] = {
-                        "count": (
-                            search_response.get("count")
-                            if plan.get("include_total_count")
-                            else len(hits)
-                        ),
-                        "facets": search_response.get("facets"),
-                    }
-                    logger.info(
-                        f"Retrieved {len(hits)} hits (fallback) for query=<{query_text}>",
-                        extra={"step": "NODE:Retriever"},
+                    return _apply_search_response(
+                        state, prepared, search_response, fallback=True
                     )
-                    return state
                 except Exception as retry_e:
                     logger.error(f"Fallback search also failed: {retry_e}")
 
-            state.setdefault("errors", []).append(
-                f"Search failed: {type(e).__name__}: {e}"
-            )
-            state["hits"] = []
-            state.setdefault("notices", []).append(
-                f"Note: Search encountered a temporary issue ({type(e).__name__}). Some data might be missing."
-            )
-            logger.exception(
-                f"Search failed completely. err={e}",
-                extra={"step": "NODE:Retriever"},
-            )
+            _record_search_failure(state, e)
 
         return state
@@ -1,6 +1,4 @@
-import os
 import re
-from pathlib import Path
 from typing import Any, Dict, Iterable, List, Optional
 
 from langchain_core.messages import AIMessage
@@ -9,16 +7,11 @@ from shipment_qna_bot.graph.state import GraphState
 from shipment_qna_bot.logging.graph_tracing import log_node_execution
 from shipment_qna_bot.logging.logger import logger
 from shipment_qna_bot.tools.azure_openai_chat import AzureOpenAIChatTool
+from shipment_qna_bot.tools.prompt_registry import PROMPTS
 from shipment_qna_bot.utils.runtime import is_test_mode
 
 _chat_tool: Optional[AzureOpenAIChatTool] = None
 
-_OVERVIEW_CACHE: Dict[str, object] = {
-    "path": None,
-    "mtime": None,
-    "text": None,
-}
-
 
 def _get_chat_tool() -> AzureOpenAIChatTool:
     global _chat_tool
@@ -126,50 +119,9 @@ _REGION_TOKENS = {
 }
 
 
-def _find_repo_root(start: Path) -> Path:
-    current = start
-    for _ in range(8):
-        if (current / "pyproject.toml").exists() or (
-            current / "requirements.txt"
-        ).exists():
-            return current
-        if current.parent == current:
-            break
-        current = current.parent
-    return start
-
-
-def _overview_path() -> Path:
-    env_path = os.getenv("SHIPMENT_QNA_BOT_OVERVIEW_PATH")
-    if env_path:
-        return Path(env_path)
-    repo_root = _find_repo_root(Path(__file__).resolve())
-    return repo_root / "docs" / "overview_info.md"
-
-
 def _read_overview_text() -> str:
-    path = _overview_path()
-    try:
-        stat = path.stat()
-    except FileNotFoundError:
-        logger.warning("overview_info.md not found at %s", path)
-        return ""
-
-    cached_path = _OVERVIEW_CACHE.get("path")
-    cached_mtime = _OVERVIEW_CACHE.get("mtime")
-    if cached_path == str(path) and cached_mtime == stat.st_mtime:
-        return str(_OVERVIEW_CACHE.get("text") or "")
-
-    try:
-        text = path.read_text(encoding="utf-8")
-    except Exception as exc:
-        logger.warning("Failed to read overview_info.md: %s", exc)
-        return ""
-
-    _OVERVIEW_CACHE["path"] = str(path)
-    _OVERVIEW_CACHE["mtime"] = stat.st_mtime
-    _OVERVIEW_CACHE["text"] = text
-    return text
+    # Re-read only when docs/overview_info.md (or the env override) changes.
+    return PROMPTS.doc("overview_info.md")
 
 
 def _extract_keywords(text: str) -> List[str]:
@@ -0,0 +1,183 @@
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from shipment_qna_bot.graph.nodes.extractor import _merge_entities
+from shipment_qna_bot.graph.nodes.intent import (_classify_deterministic,
+                                                 intent_update)
+from shipment_qna_bot.graph.nodes.normalizer import (_build_rewrite_messages,
+                                                     _topic_shift_candidate)
+from shipment_qna_bot.graph.state import GraphState
+from shipment_qna_bot.logging.graph_tracing import log_node_execution
+from shipment_qna_bot.logging.logger import logger
+from shipment_qna_bot.tools.azure_openai_chat import AzureOpenAIChatTool
+
+_chat_tool: AzureOpenAIChatTool | None = None
+
+
+def _get_chat_tool() -> AzureOpenAIChatTool:
+    global _chat_tool
+    if _chat_tool is None:
+        _chat_tool = AzureOpenAIChatTool()
+    return _chat_tool
+
+
+_UNDERSTAND_PROMPT = """
+Role:
+You are the query understanding stage of a Logistics Shipment Q&A Bot.
+
+Task:
+Given the conversation so far and the user's follow-up question, return ONE JSON object with:
+1. "standalone_question": the follow-up rewritten to stand on its own. Replace pronouns ("it", "that shipment") with identifiers from the history. If it is already standalone or starts a new topic, return it unchanged. Do NOT inject earlier container IDs into broad analytics questions (counts, sums) unless they clearly refer to them.
+2. "entities": an object with keys "container_number", "po_numbers", "booking_numbers", "obl_nos", "location", "carrier", "date_range", "status_keywords" (lists; empty when absent).
+3. "primary_intent": one of ['retrieval', 'analytics', 'greeting', 'company_overview', 'clarification', 'end'].
+   - 'analytics': aggregations, summaries, counts, distinct lists ("How many...", "Total weight...", "Which carriers...").
+   - 'retrieval': lookups for specific IDs (container, PO, booking, OBL) or a specific subset.
+   - 'clarification': only when the question is too vague to act on ("Show me dates").
+   - 'greeting': "hi", "hello". 'end': "bye", "thank you". 'company_overview': questions about the company.
+4. "intents": all applicable intents including sub-intents like ['status', 'delay', 'eta_window', 'hot', 'fd', 'in-cd'].
+5. "sentiment": one of ['positive', 'neutral', 'negative'].
+
+Output JSON ONLY:
+{
+  "standalone_question": "what is the eta of container abcd1234567?",
+  "entities": {"container_number": ["ABCD1234567"], "po_numbers": [], "booking_numbers": [], "obl_nos": [], "location": [], "carrier": [], "date_range": [], "status_keywords": []},
+  "primary_intent": "retrieval",
+  "intents": ["retrieval", "eta"],
+  "sentiment": "neutral"
+}
+""".strip()
+
+_RESPONSE_FORMAT = {"type": "json_object"}
+
+
+def _prepare_understanding(
+    state: GraphState,
+) -> Tuple[Optional[List[Dict[str, str]]], bool]:
+    """
+    Runs the normalizer pre-checks and the deterministic intent paths.
+    Returns (messages, rewrites): messages is None when the turn is settled
+    without an LLM call; rewrites tells whether the standalone question
+    returned by the model should replace the normalized one.
+    """
+    rewrite_messages = _build_rewrite_messages(state)
+    if rewrite_messages is not None:
+        conversation = rewrite_messages[1:]
+        return [{"role": "system", "content": _UNDERSTAND_PROMPT}, *conversation], True
+
+    text = state.get("normalized_question") or ""
+    settled = _classify_deterministic(state)
+    if settled is not None:
+        state.update(settled)
+        _apply_entities(state, text, {})
+        return None, False
+
+    return [
+        {"role": "system", "content": _UNDERSTAND_PROMPT},
+        {"role": "user", "content": f"Follow-up Question: {text}"},
+    ], False
+
+
+def _apply_entities(state: GraphState, text: str, entities: Dict[str, Any]) -> None:
+    merged = _merge_entities(text, entities, None)
+    state["extracted_ids"] = merged["extracted_ids"]
+    state["time_window_days"] = merged["time_window_days"]
+
+
+def _parse_understanding(content: str) -> Dict[str, Any]:
+    json_match = re.search(r"\{.*\}", content or "", re.DOTALL)
+    if not json_match:
+        return {}
+    data = json.loads(json_match.group(0))
+    return data if isinstance(data, dict) else {}
+
+
+def _apply_understanding(
+    state: GraphState, response: Optional[Dict[str, Any]], rewrites: bool
+) -> GraphState:
+    """
+    Folds the combined response (None on failure) into the state: normalized
+    question and topic-shift check, entities, then intent.
+    """
+    question = (state.get("question_raw") or "").strip()
+    data: Dict[str, Any] = {}
+    if response is not None:
+        usage_metadata = state.get("usage_metadata") or {
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "total_tokens": 0,
+        }
+        for k, v in response["usage"].items():
+            usage_metadata[k] = usage_metadata.get(k, 0) + v
+        state["usage_metadata"] = usage_metadata
+        try:
+            data = _parse_understanding(response.get("content") or "")
+        except json.JSONDecodeError:
+            logger.warning(
+                f"Understanding JSON parse failed. Raw: {response.get('content')}"
+            )
+
+    if rewrites:
+        standalone = str(data.get("standalone_question") or question).strip()
+        normalized = standalone.lower()
+        state["normalized_question"] = normalized
+        state["topic_shift_candidate"] = _topic_shift_candidate(question, normalized)
+        logger.info(
+            f"Resolved standalone question: {normalized}",
+            extra={"extra_data": {"original": question}},
+        )
+
+    text = state.get("normalized_question") or ""
+    entities = data.get("entities")
+    _apply_entities(state, text, entities if isinstance(entities, dict) else {})
+    state.update(intent_update(text, data))
+    return state
+
+
+def understand_node(state: GraphState) -> Dict[str, Any]:
+    """
+    Single structured-output call that replaces normalizer, extractor and
+    intent (GRAPH_UNDERSTANDING_MODE=combined).
+    """
+    with log_node_execution(
+        "Understand",
+        {"question": (state.get("question_raw") or "")[:120]},
+        state_ref=state,
+    ):
+        messages, rewrites = _prepare_understanding(state)
+        if messages is None:
+            return state
+
+        try:
+            response = _get_chat_tool().chat_completion(
+                messages, temperature=0.0, response_format=_RESPONSE_FORMAT
+            )
+        except Exception as e:
+            logger.warning(f"Combined understanding failed: {e}")
+            response = None
+
+        return _apply_understanding(state, response, rewrites)
+
+
+async def aunderstand_node(state: GraphState) -> Dict[str, Any]:
+    """
+    Async variant of `understand_node` used by `arun_graph`.
+    """
+    with log_node_execution(
+        "Understand",
+        {"question": (state.get("question_raw") or "")[:120]},
+        state_ref=state,
+    ):
+        messages, rewrites = _prepare_understanding(state)
+        if messages is None:
+            return state
+
+        try:
+            response = await _get_chat_tool().achat_completion(
+                messages, temperature=0.0, response_format=_RESPONSE_FORMAT
+            )
+        except Exception as e:
+            logger.warning(f"Combined understanding failed: {e}")
+            response = None
+
+        return _apply_understanding(state, response, rewrites)
@@ -4,6 +4,49 @@ from typing import Annotated, Any, Dict, List, Optional, TypedDict
 from langchain_core.messages import BaseMessage
 from langgraph.graph.message import add_messages
 
+USAGE_DELTA_KEY = "_delta"
+
+
+def usage_delta(usage: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Tags a per-call usage dict so `merge_usage` adds it to the running totals.
+    """
+    return {**(usage or {}), USAGE_DELTA_KEY: True}
+
+
+def merge_usage(
+    left: Optional[Dict[str, Any]], right: Optional[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """
+    Reducer for `usage_metadata`. Delta-tagged writes (parallel branches) are
+    summed into the totals; plain writes replace them, as sequential nodes that
+    accumulate in place expect.
+    """
+    if right is None:
+        return left or {}
+    if not right.get(USAGE_DELTA_KEY):
+        return right
+    merged = dict(left or {})
+    for k, v in right.items():
+        if k == USAGE_DELTA_KEY:
+            continue
+        merged[k] = merged.get(k, 0) + v
+    return merged
+
+
+def last_turns(messages: List[Any], max_turns: int) -> List[Any]:
+    """
+    The tail of `messages` starting at the `max_turns`-th human message from
+    the end (the whole list when it holds fewer turns).
+    """
+    seen = 0
+    for i in range(len(messages) - 1, -1, -1):
+        if getattr(messages[i], "type", None) == "human":
+            seen += 1
+            if seen == max_turns:
+                return messages[i:]
+    return messages
+
 
 class RetrievalPlan(TypedDict):
     query_text: str
@@ -42,6 +85,9 @@ class GraphState(TypedDict):
         str, List[str]
     ]  # e.g. {'container': ['ABCD123'], 'po': [], 'obl': []}
     time_window_days: Optional[int]
+    # Last IDs, time window and locations of the conversation (see
+    # nodes/history.py); carried across turns by the checkpointer.
+    entity_memory: Optional[Dict[str, Any]]
 
     # --- Intent ---
     intent: Optional[str]
@@ -68,8 +114,8 @@ class GraphState(TypedDict):
     topic_shift_candidate: Optional[Dict[str, Any]]
 
     # --- Metrics ---
-    usage_metadata: Dict[
-        str, Any
+    usage_metadata: Annotated[
+        Dict[str, Any], merge_usage
     ]  # {prompt_tokens: int, completion_tokens: int, cost_usd: float}
 
     # --- Errors/Notices ---
@@ -65,6 +65,7 @@ class GraphTracingCallbackHandler(BaseCallbackHandler):
         logger.error(f"LLM Error: {error}", exc_info=True)
 
 
+import time
 from contextlib import contextmanager
 from typing import Any, Dict, Generator, Optional
 
@@ -124,13 +125,24 @@ def log_node_execution(
     state_ref: Optional[Dict[str, Any]] = None,
 ) -> Generator[None, None, None]:
     """
-    Context manager to log the start and end of a graph node execution.
+    Context manager to log the start and end of a graph node execution,
+    including its wall-clock duration.
     """
     context = context or {}
     logger.info(f"Node execution started: {node_name}", extra={"extra_data": context})
+    started = time.perf_counter()
     try:
         yield
-        logger.info(f"Node execution completed: {node_name}")
+        elapsed_ms = round((time.perf_counter() - started) * 1000.0, 1)
+        logger.info(
+            f"Node execution completed: {node_name}",
+            extra={"extra_data": {"node": node_name, "elapsed_ms": elapsed_ms}},
+        )
     except Exception as e:
-        logger.error(f"Node execution failed: {node_name} - {e}", exc_info=True)
+        elapsed_ms = round((time.perf_counter() - started) * 1000.0, 1)
+        logger.error(
+            f"Node execution failed: {node_name} - {e}",
+            exc_info=True,
+            extra={"extra_data": {"node": node_name, "elapsed_ms": elapsed_ms}},
+        )
         raise
@@ -0,0 +1,192 @@
+# src/shipment_qna_bot/models/shipment_hit.py
+
+from __future__ import annotations
+
+import json
+from collections.abc import Iterator, Mapping
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+# Keys copied up from metadata_json when the index row does not carry them.
+HYDRATED_FIELDS = (
+    "derived_ata_dp_date",
+    "optimal_eta_fd_date",
+    "dp_delayed_dur",
+    "fd_delayed_dur",
+    "delayed_dp",
+    "delayed_fd",
+    "empty_container_return_date",
+    "eta_dp_date",
+    "eta_fd_date",
+    "ata_dp_date",
+    "optimal_ata_dp_date",
+)
+
+# Parsed up front; other date fields are parsed on first use.
+DATE_FIELDS = (
+    "derived_ata_dp_date",
+    "ata_dp_date",
+    "eta_dp_date",
+    "optimal_ata_dp_date",
+    "best_eta_dp_date",
+    "eta_fd_date",
+    "optimal_eta_fd_date",
+    "best_eta_fd_date",
+)
+
+DELAY_FIELDS = ("dp_delayed_dur", "fd_delayed_dur")
+
+# Integer stand-in for a missing timestamp; equals NumPy's NaT bit pattern so
+# columns of `timestamp_us` values view directly as datetime64[us].
+MISSING_US = -(2**63)
+
+# Arrival fallbacks, most authoritative first.
+DP_ARRIVAL_FIELDS = (
+    "derived_ata_dp_date",
+    "ata_dp_date",
+    "eta_dp_date",
+    "optimal_ata_dp_date",
+)
+FD_ARRIVAL_FIELDS = ("optimal_eta_fd_date", "eta_fd_date")
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def parse_datetime(val: Any) -> Optional[datetime]:
+    if not val or val == "NaT":
+        return None
+    if isinstance(val, datetime):
+        return val if val.tzinfo else val.replace(tzinfo=timezone.utc)
+    try:
+        s = str(val).replace("Z", "+00:00")
+        dt = datetime.fromisoformat(s)
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=timezone.utc)
+        return dt
+    except Exception:
+        return None
+
+
+def _epoch_us(dt: datetime) -> int:
+    delta = dt - _EPOCH
+    return (delta.days * 86_400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def _parse_metadata(raw: Any) -> Dict[str, Any]:
+    if isinstance(raw, dict):
+        return raw  # type: ignore
+    if isinstance(raw, str):
+        try:
+            parsed = json.loads(raw)
+        except Exception:
+            return {}
+        return parsed if isinstance(parsed, dict) else {}
+    return {}
+
+
+@dataclass(slots=True, eq=False)
+class ShipmentHit(Mapping[str, Any]):
+    """
+    One search hit, normalized once when it leaves the search tool.
+
+    `metadata_json` is parsed a single time, the usual metadata keys are
+    hydrated into `fields`, and arrival dates and delays are parsed up front,
+    so downstream nodes never touch the raw blob again. Reads like the plain
+    dict it replaces (`hit.get("eta_dp_date")`, `"content" in hit`), with the
+    typed values on `hot`, `date()`, `timestamp_us()` and `delay()`.
+    """
+
+    fields: Dict[str, Any]
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    hot: bool = False
+    dates: Dict[str, Optional[datetime]] = field(default_factory=dict)
+    delays: Dict[str, float] = field(default_factory=dict)
+    timestamps: Dict[str, int] = field(default_factory=dict)
+
+    @classmethod
+    def from_raw(
+        cls, raw: Mapping[str, Any], metadata_field: str = "metadata_json"
+    ) -> ShipmentHit:
+        fields = dict(raw)
+        metadata = _parse_metadata(fields.get(metadata_field))
+        for key in HYDRATED_FIELDS:
+            if key not in fields and key in metadata:
+                fields[key] = metadata[key]
+        hot = fields.get("hot_container_flag")
+        if hot is None:
+            hot = metadata.get("hot_container_flag")
+        hit = cls(fields=fields, metadata=metadata, hot=bool(hot))
+        for key in DATE_FIELDS:
+            hit.timestamp_us(key)
+        for key in DELAY_FIELDS:
+            hit.delay(key)
+        return hit
+
+    @classmethod
+    def coerce(cls, hit: Mapping[str, Any]) -> ShipmentHit:
+        """
+        Returns `hit` unchanged when it is already normalized (fakes, cached
+        or checkpointed plain dicts are normalized here).
+        """
+        return hit if isinstance(hit, cls) else cls.from_raw(hit)
+
+    def __getitem__(self, key: str) -> Any:
+        return self.fields[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.fields)
+
+    def __len__(self) -> int:
+        return len(self.fields)
+
+    def lookup(self, name: str) -> Any:
+        """
+        Index field first, then metadata_json.
+        """
+        if name in self.fields:
+            return self.fields[name]
+        return self.metadata.get(name)
+
+    def date(self, name: str) -> Optional[datetime]:
+        try:
+            return self.dates[name]
+        except KeyError:
+            dt = self.dates[name] = parse_datetime(self.lookup(name))
+            return dt
+
+    def timestamp_us(self, name: str) -> int:
+        """
+        UTC microseconds since the epoch, MISSING_US when the field is absent
+        or does not parse.
+        """
+        try:
+            return self.timestamps[name]
+        except KeyError:
+            pass
+        dt = self.date(name)
+        val = MISSING_US if dt is None else _epoch_us(dt)
+        self.timestamps[name] = val
+        return val
+
+    def first_date(self, *names: str) -> Optional[datetime]:
+        for name in names:
+            dt = self.date(name)
+            if dt is not None:
+                return dt
+        return None
+
+    def delay(self, name: str) -> float:
+        try:
+            return self.delays[name]
+        except KeyError:
+            pass
+        try:
+            val = float(self.lookup(name) or 0.0)
+        except Exception:
+            val = 0.0
+        self.delays[name] = val
+        return val
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(self.fields)
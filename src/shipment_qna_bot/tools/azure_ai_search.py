@@ -2,6 +2,8 @@
 
 from __future__ import annotations
 
+import hashlib
+import json
 import os
 
 from dotenv import find_dotenv, load_dotenv
@@ -13,8 +15,13 @@ from typing import Any, Dict, List, Optional
 from azure.core.credentials import AzureKeyCredential
 from azure.identity import DefaultAzureCredential
 from azure.search.documents import SearchClient
+from azure.search.documents.aio import SearchClient as AsyncSearchClient
 
+from shipment_qna_bot.models.shipment_hit import ShipmentHit
 from shipment_qna_bot.security.rls import build_search_filter
+from shipment_qna_bot.tools.search_transport import get_search_transport
+from shipment_qna_bot.utils import metrics
+from shipment_qna_bot.utils.coalesce import InFlightCoalescer
 from shipment_qna_bot.utils.runtime import is_test_mode
 
 # from openai import AzureOpenAI
@@ -24,6 +31,33 @@ try:
 except Exception as err:
     VectorizedQuery = None
 
+# Shared by every tool instance so concurrent turns asking the same thing
+# (same scope, query, vector, filter and paging) make one backend call.
+_COALESCER: InFlightCoalescer[Dict[str, Any]] = InFlightCoalescer(
+    metric="search.coalesced"
+)
+
+
+def _coalescing_enabled() -> bool:
+    return os.getenv("AZURE_SEARCH_COALESCE", "true").lower() == "true"
+
+
+def search_stats() -> Dict[str, Any]:
+    """
+    Connection pool and coalescing counters for /api/health.
+    """
+    backend = metrics.get_counter("search.backend")
+    coalesced = metrics.get_counter("search.coalesced")
+    return {
+        "backend_calls": backend,
+        "coalesced": coalesced,
+        "coalesce_ratio": (
+            round(coalesced / (backend + coalesced), 4) if backend + coalesced else 0.0
+        ),
+        "in_flight": _COALESCER.in_flight(),
+        "pool": get_search_transport().stats(),
+    }
+
 
 class AzureAISearchTool:
     """
@@ -36,6 +70,7 @@ class AzureAISearchTool:
         self._test_mode = is_test_mode()
         if self._test_mode:
             self._client = None
+            self._async_client = None
             self._id_field = "document_id"
             self._content_field = "chunk"
             self._container_field = "container_number"
@@ -61,6 +96,13 @@ class AzureAISearchTool:
             credential=cred,
             index_name=index_name,
         )
+        # Async client for the async graph path; built on first use over the
+        # shared connection pool (see `_get_async_client`).
+        self._endpoint = endpoint
+        self._credential = cred
+        self._index_name = index_name
+        self._async_client = None
+        self._async_transport = None
 
         # configured field names in az-index
         self._id_field = os.getenv("AZURE_SEARCH_ID_FIELD", "document_id")
@@ -107,44 +149,22 @@ class AzureAISearchTool:
         joined = ",".join(safe_codes)
         return f"search.in({self._consignee_field}, '{joined}', ',')"
 
-    def search(
+    def _build_search_kwargs(
         self,
         *,
         query_text: str,
         consignee_codes: List[str],
-        top_k: int = 10,
-        vector: Optional[List[float]] = None,
-        vector_k: int = 30,
-        extra_filter: Optional[str] = None,
-        include_total_count: bool = False,
-        facets: Optional[List[str]] = None,
-        skip: Optional[int] = None,
-        order_by: Optional[str] = None,
+        top_k: int,
+        vector: Optional[List[float]],
+        vector_k: int,
+        extra_filter: Optional[str],
+        skip: Optional[int],
+        order_by: Optional[str],
     ) -> Dict[str, Any]:
-        """
-        Hybrid search entry point.
-
-        NOTE:
-        - `consignee_codes` MUST be the already-authorized scope (effective scope).
-          Never pass raw payload values here. The API layer is responsible for using
-          `resolve_allowed_scope` and only forwarding the allowed list.
-        """
-        if self._test_mode:
-            return {
-                "hits": [],
-                "count": 0 if include_total_count else None,
-                "facets": None,
-            }
-
         base_filter = self._consignee_filter(consignee_codes)
         final_filter = (
             base_filter if not extra_filter else f"({base_filter}) and ({extra_filter})"
         )
-        select = [
-            self._id_field,
-            self._content_field,
-            self._container_field,
-        ]
 
         kwargs: Dict[str, Any] = {
             "search_text": query_text or "*",
@@ -167,45 +187,77 @@ class AzureAISearchTool:
                     fields=self._vector_field,
                 )
             ]
+        return kwargs
+
+    def _to_hit(self, doc: Dict[str, Any]) -> ShipmentHit:
+        # Extract key fields using configured names
+        fields = {
+            "doc_id": doc.get(self._id_field),
+            "container_number": doc.get(self._container_field),
+            "content": doc.get(self._content_field),
+            "score": doc.get("@search.score"),
+            "reranker_score": doc.get("@search.reranker_score"),
+        }
+        # Include all other fields except vectors to avoid bloat
+        for k, v in doc.items():
+            if k not in fields and k not in {
+                self._vector_field,
+                self._consignee_field,
+            }:
+                fields[k] = v
+        # metadata_json is parsed here, once, for every downstream node.
+        hit = ShipmentHit.from_raw(fields, metadata_field=self._metadata_field)
+        if not hit.fields["container_number"]:
+            # Fallback check inside metadata_json if top-level missing
+            hit.fields["container_number"] = hit.metadata.get("container_number")
+        return hit
+
+    @staticmethod
+    def _empty_response(include_total_count: bool) -> Dict[str, Any]:
+        return {
+            "hits": [],
+            "count": 0 if include_total_count else None,
+            "facets": None,
+        }
+
+    def search(
+        self,
+        *,
+        query_text: str,
+        consignee_codes: List[str],
+        top_k: int = 10,
+        vector: Optional[List[float]] = None,
+        vector_k: int = 30,
+        extra_filter: Optional[str] = None,
+        include_total_count: bool = False,
+        facets: Optional[List[str]] = None,
+        skip: Optional[int] = None,
+        order_by: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Hybrid search entry point.
 
+        NOTE:
+        - `consignee_codes` MUST be the already-authorized scope (effective scope).
+          Never pass raw payload values here. The API layer is responsible for using
+          `resolve_allowed_scope` and only forwarding the allowed list.
+        """
+        if self._test_mode:
+            return self._empty_response(include_total_count)
+
+        kwargs = self._build_search_kwargs(
+            query_text=query_text,
+            consignee_codes=consignee_codes,
+            top_k=top_k,
+            vector=vector,
+            vector_k=vector_k,
+            extra_filter=extra_filter,
+            skip=skip,
+            order_by=order_by,
+        )
         results = self._client.search(**kwargs)
 
-        hits: List[Dict[str, Any]] = []
-        for r in results:
-            doc = dict(r)
-
-            # Extract key fields using configured names
-            container_number = doc.get(self._container_field)
-            if not container_number:
-                # Fallback check inside metadata_json if top-level missing
-                raw_meta = doc.get(self._metadata_field)
-                if isinstance(raw_meta, str):
-                    try:
-                        import json
-
-                        meta_dict = json.loads(raw_meta)
-                        container_number = meta_dict.get("container_number")
-                    except:
-                        pass
-                elif isinstance(raw_meta, dict):
-                    container_number = raw_meta.get("container_number")
-
-            hit = {
-                "doc_id": doc.get(self._id_field),
-                "container_number": container_number,
-                "content": doc.get(self._content_field),
-                "score": doc.get("@search.score"),
-                "reranker_score": doc.get("@search.reranker_score"),
-            }
-            # Include all other fields except vectors to avoid bloat
-            for k, v in doc.items():
-                if k not in hit and k not in {
-                    self._vector_field,
-                    self._consignee_field,
-                }:
-                    hit[k] = v
-
-            hits.append(hit)
+        hits: List[ShipmentHit] = [self._to_hit(dict(r)) for r in results]
 
         return {
             "hits": hits,
@@ -213,6 +265,110 @@ class AzureAISearchTool:
             "facets": results.get_facets() if facets else None,
         }
 
+    def _get_async_client(self) -> AsyncSearchClient:
+        transport = get_search_transport()
+        if self._async_client is None or not transport.is_current(
+            self._async_transport
+        ):
+            self._async_transport = transport.transport()
+            self._async_client = AsyncSearchClient(
+                endpoint=self._endpoint,
+                credential=self._credential,
+                index_name=self._index_name,
+                transport=self._async_transport,
+            )
+        return self._async_client
+
+    def _coalesce_key(
+        self,
+        kwargs: Dict[str, Any],
+        vector: Optional[List[float]],
+        vector_k: int,
+        include_total_count: bool,
+        facets: Optional[List[str]],
+    ) -> str:
+        # The consignee scope is inside `filter`, so callers with different
+        # scopes never share a result.
+        vector_hash = (
+            hashlib.sha256(json.dumps(vector).encode("utf-8")).hexdigest()
+            if vector
+            else None
+        )
+        payload = {
+            "index": self._index_name,
+            "search_text": kwargs["search_text"],
+            "filter": kwargs["filter"],
+            "top": kwargs["top"],
+            "skip": kwargs["skip"],
+            "order_by": kwargs["order_by"],
+            "vector": vector_hash,
+            "vector_k": vector_k if vector_hash else None,
+            "include_total_count": include_total_count,
+            "facets": facets,
+        }
+        blob = json.dumps(payload, sort_keys=True, default=str)
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+    async def _asearch_backend(
+        self,
+        kwargs: Dict[str, Any],
+        include_total_count: bool,
+        facets: Optional[List[str]],
+    ) -> Dict[str, Any]:
+        metrics.increment("search.backend")
+        results = await self._get_async_client().search(**kwargs)
+
+        hits: List[ShipmentHit] = []
+        async for r in results:
+            hits.append(self._to_hit(dict(r)))
+
+        return {
+            "hits": hits,
+            "count": await results.get_count() if include_total_count else None,
+            "facets": await results.get_facets() if facets else None,
+        }
+
+    async def asearch(
+        self,
+        *,
+        query_text: str,
+        consignee_codes: List[str],
+        top_k: int = 10,
+        vector: Optional[List[float]] = None,
+        vector_k: int = 30,
+        extra_filter: Optional[str] = None,
+        include_total_count: bool = False,
+        facets: Optional[List[str]] = None,
+        skip: Optional[int] = None,
+        order_by: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Async variant of `search`. Same RLS contract and return shape.
+
+        Runs over the shared connection pool, and identical calls already in
+        flight are joined instead of repeated (AZURE_SEARCH_COALESCE).
+        """
+        if self._test_mode:
+            return self._empty_response(include_total_count)
+
+        kwargs = self._build_search_kwargs(
+            query_text=query_text,
+            consignee_codes=consignee_codes,
+            top_k=top_k,
+            vector=vector,
+            vector_k=vector_k,
+            extra_filter=extra_filter,
+            skip=skip,
+            order_by=order_by,
+        )
+        if not _coalescing_enabled():
+            return await self._asearch_backend(kwargs, include_total_count, facets)
+
+        key = self._coalesce_key(kwargs, vector, vector_k, include_total_count, facets)
+        return await _COALESCER.run(
+            key, lambda: self._asearch_backend(kwargs, include_total_count, facets)
+        )
+
     def upload_documents(self, documents: List[Dict[str, Any]]) -> None:
         """
         Uploads a batch of documents to the Azure Search index.
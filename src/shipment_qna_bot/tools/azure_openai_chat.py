@@ -1,9 +1,11 @@
 import os
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional
 
 from dotenv import find_dotenv, load_dotenv
-from openai import AzureOpenAI
+from openai import AsyncAzureOpenAI, AzureOpenAI
 
+from shipment_qna_bot.logging.logger import logger
+from shipment_qna_bot.tools.llm_cache import get_llm_cache, make_cache_key
 from shipment_qna_bot.utils.runtime import is_test_mode
 
 # Load environment variables
@@ -19,8 +21,10 @@ class AzureOpenAIChatTool:
             self.azure_endpoint = "test"
             self.deployment_name = "test"
             self.client = None
+            self.async_client = None
             self.timeout_s = None
             self.max_retries = 0
+            self.cache = None
             return
 
         self.api_key = os.getenv("AZURE_OPENAI_API_KEY")
@@ -60,6 +64,124 @@ class AzureOpenAIChatTool:
             timeout=self.timeout_s,
             max_retries=self.max_retries,
         )
+        # Async twin used by the async graph path so a single worker can keep
+        # many LLM calls in flight without blocking the event loop.
+        self.async_client = AsyncAzureOpenAI(
+            api_key=self.api_key,
+            api_version=self.api_version,
+            azure_endpoint=self.azure_endpoint,
+            timeout=self.timeout_s,
+            max_retries=self.max_retries,
+        )
+        # Exact-match response cache for deterministic calls (see llm_cache).
+        self.cache = get_llm_cache()
+
+    @staticmethod
+    def _empty_result() -> Dict[str, Any]:
+        return {
+            "content": "",
+            "usage": {
+                "prompt_tokens": 0,
+                "completion_tokens": 0,
+                "total_tokens": 0,
+            },
+        }
+
+    def _request_kwargs(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: int,
+        tools: Optional[List[Dict[str, Any]]],
+        tool_choice: Optional[str],
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        kwargs: Dict[str, Any] = {
+            "model": self.deployment_name,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+        }
+        if self.timeout_s:
+            kwargs["timeout"] = self.timeout_s
+        if tools:
+            kwargs["tools"] = tools
+        if tool_choice:
+            kwargs["tool_choice"] = tool_choice
+        if response_format:
+            kwargs["response_format"] = response_format
+        return kwargs
+
+    @staticmethod
+    def _parse_response(response: Any) -> Dict[str, Any]:
+        choice = response.choices[0]
+        message = choice.message
+
+        result = {
+            "content": message.content or "",
+            "usage": {
+                "prompt_tokens": response.usage.prompt_tokens,
+                "completion_tokens": response.usage.completion_tokens,
+                "total_tokens": response.usage.total_tokens,
+            },
+        }
+
+        if message.tool_calls:
+            result["tool_calls"] = message.tool_calls
+            # Store the tool_call_id of the first call for convenience if needed,
+            # though usually we iterate over tool_calls.
+            result["tool_call_id"] = message.tool_calls[0].id
+
+        return result
+
+    def _cache_key(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: int,
+        tools: Optional[List[Dict[str, Any]]],
+        tool_choice: Optional[str],
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> Optional[str]:
+        # Only temperature-0, tool-free calls are deterministic enough to reuse.
+        if self.cache is None or temperature != 0 or tools or tool_choice:
+            return None
+        return make_cache_key(
+            messages, self.deployment_name, temperature, max_tokens, response_format
+        )
+
+    def _cached_result(self, key: Optional[str]) -> Optional[Dict[str, Any]]:
+        if key is None:
+            return None
+        try:
+            cached = self.cache.get(key)
+        except Exception as e:
+            logger.warning(f"LLM cache read failed: {e}")
+            return None
+        if cached is None:
+            return None
+        return {
+            "content": cached.get("content", ""),
+            "usage": {
+                "prompt_tokens": 0,
+                "completion_tokens": 0,
+                "total_tokens": 0,
+                "cache_hits": 1,
+                "cache_misses": 0,
+            },
+        }
+
+    def _store_result(self, key: Optional[str], result: Dict[str, Any]) -> None:
+        if key is None:
+            return
+        result["usage"]["cache_hits"] = 0
+        result["usage"]["cache_misses"] = 1
+        if not result.get("content") or result.get("tool_calls"):
+            return
+        try:
+            self.cache.set(key, {"content": result["content"]})
+        except Exception as e:
+            logger.warning(f"LLM cache write failed: {e}")
 
     def chat_completion(
         self,
@@ -68,54 +190,112 @@ class AzureOpenAIChatTool:
         max_tokens: int = 800,
         tools: Optional[List[Dict[str, Any]]] = None,
         tool_choice: Optional[str] = None,
+        response_format: Optional[Dict[str, Any]] = None,
     ) -> Dict[str, Any]:
         """
         Generates a chat completion using the Azure OpenAI client.
         Returns a dict with 'content', 'usage', and optionally 'tool_calls'.
+        `response_format={"type": "json_object"}` requests structured output.
         """
         if self._test_mode:
-            return {
-                "content": "",
-                "usage": {
-                    "prompt_tokens": 0,
-                    "completion_tokens": 0,
-                    "total_tokens": 0,
-                },
-            }
+            return self._empty_result()
 
-        try:
-            kwargs = {
-                "model": self.deployment_name,
-                "messages": messages,
-                "temperature": temperature,
-                "max_tokens": max_tokens,
-            }
-            if self.timeout_s:
-                kwargs["timeout"] = self.timeout_s
-            if tools:
-                kwargs["tools"] = tools
-            if tool_choice:
-                kwargs["tool_choice"] = tool_choice
+        key = self._cache_key(
+            messages, temperature, max_tokens, tools, tool_choice, response_format
+        )
+        cached = self._cached_result(key)
+        if cached is not None:
+            return cached
 
+        try:
+            kwargs = self._request_kwargs(
+                messages, temperature, max_tokens, tools, tool_choice, response_format
+            )
             response = self.client.chat.completions.create(**kwargs)
-            choice = response.choices[0]
-            message = choice.message
-
-            result = {
-                "content": message.content or "",
-                "usage": {
-                    "prompt_tokens": response.usage.prompt_tokens,
-                    "completion_tokens": response.usage.completion_tokens,
-                    "total_tokens": response.usage.total_tokens,
-                },
-            }
-
-            if message.tool_calls:
-                result["tool_calls"] = message.tool_calls
-                # Store the tool_call_id of the first call for convenience if needed,
-                # though usually we iterate over tool_calls.
-                result["tool_call_id"] = message.tool_calls[0].id
-
-            return result
+            result = self._parse_response(response)
+        except Exception as e:
+            raise RuntimeError(f"Azure OpenAI Chat Completion failed: {e}")
+        self._store_result(key, result)
+        return result
+
+    async def achat_completion(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.0,
+        max_tokens: int = 800,
+        tools: Optional[List[Dict[str, Any]]] = None,
+        tool_choice: Optional[str] = None,
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Async variant of `chat_completion` with the same return shape.
+        """
+        if self._test_mode:
+            return self._empty_result()
+
+        key = self._cache_key(
+            messages, temperature, max_tokens, tools, tool_choice, response_format
+        )
+        cached = self._cached_result(key)
+        if cached is not None:
+            return cached
+
+        try:
+            kwargs = self._request_kwargs(
+                messages, temperature, max_tokens, tools, tool_choice, response_format
+            )
+            response = await self.async_client.chat.completions.create(**kwargs)
+            result = self._parse_response(response)
         except Exception as e:
             raise RuntimeError(f"Azure OpenAI Chat Completion failed: {e}")
+        self._store_result(key, result)
+        return result
+
+    async def astream_chat_completion(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.0,
+        max_tokens: int = 800,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streams a chat completion. Yields `{"delta": text}` chunks as they
+        arrive, then one final dict with the same shape as `achat_completion`.
+        """
+        if self._test_mode:
+            yield self._empty_result()
+            return
+
+        key = self._cache_key(messages, temperature, max_tokens, None, None)
+        cached = self._cached_result(key)
+        if cached is not None:
+            if cached["content"]:
+                yield {"delta": cached["content"]}
+            yield cached
+            return
+
+        parts: List[str] = []
+        usage = {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+        try:
+            kwargs = self._request_kwargs(messages, temperature, max_tokens, None, None)
+            stream = await self.async_client.chat.completions.create(
+                **kwargs, stream=True, stream_options={"include_usage": True}
+            )
+            async for chunk in stream:
+                if getattr(chunk, "usage", None):
+                    usage = {
+                        "prompt_tokens": chunk.usage.prompt_tokens,
+                        "completion_tokens": chunk.usage.completion_tokens,
+                        "total_tokens": chunk.usage.total_tokens,
+                    }
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    parts.append(delta)
+                    yield {"delta": delta}
+        except Exception as e:
+            raise RuntimeError(f"Azure OpenAI Chat Completion failed: {e}")
+
+        result = {"content": "".join(parts), "usage": usage}
+        self._store_result(key, result)
+        yield result
@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import asyncio
 import os
 import time
 
@@ -11,13 +12,68 @@ load_dotenv(find_dotenv(), override=True)
 
 from typing import List
 
-from openai import AzureOpenAI
+from openai import AsyncAzureOpenAI, AzureOpenAI
 
+from shipment_qna_bot.logging.logger import logger
+from shipment_qna_bot.tools.embedding_cache import get_embedding_cache
 from shipment_qna_bot.utils.runtime import is_test_mode
 
 # from azure.ai.openai import AzureOpenAI
 # from azure.ai.openai.schemas import Embeddings
 
+_TRANSIENT_MARKERS = [
+    "ratelimit",
+    "rate limit",
+    "429",
+    "timeout",
+    "timed out",
+    "service unavailable",
+    "temporarily unavailable",
+    "500",
+    "502",
+    "503",
+    "504",
+    "connection reset",
+    "connection aborted",
+    "econnreset",
+    "gateway timeout",
+]
+
+
+def _is_transient(err: Exception) -> bool:
+    msg_lower = str(err).lower()
+    return any(marker in msg_lower for marker in _TRANSIENT_MARKERS)
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Conservative token estimate (~3 chars/token; IDs and dates tokenize densely).
+    """
+    return len(text) // 3 + 1
+
+
+def pack_batches(texts: List[str], max_inputs: int, max_tokens: int) -> List[List[int]]:
+    """
+    Groups input positions into request batches holding at most `max_inputs`
+    texts and `max_tokens` estimated tokens. An oversized text gets a batch
+    of its own.
+    """
+    batches: List[List[int]] = []
+    current: List[int] = []
+    current_tokens = 0
+    for i, text in enumerate(texts):
+        tokens = estimate_tokens(text)
+        if current and (
+            len(current) >= max_inputs or current_tokens + tokens > max_tokens
+        ):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(i)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
 
 class AzureOpenAIEmbeddingsClient:
     def __init__(self) -> None:
@@ -25,7 +81,9 @@ class AzureOpenAIEmbeddingsClient:
         if self._test_mode:
             self._deployment = "test"
             self._client = None
+            self._async_client = None
             self._timeout_s = None
+            self._cache = None
             return
 
         endpoint = os.getenv("AZURE_OPENAI_ENDPOINT")
@@ -54,6 +112,33 @@ class AzureOpenAIEmbeddingsClient:
             timeout=self._timeout_s,
             max_retries=int(os.getenv("AZURE_OPENAI_EMBED_MAX_RETRIES", "5")),
         )
+        self._async_client = AsyncAzureOpenAI(
+            azure_endpoint=endpoint,
+            api_key=api_key,
+            api_version=api_version,
+            timeout=self._timeout_s,
+            max_retries=int(os.getenv("AZURE_OPENAI_EMBED_MAX_RETRIES", "5")),
+        )
+        # Query vectors repeat across retrievals and judge retries (see embedding_cache).
+        self._cache = get_embedding_cache()
+
+    def _cached_vector(self, text: str) -> List[float] | None:
+        if self._cache is None:
+            return None
+        try:
+            vector = self._cache.get(text, self._deployment)
+        except Exception as e:
+            logger.warning(f"Embedding cache read failed: {e}")
+            return None
+        return None if vector is None else vector.tolist()
+
+    def _store_vector(self, text: str, vector: List[float]) -> None:
+        if self._cache is None or not vector:
+            return
+        try:
+            self._cache.set(text, self._deployment, vector)
+        except Exception as e:
+            logger.warning(f"Embedding cache write failed: {e}")
 
     def embed_query(self, text: str) -> List[float]:
         if self._test_mode:
@@ -61,26 +146,12 @@ class AzureOpenAIEmbeddingsClient:
         text = (text or "").strip()
         if not text:
             return []
+        cached = self._cached_vector(text)
+        if cached is not None:
+            return cached
         max_retries = int(os.getenv("AZURE_OPENAI_EMBED_MAX_RETRIES", "5"))
         base_delay = float(os.getenv("AZURE_OPENAI_EMBED_RETRY_DELAY", "1.0"))
         last_error: Exception | None = None
-        transient_markers = [
-            "ratelimit",
-            "rate limit",
-            "429",
-            "timeout",
-            "timed out",
-            "service unavailable",
-            "temporarily unavailable",
-            "500",
-            "502",
-            "503",
-            "504",
-            "connection reset",
-            "connection aborted",
-            "econnreset",
-            "gateway timeout",
-        ]
 
         for attempt in range(1, max_retries + 1):
             try:
@@ -90,12 +161,12 @@ class AzureOpenAIEmbeddingsClient:
                     input=text_input,
                     timeout=self._timeout_s,
                 )
-                return list(resp.data[0].embedding)
+                vector = list(resp.data[0].embedding)
+                self._store_vector(text, vector)
+                return vector
             except Exception as e:
                 last_error = e
-                msg = str(e)
-                msg_lower = msg.lower()
-                if any(marker in msg_lower for marker in transient_markers):
+                if _is_transient(e):
                     time.sleep(base_delay * attempt)
                     continue
                 break
@@ -103,3 +174,105 @@ class AzureOpenAIEmbeddingsClient:
         raise RuntimeError(
             f"Azure OpenAI Embedding failed: {last_error}"
         ) from last_error
+
+    def embed_batch(
+        self,
+        texts: List[str],
+        max_inputs: int | None = None,
+        max_tokens: int | None = None,
+    ) -> List[List[float]]:
+        """
+        Embeds many texts with as few requests as the limits allow.
+
+        Inputs are packed into requests of at most `max_inputs` texts and
+        `max_tokens` estimated tokens (AZURE_OPENAI_EMBED_BATCH_SIZE /
+        AZURE_OPENAI_EMBED_BATCH_TOKENS). Each request is retried with
+        exponential backoff on transient errors; a request that still fails
+        raises. Results keep input order; blank texts map to [].
+        """
+        if self._test_mode:
+            return [[] for _ in texts]
+        max_inputs = max_inputs or int(os.getenv("AZURE_OPENAI_EMBED_BATCH_SIZE", "64"))
+        max_tokens = max_tokens or int(
+            os.getenv("AZURE_OPENAI_EMBED_BATCH_TOKENS", "100000")
+        )
+
+        cleaned = [str(t or "").strip() for t in texts]
+        positions = [i for i, t in enumerate(cleaned) if t]
+        vectors: List[List[float]] = [[] for _ in texts]
+
+        for batch in pack_batches(
+            [cleaned[i] for i in positions], max_inputs, max_tokens
+        ):
+            batch_positions = [positions[j] for j in batch]
+            batch_vectors = self._embed_request([cleaned[i] for i in batch_positions])
+            for pos, vector in zip(batch_positions, batch_vectors):
+                vectors[pos] = vector
+        return vectors
+
+    def _embed_request(self, inputs: List[str]) -> List[List[float]]:
+        max_retries = int(os.getenv("AZURE_OPENAI_EMBED_MAX_RETRIES", "5"))
+        base_delay = float(os.getenv("AZURE_OPENAI_EMBED_RETRY_DELAY", "1.0"))
+        last_error: Exception | None = None
+
+        for attempt in range(1, max_retries + 1):
+            try:
+                resp = self._client.embeddings.create(
+                    model=self._deployment,
+                    input=inputs,
+                    timeout=self._timeout_s,
+                )
+                ordered = sorted(resp.data, key=lambda d: d.index)
+                if len(ordered) != len(inputs):
+                    raise RuntimeError(
+                        f"expected {len(inputs)} embeddings, got {len(ordered)}"
+                    )
+                return [list(d.embedding) for d in ordered]
+            except Exception as e:
+                last_error = e
+                if _is_transient(e) and attempt < max_retries:
+                    time.sleep(base_delay * 2 ** (attempt - 1))
+                    continue
+                break
+
+        raise RuntimeError(
+            f"Azure OpenAI batch embedding failed ({len(inputs)} inputs): {last_error}"
+        ) from last_error
+
+    async def aembed_query(self, text: str) -> List[float]:
+        """
+        Async variant of `embed_query`; backs off with `asyncio.sleep` so retries
+        never stall the event loop.
+        """
+        if self._test_mode:
+            return []
+        text = (text or "").strip()
+        if not text:
+            return []
+        cached = self._cached_vector(text)
+        if cached is not None:
+            return cached
+        max_retries = int(os.getenv("AZURE_OPENAI_EMBED_MAX_RETRIES", "5"))
+        base_delay = float(os.getenv("AZURE_OPENAI_EMBED_RETRY_DELAY", "1.0"))
+        last_error: Exception | None = None
+
+        for attempt in range(1, max_retries + 1):
+            try:
+                resp = await self._async_client.embeddings.create(
+                    model=self._deployment,
+                    input=str(text),
+                    timeout=self._timeout_s,
+                )
+                vector = list(resp.data[0].embedding)
+                self._store_vector(text, vector)
+                return vector
+            except Exception as e:
+                last_error = e
+                if _is_transient(e):
+                    await asyncio.sleep(base_delay * attempt)
+                    continue
+                break
+
+        raise RuntimeError(
+            f"Azure OpenAI Embedding failed: {last_error}"
+        ) from last_error
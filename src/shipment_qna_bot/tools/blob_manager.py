@@ -1,19 +1,161 @@
 import glob
 import os
+import threading
+from dataclasses import dataclass
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
 from azure.storage.blob import BlobClient
 from dotenv import find_dotenv, load_dotenv
 
 from shipment_qna_bot.logging.logger import logger
 from shipment_qna_bot.tools.analytics_metadata import ANALYTICS_METADATA
 from shipment_qna_bot.tools.date_tools import get_today_date
+from shipment_qna_bot.tools.parquet_loader import (load_pushdown,
+                                                   read_schema_columns,
+                                                   rewrite_sorted_by_consignee)
 from shipment_qna_bot.utils.runtime import is_test_mode
 
 load_dotenv(find_dotenv(), override=True)
 
+CONSIGNEE_COLUMN = "consignee_codes"
+
+# "resident": keep the whole type-cast file in memory and slice per request.
+# "pushdown": keep nothing resident; read only matching row groups/columns
+# from a consignee-sorted copy of the daily file.
+LOAD_MODES = ("resident", "pushdown")
+_PUSHDOWN_LOCK = threading.Lock()
+
+
+@dataclass(frozen=True)
+class ResidentDataset:
+    """
+    A type-cast master dataset kept in memory for one daily parquet file.
+    `code_index` maps each consignee code to the sorted row positions it owns;
+    it is None when the file has no consignee column.
+    """
+
+    path: str
+    mtime: float
+    df: pd.DataFrame
+    code_index: Optional[Dict[str, np.ndarray]]
+
+    def slice(self, consignee_codes: List[str]) -> pd.DataFrame:
+        if self.code_index is None:
+            return pd.DataFrame()
+        parts = [self.code_index[c] for c in consignee_codes if c in self.code_index]
+        if not parts:
+            return self.df.iloc[0:0].copy()
+        positions = np.unique(np.concatenate(parts))
+        return self.df.iloc[positions].copy()
+
+
+# Process-wide snapshot shared by every BlobAnalyticsManager instance.
+# Readers grab the reference without locking; rebuilds swap it atomically.
+_RESIDENT: Optional[ResidentDataset] = None
+_RESIDENT_LOCK = threading.Lock()
+
+
+def _cast_types(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Automatic Type Casting based on Metadata.
+    """
+    for col, meta in ANALYTICS_METADATA.items():
+        if col in df.columns:
+            col_type = meta.get("type")
+            if col_type == "numeric":
+                df[col] = pd.to_numeric(df[col], errors="coerce")
+            elif col_type == "datetime":
+                df[col] = pd.to_datetime(df[col], errors="coerce")
+    return df
+
+
+def _build_code_index(codes: pa.ChunkedArray) -> Dict[str, np.ndarray]:
+    """
+    Builds consignee code -> row positions from a list-valued (or scalar) column.
+    A shipment shared by several consignees appears under each of them.
+    Works on the Arrow column to avoid exploding Python lists.
+    """
+    arr = codes.combine_chunks()
+    if pa.types.is_list(arr.type) or pa.types.is_large_list(arr.type):
+        positions = pc.list_parent_indices(arr).to_numpy()
+        flat = pc.list_flatten(arr)
+    else:
+        positions = np.arange(len(arr), dtype=np.int64)
+        flat = arr
+    flat = flat.cast(pa.string())
+    valid = pc.is_valid(flat).to_numpy(zero_copy_only=False)
+    if not valid.any():
+        return {}
+    encoded = pc.dictionary_encode(flat.filter(pa.array(valid)))
+    keys = encoded.dictionary.to_pylist()
+    ids = encoded.indices.to_numpy()
+    positions = positions[valid]
+    order = np.argsort(ids, kind="stable")
+    counts = np.bincount(ids, minlength=len(keys))
+    chunks = np.split(positions[order], np.cumsum(counts)[:-1])
+    return {key: np.unique(chunk) for key, chunk in zip(keys, chunks)}
+
+
+def get_resident_dataset(file_path: str) -> ResidentDataset:
+    """
+    Returns the in-memory dataset for `file_path`, loading it on first use
+    and whenever the daily file (or its mtime) changes.
+    """
+    global _RESIDENT
+    mtime = os.path.getmtime(file_path)
+    current = _RESIDENT
+    if current is not None and current.path == file_path and current.mtime == mtime:
+        return current
+
+    with _RESIDENT_LOCK:
+        current = _RESIDENT
+        if current is not None and current.path == file_path and current.mtime == mtime:
+            return current
+
+        df = _cast_types(pd.read_parquet(file_path))
+        code_index = None
+        if CONSIGNEE_COLUMN in df.columns:
+            code_index = _build_code_index(
+                pq.read_table(file_path, columns=[CONSIGNEE_COLUMN]).column(0)
+            )
+        else:
+            logger.warning(
+                f"Column '{CONSIGNEE_COLUMN}' not found in dataset. Columns: {df.columns}"
+            )
+
+        resident = ResidentDataset(
+            path=file_path, mtime=mtime, df=df, code_index=code_index
+        )
+        _RESIDENT = resident
+        logger.info(
+            f"Resident master dataset loaded: rows={len(df)} "
+            f"codes={len(code_index or {})} path={file_path}"
+        )
+        return resident
+
+
+def get_load_mode() -> str:
+    mode = os.getenv("ANALYTICS_LOAD_MODE", "resident").strip().lower()
+    if mode not in LOAD_MODES:
+        logger.warning(f"Unknown ANALYTICS_LOAD_MODE={mode!r}; using 'resident'.")
+        return "resident"
+    return mode
+
+
+def reset_resident_dataset() -> None:
+    """
+    Drops the resident snapshot (used by tests and after manual cache purges).
+    """
+    global _RESIDENT
+    with _RESIDENT_LOCK:
+        _RESIDENT = None
+
 
 class BlobAnalyticsManager:
     """
@@ -43,14 +185,21 @@ class BlobAnalyticsManager:
     def _get_cache_path(self, date_str: str) -> str:
         return os.path.join(self.cache_dir, f"master_{date_str}.parquet")
 
+    def _get_sorted_path(self, date_str: str) -> str:
+        return os.path.join(self.cache_dir, f"master_{date_str}.sorted.parquet")
+
     def _cleanup_old_cache(self, current_date_str: str):
         """
         Removes any master_*.parquet files that do not match the current date.
         """
+        keep = {
+            os.path.basename(self._get_cache_path(current_date_str)),
+            os.path.basename(self._get_sorted_path(current_date_str)),
+        }
         pattern = os.path.join(self.cache_dir, "master_*.parquet")
         for fpath in glob.glob(pattern):
             fname = os.path.basename(fpath)
-            if fname != f"master_{current_date_str}.parquet":
+            if fname not in keep:
                 try:
                     os.remove(fpath)
                     logger.info(f"Cleaned up old cache file: {fpath}")
@@ -111,9 +260,45 @@ class BlobAnalyticsManager:
                 os.remove(target_path)
             raise RuntimeError(f"Blob download failed: {e}")
 
-    def load_filtered_data(self, consignee_codes: List[str]) -> pd.DataFrame:
+    def ensure_sorted_copy(self, file_path: str) -> Optional[str]:
+        """
+        Returns the consignee-sorted copy of `file_path`, rewriting it when missing
+        or older than the source. None when the source has no consignee column.
+        """
+        sorted_path = self._get_sorted_path(self._get_today_str())
+
+        def _fresh() -> bool:
+            return os.path.exists(sorted_path) and os.path.getmtime(
+                sorted_path
+            ) >= os.path.getmtime(file_path)
+
+        if _fresh():
+            return sorted_path
+        with _PUSHDOWN_LOCK:
+            if _fresh():
+                return sorted_path
+            if not rewrite_sorted_by_consignee(
+                file_path, sorted_path, list_column=CONSIGNEE_COLUMN
+            ):
+                return None
+        return sorted_path
+
+    def available_columns(self) -> List[str]:
         """
-        Loads the master dataset and returns a DataFrame filtered for the given consignee_ids.
+        Column names of today's master file, read from the parquet footer only.
+        """
+        return read_schema_columns(self.download_master_data())
+
+    def load_filtered_data(
+        self, consignee_codes: List[str], columns: Optional[List[str]] = None
+    ) -> pd.DataFrame:
+        """
+        Returns a DataFrame filtered for the given consignee_ids.
+
+        In "resident" mode the master file is decoded and type-cast once per day
+        into a process-wide resident dataset; each call only slices the rows its
+        codes own. In "pushdown" mode nothing is kept in memory and only the
+        matching row groups of `columns` are read. `columns=None` means all.
         """
         if not consignee_codes:
             logger.warning(
@@ -124,74 +309,24 @@ class BlobAnalyticsManager:
         file_path = self.download_master_data()
 
         try:
-            # We assume the parquet has a column 'consignee_code' (singular) or similar.
-            # Adjust column name as per schema. Assuming 'consignee_code' based on context.
-            # Using pyarrow pushdown predicate if possible.
-            # Note: 'consignee_code' must be a column in the parquet.
-
-            # Using pandas read_parquet with filters (requires pyarrow)
-            # filters=[('col', 'in', ['a', 'b'])]
-
-            # Note: Filter format for read_parquet is [ (col, op, val), ... ] which are ANDed.
-            # For "IN" logic with multiple codes, DNF (lists of lists) or specific 'in' operator support
-            # depends on engine.
-            # Pyarrow 'filters' parameter supports DNF: [[('col', '==', 'a'), ('col', '==', 'b')]] is (A or B).
-            # But let's verify if 'in' operator is supported in recent pyarrow.
-            # Safe bet: Load columns, then filter in pandas if dataset fits in memory.
-            # Given requirement "high-throughput Data Loader", trying pushdown is better.
-
-            # Let's try standard filtering in pandas after load for robustness first,
-            # as pushdown requires partitioned datasets often for strict row skipping.
-
-            df = pd.read_parquet(file_path)
-
-            # Filter
-            # The parquet column is 'consignee_codes' (list of strings).
-            target_col = "consignee_codes"
-            if target_col not in df.columns:
-                # fallback or check if we have data at all
-                logger.warning(
-                    f"Column '{target_col}' not found in dataset. Columns: {df.columns}"
+            if get_load_mode() == "pushdown":
+                sorted_path = self.ensure_sorted_copy(file_path)
+                if sorted_path is None:
+                    return pd.DataFrame()  # fail safe
+                filtered_df = _cast_types(
+                    load_pushdown(sorted_path, consignee_codes, columns)
                 )
-                return pd.DataFrame()  # fail safe
-
-            # Apply filter: overlap between row's [codes] and user's [codes]
-            # Efficient method: Explode -> IsIn -> Index Unique -> Slice
-            # This handles if a shipment belongs to multiple consignees (rare but possible with shared IDs).
-
-            # Ensure column is treated as list (in case it loaded as string representation)
-            # If it's pure parquet list, pandas reads as array/list.
-
-            # Optimization: If the dataset is huge, this might be memory intensive.
-            # But for <100k rows, it's fine.
-
-            # Check first row type to be safe
-            if not df.empty and isinstance(df[target_col].iloc[0], str):
-                # If it looks like "['A', 'B']", validation needed.
-                # But assuming standard parquet list support.
-                pass
-
-            exploded = df.explode(target_col)
-            mask = exploded[target_col].isin(consignee_codes)
-            valid_indices = exploded[mask].index.unique()
-
-            filtered_df = df.loc[valid_indices].copy()
-
-            # Automatic Type Casting based on Metadata
-            for col, meta in ANALYTICS_METADATA.items():
-                if col in filtered_df.columns:
-                    col_type = meta.get("type")
-                    if col_type == "numeric":
-                        filtered_df[col] = pd.to_numeric(
-                            filtered_df[col], errors="coerce"
-                        )
-                    elif col_type == "datetime":
-                        filtered_df[col] = pd.to_datetime(
-                            filtered_df[col], errors="coerce"
-                        )
+            else:
+                resident = get_resident_dataset(file_path)
+                # Slices are copies, so analytics code cannot mutate the shared frame.
+                filtered_df = resident.slice(consignee_codes)
+                if columns is not None:
+                    keep = [c for c in filtered_df.columns if c in set(columns)]
+                    filtered_df = filtered_df[keep]
 
             logger.info(
-                f"Loaded {len(filtered_df)} rows for codes {consignee_codes[:3]}..."
+                f"Loaded {len(filtered_df)} rows x {len(filtered_df.columns)} cols "
+                f"for codes {consignee_codes[:3]}..."
             )
             return filtered_df
 
@@ -0,0 +1,146 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+
+from shipment_qna_bot.logging.logger import logger
+from shipment_qna_bot.utils.ttl_cache import TTLCache
+
+_WS_RE = re.compile(r"\s+")
+
+
+def make_embedding_key(text: str, deployment: str) -> str:
+    """
+    Keys on the deployment and the case/whitespace-normalized text.
+    """
+    normalized = _WS_RE.sub(" ", (text or "").strip().lower())
+    return hashlib.sha256(f"{deployment}\x00{normalized}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    LRU+TTL cache of query embeddings stored as float32 arrays, with an
+    optional SQLite tier (raw float32 bytes) so restarts do not start cold.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 4096,
+        ttl_s: float = 86400.0,
+        persist_path: Optional[str] = None,
+    ):
+        self.ttl_s = float(ttl_s)
+        self._memory: TTLCache[np.ndarray] = TTLCache(
+            max_entries=max_entries, ttl_s=ttl_s
+        )
+        self.disk_hits = 0
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        if persist_path:
+            parent = os.path.dirname(persist_path)
+            if parent and not os.path.exists(parent):
+                os.makedirs(parent, exist_ok=True)
+            self._conn = sqlite3.connect(
+                persist_path, check_same_thread=False, timeout=5.0
+            )
+            with self._lock, self._conn:
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS embedding_cache ("
+                    " key TEXT PRIMARY KEY,"
+                    " vector BLOB NOT NULL,"
+                    " expires_at REAL NOT NULL)"
+                )
+
+    def get(self, text: str, deployment: str) -> Optional[np.ndarray]:
+        key = make_embedding_key(text, deployment)
+        vector = self._memory.get(key)
+        if vector is not None or self._conn is None:
+            return vector
+
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT vector, expires_at FROM embedding_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] <= time.time():
+                self._conn.execute("DELETE FROM embedding_cache WHERE key = ?", (key,))
+                return None
+        vector = np.frombuffer(row[0], dtype=np.float32)
+        self.disk_hits += 1
+        self._memory.set(key, vector, ttl_s=row[1] - time.time())
+        return vector
+
+    def set(self, text: str, deployment: str, vector: Sequence[float]) -> np.ndarray:
+        key = make_embedding_key(text, deployment)
+        array = np.asarray(vector, dtype=np.float32)
+        array.flags.writeable = False
+        self._memory.set(key, array)
+        if self._conn is not None:
+            with self._lock, self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO embedding_cache (key, vector, expires_at)"
+                    " VALUES (?, ?, ?)",
+                    (key, array.tobytes(), time.time() + self.ttl_s),
+                )
+        return array
+
+    def clear(self) -> None:
+        self._memory.clear()
+        if self._conn is not None:
+            with self._lock, self._conn:
+                self._conn.execute("DELETE FROM embedding_cache")
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._memory.stats(), "disk_hits": self.disk_hits}
+
+
+def build_embedding_cache() -> Optional[EmbeddingCache]:
+    """
+    Builds the cache from env: EMBED_CACHE_MAX_ENTRIES, EMBED_CACHE_TTL_S
+    (0 disables) and EMBED_CACHE_PATH (enables the SQLite tier).
+    """
+    ttl_s = float(os.getenv("EMBED_CACHE_TTL_S", "86400"))
+    max_entries = int(os.getenv("EMBED_CACHE_MAX_ENTRIES", "4096"))
+    if ttl_s <= 0 or max_entries <= 0:
+        return None
+    path = os.getenv("EMBED_CACHE_PATH") or None
+    try:
+        return EmbeddingCache(max_entries=max_entries, ttl_s=ttl_s, persist_path=path)
+    except Exception as e:
+        logger.warning(f"Embedding cache tier unavailable ({e}); using memory only.")
+        return EmbeddingCache(max_entries=max_entries, ttl_s=ttl_s)
+
+
+_SHARED_CACHE: Optional[EmbeddingCache] = None
+_SHARED_READY = False
+_SHARED_LOCK = threading.Lock()
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """
+    Process-wide cache shared by every embeddings client (None when disabled).
+    """
+    global _SHARED_CACHE, _SHARED_READY
+    if not _SHARED_READY:
+        with _SHARED_LOCK:
+            if not _SHARED_READY:
+                _SHARED_CACHE = build_embedding_cache()
+                _SHARED_READY = True
+    return _SHARED_CACHE
+
+
+def reset_embedding_cache() -> None:
+    """
+    Forgets the shared cache so the next call re-reads the env (tests).
+    """
+    global _SHARED_CACHE, _SHARED_READY
+    with _SHARED_LOCK:
+        _SHARED_CACHE = None
+        _SHARED_READY = False
@@ -0,0 +1,188 @@
+import copy
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from shipment_qna_bot.logging.logger import logger
+from shipment_qna_bot.utils.ttl_cache import TTLCache
+
+_WS_RE = re.compile(r"\s+")
+
+
+def make_cache_key(
+    messages: List[Dict[str, Any]],
+    model: str,
+    temperature: float,
+    max_tokens: int,
+    response_format: Optional[Dict[str, Any]] = None,
+) -> str:
+    """
+    Hashes the normalized prompt and every request parameter that changes
+    the output (a structured-output call must not get a plain-text reply).
+    Whitespace runs are collapsed so cosmetic differences in prompt
+    templates or user input map to the same entry.
+    """
+    normalized = [
+        {
+            "role": str(m.get("role", "")),
+            "content": _WS_RE.sub(" ", str(m.get("content") or "")).strip(),
+        }
+        for m in messages
+    ]
+    payload = json.dumps(
+        {
+            "messages": normalized,
+            "model": model,
+            "temperature": round(float(temperature), 4),
+            "max_tokens": int(max_tokens),
+            "response_format": response_format,
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class MemoryLLMCache:
+    """
+    Process-local backend on top of `TTLCache`.
+    """
+
+    def __init__(self, max_entries: int = 2048, ttl_s: float = 900.0):
+        self._cache: TTLCache[Dict[str, Any]] = TTLCache(
+            max_entries=max_entries, ttl_s=ttl_s
+        )
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        value = self._cache.get(key)
+        return copy.deepcopy(value) if value is not None else None
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        self._cache.set(key, copy.deepcopy(value))
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+
+class SQLiteLLMCache:
+    """
+    Local SQLite backend so cached responses survive restarts and are shared
+    by workers on the same host.
+    """
+
+    def __init__(self, path: str, max_entries: int = 20000, ttl_s: float = 900.0):
+        self.path = path
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_s = float(ttl_s)
+        self._lock = threading.Lock()
+        parent = os.path.dirname(path)
+        if parent and not os.path.exists(parent):
+            os.makedirs(parent, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5.0)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " expires_at REAL NOT NULL,"
+                " last_access REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_llm_cache_access"
+                " ON llm_cache(last_access)"
+            )
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] <= now:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                return None
+            self._conn.execute(
+                "UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key)
+            )
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, expires_at, last_access)"
+                " VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now + self.ttl_s, now),
+            )
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM llm_cache WHERE key IN ("
+                    " SELECT key FROM llm_cache ORDER BY last_access ASC LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+
+    def clear(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM llm_cache")
+
+
+def build_llm_cache() -> Optional[Any]:
+    """
+    Builds the response cache from env:
+    LLM_CACHE_BACKEND=memory|sqlite|off, LLM_CACHE_TTL_S, LLM_CACHE_MAX_ENTRIES,
+    LLM_CACHE_PATH (sqlite only).
+    """
+    backend = os.getenv("LLM_CACHE_BACKEND", "memory").strip().lower()
+    ttl_s = float(os.getenv("LLM_CACHE_TTL_S", "900"))
+    max_entries = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "2048"))
+
+    if backend in {"off", "none", "disabled", ""} or ttl_s <= 0:
+        return None
+    if backend == "sqlite":
+        path = os.getenv(
+            "LLM_CACHE_PATH", os.path.join("data_cache", "llm_cache.sqlite")
+        )
+        try:
+            return SQLiteLLMCache(path, max_entries=max_entries, ttl_s=ttl_s)
+        except Exception as e:
+            logger.warning(f"SQLite LLM cache unavailable ({e}); using memory cache.")
+    elif backend != "memory":
+        logger.warning(f"Unknown LLM_CACHE_BACKEND={backend!r}; using memory cache.")
+    return MemoryLLMCache(max_entries=max_entries, ttl_s=ttl_s)
+
+
+_SHARED_CACHE: Optional[Any] = None
+_SHARED_READY = False
+_SHARED_LOCK = threading.Lock()
+
+
+def get_llm_cache() -> Optional[Any]:
+    """
+    Process-wide cache shared by every chat tool instance (None when disabled).
+    """
+    global _SHARED_CACHE, _SHARED_READY
+    if not _SHARED_READY:
+        with _SHARED_LOCK:
+            if not _SHARED_READY:
+                _SHARED_CACHE = build_llm_cache()
+                _SHARED_READY = True
+    return _SHARED_CACHE
+
+
+def reset_llm_cache() -> None:
+    """
+    Forgets the shared cache so the next call re-reads the env (tests).
+    """
+    global _SHARED_CACHE, _SHARED_READY
+    with _SHARED_LOCK:
+        _SHARED_CACHE = None
+        _SHARED_READY = False
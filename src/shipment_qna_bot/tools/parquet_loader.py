@@ -0,0 +1,118 @@
+import os
+from typing import List, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from shipment_qna_bot.logging.logger import logger
+
+# Columns added by `rewrite_sorted_by_consignee`.
+CODE_COLUMN = "consignee_code"
+ROW_ID_COLUMN = "_row_id"
+
+DEFAULT_ROW_GROUP_SIZE = int(os.getenv("ANALYTICS_ROW_GROUP_SIZE", "50000"))
+
+
+def read_schema_columns(path: str) -> List[str]:
+    """
+    Returns the user-facing column names of a parquet file without reading data.
+    """
+    names = pq.read_schema(path).names
+    return [n for n in names if n not in (CODE_COLUMN, ROW_ID_COLUMN)]
+
+
+def rewrite_sorted_by_consignee(
+    src_path: str,
+    dest_path: str,
+    list_column: str = "consignee_codes",
+    row_group_size: int = DEFAULT_ROW_GROUP_SIZE,
+) -> bool:
+    """
+    Rewrites the master parquet so a consignee filter can skip row groups.
+
+    Each row is repeated once per code in `list_column` with a scalar
+    `consignee_code` and the original `_row_id`, then the table is sorted by
+    code and written in bounded row groups. Row-group min/max statistics on
+    `consignee_code` become tight, which is what lets pushdown skip data.
+
+    Returns False (and writes nothing) when `list_column` is missing.
+    """
+    table = pq.read_table(src_path)
+    if list_column not in table.column_names:
+        logger.warning(
+            f"Column '{list_column}' not found in {src_path}; skipping pushdown rewrite."
+        )
+        return False
+
+    codes = table.column(list_column).combine_chunks()
+    if not pa.types.is_list(codes.type) and not pa.types.is_large_list(codes.type):
+        # Scalar codes: one row per shipment already.
+        parents = pa.array(range(len(table)), type=pa.int64())
+        flat = codes.cast(pa.string())
+    else:
+        parents = pc.list_parent_indices(codes)
+        flat = pc.list_flatten(codes).cast(pa.string())
+
+    table = table.append_column(
+        ROW_ID_COLUMN, pa.array(range(len(table)), type=pa.int64())
+    )
+    exploded = table.take(parents).append_column(CODE_COLUMN, flat)
+    exploded = exploded.filter(pc.is_valid(exploded.column(CODE_COLUMN)))
+    exploded = exploded.sort_by(
+        [(CODE_COLUMN, "ascending"), (ROW_ID_COLUMN, "ascending")]
+    )
+
+    tmp_path = f"{dest_path}.tmp"
+    pq.write_table(
+        exploded,
+        tmp_path,
+        row_group_size=row_group_size,
+        write_statistics=True,
+    )
+    os.replace(tmp_path, dest_path)
+    logger.info(
+        f"Rewrote {src_path} -> {dest_path}: rows={exploded.num_rows} "
+        f"row_groups={pq.ParquetFile(dest_path).num_row_groups}"
+    )
+    return True
+
+
+def load_pushdown(
+    sorted_path: str,
+    consignee_codes: List[str],
+    columns: Optional[List[str]] = None,
+) -> pd.DataFrame:
+    """
+    Reads only the row groups and columns needed for `consignee_codes`
+    from a file produced by `rewrite_sorted_by_consignee`.
+
+    Shipments shared by several requested codes are returned once, in the
+    original file order.
+    """
+    dataset = ds.dataset(sorted_path, format="parquet")
+    schema_names = dataset.schema.names
+
+    if columns is None:
+        wanted = [n for n in schema_names if n != CODE_COLUMN]
+    else:
+        wanted = [c for c in columns if c in schema_names and c != CODE_COLUMN]
+        if ROW_ID_COLUMN not in wanted:
+            wanted.append(ROW_ID_COLUMN)
+
+    table = dataset.to_table(
+        columns=wanted,
+        filter=ds.field(CODE_COLUMN).isin(list(consignee_codes)),
+    )
+
+    df = table.to_pandas()
+    if df.empty:
+        return df.drop(columns=[ROW_ID_COLUMN], errors="ignore")
+
+    # Index by original row position, matching a slice of the full file.
+    df = df.drop_duplicates(subset=[ROW_ID_COLUMN]).sort_values(ROW_ID_COLUMN)
+    df = df.set_index(ROW_ID_COLUMN)
+    df.index.name = None
+    return df
@@ -0,0 +1,146 @@
+# src/shipment_qna_bot/tools/prompt_registry.py
+
+from __future__ import annotations
+
+import os
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+from shipment_qna_bot.logging.logger import logger
+
+# Env overrides for individual reference docs (tests, alternate deployments).
+DOC_PATH_ENV = {
+    "overview_info.md": "SHIPMENT_QNA_BOT_OVERVIEW_PATH",
+    "ready_ref.md": "SHIPMENT_QNA_BOT_READY_REF_PATH",
+}
+
+_DocVersion = Optional[Tuple[int, int]]
+
+
+def find_repo_root(start: Path) -> Path:
+    current = start
+    for _ in range(8):
+        if (current / "pyproject.toml").exists() or (
+            current / "requirements.txt"
+        ).exists():
+            return current
+        if current.parent == current:
+            break
+        current = current.parent
+    return start
+
+
+class PromptRegistry:
+    """
+    Loads the reference docs under docs/ and renders prompt templates once.
+
+    A doc is re-read only when its mtime or size changes, and a rendered
+    prompt is reused until one of the docs it was built from changes. Node
+    templates keep the large static text first so every request shares the
+    same prefix (provider-side prompt caching); per-request values belong
+    after it.
+    """
+
+    def __init__(self, docs_dir: Optional[Path] = None):
+        self.docs_dir = docs_dir
+        self._docs: Dict[str, Tuple[_DocVersion, str]] = {}
+        self._templates: Dict[str, Tuple[Callable[..., str], Tuple[str, ...]]] = {}
+        self._rendered: Dict[str, Tuple[Tuple[_DocVersion, ...], Dict[tuple, str]]] = {}
+        self._lock = threading.Lock()
+        self.doc_reads = 0
+        self.renders = 0
+        self.hits = 0
+
+    def doc_path(self, name: str) -> Path:
+        env_var = DOC_PATH_ENV.get(name)
+        if env_var and os.getenv(env_var):
+            return Path(os.environ[env_var])
+        docs_dir = self.docs_dir or find_repo_root(Path(__file__).resolve()) / "docs"
+        return docs_dir / name
+
+    def _doc_version(self, path: Path) -> _DocVersion:
+        try:
+            stat = path.stat()
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _load_doc(self, name: str) -> Tuple[_DocVersion, str]:
+        path = self.doc_path(name)
+        key = str(path)
+        version = self._doc_version(path)
+        cached = self._docs.get(key)
+        if cached is not None and cached[0] == version:
+            return cached
+        if version is None:
+            logger.warning("%s not found at %s", name, path)
+            text = ""
+        else:
+            try:
+                text = path.read_text(encoding="utf-8")
+                self.doc_reads += 1
+            except Exception as exc:
+                logger.warning("Failed to read %s: %s", name, exc)
+                return (None, "")
+        with self._lock:
+            self._docs[key] = (version, text)
+        return version, text
+
+    def doc(self, name: str) -> str:
+        """
+        Text of docs/<name>, or "" when the file is missing or unreadable.
+        """
+        return self._load_doc(name)[1]
+
+    def register(
+        self, name: str, render: Callable[..., str], docs: Tuple[str, ...] = ()
+    ) -> None:
+        """
+        `render` receives the text of each doc in `docs` positionally, then
+        the keyword params given to `render()`. Params must be hashable.
+        """
+        with self._lock:
+            self._templates[name] = (render, tuple(docs))
+            self._rendered.pop(name, None)
+
+    def render(self, name: str, **params) -> str:
+        render, doc_names = self._templates[name]
+        loaded = [self._load_doc(d) for d in doc_names]
+        versions = tuple(version for version, _ in loaded)
+        key = tuple(sorted(params.items()))
+
+        cached_versions, variants = self._rendered.get(name, ((), {}))
+        if cached_versions == versions and key in variants:
+            self.hits += 1
+            return variants[key]
+
+        text = render(*(t for _, t in loaded), **params)
+        with self._lock:
+            cached_versions, variants = self._rendered.get(name, ((), {}))
+            if cached_versions != versions:
+                variants = {}
+                self._rendered[name] = (versions, variants)
+            variants[key] = text
+            self.renders += 1
+        return text
+
+    def clear(self) -> None:
+        """
+        Drops loaded docs and rendered prompts; registered templates stay.
+        """
+        with self._lock:
+            self._docs.clear()
+            self._rendered.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "templates": len(self._templates),
+            "doc_reads": self.doc_reads,
+            "renders": self.renders,
+            "hits": self.hits,
+        }
+
+
+# Shared by every node; templates are registered at import time.
+PROMPTS = PromptRegistry()
@@ -0,0 +1,175 @@
+import copy
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional
+
+from shipment_qna_bot.utils import metrics
+from shipment_qna_bot.utils.ttl_cache import TTLCache
+
+_WS_RE = re.compile(r"\s+")
+
+# Anchored to the project's data/ directory (as the scripts resolve it) so the
+# ingestion scripts and the API agree on the file whatever their CWD.
+DEFAULT_GENERATION_PATH = os.path.abspath(
+    os.path.join(
+        os.path.dirname(__file__), "..", "..", "..", "data", "index_generation"
+    )
+)
+
+
+def make_retrieval_key(
+    consignee_codes: Iterable[str],
+    query_text: str,
+    extra_filter: Optional[str],
+    top_k: int,
+    skip: Optional[int],
+    order_by: Optional[str],
+    vector_k: int = 30,
+    include_total_count: bool = False,
+) -> str:
+    """
+    Keys on the consignee scope (as a set) plus everything that shapes the
+    search request, so one scope can never be served another's hits.
+    """
+    payload = {
+        "scope": sorted({str(c).strip() for c in consignee_codes if c}),
+        "query_text": _WS_RE.sub(" ", (query_text or "").strip().lower()),
+        "extra_filter": _WS_RE.sub(" ", (extra_filter or "").strip()) or None,
+        "top_k": int(top_k),
+        "skip": skip,
+        "order_by": order_by,
+        "vector_k": int(vector_k),
+        "include_total_count": bool(include_total_count),
+    }
+    blob = json.dumps(payload, sort_keys=True, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def _generation_path() -> str:
+    return os.getenv("RETRIEVAL_CACHE_GENERATION_PATH", DEFAULT_GENERATION_PATH)
+
+
+def bump_index_generation(path: Optional[str] = None) -> None:
+    """
+    Called by ingest_all / reconcile_index when they finish uploading; every
+    RetrievalCache watching the same file drops its entries.
+    """
+    path = path or _generation_path()
+    parent = os.path.dirname(path)
+    if parent:
+        os.makedirs(parent, exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(str(time.time_ns()))
+    os.replace(tmp_path, path)
+
+
+class RetrievalCache:
+    """
+    Short-lived LRU+TTL cache of search responses.
+
+    The TTL bounds staleness against ingestion running elsewhere; when the
+    index generation file changes (checked at most every `check_every_s`)
+    the whole cache is dropped.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_s: float = 300.0,
+        generation_path: Optional[str] = None,
+        check_every_s: float = 1.0,
+    ):
+        self._cache: TTLCache[Dict[str, Any]] = TTLCache(
+            max_entries=max_entries, ttl_s=ttl_s
+        )
+        self.generation_path = generation_path
+        self.check_every_s = check_every_s
+        self._generation = self._read_generation()
+        self._checked_at = time.monotonic()
+        self._lock = threading.Lock()
+        self.invalidations = 0
+
+    def _read_generation(self) -> Optional[int]:
+        if not self.generation_path:
+            return None
+        try:
+            return os.stat(self.generation_path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _check_generation(self) -> None:
+        now = time.monotonic()
+        if not self.generation_path or now - self._checked_at < self.check_every_s:
+            return
+        with self._lock:
+            self._checked_at = now
+            generation = self._read_generation()
+            if generation != self._generation:
+                self._generation = generation
+                self._cache.clear()
+                self.invalidations += 1
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        self._check_generation()
+        value = self._cache.get(key)
+        metrics.increment(
+            "retrieval_cache.miss" if value is None else "retrieval_cache.hit"
+        )
+        return copy.deepcopy(value) if value is not None else None
+
+    def set(self, key: str, response: Dict[str, Any]) -> None:
+        self._cache.set(key, copy.deepcopy(response))
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._cache.stats(), "invalidations": self.invalidations}
+
+
+def build_retrieval_cache() -> Optional[RetrievalCache]:
+    """
+    Builds the cache from env: RETRIEVAL_CACHE_TTL_S (0 disables; keep it
+    below the ingestion cadence), RETRIEVAL_CACHE_MAX_ENTRIES and
+    RETRIEVAL_CACHE_GENERATION_PATH.
+    """
+    ttl_s = float(os.getenv("RETRIEVAL_CACHE_TTL_S", "300"))
+    max_entries = int(os.getenv("RETRIEVAL_CACHE_MAX_ENTRIES", "1024"))
+    if ttl_s <= 0 or max_entries <= 0:
+        return None
+    return RetrievalCache(
+        max_entries=max_entries, ttl_s=ttl_s, generation_path=_generation_path()
+    )
+
+
+_SHARED_CACHE: Optional[RetrievalCache] = None
+_SHARED_READY = False
+_SHARED_LOCK = threading.Lock()
+
+
+def get_retrieval_cache() -> Optional[RetrievalCache]:
+    """
+    Process-wide cache used by the retrieve node (None when disabled).
+    """
+    global _SHARED_CACHE, _SHARED_READY
+    if not _SHARED_READY:
+        with _SHARED_LOCK:
+            if not _SHARED_READY:
+                _SHARED_CACHE = build_retrieval_cache()
+                _SHARED_READY = True
+    return _SHARED_CACHE
+
+
+def reset_retrieval_cache() -> None:
+    """
+    Forgets the shared cache so the next call re-reads the env (tests).
+    """
+    global _SHARED_CACHE, _SHARED_READY
+    with _SHARED_LOCK:
+        _SHARED_CACHE = None
+        _SHARED_READY = False
@@ -0,0 +1,136 @@
+import asyncio
+import os
+import threading
+from typing import Any, Dict, Optional
+
+import aiohttp
+from azure.core.pipeline.transport import AioHttpTransport
+
+from shipment_qna_bot.utils import metrics
+
+
+def _trace_config() -> aiohttp.TraceConfig:
+    trace = aiohttp.TraceConfig()
+
+    async def _created(session, ctx, params):
+        metrics.increment("search.pool.connections_created")
+
+    async def _reused(session, ctx, params):
+        metrics.increment("search.pool.connections_reused")
+
+    async def _queued(session, ctx, params):
+        metrics.increment("search.pool.queued")
+
+    trace.on_connection_create_end.append(_created)
+    trace.on_connection_reuseconn.append(_reused)
+    trace.on_connection_queued_start.append(_queued)
+    return trace
+
+
+def _retire(
+    session: Optional[aiohttp.ClientSession],
+    loop: Optional[asyncio.AbstractEventLoop],
+) -> None:
+    """
+    Closes a session that belongs to another event loop. A loop that is still
+    running closes it itself; once the loop has stopped (asyncio.run returned)
+    nothing can await the close, so the pooled connections are dropped
+    directly.
+    """
+    if session is None or session.closed:
+        return
+    if loop is not None and loop.is_running() and not loop.is_closed():
+        asyncio.run_coroutine_threadsafe(session.close(), loop)
+        return
+    connector = session.connector
+    if connector is not None:
+        connector._close()
+
+
+class PooledSearchTransport:
+    """
+    One keep-alive aiohttp connection pool shared by every async
+    SearchClient in the process. aiohttp sessions are bound to an event
+    loop, so the pool is rebuilt when the running loop changes (tests,
+    scripts calling asyncio.run repeatedly); the server runs on one loop.
+    """
+
+    def __init__(self, limit: int = 32, keepalive_s: float = 30.0):
+        self.limit = limit
+        self.keepalive_s = keepalive_s
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._transport: Optional[AioHttpTransport] = None
+
+    def transport(self) -> AioHttpTransport:
+        loop = asyncio.get_running_loop()
+        if self._transport is None or self._loop is not loop:
+            _retire(self._session, self._loop)
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit,
+                keepalive_timeout=self.keepalive_s,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector, trace_configs=[_trace_config()]
+            )
+            self._transport = AioHttpTransport(
+                session=self._session, session_owner=False
+            )
+            self._loop = loop
+            metrics.increment("search.pool.sessions")
+        return self._transport
+
+    def is_current(self, transport: Any) -> bool:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return False
+        return transport is self._transport and self._loop is loop
+
+    async def aclose(self) -> None:
+        if self._session is not None and self._loop is asyncio.get_running_loop():
+            await self._session.close()
+        else:
+            _retire(self._session, self._loop)
+        self._session = None
+        self._transport = None
+        self._loop = None
+
+    def stats(self) -> Dict[str, Any]:
+        counters = metrics.snapshot("search.pool.")
+        return {
+            "limit": self.limit,
+            "sessions": counters.get("search.pool.sessions", 0),
+            "connections_created": counters.get("search.pool.connections_created", 0),
+            "connections_reused": counters.get("search.pool.connections_reused", 0),
+            "queued": counters.get("search.pool.queued", 0),
+        }
+
+
+_SHARED_TRANSPORT: Optional[PooledSearchTransport] = None
+_SHARED_LOCK = threading.Lock()
+
+
+def get_search_transport() -> PooledSearchTransport:
+    """
+    Process-wide pool sized by AZURE_SEARCH_POOL_SIZE.
+    """
+    global _SHARED_TRANSPORT
+    if _SHARED_TRANSPORT is None:
+        with _SHARED_LOCK:
+            if _SHARED_TRANSPORT is None:
+                _SHARED_TRANSPORT = PooledSearchTransport(
+                    limit=int(os.getenv("AZURE_SEARCH_POOL_SIZE", "32")),
+                    keepalive_s=float(os.getenv("AZURE_SEARCH_KEEPALIVE_S", "30")),
+                )
+    return _SHARED_TRANSPORT
+
+
+def reset_search_transport() -> None:
+    """
+    Forgets the shared pool so the next call re-reads the env (tests).
+    """
+    global _SHARED_TRANSPORT
+    with _SHARED_LOCK:
+        _SHARED_TRANSPORT = None
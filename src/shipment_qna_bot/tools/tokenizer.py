@@ -0,0 +1,89 @@
+# src/shipment_qna_bot/tools/tokenizer.py
+
+from __future__ import annotations
+
+import os
+import threading
+from typing import Any, Dict, Optional, Set
+
+from shipment_qna_bot.logging.logger import logger
+from shipment_qna_bot.tools.azure_openai_embeddings import estimate_tokens
+
+DEFAULT_ENCODING = "o200k_base"
+
+
+_ENCODINGS: Dict[str, Optional[Any]] = {}
+_LOADING: Set[str] = set()
+_LOCK = threading.Lock()
+
+
+def _encoding_name() -> str:
+    return os.getenv("ANSWER_TOKENIZER_ENCODING", DEFAULT_ENCODING)
+
+
+def _load(name: str) -> Optional[Any]:
+    try:
+        import tiktoken
+
+        encoding = tiktoken.get_encoding(name)
+    except Exception as exc:
+        # tiktoken fetches encodings on first use; offline hosts fall back.
+        logger.warning(
+            "Tokenizer %s unavailable (%s); using the character estimate", name, exc
+        )
+        encoding = None
+    with _LOCK:
+        _ENCODINGS[name] = encoding
+        _LOADING.discard(name)
+    return encoding
+
+
+def load_encoding(name: Optional[str] = None) -> Optional[Any]:
+    """
+    Loads the encoding, downloading its BPE file if tiktoken has not cached
+    it yet (no timeout). Run at startup (API lifespan, benchmarks), never on
+    the request path.
+    """
+    name = name or _encoding_name()
+    with _LOCK:
+        if name in _ENCODINGS:
+            return _ENCODINGS[name]
+        _LOADING.add(name)
+    return _load(name)
+
+
+def get_encoding() -> Optional[Any]:
+    """
+    The loaded encoding, or None while it is not available. Requests never
+    wait for a download: if startup did not load it, the first call starts
+    loading it in the background and callers use the estimate meanwhile.
+    """
+    name = _encoding_name()
+    with _LOCK:
+        if name in _ENCODINGS:
+            return _ENCODINGS[name]
+        if name in _LOADING:
+            return None
+        _LOADING.add(name)
+    threading.Thread(
+        target=_load, args=(name,), name="tokenizer-load", daemon=True
+    ).start()
+    return None
+
+
+def tokenizer_name() -> str:
+    encoding = get_encoding()
+    return encoding.name if encoding is not None else "estimate"
+
+
+def count_tokens(text: str) -> int:
+    """
+    Token count under the chat model's encoding, or the conservative
+    character estimate when the encoding cannot be loaded.
+    """
+    if not text:
+        return 0
+    encoding = get_encoding()
+    if encoding is None:
+        return estimate_tokens(text)
+    return len(encoding.encode(text, disallowed_special=()))
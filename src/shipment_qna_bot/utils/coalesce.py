@@ -0,0 +1,69 @@
+import asyncio
+import copy
+import functools
+from typing import (Any, Awaitable, Callable, Dict, Generic, Optional, Tuple,
+                    TypeVar)
+
+from shipment_qna_bot.utils import metrics
+
+T = TypeVar("T")
+
+
+class InFlightCoalescer(Generic[T]):
+    """
+    Collapses concurrent async calls with the same key into one: the first
+    caller starts `factory` as a task, callers arriving while it is in flight
+    await the same result (deep-copied, so they can mutate it). Cancelling
+    any caller, the first included, leaves the call running for the others. Nothing is kept once
+    the call completes. Keys are scoped to the running event loop.
+
+    `metric` names a counter (utils.metrics) bumped for every joined call.
+    """
+
+    def __init__(self, metric: Optional[str] = None) -> None:
+        self.metric = metric
+        self._inflight: Dict[Tuple[int, str], "asyncio.Future[T]"] = {}
+        self._joined: Dict["asyncio.Future[T]", int] = {}
+        self.leaders = 0
+        self.followers = 0
+
+    async def run(self, key: str, factory: Callable[[], Awaitable[T]]) -> T:
+        slot = (id(asyncio.get_running_loop()), key)
+        task = self._inflight.get(slot)
+        if task is not None:
+            self.followers += 1
+            if self.metric:
+                metrics.increment(self.metric)
+            self._joined[task] = self._joined.get(task, 0) + 1
+            return copy.deepcopy(await asyncio.shield(task))
+
+        # The backend call runs as its own task, so a leader that is
+        # cancelled (client disconnect) does not cancel its followers.
+        task = asyncio.ensure_future(factory())
+        self._inflight[slot] = task
+        self.leaders += 1
+        task.add_done_callback(functools.partial(self._release, slot))
+        try:
+            result = await asyncio.shield(task)
+        finally:
+            joined = self._joined.pop(task, 0)
+        # Followers copy the result once they resume; hand the leader its own
+        # copy so mutating it cannot race with theirs.
+        return copy.deepcopy(result) if joined else result
+
+    def _release(self, slot: Tuple[int, str], task: "asyncio.Future[T]") -> None:
+        if self._inflight.get(slot) is task:
+            del self._inflight[slot]
+        # Mark a failure retrieved for the case where every caller went away.
+        if not task.cancelled():
+            task.exception()
+
+    def in_flight(self) -> int:
+        return len(self._inflight)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "leaders": self.leaders,
+            "followers": self.followers,
+            "in_flight": self.in_flight(),
+        }
@@ -0,0 +1,41 @@
+import threading
+from typing import Dict, Iterable
+
+_COUNTERS: Dict[str, int] = {}
+_LOCK = threading.Lock()
+
+
+def increment(name: str, value: int = 1) -> None:
+    """
+    Adds `value` to a process-wide counter.
+    """
+    with _LOCK:
+        _COUNTERS[name] = _COUNTERS.get(name, 0) + value
+
+
+def get_counter(name: str) -> int:
+    with _LOCK:
+        return _COUNTERS.get(name, 0)
+
+
+def snapshot(prefix: str = "") -> Dict[str, int]:
+    """
+    Copy of the counters whose name starts with `prefix`.
+    """
+    with _LOCK:
+        return {k: v for k, v in _COUNTERS.items() if k.startswith(prefix)}
+
+
+def ratio(numerator: str, denominators: Iterable[str]) -> float:
+    """
+    numerator / sum(denominators), or 0.0 before anything was counted.
+    """
+    with _LOCK:
+        total = sum(_COUNTERS.get(name, 0) for name in denominators)
+        return _COUNTERS.get(numerator, 0) / total if total else 0.0
+
+
+def reset(prefix: str = "") -> None:
+    with _LOCK:
+        for name in [k for k in _COUNTERS if k.startswith(prefix)]:
+            del _COUNTERS[name]
@@ -0,0 +1,132 @@
+# tests/benchmark_analytics_load.py
+"""
+Load time and peak RSS for the analytics data loaders on a synthetic master file.
+
+Building the file and each strategy run in fresh subprocesses (ru_maxrss survives
+fork/exec, so the parent must stay small) so peak RSS reflects that strategy only:
+  full      - the previous path: read everything, explode, isin, cast
+  resident  - first request on an empty process (decode + index + slice)
+  pushdown  - consignee-sorted copy, row-group pushdown and column projection
+
+Usage:
+    python tests/benchmark_analytics_load.py [n_rows] [n_consignees]
+"""
+
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+os.environ.setdefault("SHIPMENT_QNA_BOT_TEST_MODE", "1")
+
+TARGET_CODE = "0000007"
+PROJECTION = ["container_number", "shipment_status", "eta_dp_date", "cargo_weight_kg"]
+
+
+def build_master(path: str, n_rows: int, n_consignees: int) -> None:
+    rng = np.random.default_rng(7)
+    codes = rng.integers(0, n_consignees, n_rows)
+    statuses = np.array(
+        ["DELIVERED", "IN_OCEAN", "AT_DISCHARGE_PORT", "EMPTY_RETURNED"]
+    )
+    ports = np.array(["Los Angeles", "Long Beach", "Savannah", "Rotterdam", "Houston"])
+    eta = pd.Timestamp("2025-01-01") + pd.to_timedelta(
+        rng.integers(0, 365, n_rows), unit="D"
+    )
+    df = pd.DataFrame(
+        {
+            "container_number": [f"CONT{i:07d}" for i in range(n_rows)],
+            "consignee_codes": [[f"{c:07d}"] for c in codes],
+            "po_numbers": [[f"PO{i:08d}"] for i in range(n_rows)],
+            "shipment_status": statuses[rng.integers(0, len(statuses), n_rows)],
+            "discharge_port": ports[rng.integers(0, len(ports), n_rows)],
+            "final_destination": ports[rng.integers(0, len(ports), n_rows)],
+            "eta_dp_date": eta.astype(str),
+            "eta_fd_date": (eta + pd.Timedelta(days=7)).astype(str),
+            "cargo_weight_kg": rng.random(n_rows) * 20000,
+            "cargo_measure_cubic_meter": rng.random(n_rows) * 60,
+            "dp_delayed_dur": rng.integers(0, 20, n_rows).astype(float),
+            "combined_content": ["lorem ipsum " * 20] * n_rows,
+        }
+    )
+    df.to_parquet(path)
+
+
+def _run_strategy(strategy: str, cache_dir: str) -> dict:
+    from shipment_qna_bot.tools.blob_manager import BlobAnalyticsManager, _cast_types
+
+    mgr = BlobAnalyticsManager(cache_dir=cache_dir)
+    t0 = time.perf_counter()
+    if strategy == "full":
+        df = pd.read_parquet(mgr.download_master_data())
+        exploded = df.explode("consignee_codes")
+        idx = exploded[exploded["consignee_codes"].isin([TARGET_CODE])].index.unique()
+        out = _cast_types(df.loc[idx].copy())
+    else:
+        os.environ["ANALYTICS_LOAD_MODE"] = strategy
+        columns = PROJECTION if strategy == "pushdown" else None
+        out = mgr.load_filtered_data([TARGET_CODE], columns=columns)
+    elapsed_ms = (time.perf_counter() - t0) * 1000.0
+    # ru_maxrss is KiB on Linux, bytes on macOS.
+    scale = 1 if sys.platform == "darwin" else 1024
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 1e6
+    return {"rows": len(out), "ms": elapsed_ms, "peak_rss_mb": peak_mb}
+
+
+def _build(cache_dir: str, n_rows: int, n_consignees: int) -> dict:
+    from shipment_qna_bot.tools.blob_manager import BlobAnalyticsManager
+
+    mgr = BlobAnalyticsManager(cache_dir=cache_dir)
+    master = mgr._get_cache_path(mgr._get_today_str())
+    build_master(master, n_rows, n_consignees)
+
+    t0 = time.perf_counter()
+    mgr.ensure_sorted_copy(master)
+    return {"rewrite_ms": (time.perf_counter() - t0) * 1000.0}
+
+
+def _child(*args: str) -> dict:
+    out = subprocess.run(
+        [sys.executable, __file__, *args],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        print(json.dumps(_run_strategy(sys.argv[2], sys.argv[3])))
+        return
+    if len(sys.argv) > 1 and sys.argv[1] == "--build":
+        print(json.dumps(_build(sys.argv[2], int(sys.argv[3]), int(sys.argv[4]))))
+        return
+
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    n_consignees = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        print(f"Building synthetic master: rows={n_rows} consignees={n_consignees}")
+        built = _child("--build", cache_dir, str(n_rows), str(n_consignees))
+
+        print("\n--- Summary ---")
+        print(f"Sorted rewrite (once per day): {built['rewrite_ms']:.1f} ms")
+        for strategy in ("full", "resident", "pushdown"):
+            stats = _child("--child", strategy, cache_dir)
+            print(
+                f"{strategy:<9} rows={stats['rows']:<6} "
+                f"load={stats['ms']:8.1f} ms  peak_rss={stats['peak_rss_mb']:7.1f} MB"
+            )
+
+
+if __name__ == "__main__":
+    main()
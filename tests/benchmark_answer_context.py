@@ -0,0 +1,169 @@
+# tests/benchmark_answer_context.py
+"""
+Prompt tokens of the answer step's document context: the previous
+unbounded rendering (every priority field, full content and milestones for
+up to 10 hits, reproduced below) vs the budgeted packer, over a fixture
+corpus of turns with varying hit counts, content length and milestone
+history.
+
+Usage:
+    python tests/benchmark_answer_context.py [turns] [budget]
+"""
+
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from shipment_qna_bot.graph.nodes.answer_context import pack_documents
+from shipment_qna_bot.models.shipment_hit import ShipmentHit
+from shipment_qna_bot.tools.tokenizer import (count_tokens, load_encoding,
+                                              tokenizer_name)
+
+PRIORITY_FIELDS = [
+    "container_number",
+    "shipment_status",
+    "po_numbers",
+    "booking_numbers",
+    "true_carrier_scac_name",
+    "final_carrier_name",
+    "first_vessel_name",
+    "final_vessel_name",
+    "discharge_port",
+    "best_eta_dp_date",
+    "derived_ata_dp_date",
+    "eta_dp_date",
+    "ata_dp_date",
+    "delayed_dp",
+    "dp_delayed_dur",
+    "final_destination",
+    "best_eta_fd_date",
+    "eta_fd_date",
+    "optimal_eta_fd_date",
+    "delayed_fd",
+    "fd_delayed_dur",
+    "cargo_weight_kg",
+    "cargo_measure_cubic_meter",
+    "cargo_count",
+    "cargo_detail_count",
+    "hot_container_flag",
+    "empty_container_return_date",
+]
+
+NOTES = [
+    "Customs hold released after document review.",
+    "Consignee requested priority delivery to the DC.",
+    "Transshipment at Singapore; feeder vessel swapped.",
+    "Chassis shortage reported at the terminal.",
+    "Cargo includes temperature-sensitive goods; reefer plugged in.",
+]
+
+
+def _make_hit(rng: random.Random, i: int) -> ShipmentHit:
+    container = f"TCLU{rng.randint(0, 9999999):07d}"
+    po = str(4500000000 + rng.randint(0, 99999))
+    eta = f"2025-03-{rng.randint(1, 28):02d}T00:00:00"
+    fields = {
+        "doc_id": str(i),
+        "score": rng.random() * 10,
+        "container_number": container,
+        "shipment_status": rng.choice(["IN_OCEAN", "AT_DP", "DELIVERED"]),
+        "po_numbers": [po],
+        "booking_numbers": [f"BK{rng.randint(0, 999999):06d}"],
+        "true_carrier_scac_name": "MAEU",
+        "final_carrier_name": "MAERSK",
+        "first_vessel_name": "MAERSK ESSEN",
+        "final_vessel_name": "MAERSK ESSEN",
+        "discharge_port": "LOS ANGELES",
+        "best_eta_dp_date": eta,
+        "eta_dp_date": eta,
+        "final_destination": "CHICAGO",
+        "best_eta_fd_date": f"2025-04-{rng.randint(1, 28):02d}T00:00:00",
+        "cargo_weight_kg": round(rng.uniform(500, 24000), 1),
+        "cargo_measure_cubic_meter": round(rng.uniform(5, 70), 2),
+        "cargo_count": rng.randint(1, 900),
+        "hot_container_flag": rng.random() < 0.2,
+    }
+    # Content restates the structured fields, sometimes more than once, plus
+    # a few free-text notes.
+    summary = (
+        f"Container {container} for PO {po} is {fields['shipment_status']}. "
+        f"Discharge port LOS ANGELES, ETA {eta[:10]}. Carrier MAERSK."
+    )
+    notes = " ".join(rng.sample(NOTES, rng.randint(0, 3)))
+    fields["content"] = " ".join([summary] * rng.randint(1, 4) + [notes])
+    meta = {
+        "milestones": [
+            {
+                "event": rng.choice(["Gate in", "Loaded", "Departed", "Arrived"]),
+                "location": rng.choice(["SHANGHAI", "SINGAPORE", "LOS ANGELES"]),
+                "date": f"2025-02-{rng.randint(1, 28):02d}T08:00:00",
+            }
+            for _ in range(rng.choice([0, 2, 5, 12, 40]))
+        ]
+    }
+    fields["metadata_json"] = json.dumps(meta)
+    return ShipmentHit.from_raw(fields)
+
+
+def _legacy_context(hits) -> str:
+    out = ""
+    for i, hit in enumerate(hits[:10]):
+        out += f"\n--- Document {i+1} ---\n"
+        for f in PRIORITY_FIELDS:
+            if f in hit:
+                out += f"{f}: {hit[f]}\n"
+        if "content" in hit:
+            out += f"Content: {hit['content']}\n"
+        if "milestones" in hit.metadata:
+            out += f"Milestones: {json.dumps(hit.metadata['milestones'])}\n"
+    return out
+
+
+def _describe(name, values):
+    values = sorted(values)
+    pct = lambda p: values[min(len(values) - 1, int(p * len(values)))]
+    print(
+        f"{name:<9} mean={statistics.mean(values):>7.0f} "
+        f"stdev={statistics.pstdev(values):>6.0f} p50={pct(0.5):>6d} "
+        f"p90={pct(0.9):>6d} p99={pct(0.99):>6d} max={values[-1]:>6d}"
+    )
+
+
+def main():
+    turns = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    budget = int(sys.argv[2]) if len(sys.argv) > 2 else 3000
+    load_encoding()
+    rng = random.Random(22)
+    corpus = [
+        [_make_hit(rng, t * 100 + i) for i in range(rng.choice([1, 3, 5, 10, 10]))]
+        for t in range(turns)
+    ]
+
+    legacy, packed, trimmed = [], [], 0
+    start = time.perf_counter()
+    for hits in corpus:
+        legacy.append(count_tokens(_legacy_context(hits)))
+    legacy_s = time.perf_counter() - start
+    start = time.perf_counter()
+    for hits in corpus:
+        ctx = pack_documents(hits, budget)
+        packed.append(count_tokens(ctx.text))
+        trimmed += bool(ctx.trimmed)
+    packed_s = time.perf_counter() - start
+
+    print(f"{turns} turns, budget {budget}, tokens via {tokenizer_name()}")
+    _describe("previous", legacy)
+    _describe("budgeted", packed)
+    print(
+        f"turns trimmed: {trimmed}/{turns}; build+count "
+        f"{legacy_s / turns * 1000:.2f}ms -> {packed_s / turns * 1000:.2f}ms per turn"
+    )
+
+
+if __name__ == "__main__":
+    main()
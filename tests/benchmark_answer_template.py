@@ -0,0 +1,163 @@
+# tests/benchmark_answer_template.py
+"""
+Answer + judge latency on an ID-lookup workload with templated answers off
+(every turn goes to the LLM) and on (bare lookups are rendered from the
+hits). The chat client is an in-process fake that sleeps for a fixed
+latency, as in benchmark_concurrency.py.
+
+Usage:
+    python tests/benchmark_answer_template.py [turns] [latency_ms]
+"""
+
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+os.environ["SHIPMENT_QNA_BOT_TEST_MODE"] = "0"
+
+from shipment_qna_bot.graph.nodes import answer, judge
+from shipment_qna_bot.models.shipment_hit import ShipmentHit
+from shipment_qna_bot.utils import metrics
+
+LATENCY_S = 0.05
+
+
+class FakeChat:
+    def chat_completion(self, messages, **kwargs):
+        time.sleep(LATENCY_S)
+        if "judge" in str(messages[0].get("content", "")).lower():
+            content = '{"decision": "satisfied", "feedback": null}'
+        else:
+            content = "The shipment is on its way."
+        prompt = sum(len(str(m.get("content", ""))) for m in messages) // 4
+        return {
+            "content": content,
+            "usage": {
+                "prompt_tokens": prompt,
+                "completion_tokens": 10,
+                "total_tokens": prompt + 10,
+            },
+        }
+
+
+def _hits(rng, container, po, n):
+    return [
+        ShipmentHit.from_raw(
+            {
+                "doc_id": f"{container}-{i}",
+                "container_number": (
+                    container if i == 0 else f"MSKU{rng.randint(0, 9999999):07d}"
+                ),
+                "po_numbers": [po],
+                "shipment_status": rng.choice(["IN_OCEAN", "AT_DP", "DELIVERED"]),
+                "discharge_port": "LOS ANGELES",
+                "eta_dp_date": f"2025-03-{rng.randint(1, 28):02d}T00:00:00",
+                "hot_container_flag": rng.random() < 0.2,
+                "content": f"Container {container} for PO {po}.",
+            }
+        )
+        for i in range(n)
+    ]
+
+
+def _workload(turns):
+    rng = random.Random(23)
+    out = []
+    for _ in range(turns):
+        container = f"TCLU{rng.randint(0, 9999999):07d}"
+        po = str(5300000000 + rng.randint(0, 9999999))
+        kind = rng.random()
+        if kind < 0.45:
+            question, ids, n = (
+                rng.choice(
+                    [container, f"where is container {container}", f"eta {container}"]
+                ),
+                {"container_number": [container]},
+                1,
+            )
+        elif kind < 0.8:
+            question, ids, n = (
+                f"status of PO {po}",
+                {"po_numbers": [po]},
+                rng.randint(1, 6),
+            )
+        else:
+            question, ids, n = (
+                f"why is {container} delayed?",
+                {"container_number": [container]},
+                1,
+            )
+        out.append((question, ids, _hits(rng, container, po, n)))
+    return out
+
+
+def _run(workload, templated):
+    os.environ["ANSWER_TEMPLATED"] = "1" if templated else "0"
+    metrics.reset("answer.")
+    latencies = []
+    for question, ids, hits in workload:
+        state = {
+            "question_raw": question,
+            "intent": "retrieval",
+            "extracted_ids": ids,
+            "hits": list(hits),
+            "messages": [],
+            "today_date": "2025-03-10",
+        }
+        start = time.perf_counter()
+        answer.answer_node(state)
+        judge.judge_node(state)
+        latencies.append(time.perf_counter() - start)
+    return sorted(latencies), metrics.snapshot("answer.")
+
+
+def _pct(values, p):
+    return values[min(len(values) - 1, int(p * len(values)))] * 1000
+
+
+def main():
+    global LATENCY_S
+    turns = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    if len(sys.argv) > 2:
+        LATENCY_S = float(sys.argv[2]) / 1000
+    answer._chat_tool = FakeChat()
+    judge._CHAT_TOOL = FakeChat()
+    workload = _workload(turns)
+
+    print(f"{turns} turns, fake LLM latency {LATENCY_S * 1000:.0f}ms")
+    print(f"{'mode':<10} {'p50':>9} {'p95':>9} {'mean':>9}  routing")
+    for label, templated in (("llm", False), ("templated", True)):
+        latencies, counters = _run(workload, templated)
+        print(
+            f"{label:<10} {_pct(latencies, 0.5):>7.2f}ms {_pct(latencies, 0.95):>7.2f}ms "
+            f"{statistics.mean(latencies) * 1000:>7.2f}ms  {counters}"
+        )
+
+    # The templated step alone, without any LLM on the path.
+    os.environ["ANSWER_TEMPLATED"] = "1"
+    lookups = [w for w in workload if not w[0].startswith("why")]
+    timings = []
+    for question, ids, hits in lookups:
+        state = {
+            "question_raw": question,
+            "intent": "retrieval",
+            "extracted_ids": ids,
+            "hits": list(hits),
+            "messages": [],
+        }
+        start = time.perf_counter()
+        answer.answer_node(state)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    print(
+        f"templated answer_node alone: p50 {_pct(timings, 0.5) * 1000:.0f}us, "
+        f"p95 {_pct(timings, 0.95) * 1000:.0f}us"
+    )
+
+
+if __name__ == "__main__":
+    main()
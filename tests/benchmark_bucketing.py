@@ -0,0 +1,92 @@
+# tests/benchmark_bucketing.py
+"""
+Arrival-bucket chart cost: the previous windows x categories x hits scan
+(reproduced below) vs sorting once and counting windows with searchsorted.
+
+Usage:
+    python tests/benchmark_bucketing.py [reps]
+"""
+
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from shipment_qna_bot.graph.nodes.answer import _bucket_counts
+from shipment_qna_bot.models.shipment_hit import DP_ARRIVAL_FIELDS, ShipmentHit
+
+NOW = datetime(2025, 3, 10, 9, 0, tzinfo=timezone.utc)
+QUESTION = "hot vs normal arrivals by week"
+WINDOWS = [("today", 1), ("this_week", 7), ("this_fortnight", 14), ("this_month", 30)]
+
+
+def _make_hits(n: int):
+    rng = random.Random(4)
+    hits = []
+    for i in range(n):
+        eta = NOW + timedelta(hours=rng.randint(-72, 24 * 45))
+        meta = {
+            "eta_dp_date": eta.isoformat(),
+            "hot_container_flag": rng.random() < 0.3,
+        }
+        hits.append(
+            ShipmentHit.from_raw({"doc_id": str(i), "metadata_json": json.dumps(meta)})
+        )
+    return hits
+
+
+def _scan_bucket_counts(hits, now):
+    rows, chart_rows = [], []
+    categories = ["hot", "normal"]
+    for label, days in WINDOWS:
+        bucket_end = now + timedelta(days=days)
+        for category in categories:
+            count = 0
+            for h in hits:
+                dt = h.first_date(*DP_ARRIVAL_FIELDS)
+                if not dt or not (now <= dt < bucket_end):
+                    continue
+                if (category == "hot") != h.hot:
+                    continue
+                count += 1
+            chart_rows.append({"bucket": label, "category": category, "count": count})
+        totals = {"bucket": label}
+        for category in categories:
+            totals[f"{category}_count"] = next(
+                r["count"]
+                for r in chart_rows
+                if r["bucket"] == label and r["category"] == category
+            )
+        totals["total_count"] = sum(
+            r["count"] for r in chart_rows if r["bucket"] == label
+        )
+        rows.append(totals)
+    return {"rows": rows, "chart_rows": chart_rows, "categories": categories}
+
+
+def _time(fn, reps):
+    start = time.perf_counter()
+    for _ in range(reps):
+        fn()
+    return (time.perf_counter() - start) / reps
+
+
+def main():
+    reps = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    print(f"{'hits':>6} {'scan':>10} {'sorted':>10} {'speedup':>8}")
+    for n in (100, 1000, 10000):
+        hits = _make_hits(n)
+        assert _scan_bucket_counts(hits, NOW) == _bucket_counts(hits, QUESTION, NOW)
+        scan = _time(lambda: _scan_bucket_counts(hits, NOW), reps)
+        fast = _time(lambda: _bucket_counts(hits, QUESTION, NOW), reps)
+        print(
+            f"{n:>6} {scan * 1000:>8.2f}ms {fast * 1000:>8.2f}ms {scan / fast:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
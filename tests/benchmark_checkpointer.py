@@ -0,0 +1,102 @@
+# tests/benchmark_checkpointer.py
+"""
+Process memory and per-turn latency of the conversation checkpointer under
+long-running load: MemorySaver (previous default) vs SQLiteCheckpointSaver.
+
+A one-node graph with the real message reducer returns ten ~1KB
+ShipmentHit records per turn, like a retrieval answer. Conversations are
+spread over a pool of thread ids, and memory is sampled with tracemalloc
+after each batch.
+
+Usage:
+    python tests/benchmark_checkpointer.py [turns] [threads]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Annotated, List, TypedDict
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from langgraph.graph import END, StateGraph
+from langgraph.graph.message import add_messages
+
+from shipment_qna_bot.graph.checkpointer import SQLiteCheckpointSaver
+from shipment_qna_bot.models.shipment_hit import ShipmentHit
+
+
+class State(TypedDict):
+    messages: Annotated[List[BaseMessage], add_messages]
+    hits: list
+
+
+def _answer(state):
+    question = state["messages"][-1].content
+    hits = [
+        ShipmentHit.from_raw(
+            {
+                "doc_id": f"{question}-{i}",
+                "container_number": f"TCLU{i:07d}",
+                "content": "shipment summary " * 60,
+            }
+        )
+        for i in range(10)
+    ]
+    return {"messages": [AIMessage(content="answer " * 40)], "hits": hits}
+
+
+def _graph(saver):
+    workflow = StateGraph(State)
+    workflow.add_node("answer", _answer)
+    workflow.set_entry_point("answer")
+    workflow.add_edge("answer", END)
+    return workflow.compile(checkpointer=saver)
+
+
+def _run(label, saver, turns, threads, path=None):
+    graph = _graph(saver)
+    rng = random.Random(24)
+    tracemalloc.start()
+    samples, latencies = [], []
+    batch = max(1, turns // 5)
+    for turn in range(1, turns + 1):
+        config = {"configurable": {"thread_id": f"conv-{rng.randrange(threads)}"}}
+        start = time.perf_counter()
+        graph.invoke({"messages": [HumanMessage(content=f"q{turn}")]}, config=config)
+        latencies.append(time.perf_counter() - start)
+        if turn % batch == 0:
+            samples.append(tracemalloc.get_traced_memory()[0] / 2**20)
+    tracemalloc.stop()
+    latencies.sort()
+    size = f"  db={os.path.getsize(path) / 2**20:.1f}MB" if path else ""
+    print(
+        f"{label:<7} heap MB by fifth: "
+        + " ".join(f"{m:6.1f}" for m in samples)
+        + f"  p50={latencies[len(latencies) // 2] * 1000:.2f}ms"
+        + f" p95={latencies[int(len(latencies) * 0.95)] * 1000:.2f}ms{size}"
+    )
+
+
+def main():
+    turns = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    serde = JsonPlusSerializer(
+        allowed_msgpack_modules=[(ShipmentHit.__module__, ShipmentHit.__name__)]
+    )
+    print(f"{turns} turns over {threads} conversations")
+    _run("memory", MemorySaver(serde=serde), turns, threads)
+    path = os.path.join(tempfile.mkdtemp(), "checkpoints.sqlite")
+    saver = SQLiteCheckpointSaver(path, serde=serde, max_turns=20)
+    _run("sqlite", saver, turns, threads, path)
+    print(f"sqlite  {saver.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+# tests/benchmark_concurrency.py
+"""
+Compares sequential `run_graph` calls against concurrent `arun_graph` calls.
+
+Azure clients are replaced by in-process fakes that sleep for a fixed latency,
+so the numbers reflect how the graph overlaps I/O rather than network noise.
+
+Usage:
+    python tests/benchmark_concurrency.py [n_requests] [latency_ms]
+"""
+
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+os.environ["SHIPMENT_QNA_BOT_TEST_MODE"] = "0"
+# Measure overlap, not cache hits on repeated questions.
+os.environ.setdefault("RETRIEVAL_CACHE_TTL_S", "0")
+
+from shipment_qna_bot.graph import builder
+from shipment_qna_bot.graph.nodes import (answer, extractor, intent, judge,
+                                          normalizer, planner, retrieve,
+                                          understand)
+
+LATENCY_S = 0.05
+
+
+def _usage(messages, content):
+    # Roughly 4 characters per token, so prompt size shows up in token cost.
+    prompt = sum(len(str(m.get("content", ""))) for m in messages) // 4
+    completion = max(1, len(content) // 4)
+    return {
+        "prompt_tokens": prompt,
+        "completion_tokens": completion,
+        "total_tokens": prompt + completion,
+    }
+
+
+def _reply_for(messages):
+    system = str(messages[0].get("content", "")).lower()
+    if "query understanding stage" in system:
+        content = json.dumps(
+            {
+                "standalone_question": "what is the eta of container tclu2937251?",
+                "entities": {"container_number": ["TCLU2937251"]},
+                "primary_intent": "retrieval",
+                "intents": ["retrieval", "eta"],
+                "sentiment": "neutral",
+            }
+        )
+    elif "co-references" in system:
+        content = "What is the ETA of container TCLU2937251?"
+    elif "intent classifier" in system:
+        content = json.dumps(
+            {
+                "primary_intent": "retrieval",
+                "intents": ["status"],
+                "sentiment": "neutral",
+            }
+        )
+    elif "search planner" in system:
+        content = json.dumps({"query_text": "container status", "top_k": 5})
+    elif "judge" in system:
+        content = json.dumps({"decision": "satisfied", "feedback": None})
+    elif "extract" in system:
+        content = "{}"
+    else:
+        content = "Container TCLU2937251 is IN_OCEAN."
+    return {"content": content, "usage": _usage(messages, content), "tool_calls": None}
+
+
+class FakeChat:
+    def chat_completion(self, messages, **kwargs):
+        time.sleep(LATENCY_S)
+        return _reply_for(messages)
+
+    async def achat_completion(self, messages, **kwargs):
+        await asyncio.sleep(LATENCY_S)
+        return _reply_for(messages)
+
+
+class FakeEmbed:
+    def embed_query(self, text):
+        time.sleep(LATENCY_S)
+        return [0.0] * 8
+
+    async def aembed_query(self, text):
+        await asyncio.sleep(LATENCY_S)
+        return [0.0] * 8
+
+
+_HIT = {
+    "document_id": "doc-1",
+    "container_number": "TCLU2937251",
+    "shipment_status": "IN_OCEAN",
+    "po_numbers": ["5302997239"],
+}
+
+
+class FakeSearch:
+    def search(self, **kwargs):
+        time.sleep(LATENCY_S)
+        return {"hits": [dict(_HIT)], "count": 1, "facets": None}
+
+    async def asearch(self, **kwargs):
+        await asyncio.sleep(LATENCY_S)
+        return {"hits": [dict(_HIT)], "count": 1, "facets": None}
+
+
+def _install_fakes():
+    chat = FakeChat()
+    answer._chat_tool = chat
+    extractor._chat_tool = chat
+    intent._chat_tool = chat
+    understand._chat_tool = chat
+    planner._chat_tool = chat
+    normalizer._CHAT_TOOL = chat
+    judge._CHAT_TOOL = chat
+    retrieve._EMBED = FakeEmbed()
+    retrieve._SEARCH = FakeSearch()
+
+
+def _payload(i):
+    return {
+        "conversation_id": f"bench-{i}",
+        "question_raw": "Show me the status for container TCLU2937251",
+        "consignee_codes": ["0000866"],
+    }
+
+
+async def _run_concurrent(n):
+    t0 = time.perf_counter()
+    await asyncio.gather(*(builder.arun_graph(_payload(i)) for i in range(n)))
+    return (time.perf_counter() - t0) * 1000.0
+
+
+def main():
+    global LATENCY_S
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    if len(sys.argv) > 2:
+        LATENCY_S = float(sys.argv[2]) / 1000.0
+
+    _install_fakes()
+
+    timings = []
+    t0 = time.perf_counter()
+    for i in range(n):
+        t1 = time.perf_counter()
+        builder.run_graph(_payload(1000 + i))
+        timings.append((time.perf_counter() - t1) * 1000.0)
+    sequential_ms = (time.perf_counter() - t0) * 1000.0
+
+    concurrent_ms = asyncio.run(_run_concurrent(n))
+
+    print("--- Summary ---")
+    print(f"Requests:          {n}")
+    print(f"Injected latency:  {LATENCY_S * 1000:.0f} ms per Azure call")
+    print(f"Per-request mean:  {statistics.mean(timings):.1f} ms")
+    print(f"Sequential total:  {sequential_ms:.1f} ms")
+    print(f"Concurrent total:  {concurrent_ms:.1f} ms")
+    print(f"Speedup:           {sequential_ms / concurrent_ms:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
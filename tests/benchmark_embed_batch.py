@@ -0,0 +1,160 @@
+# tests/benchmark_embed_batch.py
+"""
+Ingestion embedding throughput (docs/sec): one request per document versus
+`flatten_documents` batching, against a local fake Azure OpenAI embeddings
+endpoint; then batched embed-then-upload in sequence versus the staged
+`ingest_pipeline` with a fake upload that sleeps per batch.
+
+The fake server answers /openai/deployments/{name}/embeddings after a fixed
+round-trip latency plus a small per-input cost, so the numbers reflect
+request count rather than network noise.
+
+Usage:
+    python tests/benchmark_embed_batch.py [n_docs] [latency_ms] [batch_size]
+"""
+
+import contextlib
+import io
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src", "scripts"))
+
+LATENCY_S = 0.05
+PER_INPUT_S = 0.0005
+UPLOAD_LATENCY_S = 0.1
+DIMENSIONS = 8
+
+
+class _FakeEmbeddingsHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        if not self.path.split("?")[0].endswith("/embeddings"):
+            self.send_error(404)
+            return
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        inputs = body["input"]
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        time.sleep(LATENCY_S + PER_INPUT_S * len(inputs))
+        payload = json.dumps(
+            {
+                "object": "list",
+                "model": body.get("model", "fake"),
+                "data": [
+                    {
+                        "object": "embedding",
+                        "index": i,
+                        "embedding": [float(len(text) % 7)] * DIMENSIONS,
+                    }
+                    for i, text in enumerate(inputs)
+                ],
+                "usage": {"prompt_tokens": len(inputs), "total_tokens": len(inputs)},
+            }
+        ).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+def _start_server() -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _FakeEmbeddingsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _docs(n: int):
+    return [
+        {
+            "document_id": f"doc-{i:06d}",
+            "content": f"Container TCLU{i:07d} for PO {4500000000 + i} is IN_OCEAN; "
+            f"ETA 2025-12-{1 + i % 28:02d} at USLAX.",
+            "metadata": {"consignee_codes": ["0000866"]},
+        }
+        for i in range(n)
+    ]
+
+
+def main():
+    global LATENCY_S
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    if len(sys.argv) > 2:
+        LATENCY_S = float(sys.argv[2]) / 1000
+    batch_size = int(sys.argv[3]) if len(sys.argv) > 3 else 64
+
+    server = _start_server()
+    os.environ.update(
+        {
+            "SHIPMENT_QNA_BOT_TEST_MODE": "0",
+            "AZURE_OPENAI_ENDPOINT": f"http://127.0.0.1:{server.server_port}",
+            "AZURE_OPENAI_API_KEY": "fake",
+            "AZURE_OPENAI_API_VERSION": "2024-02-15-preview",
+            "AZURE_OPENAI_EMBED_DEPLOYMENT": "fake-embed",
+            # Every document is new during ingestion; keep the cache out of it.
+            "EMBED_CACHE_TTL_S": "0",
+        }
+    )
+
+    from ingest_pipeline import run_pipeline
+    from reindex_data import flatten_document, flatten_documents
+
+    from shipment_qna_bot.tools.azure_openai_embeddings import \
+        AzureOpenAIEmbeddingsClient
+
+    embedder = AzureOpenAIEmbeddingsClient()
+    docs = _docs(n)
+    print(f"{n} docs, latency={LATENCY_S * 1000:.0f}ms, batch_size={batch_size}")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        single = [flatten_document(d, embedder) for d in docs]
+        single_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        batched, errors = flatten_documents(docs, embedder, batch_size=batch_size)
+        batched_s = time.perf_counter() - start
+
+    assert not errors and len(single) == len(batched) == n
+    assert [d["content_vector"] for d in single] == [
+        d["content_vector"] for d in batched
+    ]
+    print(f"per-document: {single_s:7.2f}s  {n / single_s:8.1f} docs/sec")
+    print(f"batched:      {batched_s:7.2f}s  {n / batched_s:8.1f} docs/sec")
+    print(f"speedup:      {single_s / batched_s:7.1f}x")
+
+    def _embed(batch):
+        return flatten_documents(batch, embedder, batch_size=batch_size, progress=False)
+
+    def _upload(batch):
+        time.sleep(UPLOAD_LATENCY_S)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        for i in range(0, n, batch_size):
+            processed, _ = _embed(docs[i : i + batch_size])
+            _upload(processed)
+        sequential_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        result = run_pipeline(docs, _embed, _upload, batch_size=batch_size)
+        pipelined_s = time.perf_counter() - start
+
+    assert result.uploaded == n
+    print(f"upload latency={UPLOAD_LATENCY_S * 1000:.0f}ms per batch")
+    print(f"sequential:   {sequential_s:7.2f}s  {n / sequential_s:8.1f} docs/sec")
+    print(f"pipelined:    {pipelined_s:7.2f}s  {n / pipelined_s:8.1f} docs/sec")
+    for meter in result.stages.values():
+        print(f"  {meter.describe()}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
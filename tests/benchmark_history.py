@@ -0,0 +1,134 @@
+# tests/benchmark_history.py
+"""
+Co-reference rewrite cost over a long session: the whole history in the
+prompt (previous behaviour), the 20 turns the checkpointer keeps, and the
+sliding window with entity memory and local pronoun resolution.
+
+Each turn runs normalize_node on the state a checkpointed conversation would
+carry (prior messages, previous normalized question and extracted IDs). The
+chat client is an in-process fake that sleeps for a fixed latency, as in
+benchmark_concurrency.py; prompt size is counted with tools/tokenizer.py.
+
+Usage:
+    python tests/benchmark_history.py [turns] [latency_ms]
+"""
+
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+os.environ["SHIPMENT_QNA_BOT_TEST_MODE"] = "0"
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from shipment_qna_bot.graph.nodes import normalizer
+from shipment_qna_bot.graph.nodes.extractor import extract_regex_ids
+from shipment_qna_bot.tools.tokenizer import count_tokens, load_encoding
+from shipment_qna_bot.utils import metrics
+
+LATENCY_S = 0.05
+
+MODES = (
+    ("full", {"NORMALIZER_HISTORY_TURNS": "100000", "NORMALIZER_LOCAL_COREF": "0"}),
+    ("capped20", {"NORMALIZER_HISTORY_TURNS": "20", "NORMALIZER_LOCAL_COREF": "0"}),
+    ("window3", {"NORMALIZER_HISTORY_TURNS": "3", "NORMALIZER_LOCAL_COREF": "1"}),
+)
+
+
+class FakeChat:
+    def __init__(self):
+        self.prompt_tokens = []
+
+    def chat_completion(self, messages, **kwargs):
+        time.sleep(LATENCY_S)
+        prompt = sum(count_tokens(str(m.get("content", ""))) for m in messages)
+        self.prompt_tokens.append(prompt)
+        question = messages[-1]["content"].replace("Follow-up Question: ", "")
+        return {
+            "content": question,
+            "usage": {
+                "prompt_tokens": prompt,
+                "completion_tokens": 20,
+                "total_tokens": prompt + 20,
+            },
+        }
+
+
+def _session(turns):
+    rng = random.Random(25)
+    out = []
+    for _ in range(turns):
+        container = f"TCLU{rng.randint(0, 9999999):07d}"
+        kind = rng.random()
+        if kind < 0.35:
+            out.append(f"where is container {container}?")
+        elif kind < 0.6:
+            out.append(rng.choice(["is it delayed?", "what is its eta?"]))
+        elif kind < 0.8:
+            out.append(rng.choice(["and next week?", "what about the previous one?"]))
+        else:
+            out.append("how many shipments arrive in the next 7 days?")
+    return out
+
+
+def _answer(rng):
+    rows = "\n".join(
+        f"| TCLU{rng.randint(0, 9999999):07d} | LOS ANGELES | 12-Mar-25 | IN_OCEAN |"
+        for _ in range(rng.randint(3, 15))
+    )
+    return "Here is the latest status.\n| container | port | eta | status |\n" + rows
+
+
+def _run(questions, env):
+    os.environ.update(env)
+    chat = FakeChat()
+    normalizer._CHAT_TOOL = chat
+    metrics.reset("normalizer.")
+    rng = random.Random(7)
+    state = {"messages": [], "usage_metadata": {}}
+    latencies = []
+    for question in questions:
+        state["question_raw"] = question
+        state["messages"].append(HumanMessage(content=question))
+        start = time.perf_counter()
+        normalizer.normalize_node(state)
+        latencies.append(time.perf_counter() - start)
+        # What the rest of the turn leaves in the checkpoint.
+        state["extracted_ids"] = extract_regex_ids(state["normalized_question"])
+        state["messages"].append(AIMessage(content=_answer(rng)))
+    return sorted(latencies), chat.prompt_tokens, metrics.snapshot("normalizer.")
+
+
+def _pct(values, p):
+    return values[min(len(values) - 1, int(p * len(values)))]
+
+
+def main():
+    global LATENCY_S
+    turns = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+    if len(sys.argv) > 2:
+        LATENCY_S = float(sys.argv[2]) / 1000
+    questions = _session(turns)
+    load_encoding()
+
+    print(f"{turns}-turn session, fake LLM latency {LATENCY_S * 1000:.0f}ms")
+    print(
+        f"{'mode':<9} {'calls':>5} {'tok p50':>8} {'tok max':>8} {'tok last':>8}"
+        f" {'total tok':>9} {'p50':>8} {'mean':>8}  routing"
+    )
+    for label, env in MODES:
+        latencies, tokens, counters = _run(questions, env)
+        print(
+            f"{label:<9} {len(tokens):>5} {_pct(sorted(tokens), 0.5):>8}"
+            f" {max(tokens):>8} {tokens[-1]:>8} {sum(tokens):>9}"
+            f" {_pct(latencies, 0.5) * 1000:>6.1f}ms"
+            f" {statistics.mean(latencies) * 1000:>6.1f}ms  {counters}"
+        )
+
+
+if __name__ == "__main__":
+    main()
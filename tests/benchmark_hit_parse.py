@@ -0,0 +1,153 @@
+# tests/benchmark_hit_parse.py
+"""
+Per-turn hit handling cost on 100-hit result sets: metadata_json parsed by
+each consumer (the previous access pattern, reproduced below) vs parsed once
+into ShipmentHit records.
+
+A turn covers normalizing the hits, a date-window + delay post-filter, the
+hot/normal bucket chart and the top-10 answer context.
+
+Usage:
+    python tests/benchmark_hit_parse.py [n_hits] [turns]
+"""
+
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from shipment_qna_bot.graph.nodes.answer import _bucket_counts
+from shipment_qna_bot.graph.nodes.retrieve import _post_filter_hits
+from shipment_qna_bot.models.shipment_hit import ShipmentHit
+
+NOW = datetime(2025, 3, 10, tzinfo=timezone.utc)
+POST_FILTER = {
+    "date_window": {"fields": ["eta_dp_date"], "days": 30},
+    "delay": {"field": "dp_delayed_dur", "days": 0},
+}
+QUESTION = "hot vs normal arrivals this month"
+HYDRATED = [
+    "derived_ata_dp_date",
+    "optimal_eta_fd_date",
+    "dp_delayed_dur",
+    "fd_delayed_dur",
+    "delayed_dp",
+    "delayed_fd",
+    "empty_container_return_date",
+    "eta_dp_date",
+    "eta_fd_date",
+    "ata_dp_date",
+    "optimal_ata_dp_date",
+]
+
+
+def _make_hits(n: int):
+    rng = random.Random(3)
+    hits = []
+    for i in range(n):
+        eta = NOW + timedelta(days=rng.randint(-5, 40))
+        meta = {
+            "container_number": f"TCLU{i:07d}",
+            "eta_dp_date": eta.isoformat(),
+            "eta_fd_date": (eta + timedelta(days=6)).isoformat(),
+            "optimal_eta_fd_date": (eta + timedelta(days=7)).isoformat(),
+            "dp_delayed_dur": rng.randint(-3, 9),
+            "fd_delayed_dur": rng.randint(-3, 9),
+            "hot_container_flag": rng.random() < 0.3,
+            "milestones": [
+                {"event": f"event {k}", "date": (eta - timedelta(days=k)).isoformat()}
+                for k in range(12)
+            ],
+        }
+        meta.update({f"attr_{k}": f"value {k} for {i}" for k in range(40)})
+        hits.append(
+            {
+                "doc_id": f"doc-{i}",
+                "container_number": meta["container_number"],
+                "content": "shipment summary " * 20,
+                "metadata_json": json.dumps(meta),
+            }
+        )
+    return hits
+
+
+def _parse_dt(val):
+    if not val:
+        return None
+    try:
+        dt = datetime.fromisoformat(str(val).replace("Z", "+00:00"))
+        return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+    except Exception:
+        return None
+
+
+def _legacy_turn(raw_hits):
+    # The search tool, retrieve hydration, post-filter, bucket chart and
+    # context builder each decoded metadata_json on their own.
+    hits = [dict(h) for h in raw_hits]
+    for h in hits:
+        meta = json.loads(h["metadata_json"])
+        for key in HYDRATED:
+            if key not in h and key in meta:
+                h[key] = meta[key]
+    kept = []
+    for h in hits:
+        meta = json.loads(h["metadata_json"])
+        for key in HYDRATED:
+            if key not in h and key in meta:
+                h[key] = meta[key]
+        meta = json.loads(h["metadata_json"])
+        dt = _parse_dt(h.get("eta_dp_date", meta.get("eta_dp_date")))
+        end = NOW + timedelta(days=30)
+        if dt and NOW <= dt < end and float(h.get("dp_delayed_dur") or 0) >= 0:
+            kept.append(h)
+    for days in (1, 7, 14, 30):
+        for category in ("hot", "normal"):
+            for h in kept:
+                dt = _parse_dt(h.get("eta_dp_date"))
+                if not dt or not (NOW <= dt < NOW + timedelta(days=days)):
+                    continue
+                hot = bool(json.loads(h["metadata_json"]).get("hot_container_flag"))
+                if (category == "hot") != hot:
+                    continue
+    for h in kept[:10]:
+        m = json.loads(h["metadata_json"])
+        json.dumps(m.get("milestones"))
+    return kept
+
+
+def _record_turn(raw_hits):
+    hits = [ShipmentHit.from_raw(h) for h in raw_hits]
+    kept = _post_filter_hits(hits, POST_FILTER, NOW)
+    _bucket_counts(kept, QUESTION, NOW)
+    for h in kept[:10]:
+        json.dumps(h.metadata.get("milestones"))
+    return kept
+
+
+def _time(fn, raw_hits, turns):
+    start = time.perf_counter()
+    for _ in range(turns):
+        fn(raw_hits)
+    return (time.perf_counter() - start) / turns
+
+
+def main():
+    n_hits = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    turns = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    raw_hits = _make_hits(n_hits)
+    assert len(_legacy_turn(raw_hits)) == len(_record_turn(raw_hits))
+
+    print(f"{n_hits} hits per turn, {turns} turns")
+    legacy = _time(_legacy_turn, raw_hits, turns)
+    record = _time(_record_turn, raw_hits, turns)
+    print(f"parse per consumer  {legacy * 1000:7.2f} ms/turn")
+    print(f"ShipmentHit         {record * 1000:7.2f} ms/turn  ({legacy / record:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
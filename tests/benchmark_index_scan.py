@@ -0,0 +1,70 @@
+# tests/benchmark_index_scan.py
+"""
+Index key enumeration for reconcile_index against the fake SearchClient:
+skip paging versus key-ordered range scans with 1 and N partitions.
+
+Each request sleeps a fixed latency; skip paging also pays a cost that grows
+with skip and fails past the service's skip limit, as the real service does.
+
+Usage:
+    python tests/benchmark_index_scan.py [n_keys] [latency_ms] [partitions]
+"""
+
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(__file__))
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src", "scripts"))
+
+from fake_search_client import FakeSearchClient
+from reconcile_index import _fetch_index_ids, _fetch_index_ids_by_skip
+
+SKIP_COST_S = 0.002
+
+
+def _time(label, fn, client, n):
+    client.requests = 0
+    start = time.perf_counter()
+    try:
+        found = len(set(fn()))
+        note = "ok" if found == n else f"found {found}/{n}"
+    except Exception as e:
+        note = f"failed after {client.requests} requests: {str(e)[:60]}"
+    elapsed = time.perf_counter() - start
+    print(f"{label:<22} {elapsed:7.2f}s  {client.requests:5d} requests  {note}")
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    latency_s = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.02
+    partitions = int(sys.argv[3]) if len(sys.argv) > 3 else 8
+
+    keys = [f"{i * 7919 % 1_000_003:07d}-{i}" for i in range(n)]
+    # Local JSONL IDs used for partition cuts: a sample, not the full set.
+    sample = keys[::50]
+    client = FakeSearchClient(keys, latency_s=latency_s, skip_cost_s=SKIP_COST_S)
+    print(f"{n} keys, latency={latency_s * 1000:.0f}ms, partitions={partitions}")
+
+    _time(
+        "skip paging",
+        lambda: _fetch_index_ids_by_skip(client, "document_id", 1000),
+        client,
+        n,
+    )
+    _time(
+        "range scan x1",
+        lambda: _fetch_index_ids(client, "document_id", 1000, sample, 1),
+        client,
+        n,
+    )
+    _time(
+        f"range scan x{partitions}",
+        lambda: _fetch_index_ids(client, "document_id", 1000, sample, partitions),
+        client,
+        n,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# tests/benchmark_ingest_memory.py
+"""
+Peak Python heap (tracemalloc) while hashing a JSONL file for ingestion:
+`load_data` (whole file as a list) versus streaming with `iter_data`, at
+growing sizes. Also times the reconcile hash store: the first refresh hashes
+the file, a rerun with no new files only stats it.
+
+Usage:
+    python tests/benchmark_ingest_memory.py [n_docs ...]
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src", "scripts"))
+
+from hash_store import HashStore
+from ingest_all import compute_doc_hash
+from reindex_data import iter_data, load_data
+
+
+def _write_corpus(path: str, n: int) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(n):
+            doc = {
+                "document_id": f"doc-{i:07d}",
+                "content": f"Container TCLU{i:07d} for PO {4500000000 + i} is "
+                "IN_OCEAN with ETA 2025-12-15 at USLAX. " * 4,
+                "metadata": {
+                    "consignee_codes": ["0000866"],
+                    "container_number": f"TCLU{i:07d}",
+                    "po_numbers": [str(4500000000 + i)],
+                },
+            }
+            f.write(json.dumps(doc) + "\n")
+
+
+def _hash_listed(path: str) -> int:
+    return sum(1 for d in load_data(path) if compute_doc_hash(d))
+
+
+def _hash_streamed(path: str) -> int:
+    return sum(1 for d in iter_data(path) if compute_doc_hash(d))
+
+
+def _peak_mb(fn) -> float:
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1e6
+
+
+def _seconds(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    sizes = [int(a) for a in sys.argv[1:]] or [5_000, 20_000]
+    with tempfile.TemporaryDirectory() as tmp:
+        print(
+            f"{'docs':>8} {'load_data':>11} {'iter_data':>11}"
+            f" {'store scan':>11} {'store rerun':>11}"
+        )
+        for n in sizes:
+            path = os.path.join(tmp, f"corpus_{n}.jsonl")
+            _write_corpus(path, n)
+            listed = _peak_mb(lambda: _hash_listed(path))
+            streamed = _peak_mb(lambda: _hash_streamed(path))
+            store = HashStore(os.path.join(tmp, f"store_{n}.sqlite"))
+            scan_s = _seconds(lambda: store.refresh([path]))
+            rerun_s = _seconds(lambda: store.refresh([path]))
+            store.close()
+            print(
+                f"{n:>8} {listed:>9.1f}MB {streamed:>9.1f}MB"
+                f" {scan_s:>10.2f}s {rerun_s:>10.4f}s"
+            )
+
+
+if __name__ == "__main__":
+    main()
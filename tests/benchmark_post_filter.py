@@ -0,0 +1,92 @@
+# tests/benchmark_post_filter.py
+"""
+Post-filter cost as top_k grows: the previous per-hit loop (reproduced
+below) vs rules compiled once and evaluated over NumPy columns.
+
+Usage:
+    python tests/benchmark_post_filter.py [reps]
+"""
+
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from shipment_qna_bot.graph.nodes.post_filter import compile_post_filter
+from shipment_qna_bot.models.shipment_hit import ShipmentHit
+
+NOW = datetime(2025, 3, 10, 9, 0, tzinfo=timezone.utc)
+POST_FILTER = {
+    "date_window": {"fields": ["ata_dp_date", "eta_dp_date"], "days": 14},
+    "delay": {"field": "dp_delayed_dur", "op": ">", "days": 2},
+}
+
+
+def _make_hits(n: int):
+    rng = random.Random(11)
+    hits = []
+    for i in range(n):
+        eta = NOW + timedelta(days=rng.randint(-10, 40), hours=rng.randint(0, 23))
+        meta = {"eta_dp_date": eta.isoformat(), "dp_delayed_dur": rng.randint(-3, 9)}
+        hits.append(
+            ShipmentHit.from_raw({"doc_id": str(i), "metadata_json": json.dumps(meta)})
+        )
+    return hits
+
+
+def _loop_post_filter(hits, post_filter, now_utc):
+    start_of_today = now_utc.replace(hour=0, minute=0, second=0, microsecond=0)
+    filtered = []
+    for h in hits:
+        ok = True
+        date_window = post_filter.get("date_window")
+        if date_window:
+            fields = date_window.get("fields") or []
+            days = int(date_window.get("days") or 0)
+            dt_val = h.first_date(*fields)
+            if not dt_val:
+                ok = False
+            else:
+                window_end = start_of_today + timedelta(days=days)
+                ok = dt_val >= start_of_today and dt_val < window_end
+        delay_rule = post_filter.get("delay")
+        if ok and delay_rule:
+            val = h.delay(delay_rule.get("field"))
+            threshold = float(delay_rule.get("days") or 0.0)
+            ok = val > threshold if delay_rule.get("op") == ">" else val >= threshold
+        if ok:
+            filtered.append(h)
+    return filtered
+
+
+def _time(fn, reps):
+    start = time.perf_counter()
+    for _ in range(reps):
+        fn()
+    return (time.perf_counter() - start) / reps
+
+
+def main():
+    reps = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    print(f"{'top_k':>6} {'loop':>10} {'compiled':>10} {'speedup':>8}")
+    for top_k in (50, 300, 1000, 5000):
+        hits = _make_hits(top_k)
+        assert _loop_post_filter(hits, POST_FILTER, NOW) == compile_post_filter(
+            POST_FILTER
+        ).apply(hits, NOW)
+        loop = _time(lambda: _loop_post_filter(hits, POST_FILTER, NOW), reps)
+        compiled = _time(
+            lambda: compile_post_filter(POST_FILTER).apply(hits, NOW), reps
+        )
+        print(
+            f"{top_k:>6} {loop * 1e6:>8.0f}us {compiled * 1e6:>8.0f}us "
+            f"{loop / compiled:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
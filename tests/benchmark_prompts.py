@@ -0,0 +1,168 @@
+# tests/benchmark_prompts.py
+"""
+System prompt cost before and after the prompt registry.
+
+1. Build latency: reading docs/ready_ref.md and formatting the answer prompt
+   on every call (the previous code path) vs a registry render.
+2. Cacheable prefix: over a mixed sequence of answer, analytics and judge
+   requests, how many prompt tokens repeat a prefix already sent for the
+   same node. Providers cache prefixes of at least 1024 tokens in 128-token
+   steps, which is how the saving is counted. The previous layouts (ready
+   ref after the per-question labels, schema before the instructions,
+   documents inside the judge system prompt) are rebuilt from the same text.
+
+Token counts use tiktoken's o200k_base when it can be loaded, otherwise
+~4 characters per token.
+
+Usage:
+    python tests/benchmark_prompts.py [calls]
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+os.environ["SHIPMENT_QNA_BOT_TEST_MODE"] = "1"
+
+from shipment_qna_bot.graph.nodes import analytics_planner, answer, judge
+from shipment_qna_bot.tools.prompt_registry import PROMPTS
+
+try:
+    import tiktoken
+
+    _ENC = tiktoken.get_encoding("o200k_base")
+    TOKENIZER = "o200k_base"
+
+    def _tokens(text: str) -> int:
+        return len(_ENC.encode(text))
+
+except Exception:
+    TOKENIZER = "~4 chars/token"
+
+    def _tokens(text: str) -> int:
+        return len(text) // 4
+
+
+MIN_CACHED, CACHE_STEP = 1024, 128
+QUESTIONS = [
+    "when does TCLU2937251 arrive?",
+    "which containers reach the final destination next week?",
+    "show hot containers at discharge port",
+    "is PO 5302997239 delayed at FD?",
+]
+
+
+def _legacy_answer_prompt(question: str) -> str:
+    # Previously the DP/FD column labels sat inline, ahead of the ready ref.
+    head, layout = answer._build_system_prompt(question).split("\n\n## Table Layout\n")
+    return head.replace(
+        'TABLE COLUMNS: as given under "Table Layout" at the end.',
+        f"TABLE COLUMNS: {layout}",
+    )
+
+
+def _legacy_answer_build(question: str) -> str:
+    with open(PROMPTS.doc_path("ready_ref.md"), "r") as f:
+        f.read()
+    return _legacy_answer_prompt(question)
+
+
+def _analytics_tail(rng: random.Random) -> str:
+    consignee = rng.randint(1, 40)
+    sample = "\n".join(
+        f"| TCLU{consignee:03d}{i:04d} | {rng.randint(1, 9)} days | IN_OCEAN |"
+        for i in range(5)
+    )
+    return (
+        "\n\n## Context\nToday's Date: 2026-Oct-18\n\n## Key Column Reference\n"
+        "- `container_number`: Container (Type: str)\n\n## Dataset Schema\n"
+        f"Columns: [...]\nShape: Rows: {rng.randint(50, 5000)}, Columns: 60\n"
+        f"Sample Data:\n{sample}\n"
+    )
+
+
+def _analytics_prompts(rng: random.Random):
+    static = PROMPTS.render("analytics.system")
+    tail = _analytics_tail(rng)
+    intro, rest = static.split("\n\n## Instructions\n")
+    instructions, ready_ref = rest.split("\n\n## Operational Reference (Ready Ref)\n")
+    context, schema = tail.split("\n\n## Dataset Schema\n")
+    legacy = (
+        f"{intro}{context}\n\n## Operational Reference (Ready Ref)\n{ready_ref}"
+        f"\n\n## Dataset Schema\n{schema}\n## Instructions\n{instructions}"
+    )
+    return legacy, static + tail
+
+
+def _judge_prompts(rng: random.Random):
+    docs = "\n".join(f"--- Doc {i} ---\n{{...}}" for i in range(rng.randint(1, 10)))
+    user = judge._JUDGE_INPUT.format(
+        context=docs, question="eta?", today="2026-Oct-18", answer="Arrives 12-Mar."
+    )
+    legacy = f"{docs}\n{judge._JUDGE_PROMPT}"
+    return legacy, judge._JUDGE_PROMPT + user
+
+
+def _cached_tokens(prompt: str, seen: list) -> int:
+    best = max((len(os.path.commonprefix([prompt, p])) for p in seen), default=0)
+    shared = _tokens(prompt[:best])
+    if shared < MIN_CACHED:
+        return 0
+    return shared - (shared - MIN_CACHED) % CACHE_STEP
+
+
+def _prefix_savings(calls: int):
+    rng = random.Random(9)
+    totals = {"legacy": [0, 0], "registry": [0, 0]}
+    seen = {("legacy", n): [] for n in ("answer", "analytics", "judge")}
+    seen.update({("registry", n): [] for n in ("answer", "analytics", "judge")})
+    for _ in range(calls):
+        node = rng.choice(["answer", "answer", "analytics", "judge"])
+        if node == "answer":
+            question = rng.choice(QUESTIONS)
+            pair = (
+                _legacy_answer_prompt(question),
+                answer._build_system_prompt(question),
+            )
+        elif node == "analytics":
+            pair = _analytics_prompts(rng)
+        else:
+            pair = _judge_prompts(rng)
+        for layout, prompt in zip(("legacy", "registry"), pair):
+            totals[layout][0] += _tokens(prompt)
+            totals[layout][1] += _cached_tokens(prompt, seen[(layout, node)])
+            seen[(layout, node)].append(prompt)
+    return totals
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+    reps = 2000
+    start = time.perf_counter()
+    for i in range(reps):
+        _legacy_answer_build(QUESTIONS[i % len(QUESTIONS)])
+    legacy_us = (time.perf_counter() - start) / reps * 1e6
+    start = time.perf_counter()
+    for i in range(reps):
+        answer._build_system_prompt(QUESTIONS[i % len(QUESTIONS)])
+    registry_us = (time.perf_counter() - start) / reps * 1e6
+    print(
+        f"answer system prompt build: read+format {legacy_us:.1f}us, "
+        f"registry {registry_us:.1f}us ({legacy_us / registry_us:.0f}x)"
+    )
+
+    totals = _prefix_savings(calls)
+    print(f"\n{calls} requests, tokens via {TOKENIZER}")
+    for layout, (sent, cached) in totals.items():
+        print(
+            f"{layout:<9} prompt={sent:>8d}  cacheable={cached:>8d} "
+            f"({cached / sent:.0%})  uncached={sent - cached:>8d}"
+        )
+
+
+if __name__ == "__main__":
+    main()
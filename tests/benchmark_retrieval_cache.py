@@ -0,0 +1,112 @@
+# tests/benchmark_retrieval_cache.py
+"""
+Retrieve-node workload with the per-scope retrieval cache off and on.
+
+Turns draw from a skewed set of questions across a few consignee scopes,
+and a share of them are followed by a judge retry with the same plan. The
+search and embedding fakes sleep a fixed latency, so the numbers reflect
+backend calls avoided.
+
+Usage:
+    python tests/benchmark_retrieval_cache.py [n_turns] [retry_share] [latency_ms]
+"""
+
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+os.environ["SHIPMENT_QNA_BOT_TEST_MODE"] = "0"
+
+from shipment_qna_bot.graph.nodes import retrieve
+from shipment_qna_bot.tools import retrieval_cache
+from shipment_qna_bot.utils import metrics
+
+LATENCY_S = 0.08
+SCOPES = [["0000866"], ["0001234"], ["0004321", "0000866"], ["0007777"], ["0009999"]]
+QUESTIONS = [f"status of container tclu{i:07d}" for i in range(30)] + [
+    "hot containers arriving next week",
+    "delayed shipments at uslax",
+    "containers discharged yesterday",
+]
+
+
+class _SleepingSearch:
+    def __init__(self):
+        self.calls = 0
+
+    async def asearch(self, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(LATENCY_S)
+        return {"hits": [{"doc_id": "d1", "content": "x"}], "count": 1, "facets": None}
+
+
+class _SleepingEmbed:
+    async def aembed_query(self, text):
+        await asyncio.sleep(LATENCY_S / 3)
+        return [0.1]
+
+
+def _workload(n_turns: int, retry_share: float):
+    rng = random.Random(7)
+    weights = [1 / (rank + 1) for rank in range(len(QUESTIONS))]
+    turns = []
+    for _ in range(n_turns):
+        scope = rng.choice(SCOPES)
+        question = rng.choices(QUESTIONS, weights=weights)[0]
+        turns.append((scope, question))
+        if rng.random() < retry_share:
+            turns.append((scope, question))
+    return turns
+
+
+async def _run(turns, ttl_s: str):
+    os.environ["RETRIEVAL_CACHE_TTL_S"] = ttl_s
+    retrieval_cache.reset_retrieval_cache()
+    metrics.reset("retrieval_cache.")
+    search = _SleepingSearch()
+    retrieve._SEARCH = search
+    retrieve._EMBED = _SleepingEmbed()
+
+    start = time.perf_counter()
+    for scope, question in turns:
+        await retrieve.aretrieve_node(
+            {
+                "conversation_id": "bench",
+                "consignee_codes": scope,
+                "intent": "retrieval",
+                "normalized_question": question,
+                "retrieval_plan": {"query_text": question, "top_k": 8},
+            }
+        )
+    elapsed = time.perf_counter() - start
+    hit_rate = metrics.ratio(
+        "retrieval_cache.hit", ["retrieval_cache.hit", "retrieval_cache.miss"]
+    )
+    return elapsed, search.calls, hit_rate
+
+
+def main():
+    global LATENCY_S
+    n_turns = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    retry_share = float(sys.argv[2]) if len(sys.argv) > 2 else 0.3
+    if len(sys.argv) > 3:
+        LATENCY_S = float(sys.argv[3]) / 1000
+    turns = _workload(n_turns, retry_share)
+    print(
+        f"{len(turns)} retrievals ({n_turns} turns, {retry_share:.0%} retried), "
+        f"latency={LATENCY_S * 1000:.0f}ms"
+    )
+    for label, ttl_s in (("cache off", "0"), ("cache on", "300")):
+        elapsed, calls, hit_rate = asyncio.run(_run(turns, ttl_s))
+        print(
+            f"{label:<10} backend={calls:4d}  hit_rate={hit_rate:5.1%}  "
+            f"total={elapsed:6.2f}s  per_retrieval={elapsed / len(turns) * 1000:6.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# tests/benchmark_search_pool.py
+"""
+Burst of concurrent retrievals against the local fake search service with
+request coalescing on and off: backend calls, wall time and pool reuse.
+
+N users ask one of K distinct questions at the same moment (the "everyone
+checks the same delayed vessel" case).
+
+Usage:
+    python tests/benchmark_search_pool.py [n_users] [distinct] [latency_ms]
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(__file__))
+
+from fake_search_service import FakeSearchService
+
+from shipment_qna_bot.tools import search_transport
+from shipment_qna_bot.tools.azure_ai_search import (AzureAISearchTool,
+                                                    search_stats)
+from shipment_qna_bot.utils import metrics
+
+
+async def _burst(n_users: int, distinct: int, latency_s: float, coalesce: bool):
+    os.environ["AZURE_SEARCH_COALESCE"] = "true" if coalesce else "false"
+    search_transport.reset_search_transport()
+    metrics.reset("search.")
+    service = FakeSearchService(latency_s=latency_s)
+    os.environ["AZURE_SEARCH_ENDPOINT"] = await service.start()
+    tool = AzureAISearchTool()
+
+    async def _one(i: int) -> float:
+        start = time.perf_counter()
+        await tool.asearch(
+            query_text=f"where is the delayed vessel {i % distinct}",
+            consignee_codes=["0000866"],
+        )
+        return time.perf_counter() - start
+
+    try:
+        start = time.perf_counter()
+        latencies = await asyncio.gather(*[_one(i) for i in range(n_users)])
+        wall = time.perf_counter() - start
+    finally:
+        await search_transport.get_search_transport().aclose()
+        await service.stop()
+    return wall, latencies, service.requests, search_stats()
+
+
+def main():
+    n_users = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    distinct = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    latency_s = float(sys.argv[3]) / 1000 if len(sys.argv) > 3 else 0.08
+    os.environ.update(
+        {
+            "SHIPMENT_QNA_BOT_TEST_MODE": "0",
+            "AZURE_SEARCH_API_KEY": "fake",
+            "AZURE_SEARCH_INDEX_NAME": "shipments",
+        }
+    )
+    pool_size = os.environ.setdefault("AZURE_SEARCH_POOL_SIZE", "32")
+    print(
+        f"{n_users} users, {distinct} distinct questions, "
+        f"latency={latency_s * 1000:.0f}ms, pool={pool_size}"
+    )
+    for coalesce in (False, True):
+        wall, latencies, requests, stats = asyncio.run(
+            _burst(n_users, distinct, latency_s, coalesce)
+        )
+        pool = stats["pool"]
+        print(
+            f"coalesce={'on ' if coalesce else 'off'}  backend={requests:4d}  "
+            f"wall={wall:6.2f}s  p50={statistics.median(latencies) * 1000:6.0f}ms  "
+            f"conns={pool['connections_created']} reused={pool['connections_reused']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
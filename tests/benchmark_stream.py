@@ -0,0 +1,135 @@
+# tests/benchmark_stream.py
+"""
+Time-to-first-byte and time-to-first-token for /api/chat versus
+/api/chat/stream against a local server.
+
+Azure clients are the sleeping fakes from benchmark_concurrency; the answer
+model additionally streams its reply in chunks, so the numbers show how early
+a user sees progress and text rather than network noise.
+
+Usage:
+    python tests/benchmark_stream.py [n_requests] [latency_ms] [chunk_ms]
+"""
+
+import asyncio
+import os
+import socket
+import statistics
+import sys
+import threading
+import time
+
+sys.path.append(os.path.dirname(__file__))
+
+import benchmark_concurrency as bench
+import httpx
+import uvicorn
+
+from shipment_qna_bot.graph.nodes import answer
+
+CHUNK_S = 0.02
+_ANSWER_CHUNKS = ["Container ", "TCLU2937251 ", "is ", "currently ", "IN_OCEAN."]
+
+
+class StreamingFakeChat(bench.FakeChat):
+    async def astream_chat_completion(self, messages, **kwargs):
+        # First chunk after the usual round-trip, then one chunk per CHUNK_S.
+        await asyncio.sleep(bench.LATENCY_S)
+        for i, text in enumerate(_ANSWER_CHUNKS):
+            if i:
+                await asyncio.sleep(CHUNK_S)
+            yield {"delta": text}
+        yield bench._reply_for(messages)
+
+    async def achat_completion(self, messages, **kwargs):
+        result = await super().achat_completion(messages, **kwargs)
+        if "judge" not in str(messages[0].get("content", "")).lower():
+            # Non-streamed answers still pay for generating every chunk.
+            await asyncio.sleep(CHUNK_S * (len(_ANSWER_CHUNKS) - 1))
+        return result
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _start_server(port: int) -> uvicorn.Server:
+    from shipment_qna_bot.api.main import app
+
+    server = uvicorn.Server(
+        uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+    )
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server
+
+
+def _payload(path: str, i: int) -> dict:
+    # A fresh conversation per request so no turn pays for a history rewrite.
+    return {
+        "question": "Show me the status for container TCLU2937251",
+        "consignee_codes": ["0000866"],
+        "conversation_id": f"bench-{path.rsplit('/', 1)[-1]}-{i}",
+    }
+
+
+def _measure(client: httpx.Client, path: str, i: int) -> dict:
+    t0 = time.perf_counter()
+    first_byte = first_token = None
+    with client.stream("POST", path, json=_payload(path, i)) as resp:
+        resp.raise_for_status()
+        for line in resp.iter_lines():
+            now = time.perf_counter()
+            if first_byte is None:
+                first_byte = now
+            if first_token is None and line.startswith("event: token"):
+                first_token = now
+    done = time.perf_counter()
+    first_byte = first_byte or done
+    return {
+        "ttfb_ms": (first_byte - t0) * 1000.0,
+        "first_token_ms": ((first_token or done) - t0) * 1000.0,
+        "total_ms": (done - t0) * 1000.0,
+    }
+
+
+def main():
+    global CHUNK_S
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    if len(sys.argv) > 2:
+        bench.LATENCY_S = float(sys.argv[2]) / 1000.0
+    if len(sys.argv) > 3:
+        CHUNK_S = float(sys.argv[3]) / 1000.0
+
+    bench._install_fakes()
+    answer._chat_tool = StreamingFakeChat()
+
+    port = _free_port()
+    server = _start_server(port)
+    base = f"http://127.0.0.1:{port}"
+
+    results = {}
+    with httpx.Client(base_url=base, timeout=30.0) as client:
+        for path in ("/api/chat", "/api/chat/stream"):
+            runs = [_measure(client, path, i) for i in range(n)]
+            results[path] = {k: statistics.mean(r[k] for r in runs) for k in runs[0]}
+    server.should_exit = True
+
+    print("--- Summary ---")
+    print(f"Requests per endpoint: {n}")
+    print(
+        f"Injected latency:      {bench.LATENCY_S * 1000:.0f} ms per Azure call, "
+        f"{CHUNK_S * 1000:.0f} ms per answer chunk"
+    )
+    for path, r in results.items():
+        print(
+            f"{path:<17} ttfb={r['ttfb_ms']:7.1f} ms  "
+            f"first_token={r['first_token_ms']:7.1f} ms  total={r['total_ms']:7.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+# tests/benchmark_understanding.py
+"""
+A/B of the understanding topologies on the same two-turn conversations
+(a lookup followed by a pronoun follow-up that needs a rewrite):
+  sequential - normalizer -> extractor -> intent
+  parallel   - normalizer -> (extractor || intent)
+  combined   - one structured-output understand call
+
+Reuses the sleeping Azure fakes from benchmark_concurrency (token usage scales
+with prompt size) and reads per-node durations from the
+`Node execution completed` log records.
+
+Usage:
+    python tests/benchmark_understanding.py [n_turns] [latency_ms]
+"""
+
+import logging
+import os
+import statistics
+import sys
+import time
+from collections import defaultdict
+
+sys.path.append(os.path.dirname(__file__))
+
+import benchmark_concurrency as bench
+
+from shipment_qna_bot.graph import builder
+from shipment_qna_bot.logging.logger import logger
+
+NODES = (
+    "normalizer",
+    "extractor",
+    "intent",
+    "understand",
+    "planner",
+    "retrieve",
+    "answer",
+    "judge",
+)
+MODES = ("sequential", "parallel", "combined")
+QUESTIONS = (
+    "Show me the status for container TCLU2937251",
+    "When will it arrive?",
+)
+
+
+class _NodeTimings(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.samples = defaultdict(list)
+
+    def emit(self, record):
+        data = getattr(record, "extra_data", None) or {}
+        if "elapsed_ms" in data and "node" in data:
+            self.samples[str(data["node"]).lower()].append(data["elapsed_ms"])
+
+
+def _run_mode(mode: str, n: int, timings: _NodeTimings) -> tuple[float, float]:
+    os.environ["GRAPH_UNDERSTANDING_MODE"] = mode
+    builder.graph_app = builder.build_graph()
+    timings.samples.clear()
+
+    totals, tokens = [], []
+    for i in range(n):
+        for question in QUESTIONS:
+            payload = {**bench._payload(f"{mode}-{i}"), "question_raw": question}
+            t0 = time.perf_counter()
+            result = builder.run_graph(payload)
+            totals.append((time.perf_counter() - t0) * 1000.0)
+            tokens.append((result.get("usage_metadata") or {}).get("total_tokens", 0))
+    return statistics.mean(totals), statistics.mean(tokens)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    if len(sys.argv) > 2:
+        bench.LATENCY_S = float(sys.argv[2]) / 1000.0
+
+    bench._install_fakes()
+    timings = _NodeTimings()
+    logger.addHandler(timings)
+
+    results = {}
+    for mode in MODES:
+        mean_ms, mean_tokens = _run_mode(mode, n, timings)
+        per_node = {
+            name: statistics.mean(v) for name, v in timings.samples.items() if v
+        }
+        results[mode] = (mean_ms, mean_tokens, per_node)
+
+    print("--- Summary ---")
+    print(f"Conversations:     {n} x {len(QUESTIONS)} turns per mode")
+    print(f"Injected latency:  {bench.LATENCY_S * 1000:.0f} ms per Azure call")
+    for mode, (mean_ms, mean_tokens, per_node) in results.items():
+        nodes = "  ".join(
+            f"{name}={per_node[name]:.0f}" for name in NODES if name in per_node
+        )
+        print(
+            f"{mode:<10} turn={mean_ms:7.1f} ms  tokens={mean_tokens:6.0f}  [{nodes}]"
+        )
+    seq = results["sequential"][0]
+    for mode in MODES[1:]:
+        saved = seq - results[mode][0]
+        print(f"{mode:<10} saves {saved:.1f} ms per turn ({saved / seq:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,10 @@ import os
 
 import pytest
 
+# The graph (and its checkpointer) is built when test modules are imported,
+# before the fixture below sets test mode; keep checkpoints in memory.
+os.environ.setdefault("CHECKPOINT_BACKEND", "memory")
+
 
 @pytest.fixture(autouse=True)
 def _force_test_mode(monkeypatch: pytest.MonkeyPatch) -> None:
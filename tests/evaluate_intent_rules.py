@@ -0,0 +1,72 @@
+# tests/evaluate_intent_rules.py
+"""
+Offline evaluation of the intent fast path against labelled queries.
+
+Fixtures use the accuracy_test_results.json layout plus an `expected_intent`
+key. Reports how many turns the rules would answer without the LLM (coverage)
+and how many of those match the label (precision).
+
+Usage:
+    python tests/evaluate_intent_rules.py [fixtures.json] [min_confidence]
+"""
+
+import json
+import os
+import sys
+from typing import Any, Dict, List, Optional
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from shipment_qna_bot.graph.nodes.intent_rules import (
+    classify_by_rules, fast_path_min_confidence)
+
+DEFAULT_FIXTURES = os.path.join(
+    os.path.dirname(__file__), "intent_fast_path_cases.json"
+)
+
+
+def evaluate(
+    cases: List[Dict[str, Any]], min_confidence: Optional[float] = None
+) -> Dict[str, Any]:
+    threshold = fast_path_min_confidence() if min_confidence is None else min_confidence
+    served, mistakes = 0, []
+    for case in cases:
+        decision = classify_by_rules(case["query"].lower())
+        if decision.intent is None or decision.confidence < threshold:
+            continue
+        served += 1
+        if decision.intent != case["expected_intent"]:
+            mistakes.append(
+                {**case, "predicted": decision.intent, "rule": decision.rule}
+            )
+
+    return {
+        "cases": len(cases),
+        "fast_path": served,
+        "coverage": served / len(cases) if cases else 0.0,
+        "precision": (served - len(mistakes)) / served if served else 1.0,
+        "mistakes": mistakes,
+    }
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_FIXTURES
+    threshold = float(sys.argv[2]) if len(sys.argv) > 2 else None
+    with open(path, "r", encoding="utf-8") as f:
+        cases = json.load(f)
+
+    report = evaluate(cases, threshold)
+    print("--- Summary ---")
+    print(f"Cases:      {report['cases']}")
+    print(f"Fast path:  {report['fast_path']} ({report['coverage']:.0%})")
+    print(f"Precision:  {report['precision']:.0%}")
+    for miss in report["mistakes"]:
+        print(
+            f"  MISS [{miss['category']}] {miss['query']!r}: "
+            f"expected={miss['expected_intent']} got={miss['predicted']} ({miss['rule']})"
+        )
+    sys.exit(1 if report["mistakes"] else 0)
+
+
+if __name__ == "__main__":
+    main()
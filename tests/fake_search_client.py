@@ -0,0 +1,101 @@
+# tests/fake_search_client.py
+"""
+In-memory stand-in for `azure.search.documents.SearchClient.search`, enough
+for enumerating index keys: select, top, skip, `order_by` on the key and
+`gt`/`ge`/`lt`/`le` filters on it joined with `and`.
+
+Like the service, `skip` above SKIP_LIMIT is rejected and ordering by a key
+that is not sortable fails. Optional per-request latency (plus a cost that
+grows with skip) lets benchmarks show how each paging strategy scales.
+"""
+
+import bisect
+import re
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+from azure.core.exceptions import HttpResponseError
+
+SKIP_LIMIT = 100_000
+
+_CLAUSE_RE = re.compile(r"^\s*(\w+)\s+(gt|ge|lt|le)\s+'((?:[^']|'')*)'\s*$")
+
+
+class FakeResults:
+    def __init__(self, rows: List[Dict[str, Any]], count: int):
+        self._rows = rows
+        self._count = count
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(self._rows)
+
+    def get_count(self) -> int:
+        return self._count
+
+
+class FakeSearchClient:
+    def __init__(
+        self,
+        keys: List[str],
+        id_field: str = "document_id",
+        sortable: bool = True,
+        latency_s: float = 0.0,
+        skip_cost_s: float = 0.0,
+    ):
+        self.keys = sorted(keys)
+        self.id_field = id_field
+        self.sortable = sortable
+        self.latency_s = latency_s
+        # Extra seconds per 10k skipped rows; the service walks past them.
+        self.skip_cost_s = skip_cost_s
+        self.requests = 0
+
+    def _bounds(self, filter: Optional[str]) -> tuple[int, int]:
+        lo, hi = 0, len(self.keys)
+        if not filter:
+            return lo, hi
+        for clause in re.split(r"\s+and\s+", filter):
+            match = _CLAUSE_RE.match(clause)
+            if not match or match.group(1) != self.id_field:
+                raise HttpResponseError(message=f"Unsupported filter: {clause}")
+            op, value = match.group(2), match.group(3).replace("''", "'")
+            if op == "gt":
+                lo = max(lo, bisect.bisect_right(self.keys, value))
+            elif op == "ge":
+                lo = max(lo, bisect.bisect_left(self.keys, value))
+            elif op == "lt":
+                hi = min(hi, bisect.bisect_left(self.keys, value))
+            else:
+                hi = min(hi, bisect.bisect_right(self.keys, value))
+        return lo, hi
+
+    def search(
+        self,
+        search_text: Optional[str] = None,
+        *,
+        select: Optional[List[str]] = None,
+        top: Optional[int] = None,
+        skip: Optional[int] = None,
+        filter: Optional[str] = None,
+        order_by: Optional[List[str]] = None,
+        include_total_count: bool = False,
+        **kwargs: Any,
+    ) -> FakeResults:
+        self.requests += 1
+        skip = skip or 0
+        if skip > SKIP_LIMIT:
+            raise HttpResponseError(
+                message=f"skip must be between 0 and {SKIP_LIMIT}, got {skip}"
+            )
+        if order_by and not self.sortable:
+            raise HttpResponseError(
+                message=f"The field '{self.id_field}' is not sortable."
+            )
+        if self.latency_s or self.skip_cost_s:
+            time.sleep(self.latency_s + self.skip_cost_s * skip / 10_000)
+
+        lo, hi = self._bounds(filter)
+        start = lo + skip
+        end = hi if top is None else min(hi, start + top)
+        rows = [{self.id_field: k} for k in self.keys[start:end]]
+        return FakeResults(rows, hi - lo)
@@ -0,0 +1,59 @@
+# tests/fake_search_service.py
+"""
+Local stand-in for the Azure AI Search REST endpoint, for exercising the
+real async SearchClient (pooling, coalescing) without the service.
+
+Answers POST .../docs/search.post.search after `latency_s` with one hit per
+request echoing the search text and filter, and counts requests and the
+peak number handled concurrently.
+"""
+
+import asyncio
+from typing import Optional
+
+from aiohttp import web
+
+
+class FakeSearchService:
+    def __init__(self, latency_s: float = 0.05):
+        self.latency_s = latency_s
+        self.requests = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._runner: Optional[web.AppRunner] = None
+        self.port = 0
+
+    async def _search(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            body = await request.json()
+            await asyncio.sleep(self.latency_s)
+            hit = {
+                "@search.score": 1.0,
+                "document_id": f"doc-{self.requests}",
+                "container_number": "TCLU2937251",
+                "chunk": body.get("search", ""),
+                "filter_seen": body.get("filter"),
+            }
+            payload = {"value": [hit]}
+            if body.get("count"):
+                payload["@odata.count"] = 1
+            return web.json_response(payload)
+        finally:
+            self.in_flight -= 1
+
+    async def start(self) -> str:
+        app = web.Application()
+        app.router.add_route("POST", "/{tail:.*search.post.search}", self._search)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{self.port}"
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
@@ -0,0 +1,123 @@
+import json
+import threading
+
+from shipment_qna_bot.graph.nodes.answer_context import (pack_documents,
+                                                         render_document,
+                                                         residual_content)
+from shipment_qna_bot.models.shipment_hit import ShipmentHit
+from shipment_qna_bot.tools import tokenizer
+from shipment_qna_bot.tools.azure_openai_embeddings import estimate_tokens
+
+
+def _hit(i, score=None, content=None, milestones=3):
+    meta = {
+        "milestones": [
+            {"event": f"event {m}", "location": "SHANGHAI", "date": "2025-03-01"}
+            for m in range(milestones)
+        ],
+    }
+    raw = {
+        "doc_id": str(i),
+        "container_number": f"TCLU{i:07d}",
+        "shipment_status": "IN_OCEAN",
+        "discharge_port": "LOS ANGELES",
+        "eta_dp_date": "2025-03-12T00:00:00",
+        "final_carrier_name": "MAERSK",
+        "cargo_weight_kg": 1200.5,
+        "content": (
+            content
+            if content is not None
+            else f"Container TCLU{i:07d} is IN_OCEAN. Customs hold at origin."
+        ),
+        "metadata_json": json.dumps(meta),
+    }
+    if score is not None:
+        raw["score"] = score
+    return ShipmentHit.from_raw(raw)
+
+
+def _count(text):
+    return len(text) // 4
+
+
+def test_residual_content_drops_restated_fields_and_repeats():
+    lines = [
+        "container_number: TCLU0000001",
+        "shipment_status: IN_OCEAN",
+        "eta_dp_date: 2025-03-12T00:00:00",
+    ]
+    content = (
+        "Container TCLU0000001 is IN_OCEAN.\nETA DP date 2025-03-12. "
+        "Customs hold at origin. Customs hold at origin."
+    )
+    assert residual_content(content, lines) == "Customs hold at origin."
+
+
+def test_render_levels_drop_tiers_in_order():
+    hit = _hit(1)
+    full = render_document(hit, 1)
+    assert "cargo_weight_kg" in full and "Milestones" in full
+    assert "Content: Customs hold at origin." in full
+    assert "TCLU0000001 is IN_OCEAN" not in full
+
+    assert "cargo_weight_kg" not in render_document(hit, 1, 1)
+    assert "Milestones" not in render_document(hit, 1, 2)
+    assert "Content" not in render_document(hit, 1, 3)
+    core = render_document(hit, 1, 4)
+    assert "final_carrier_name" not in core
+    assert "container_number: TCLU0000001" in core and "eta_dp_date" in core
+
+
+def test_within_budget_nothing_is_trimmed():
+    hits = [_hit(i) for i in range(3)]
+    packed = pack_documents(hits, budget=10_000, count=_count)
+    assert packed.documents == 3 and packed.trimmed == {}
+    assert packed.text == "".join(render_document(h, i + 1) for i, h in enumerate(hits))
+
+
+def test_least_relevant_documents_are_trimmed_first():
+    hits = [_hit(0, score=1.0), _hit(1, score=9.0), _hit(2, score=5.0)]
+    full = sum(_count(render_document(h, i + 1)) for i, h in enumerate(hits))
+    packed = pack_documents(hits, budget=full - 5, count=_count)
+    assert packed.trimmed == {"cargo": 1}
+    blocks = packed.text.split("--- Document ")[1:]
+    assert "cargo_weight_kg" not in blocks[0]
+    assert all("cargo_weight_kg" in b for b in blocks[1:])
+    assert packed.tokens <= full - 5
+
+
+def test_fields_go_before_documents_and_the_best_document_stays():
+    hits = [_hit(i, score=float(i), milestones=30) for i in range(10)]
+    packed = pack_documents(hits, budget=250, count=_count)
+    assert packed.tokens <= 250
+    assert 1 < packed.documents < 10
+    assert packed.trimmed["omitted"] == 10 - packed.documents
+    assert packed.trimmed["carrier"] == packed.documents
+    # Highest score survives, documents stay in retrieval order and are renumbered.
+    assert "TCLU0000009" in packed.text
+    assert "--- Document 1 ---" in packed.text
+    assert f"--- Document {packed.documents + 1} ---" not in packed.text
+
+    tiny = pack_documents(hits, budget=1, count=_count)
+    assert tiny.documents == 1 and "TCLU0000009" in tiny.text
+
+
+def test_requests_never_wait_for_the_tokenizer(monkeypatch):
+    started, release = threading.Event(), threading.Event()
+
+    def _slow_load(name):
+        started.set()
+        release.wait(5)
+        with tokenizer._LOCK:
+            tokenizer._ENCODINGS[name] = None
+            tokenizer._LOADING.discard(name)
+
+    monkeypatch.setenv("ANSWER_TOKENIZER_ENCODING", "slow_test_encoding")
+    monkeypatch.setattr(tokenizer, "_load", _slow_load)
+    try:
+        # The first request gets the estimate; loading runs in the background.
+        assert tokenizer.count_tokens("a" * 30) == estimate_tokens("a" * 30)
+        assert started.wait(5)
+        assert tokenizer.get_encoding() is None  # still loading
+    finally:
+        release.set()
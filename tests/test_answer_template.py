@@ -0,0 +1,141 @@
+import pytest
+
+from shipment_qna_bot.graph.nodes import answer, judge
+from shipment_qna_bot.graph.nodes.answer_template import (render_summary,
+                                                          template_kind)
+from shipment_qna_bot.models.shipment_hit import ShipmentHit
+from shipment_qna_bot.utils import metrics
+
+_IDS = {"container_number": ["TCLU2937251"], "po_numbers": []}
+_NO_IDS = {"container_number": [], "po_numbers": []}
+
+
+def _hit(container, status="IN_OCEAN", hot=False, **extra):
+    return ShipmentHit.from_raw(
+        {
+            "doc_id": container,
+            "container_number": container,
+            "shipment_status": status,
+            "po_numbers": ["5302997239"],
+            "discharge_port": "LOS ANGELES",
+            "final_destination": "CHICAGO",
+            "eta_dp_date": "2025-03-12T00:00:00",
+            "best_eta_fd_date": "2025-03-20T00:00:00",
+            "hot_container_flag": hot,
+            **extra,
+        }
+    )
+
+
+@pytest.mark.parametrize(
+    "question, intent, ids, kind",
+    [
+        ("TCLU2937251", "retrieval", _IDS, "id_lookup"),
+        ("where is container TCLU2937251?", "retrieval", _IDS, "id_lookup"),
+        ("why is TCLU2937251 late?", "retrieval", _IDS, None),
+        ("is TCLU2937251 going to miss the vessel cutoff?", "retrieval", _IDS, None),
+        ("show me hot containers", "retrieval", _NO_IDS, "list"),
+        ("which shipments arrive next week", "retrieval", _NO_IDS, "list"),
+        ("how likely is a delay for my containers", "retrieval", _NO_IDS, None),
+        ("show a chart of containers by week", "retrieval", _NO_IDS, None),
+        ("show me hot containers", "analytics", _NO_IDS, None),
+        (
+            "list delayed containers arriving in the next 7 days",
+            "retrieval",
+            _NO_IDS,
+            "list",
+        ),
+        ("What vessel are my containers on?", "retrieval", _NO_IDS, None),
+        ("what is the weight of my shipments", "retrieval", _NO_IDS, None),
+        ("which carrier is handling my containers", "retrieval", _NO_IDS, None),
+        (
+            "show me containers with cargo weight above 1000 kg",
+            "retrieval",
+            _NO_IDS,
+            None,
+        ),
+        ("what are the POs on my delayed shipments", "retrieval", _NO_IDS, None),
+    ],
+)
+def test_template_kind(question, intent, ids, kind):
+    assert template_kind(question, intent, ids) == kind
+
+
+def test_template_switch(monkeypatch):
+    monkeypatch.setenv("ANSWER_TEMPLATED", "0")
+    assert template_kind("TCLU2937251", "retrieval", _IDS) is None
+
+
+def test_render_summary():
+    one = render_summary([_hit("TCLU2937251", hot=True, dp_delayed_dur=3)], is_fd=False)
+    assert one == (
+        "Container TCLU2937251 is IN_OCEAN and is flagged hot. "
+        "Expected at LOS ANGELES on 12-Mar-25, 3 days late."
+    )
+    arrived = render_summary(
+        [_hit("TCLU2937251", derived_ata_dp_date="2025-03-11")], is_fd=False
+    )
+    assert "Arrived at LOS ANGELES on 11-Mar-25." in arrived
+    assert "Expected at CHICAGO on 20-Mar-25." in render_summary(
+        [_hit("TCLU2937251")], is_fd=True
+    )
+
+    many = [
+        _hit("TCLU0000001", hot=True),
+        _hit("TCLU0000001", hot=True),
+        _hit("TCLU0000002", status="DELIVERED", fd_delayed_dur=2),
+        _hit("TCLU0000003"),
+    ]
+    assert render_summary(many, is_fd=True) == (
+        "3 containers: 2 IN_OCEAN, 1 DELIVERED. 1 flagged hot. "
+        "1 delayed at the final destination."
+    )
+
+
+@pytest.fixture
+def live(monkeypatch):
+    monkeypatch.setenv("SHIPMENT_QNA_BOT_TEST_MODE", "0")
+    calls = []
+
+    class _Chat:
+        def chat_completion(self, messages, **kwargs):
+            calls.append(messages)
+            return {"content": "LLM answer", "usage": {}}
+
+    monkeypatch.setattr(answer, "_chat_tool", _Chat())
+    metrics.reset("answer.")
+    yield calls
+    metrics.reset("answer.")
+
+
+def _state(question, hits, **extra):
+    return {
+        "question_raw": question,
+        "intent": "retrieval",
+        "extracted_ids": {"container_number": ["TCLU2937251"]},
+        "hits": hits,
+        "messages": [],
+        **extra,
+    }
+
+
+def test_id_lookup_is_answered_without_the_llm(live):
+    state = answer.answer_node(_state("TCLU2937251", [_hit("TCLU2937251")]))
+    assert live == []
+    text = state["answer_text"]
+    assert text.startswith("1 shipments found for container TCLU2937251.")
+    assert "Expected at LOS ANGELES on 12-Mar-25." in text
+    assert "| TCLU2937251 | 5302997239 | LOS ANGELES | 12-Mar-25 | IN_OCEAN |" in text
+    assert state["table_spec"]["rows"][0]["container_number"] == "TCLU2937251"
+    assert state["citations"][0]["container_number"] == "TCLU2937251"
+    assert metrics.snapshot("answer.") == {"answer.templated": 1}
+
+    # Grounded by construction, so the judge accepts it without an LLM call.
+    assert judge._prejudge(state) and state["is_satisfied"] is True
+
+
+def test_reasoning_and_retries_go_to_the_llm(live):
+    answer.answer_node(_state("why is TCLU2937251 late?", [_hit("TCLU2937251")]))
+    answer.answer_node(_state("TCLU2937251", [_hit("TCLU2937251")], retry_count=1))
+    assert len(live) == 2
+    assert metrics.snapshot("answer.") == {"answer.llm": 2}
@@ -0,0 +1,152 @@
+import os
+
+import pandas as pd
+import pytest
+
+from shipment_qna_bot.tools import blob_manager
+from shipment_qna_bot.tools.blob_manager import BlobAnalyticsManager
+
+
+@pytest.fixture(autouse=True)
+def _fresh_resident():
+    blob_manager.reset_resident_dataset()
+    yield
+    blob_manager.reset_resident_dataset()
+
+
+def _write_master(mgr: BlobAnalyticsManager) -> str:
+    path = mgr._get_cache_path(mgr._get_today_str())
+    pd.DataFrame(
+        [
+            {
+                "container_number": "AAAU0000001",
+                "consignee_codes": ["0001", "0002"],
+                "cargo_weight_kg": "100.5",
+            },
+            {
+                "container_number": "AAAU0000002",
+                "consignee_codes": ["0002"],
+                "cargo_weight_kg": "7",
+            },
+            {
+                "container_number": "AAAU0000003",
+                "consignee_codes": ["0003"],
+                "cargo_weight_kg": "bad",
+            },
+        ]
+    ).to_parquet(path)
+    return path
+
+
+def test_slices_resident_dataset_by_code(tmp_path, monkeypatch):
+    mgr = BlobAnalyticsManager(cache_dir=str(tmp_path))
+    _write_master(mgr)
+
+    reads = []
+    real_read = pd.read_parquet
+    monkeypatch.setattr(
+        blob_manager.pd,
+        "read_parquet",
+        lambda *a, **k: reads.append(a) or real_read(*a, **k),
+    )
+
+    df = mgr.load_filtered_data(["0002"])
+    assert list(df["container_number"]) == ["AAAU0000001", "AAAU0000002"]
+    assert df["cargo_weight_kg"].dtype.kind == "f"
+
+    # Shared rows are returned once, in file order.
+    df = mgr.load_filtered_data(["0003", "0001", "0002"])
+    assert list(df["container_number"]) == [
+        "AAAU0000001",
+        "AAAU0000002",
+        "AAAU0000003",
+    ]
+    assert pd.isna(df["cargo_weight_kg"].iloc[2])
+
+    assert mgr.load_filtered_data(["9999"]).empty
+
+    # A second manager reuses the same decoded snapshot.
+    BlobAnalyticsManager(cache_dir=str(tmp_path)).load_filtered_data(["0001"])
+    assert len(reads) == 1
+
+
+def test_slices_are_isolated_from_resident(tmp_path):
+    mgr = BlobAnalyticsManager(cache_dir=str(tmp_path))
+    _write_master(mgr)
+
+    df = mgr.load_filtered_data(["0001"])
+    df["container_number"] = "MUTATED"
+
+    again = mgr.load_filtered_data(["0001"])
+    assert list(again["container_number"]) == ["AAAU0000001"]
+
+
+def test_rebuilds_when_daily_file_changes(tmp_path):
+    mgr = BlobAnalyticsManager(cache_dir=str(tmp_path))
+    path = _write_master(mgr)
+    assert len(mgr.load_filtered_data(["0002"])) == 2
+
+    pd.DataFrame(
+        [{"container_number": "BBBU0000001", "consignee_codes": ["0002"]}]
+    ).to_parquet(path)
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + 5))
+
+    df = mgr.load_filtered_data(["0002"])
+    assert list(df["container_number"]) == ["BBBU0000001"]
+
+
+def test_pushdown_mode_matches_resident(tmp_path, monkeypatch):
+    mgr = BlobAnalyticsManager(cache_dir=str(tmp_path))
+    _write_master(mgr)
+
+    resident = mgr.load_filtered_data(["0002", "0003"])
+
+    monkeypatch.setenv("ANALYTICS_LOAD_MODE", "pushdown")
+    pushed = mgr.load_filtered_data(["0002", "0003"])
+    pd.testing.assert_frame_equal(pushed, resident, check_dtype=False)
+
+    projected = mgr.load_filtered_data(["0001"], columns=["container_number"])
+    assert list(projected.columns) == ["container_number"]
+    assert list(projected["container_number"]) == ["AAAU0000001"]
+
+    # The sorted copy survives cache cleanup for the same day.
+    mgr.download_master_data()
+    assert os.path.exists(mgr._get_sorted_path(mgr._get_today_str()))
+
+
+def test_sorted_copy_has_disjoint_row_groups(tmp_path):
+    import pyarrow.parquet as pq
+
+    from shipment_qna_bot.tools.parquet_loader import (
+        load_pushdown, rewrite_sorted_by_consignee)
+
+    src = tmp_path / "src.parquet"
+    dest = tmp_path / "dest.parquet"
+    pd.DataFrame(
+        {
+            "container_number": [f"C{i}" for i in range(40)],
+            "consignee_codes": [[f"{i % 4:04d}"] for i in range(40)],
+        }
+    ).to_parquet(src)
+
+    assert rewrite_sorted_by_consignee(str(src), str(dest), row_group_size=10)
+
+    meta = pq.ParquetFile(dest).metadata
+    code_idx = meta.schema.to_arrow_schema().get_field_index("consignee_code")
+    ranges = [
+        (
+            meta.row_group(i).column(code_idx).statistics.min,
+            meta.row_group(i).column(code_idx).statistics.max,
+        )
+        for i in range(meta.num_row_groups)
+    ]
+    assert ranges == [
+        ("0000", "0000"),
+        ("0001", "0001"),
+        ("0002", "0002"),
+        ("0003", "0003"),
+    ]
+
+    df = load_pushdown(str(dest), ["0002"], columns=["container_number"])
+    assert list(df["container_number"]) == [f"C{i}" for i in range(2, 40, 4)]
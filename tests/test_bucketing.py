@@ -0,0 +1,79 @@
+import json
+import random
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from shipment_qna_bot.graph.nodes.answer import _bucket_counts
+from shipment_qna_bot.graph.nodes.bucketing import WindowCounter
+from shipment_qna_bot.graph.nodes.post_filter import to_datetime64
+from shipment_qna_bot.models.shipment_hit import ShipmentHit
+
+_NOW = datetime(2025, 3, 10, 9, 30, tzinfo=timezone.utc)
+
+
+def test_counts_match_a_scan_for_arbitrary_windows():
+    rng = random.Random(2)
+    times = [
+        (
+            None
+            if rng.random() < 0.1
+            else _NOW + timedelta(hours=rng.randint(-48, 24 * 40))
+        )
+        for _ in range(500)
+    ]
+    flags = np.array([rng.random() < 0.4 for _ in times])
+    column = np.array(
+        [np.datetime64("NaT", "us") if t is None else to_datetime64(t) for t in times]
+    )
+    windows = [("48h", 2), ("ten_days", 10), ("quarter", 90)]
+
+    counts = WindowCounter(column, {"a": flags, "b": ~flags}).counts(_NOW, windows)
+    for i, (_, days) in enumerate(windows):
+        end = _NOW + timedelta(days=days)
+        for name, mask in (("a", flags), ("b", ~flags)):
+            expected = sum(
+                1 for t, m in zip(times, mask) if m and t and _NOW <= t < end
+            )
+            assert counts[name][i] == expected
+
+
+def test_window_bounds_are_half_open():
+    column = np.array([to_datetime64(_NOW), to_datetime64(_NOW + timedelta(days=1))])
+    assert list(WindowCounter(column).counts(_NOW, [("today", 1)])["all"]) == [1]
+
+
+def _hit(eta, hot):
+    meta = {"eta_dp_date": eta.isoformat(), "hot_container_flag": hot}
+    return ShipmentHit.from_raw(
+        {"doc_id": eta.isoformat(), "metadata_json": json.dumps(meta)}
+    )
+
+
+def test_bucket_counts_shape():
+    hits = [
+        _hit(_NOW + timedelta(hours=2), True),
+        _hit(_NOW + timedelta(days=3), False),
+        _hit(_NOW + timedelta(days=10), True),
+        _hit(_NOW - timedelta(days=1), True),
+    ]
+    spec = _bucket_counts(hits, "arrivals by week", _NOW)
+    assert spec["rows"][1] == {
+        "bucket": "this_week",
+        "hot_count": 1,
+        "normal_count": 1,
+        "total_count": 2,
+    }
+    assert spec["chart_rows"][:2] == [
+        {"bucket": "today", "category": "hot", "count": 1},
+        {"bucket": "today", "category": "normal", "count": 0},
+    ]
+    json.dumps(spec)  # plain ints, ready for the table/chart specs
+
+    hot_only = _bucket_counts(hits, "hot containers this fortnight", _NOW)
+    assert hot_only["categories"] == ["hot"]
+    assert hot_only["rows"][2] == {
+        "bucket": "this_fortnight",
+        "hot_count": 2,
+        "total_count": 2,
+    }
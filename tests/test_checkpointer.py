@@ -0,0 +1,118 @@
+import asyncio
+import multiprocessing
+import time
+from typing import Annotated, List, TypedDict
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from langgraph.graph import END, StateGraph
+from langgraph.graph.message import add_messages
+
+from shipment_qna_bot.graph.checkpointer import SQLiteCheckpointSaver
+from shipment_qna_bot.models.shipment_hit import ShipmentHit
+
+
+class _State(TypedDict):
+    messages: Annotated[List[BaseMessage], add_messages]
+    hits: list
+
+
+def _reply(state):
+    question = state["messages"][-1].content
+    hit = ShipmentHit.from_raw({"doc_id": question, "container_number": question})
+    return {"messages": [AIMessage(content=f"re: {question}")], "hits": [hit]}
+
+
+def _saver(path, **kwargs):
+    serde = JsonPlusSerializer(
+        allowed_msgpack_modules=[(ShipmentHit.__module__, ShipmentHit.__name__)]
+    )
+    return SQLiteCheckpointSaver(str(path), serde=serde, **kwargs)
+
+
+def _graph(saver):
+    workflow = StateGraph(_State)
+    workflow.add_node("reply", _reply)
+    workflow.set_entry_point("reply")
+    workflow.add_edge("reply", END)
+    return workflow.compile(checkpointer=saver)
+
+
+def _ask(graph, thread, text):
+    config = {"configurable": {"thread_id": thread}}
+    return graph.invoke({"messages": [HumanMessage(content=text)]}, config=config)
+
+
+def test_threads_survive_a_restart_and_history_is_capped(tmp_path):
+    path = tmp_path / "ck.sqlite"
+    graph = _graph(_saver(path, max_turns=2))
+    for i in range(4):
+        out = _ask(graph, "t1", f"q{i}")
+    assert [m.content for m in out["messages"]][-2:] == ["q3", "re: q3"]
+
+    restarted = _graph(_saver(path, max_turns=2))
+    values = restarted.get_state({"configurable": {"thread_id": "t1"}}).values
+    assert [m.content for m in values["messages"]] == ["q2", "re: q2", "q3", "re: q3"]
+    assert isinstance(values["hits"][0], ShipmentHit)
+    assert values["hits"][0]["container_number"] == "q3"
+
+    out = asyncio.run(
+        restarted.ainvoke(
+            {"messages": [HumanMessage(content="q4")]},
+            config={"configurable": {"thread_id": "t1"}},
+        )
+    )
+    assert [m.content for m in out["messages"]][0] == "q2"
+    assert out["messages"][-1].content == "re: q4"
+
+
+def test_only_recent_checkpoints_are_kept(tmp_path):
+    saver = _saver(tmp_path / "ck.sqlite", keep_checkpoints=2)
+    graph = _graph(saver)
+    for i in range(5):
+        _ask(graph, "t1", f"q{i}")
+    _ask(graph, "t2", "q")
+    assert saver.stats()["checkpoints"] == 4
+    assert len(list(saver.list({"configurable": {"thread_id": "t1"}}))) == 2
+
+
+def test_ttl_and_lru_eviction(tmp_path):
+    saver = _saver(tmp_path / "ck.sqlite", ttl_s=100, max_threads=2)
+    graph = _graph(saver)
+    for thread in ("a", "b", "c"):
+        _ask(graph, thread, "q")
+
+    now = time.time()
+    assert saver.sweep(now) == 1  # "a" is the least recently used
+    assert saver.get_tuple({"configurable": {"thread_id": "a"}}) is None
+    assert saver.get_tuple({"configurable": {"thread_id": "c"}}) is not None
+
+    assert saver.get_tuple({"configurable": {"thread_id": "b"}}) is not None
+    assert saver.sweep(now + 1000) == 2
+    assert saver.stats() == {"threads": 0, "checkpoints": 0, "evicted": 3}
+
+
+def test_database_is_created_on_first_use(tmp_path):
+    path = tmp_path / "cache" / "ck.sqlite"
+    saver = _saver(path)
+    assert not path.parent.exists()
+    _ask(_graph(saver), "t1", "q")
+    assert path.exists()
+
+
+def _worker(path, worker):
+    graph = _graph(_saver(path))
+    for i in range(10):
+        _ask(graph, f"w{worker}-{i % 3}", f"q{i}")
+
+
+def test_worker_processes_share_the_file(tmp_path):
+    path = str(tmp_path / "ck.sqlite")
+    _saver(path)  # create the schema once
+    procs = [multiprocessing.Process(target=_worker, args=(path, w)) for w in range(3)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join(60)
+        assert p.exitcode == 0
+    assert _saver(path).stats()["threads"] == 9
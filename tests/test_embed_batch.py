@@ -0,0 +1,122 @@
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+from shipment_qna_bot.tools import embedding_cache
+from shipment_qna_bot.tools.azure_openai_embeddings import (
+    AzureOpenAIEmbeddingsClient, estimate_tokens, pack_batches)
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src", "scripts"))
+
+
+def test_pack_batches_respects_input_and_token_limits():
+    texts = ["a" * 30] * 5
+    assert pack_batches(texts, max_inputs=2, max_tokens=10_000) == [
+        [0, 1],
+        [2, 3],
+        [4],
+    ]
+
+    per_text = estimate_tokens(texts[0])
+    assert pack_batches(texts, max_inputs=10, max_tokens=per_text * 3) == [
+        [0, 1, 2],
+        [3, 4],
+    ]
+
+    # An oversized text still goes out, alone.
+    assert pack_batches(["x" * 300, "y"], max_inputs=10, max_tokens=5) == [[0], [1]]
+
+
+@pytest.fixture
+def batch_embedder(monkeypatch):
+    monkeypatch.setenv("SHIPMENT_QNA_BOT_TEST_MODE", "0")
+    monkeypatch.setenv("AZURE_OPENAI_ENDPOINT", "https://example.invalid")
+    monkeypatch.setenv("AZURE_OPENAI_API_KEY", "key")
+    monkeypatch.setenv("AZURE_OPENAI_API_VERSION", "2024-02-15-preview")
+    monkeypatch.setenv("AZURE_OPENAI_EMBED_DEPLOYMENT", "embed-3")
+    monkeypatch.setenv("AZURE_OPENAI_EMBED_RETRY_DELAY", "0")
+    monkeypatch.delenv("EMBED_CACHE_PATH", raising=False)
+    embedding_cache.reset_embedding_cache()
+
+    calls = []
+    failures = []
+
+    def _create(**kwargs):
+        inputs = kwargs["input"]
+        calls.append(inputs)
+        if failures:
+            raise failures.pop(0)
+        # Out of order on purpose: the client must sort by index.
+        data = [
+            SimpleNamespace(index=i, embedding=[float(len(text))])
+            for i, text in enumerate(inputs)
+        ]
+        return SimpleNamespace(data=list(reversed(data)))
+
+    client = AzureOpenAIEmbeddingsClient()
+    client._client = SimpleNamespace(embeddings=SimpleNamespace(create=_create))
+    yield client, calls, failures
+    embedding_cache.reset_embedding_cache()
+
+
+def test_embed_batch_keeps_order_and_skips_blank_inputs(batch_embedder):
+    client, calls, _ = batch_embedder
+    vectors = client.embed_batch(["aa", "", "bbbb", "  ", "c"], max_inputs=2)
+    assert vectors == [[2.0], [], [4.0], [], [1.0]]
+    assert calls == [["aa", "bbbb"], ["c"]]
+
+
+def test_embed_batch_retries_transient_errors(batch_embedder):
+    client, calls, failures = batch_embedder
+    failures.append(RuntimeError("429 rate limit"))
+    assert client.embed_batch(["aa", "b"]) == [[2.0], [1.0]]
+    assert len(calls) == 2
+
+    failures.append(ValueError("invalid input"))
+    with pytest.raises(RuntimeError, match="batch embedding failed"):
+        client.embed_batch(["aa"])
+
+
+def test_flatten_documents_isolates_bad_documents(batch_embedder):
+    from reindex_data import flatten_documents
+
+    client, calls, failures = batch_embedder
+
+    def _doc(doc_id, content=None):
+        return {
+            "document_id": doc_id,
+            "content": f"eta for container {doc_id}" if content is None else content,
+            "metadata": {"consignee_codes": ["C1"]},
+        }
+
+    docs = [_doc("1"), _doc("2", content=""), _doc("3"), _doc("4")]
+    failures.append(ValueError("invalid input"))  # first batch request
+    processed, errors = flatten_documents(docs, client, batch_size=8)
+
+    assert [d["document_id"] for d in processed] == ["1", "3", "4"]
+    assert [e["document_id"] for e in errors] == ["2"]
+    # One failed batch request, then one request per document.
+    assert len(calls) == 4
+
+
+def test_document_embeddings_bypass_the_query_cache(batch_embedder):
+    from reindex_data import flatten_document, flatten_documents
+
+    client, calls, failures = batch_embedder
+    # A cached query vector for text that differs from the content only in
+    # case and whitespace.
+    assert client.embed_query("ETA  for container 1") == [1.0]
+
+    doc = {
+        "document_id": "1",
+        "content": "eta for container 1",
+        "metadata": {"consignee_codes": ["C1"]},
+    }
+    assert flatten_document(doc, client)["content_vector"] == [19.0]
+    failures.append(ValueError("invalid input"))
+    processed, errors = flatten_documents([doc], client, batch_size=8)
+
+    assert errors == [] and processed[0]["content_vector"] == [19.0]
+    assert calls[1:] == [["eta for container 1"]] * 3
@@ -0,0 +1,69 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from shipment_qna_bot.tools import embedding_cache
+from shipment_qna_bot.tools.azure_openai_embeddings import \
+    AzureOpenAIEmbeddingsClient
+from shipment_qna_bot.tools.embedding_cache import (EmbeddingCache,
+                                                    make_embedding_key)
+
+
+def test_key_normalizes_text_and_scopes_by_deployment():
+    key = make_embedding_key("Hot containers  arriving\nnext week", "embed-3")
+    assert key == make_embedding_key(" hot containers arriving next week ", "embed-3")
+    assert key != make_embedding_key("hot containers arriving next week", "embed-2")
+
+
+def test_vectors_are_stored_as_float32(tmp_path):
+    cache = EmbeddingCache(max_entries=4, ttl_s=60)
+    stored = cache.set("q", "d", [0.1, 0.2, 0.3])
+    assert stored.dtype == np.float32
+    assert cache.get("Q", "d") is stored
+    assert cache.get("q", "other") is None
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    path = str(tmp_path / "embed.sqlite")
+    EmbeddingCache(ttl_s=60, persist_path=path).set("q", "d", [1.0, 2.0])
+
+    reopened = EmbeddingCache(ttl_s=60, persist_path=path)
+    np.testing.assert_array_equal(reopened.get("q", "d"), [1.0, 2.0])
+    assert reopened.stats()["disk_hits"] == 1
+
+    expired = EmbeddingCache(ttl_s=-1, persist_path=str(tmp_path / "old.sqlite"))
+    expired.set("q", "d", [1.0])
+    assert (
+        EmbeddingCache(persist_path=str(tmp_path / "old.sqlite")).get("q", "d") is None
+    )
+
+
+@pytest.fixture
+def live_embedder(monkeypatch):
+    monkeypatch.setenv("SHIPMENT_QNA_BOT_TEST_MODE", "0")
+    monkeypatch.setenv("AZURE_OPENAI_ENDPOINT", "https://example.invalid")
+    monkeypatch.setenv("AZURE_OPENAI_API_KEY", "key")
+    monkeypatch.setenv("AZURE_OPENAI_API_VERSION", "2024-02-15-preview")
+    monkeypatch.setenv("AZURE_OPENAI_EMBED_DEPLOYMENT", "embed-3")
+    monkeypatch.delenv("EMBED_CACHE_PATH", raising=False)
+    embedding_cache.reset_embedding_cache()
+
+    calls = []
+
+    def _create(**kwargs):
+        calls.append(kwargs["input"])
+        return SimpleNamespace(data=[SimpleNamespace(embedding=[0.5, 0.25])])
+
+    client = AzureOpenAIEmbeddingsClient()
+    client._client = SimpleNamespace(embeddings=SimpleNamespace(create=_create))
+    yield client, calls
+    embedding_cache.reset_embedding_cache()
+
+
+def test_embed_query_reuses_cached_vector(live_embedder):
+    client, calls = live_embedder
+    first = client.embed_query("hot containers arriving next week")
+    second = client.embed_query("Hot containers arriving next week ")
+    assert first == second == [0.5, 0.25]
+    assert calls == ["hot containers arriving next week"]
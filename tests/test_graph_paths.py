@@ -52,3 +52,120 @@ def test_graph_routing_analytics():
     result = graph_app.invoke(initial_state, config=config)
 
     assert result["intent"] == "analytics"
+
+
+def test_arun_graph_matches_sync_routing():
+    """
+    The async runner drives the same graph through `ainvoke`.
+    """
+    import asyncio
+
+    from shipment_qna_bot.graph.builder import arun_graph
+
+    result = asyncio.run(
+        arun_graph(
+            {
+                "question_raw": "What is the ETA for container ABCD1234567?",
+                "conversation_id": "test_conv_async",
+                "consignee_codes": ["TEST"],
+            }
+        )
+    )
+
+    assert result["intent"] == "retrieval"
+    assert "ABCD1234567" in result["extracted_ids"]["container_number"]
+    assert result["answer_text"]
+
+
+@pytest.mark.parametrize("mode", ["parallel", "sequential", "combined"])
+def test_understanding_modes_route_alike(mode, monkeypatch):
+    """
+    Every understanding topology yields the same routing state.
+    """
+    from shipment_qna_bot.graph.builder import build_graph
+
+    monkeypatch.setenv("GRAPH_UNDERSTANDING_MODE", mode)
+    app = build_graph()
+    nodes = app.get_graph().nodes
+    assert ("understand_join" in nodes) == (mode == "parallel")
+    assert ("understand" in nodes) == (mode == "combined")
+
+    result = app.invoke(
+        {
+            "question_raw": "What is the ETA for container ABCD1234567?",
+            "conversation_id": "test_conv",
+            "consignee_codes": ["TEST"],
+        },
+        config={"configurable": {"thread_id": f"test_thread_{mode}"}},
+    )
+
+    assert result["intent"] == "retrieval"
+    assert "ABCD1234567" in result["extracted_ids"]["container_number"]
+
+
+def test_combined_understand_rewrites_and_classifies_in_one_call(monkeypatch):
+    import json
+
+    from langchain_core.messages import AIMessage, HumanMessage
+
+    from shipment_qna_bot.graph.nodes import understand
+
+    monkeypatch.setenv("SHIPMENT_QNA_BOT_TEST_MODE", "0")
+    calls = []
+
+    class _Chat:
+        def chat_completion(self, messages, **kwargs):
+            calls.append((messages, kwargs))
+            return {
+                "content": json.dumps(
+                    {
+                        "standalone_question": "When will container ABCD1234567 arrive?",
+                        "entities": {"location": ["Savannah"]},
+                        "primary_intent": "retrieval",
+                        "intents": ["retrieval", "eta"],
+                        "sentiment": "neutral",
+                    }
+                ),
+                "usage": {
+                    "prompt_tokens": 40,
+                    "completion_tokens": 10,
+                    "total_tokens": 50,
+                },
+            }
+
+    monkeypatch.setattr(understand, "_chat_tool", _Chat())
+    state = {
+        "question_raw": "When will it arrive?",
+        "messages": [
+            HumanMessage(content="Status of ABCD1234567"),
+            AIMessage(content="It is in transit."),
+            HumanMessage(content="When will it arrive?"),
+        ],
+        "usage_metadata": {
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "total_tokens": 0,
+        },
+    }
+
+    result = understand.understand_node(state)
+
+    assert len(calls) == 1
+    assert calls[0][1]["response_format"] == {"type": "json_object"}
+    assert result["normalized_question"] == "when will container abcd1234567 arrive?"
+    assert result["extracted_ids"]["container_number"] == ["ABCD1234567"]
+    assert result["extracted_ids"]["location"] == ["Savannah"]
+    assert result["intent"] == "retrieval"
+    assert result["sub_intents"] == ["retrieval", "eta"]
+    assert result["usage_metadata"]["total_tokens"] == 50
+
+
+def test_merge_usage_sums_deltas_and_keeps_resets():
+    from shipment_qna_bot.graph.state import merge_usage, usage_delta
+
+    total = merge_usage({}, usage_delta({"prompt_tokens": 10, "total_tokens": 12}))
+    total = merge_usage(total, usage_delta({"prompt_tokens": 5, "total_tokens": 6}))
+    assert total == {"prompt_tokens": 15, "total_tokens": 18}
+
+    # A plain write replaces the totals, e.g. the per-turn reset in run_graph.
+    assert merge_usage(total, {}) == {}
@@ -0,0 +1,104 @@
+import pytest
+
+from shipment_qna_bot.graph.nodes import judge
+from shipment_qna_bot.graph.nodes.grounding import (GROUNDED, INCONCLUSIVE,
+                                                    UNGROUNDED,
+                                                    check_grounding)
+from shipment_qna_bot.utils import metrics
+
+_HITS = [
+    {
+        "container_number": "TCLU2937251",
+        "po_numbers": ["5302997239"],
+        "booking_numbers": ["TH2017996"],
+        "eta_dp_date": "2025-03-14T00:00:00",
+        "shipment_status": "IN_OCEAN",
+    },
+    {
+        "container_number": "SEGU5935510",
+        "po_numbers": ["5302997240"],
+        "eta_dp_date": "2025-03-20",
+    },
+]
+
+
+@pytest.mark.parametrize(
+    "answer, verdict",
+    [
+        ("Container TCLU2937251 (PO 5302997239) arrives on 14-Mar-25.", GROUNDED),
+        (
+            "| TCLU2937251 | 5302997239 | 2025-03-14 |\n| SEGU5935510 | 5302997240 | 20-Mar-25 |",
+            GROUNDED,
+        ),
+        ("Container MSCU1234567 is delayed.", UNGROUNDED),
+        ("Container TCLU2937251 arrives on 16-Mar-25.", INCONCLUSIVE),
+        ("Two of your shipments are still on the water.", INCONCLUSIVE),
+    ],
+)
+def test_check_grounding_verdicts(answer, verdict):
+    assert check_grounding(answer, _HITS).verdict == verdict
+
+
+def test_ids_from_the_question_are_not_invented():
+    check = check_grounding(
+        "Container MSCU1234567 was not found in your shipments.",
+        _HITS,
+        question="where is MSCU1234567?",
+    )
+    assert check.verdict == INCONCLUSIVE
+    assert check.missing_ids == ["MSCU1234567"]
+
+
+@pytest.fixture
+def live_judge(monkeypatch):
+    monkeypatch.setenv("SHIPMENT_QNA_BOT_TEST_MODE", "0")
+    metrics.reset("judge.")
+    calls = []
+
+    class _Chat:
+        def chat_completion(self, messages, **kwargs):
+            calls.append(messages)
+            return {
+                "content": '{"decision": "retry", "feedback": "wrong date"}',
+                "usage": {
+                    "prompt_tokens": 1,
+                    "completion_tokens": 1,
+                    "total_tokens": 2,
+                },
+            }
+
+    monkeypatch.setattr(judge, "_CHAT_TOOL", _Chat())
+    yield calls
+    metrics.reset("judge.")
+
+
+def _state(answer):
+    return {"question_raw": "status?", "answer_text": answer, "hits": list(_HITS)}
+
+
+def test_judge_skips_llm_when_grounded(live_judge):
+    state = judge.judge_node(_state("Container TCLU2937251 is IN_OCEAN."))
+    assert state["is_satisfied"] is True
+    assert live_judge == []
+
+    state = judge.judge_node(_state("Container MSCU1234567 is IN_OCEAN."))
+    assert state["is_satisfied"] is False
+    assert state["retry_count"] == 1
+    assert "MSCU1234567" in state["reflection_feedback"]
+    assert live_judge == []
+
+    state = judge.judge_node(_state("Container TCLU2937251 arrives 16-Mar-25."))
+    assert state["is_satisfied"] is False
+    assert len(live_judge) == 1
+
+    assert metrics.snapshot("judge.") == {
+        "judge.skipped": 2,
+        "judge.retry": 2,
+        "judge.llm": 1,
+    }
+
+
+def test_prejudge_can_be_disabled(live_judge, monkeypatch):
+    monkeypatch.setenv("JUDGE_PREJUDGE", "0")
+    judge.judge_node(_state("Container TCLU2937251 is IN_OCEAN."))
+    assert len(live_judge) == 1
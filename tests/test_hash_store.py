@@ -0,0 +1,75 @@
+import json
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src", "scripts"))
+
+from hash_store import HashStore
+from ingest_all import compute_doc_hash
+
+
+def _doc(doc_id, content):
+    return {"document_id": doc_id, "content": content, "metadata": {"x": 1}}
+
+
+def _write(path, docs, prefix=""):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(prefix)
+        for d in docs:
+            f.write(json.dumps(d) + "\n")
+
+
+def test_refresh_only_rescans_new_or_changed_files(tmp_path):
+    a, b = tmp_path / "a.jsonl", tmp_path / "b.jsonl"
+    _write(a, [_doc("1", "one"), _doc("2", "two")], prefix="\n{broken\n")
+    store = HashStore(str(tmp_path / "store.sqlite"))
+    assert store.refresh([a]) == [str(a)]
+    assert store.refresh([a]) == []
+
+    _write(b, [_doc("3", "three")])
+    assert store.refresh([a, b]) == [str(b)]
+
+    _write(a, [_doc("1", "one, revised")])
+    assert store.refresh([a, b]) == [str(a)]
+    assert store.hashes() == {
+        "1": compute_doc_hash(_doc("1", "one, revised")),
+        "3": compute_doc_hash(_doc("3", "three")),
+    }
+
+    assert store.refresh([b]) == []
+    assert set(store.hashes()) == {"3"}
+
+
+def test_store_persists_and_seeks_to_documents(tmp_path):
+    a, b = tmp_path / "a.jsonl", tmp_path / "b.jsonl"
+    _write(a, [_doc("1", "one"), _doc("2", "two")], prefix="\n")
+    # Duplicate ID in a later file: the earlier file's row wins.
+    _write(b, [_doc("2", "newer two"), _doc("3", "three")])
+    HashStore(str(tmp_path / "store.sqlite")).refresh([b, a])
+
+    store = HashStore(str(tmp_path / "store.sqlite"))
+    assert store.refresh([a, b]) == []
+    assert store.read_document("2") == _doc("2", "two")
+    assert store.read_document("missing") is None
+    assert list(store.iter_documents({"3", "1"})) == [
+        _doc("1", "one"),
+        _doc("3", "three"),
+    ]
+
+
+def test_deleting_the_winning_file_uncovers_the_duplicate(tmp_path):
+    a, b = tmp_path / "a.jsonl", tmp_path / "b.jsonl"
+    _write(a, [_doc("X", "from a")])
+    _write(b, [_doc("X", "from b"), _doc("Y", "y")])
+    store = HashStore(str(tmp_path / "store.sqlite"))
+    store.refresh([a, b])
+    assert store.hashes()["X"] == compute_doc_hash(_doc("X", "from a"))
+
+    os.remove(a)
+    assert store.refresh([b]) == []
+    assert store.hashes() == {
+        "X": compute_doc_hash(_doc("X", "from b")),
+        "Y": compute_doc_hash(_doc("Y", "y")),
+    }
+    assert store.read_document("X") == _doc("X", "from b")
+    assert list(store.iter_documents({"X"})) == [_doc("X", "from b")]
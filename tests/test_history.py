@@ -0,0 +1,184 @@
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+
+from shipment_qna_bot.graph.nodes import normalizer
+from shipment_qna_bot.graph.nodes.history import (fold_previous_turn, remember,
+                                                  render_memory,
+                                                  resolve_locally)
+from shipment_qna_bot.graph.state import last_turns
+from shipment_qna_bot.utils import metrics
+
+
+def _ids(**kwargs):
+    return {
+        "container_number": [],
+        "po_numbers": [],
+        "booking_numbers": [],
+        "obl_nos": [],
+        **kwargs,
+    }
+
+
+def test_last_turns():
+    msgs = [HumanMessage(content="1"), AIMessage(content="a")] * 3
+    assert last_turns(msgs, 2) == msgs[2:]
+    assert last_turns(msgs, 5) == msgs
+
+
+def test_remember_keeps_last_ids_and_focus():
+    memory = remember(
+        None,
+        "where is tclu2937251 arriving in los angeles next week",
+        _ids(
+            container_number=["TCLU2937251"],
+            booking_numbers=["TCLU2937251"],
+            location=["Los Angeles"],
+        ),
+    )
+    assert memory["ids"] == {"container_number": ["TCLU2937251"]}
+    assert memory["focus"] == {"container_number": ["TCLU2937251"]}
+    assert memory["time_window"] == "next week"
+    assert memory["locations"] == ["Los Angeles"]
+
+    memory = remember(memory, "how many shipments in total", _ids())
+    assert memory["focus"] == {}
+    assert memory["ids"] == {"container_number": ["TCLU2937251"]}
+    assert render_memory(memory) == (
+        "Entities mentioned earlier in this conversation: container TCLU2937251; "
+        "time window next week; locations Los Angeles."
+    )
+
+    memory = remember(
+        memory, "status of po 5302997239", _ids(po_numbers=["5302997239"])
+    )
+    assert memory["focus"] == {"po_numbers": ["5302997239"]}
+    assert memory["ids"]["container_number"] == ["TCLU2937251"]
+
+
+def test_fold_previous_turn_reads_the_checkpointed_values():
+    state = {
+        "normalized_question": "eta of tclu2937251",
+        "extracted_ids": _ids(container_number=["TCLU2937251"]),
+    }
+    assert fold_previous_turn(state)["focus"] == {"container_number": ["TCLU2937251"]}
+    assert state["entity_memory"]["ids"] == {"container_number": ["TCLU2937251"]}
+    assert fold_previous_turn({})["ids"] == {}
+
+
+_CONTAINER = remember(None, "", _ids(container_number=["TCLU2937251"]))
+_TWO_POS = remember(None, "", _ids(po_numbers=["5302997239", "5302997240"]))
+
+
+@pytest.mark.parametrize(
+    "question, memory, resolved",
+    [
+        ("when will it arrive?", _CONTAINER, "when will container tclu2937251 arrive?"),
+        ("what is its eta", _CONTAINER, "what is container tclu2937251's eta"),
+        (
+            "is that shipment arriving this week?",
+            _CONTAINER,
+            "is container tclu2937251 arriving this week?",
+        ),
+        (
+            "are they delayed",
+            _TWO_POS,
+            "are pos 5302997239 and 5302997240 delayed",
+        ),
+        ("how many shipments are delayed?", _CONTAINER, None),
+        # The pronoun has an antecedent in the same question.
+        ("show me hot containers and when they arrive", _CONTAINER, None),
+        ("which shipments are late and where are they", _CONTAINER, None),
+        # Expletive "it" refers to nothing.
+        ("what time is it", _CONTAINER, None),
+        ("is it possible to list all delayed shipments?", _CONTAINER, None),
+        ("it seems late", _CONTAINER, None),
+        # Lists, aggregates and long questions go to the LLM.
+        ("how many of them are delayed", _TWO_POS, None),
+        (
+            "when will it arrive given the port congestion we saw last month",
+            _CONTAINER,
+            None,
+        ),
+        ("when will it arrive vs MSKU1234567?", _CONTAINER, None),
+        ("same question for the previous one", _CONTAINER, None),
+        ("when will it arrive?", remember(None, "", _ids()), None),
+        (
+            "when will it arrive?",
+            remember(
+                None,
+                "",
+                _ids(container_number=["TCLU2937251"], po_numbers=["5302997239"]),
+            ),
+            None,
+        ),
+    ],
+)
+def test_resolve_locally(question, memory, resolved):
+    assert resolve_locally(question, memory) == resolved
+
+
+def test_local_resolution_switch(monkeypatch):
+    monkeypatch.setenv("NORMALIZER_LOCAL_COREF", "0")
+    assert resolve_locally("when will it arrive?", _CONTAINER) is None
+
+
+@pytest.fixture
+def live(monkeypatch):
+    monkeypatch.setenv("SHIPMENT_QNA_BOT_TEST_MODE", "0")
+    calls = []
+
+    class _Chat:
+        def chat_completion(self, messages, **kwargs):
+            calls.append(messages)
+            return {"content": "Standalone question", "usage": {"total_tokens": 1}}
+
+    monkeypatch.setattr(normalizer, "_CHAT_TOOL", _Chat())
+    metrics.reset("normalizer.")
+    yield calls
+    metrics.reset("normalizer.")
+
+
+def _session(turns, question, **state):
+    messages = []
+    for i in range(turns):
+        messages.append(HumanMessage(content=f"eta of PO {5302990000 + i}"))
+        messages.append(AIMessage(content="| container | eta |\n" * 200))
+    messages.append(HumanMessage(content=question))
+    return {"question_raw": question, "messages": messages, **state}
+
+
+def test_long_sessions_send_a_bounded_prompt(live, monkeypatch):
+    monkeypatch.setenv("NORMALIZER_HISTORY_TURNS", "2")
+    state = _session(
+        30,
+        "and what about the one before?",
+        normalized_question="eta of po 5302990029",
+        extracted_ids=_ids(po_numbers=["5302990029"], location=["Los Angeles"]),
+    )
+    normalizer.normalize_node(state)
+
+    (prompt,) = live
+    assert len(prompt) == 7  # system, memory, 2 turns, follow-up
+    assert prompt[1] == {
+        "role": "system",
+        "content": "Entities mentioned earlier in this conversation: "
+        "PO 5302990029; locations Los Angeles.",
+    }
+    assert prompt[2]["content"] == "eta of PO 5302990028"
+    assert len(prompt[3]["content"]) < 700
+    assert state["normalized_question"] == "standalone question"
+    assert metrics.snapshot("normalizer.") == {"normalizer.llm": 1}
+
+
+def test_pronoun_follow_up_skips_the_llm(live):
+    state = _session(
+        1,
+        "Is it delayed?",
+        normalized_question="eta of tclu2937251",
+        extracted_ids=_ids(container_number=["TCLU2937251"]),
+    )
+    normalizer.normalize_node(state)
+    assert live == []
+    assert state["normalized_question"] == "is container tclu2937251 delayed?"
+    assert state["topic_shift_candidate"] is None
+    assert metrics.snapshot("normalizer.") == {"normalizer.local": 1}
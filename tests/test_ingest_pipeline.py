@@ -0,0 +1,115 @@
+import json
+import os
+import sys
+import threading
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src", "scripts"))
+
+from ingest_all import ManifestCheckpointer
+from ingest_pipeline import run_pipeline
+
+
+def _docs(n):
+    return [{"document_id": str(i), "content": f"doc {i}"} for i in range(n)]
+
+
+def _embed(batch):
+    return [dict(d, content_vector=[1.0]) for d in batch], []
+
+
+def test_pipeline_uploads_every_doc_and_meters_stages():
+    uploaded = []
+    result = run_pipeline(
+        _docs(10),
+        _embed,
+        lambda batch: None,
+        batch_size=3,
+        on_uploaded=lambda batch: uploaded.extend(d["document_id"] for d in batch),
+    )
+    assert sorted(uploaded, key=int) == [str(i) for i in range(10)]
+    assert result.uploaded == 10 and not result.errors
+    assert {m.name: m.docs for m in result.stages.values()} == {
+        "read": 10,
+        "embed": 10,
+        "upload": 10,
+    }
+
+
+def test_embedding_overlaps_upload():
+    # Upload of the first batch waits until the next batch is being embedded;
+    # run sequentially this would time out.
+    second_embed = threading.Event()
+    overlapped = []
+
+    def _embed_tracking(batch):
+        if batch[0]["document_id"] != "0":
+            second_embed.set()
+        return _embed(batch)
+
+    def _upload(batch):
+        if batch[0]["document_id"] == "0":
+            overlapped.append(second_embed.wait(timeout=5))
+
+    result = run_pipeline(
+        _docs(4), _embed_tracking, _upload, batch_size=2, embed_workers=1
+    )
+    assert overlapped == [True]
+    assert result.uploaded == 4
+
+
+def test_stop_on_error_stops_feeding_batches():
+    def _embed_failing(batch):
+        return [], [{"document_id": d["document_id"], "error": "bad"} for d in batch]
+
+    result = run_pipeline(
+        _docs(100),
+        _embed_failing,
+        lambda batch: None,
+        batch_size=1,
+        embed_workers=1,
+        queue_size=1,
+        stop_on_error=True,
+    )
+    assert result.uploaded == 0
+    assert 1 <= len(result.errors) < 100
+
+
+def test_failed_upload_is_reported_not_checkpointed(tmp_path):
+    checkpointer = ManifestCheckpointer(str(tmp_path), {}, every_s=0)
+
+    def _upload(batch):
+        if batch[0]["document_id"] == "2":
+            raise RuntimeError("503")
+
+    result = run_pipeline(
+        _docs(4),
+        _embed,
+        _upload,
+        batch_size=2,
+        on_uploaded=lambda batch: checkpointer.record(
+            {d["document_id"]: "h" for d in batch}
+        ),
+    )
+    checkpointer.flush()
+
+    assert sorted(result.upload_failures) == ["2", "3"]
+    with open(tmp_path / "manifest.json", encoding="utf-8") as f:
+        assert json.load(f) == {"0": "h", "1": "h"}
+
+
+def _write_jsonl(path, docs, extra_lines=()):
+    with open(path, "w", encoding="utf-8") as f:
+        for line in extra_lines:
+            f.write(line + "\n")
+        for d in docs:
+            f.write(json.dumps(d) + "\n")
+
+
+def test_iter_data_streams_and_skips_invalid_lines(tmp_path):
+    from reindex_data import iter_data
+
+    path = tmp_path / "a.jsonl"
+    _write_jsonl(path, _docs(3), extra_lines=["{not json", ""])
+    stream = iter_data(str(path))
+    assert not isinstance(stream, list)
+    assert [d["document_id"] for d in stream] == ["0", "1", "2"]
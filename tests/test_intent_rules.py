@@ -0,0 +1,78 @@
+import json
+import os
+
+import pytest
+
+from shipment_qna_bot.graph.nodes import intent
+from shipment_qna_bot.graph.nodes.intent_rules import classify_by_rules
+from shipment_qna_bot.utils import metrics
+
+_FIXTURES = os.path.join(os.path.dirname(__file__), "intent_fast_path_cases.json")
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("hi", "greeting"),
+        ("thanks!", "end"),
+        ("tclu2937251", "retrieval"),
+        ("what is the eta for container abcd1234567?", "retrieval"),
+        ("how many shipments are delayed?", "analytics"),
+    ],
+)
+def test_obvious_turns_are_confident(text, expected):
+    decision = classify_by_rules(text)
+    assert decision.intent == expected
+    assert decision.confidence >= 0.85
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "hi, where is container tclu2937251?",
+        "how many pos are on container tclu2937251?",
+        "which carriers are used for my shipments?",
+    ],
+)
+def test_mixed_turns_fall_back_to_llm(text):
+    assert classify_by_rules(text).confidence < 0.85
+
+
+def test_fixture_precision():
+    from evaluate_intent_rules import evaluate
+
+    with open(_FIXTURES, "r", encoding="utf-8") as f:
+        report = evaluate(json.load(f))
+    assert report["mistakes"] == []
+    assert report["coverage"] > 0.5
+
+
+def test_fast_path_skips_llm_and_is_counted(monkeypatch):
+    monkeypatch.setenv("SHIPMENT_QNA_BOT_TEST_MODE", "0")
+    metrics.reset("intent.")
+
+    class _Chat:
+        def chat_completion(self, messages, **kwargs):
+            return {
+                "content": '{"primary_intent": "analytics", "intents": [], "sentiment": "neutral"}',
+                "usage": {
+                    "prompt_tokens": 1,
+                    "completion_tokens": 1,
+                    "total_tokens": 2,
+                },
+            }
+
+    monkeypatch.setattr(intent, "_chat_tool", _Chat())
+
+    fast = intent.intent_node({"normalized_question": "tclu2937251"})
+    assert fast["intent"] == "retrieval"
+    assert "usage_metadata" not in fast
+
+    slow = intent.intent_node(
+        {"normalized_question": "which carriers are used for my shipments?"}
+    )
+    assert slow["intent"] == "analytics"
+
+    assert metrics.snapshot("intent.") == {"intent.fast_path": 1, "intent.llm": 1}
+    assert metrics.ratio("intent.fast_path", ["intent.fast_path", "intent.llm"]) == 0.5
+    metrics.reset("intent.")
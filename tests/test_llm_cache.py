@@ -0,0 +1,132 @@
+from types import SimpleNamespace
+
+import pytest
+
+from shipment_qna_bot.tools import llm_cache
+from shipment_qna_bot.tools.azure_openai_chat import AzureOpenAIChatTool
+from shipment_qna_bot.tools.llm_cache import SQLiteLLMCache, make_cache_key
+from shipment_qna_bot.utils.ttl_cache import TTLCache
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_ttl_cache_expiry_and_lru():
+    clock = _Clock()
+    cache = TTLCache(max_entries=2, ttl_s=10, clock=clock)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "b" is now least recently used
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+
+    clock.now = 11
+    assert cache.get("a") is None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_cache_key_normalizes_whitespace_only():
+    base = [{"role": "user", "content": "Where is  container\nABCD1234567?"}]
+    same = [{"role": "user", "content": " Where is container ABCD1234567? "}]
+    other = [{"role": "user", "content": "Where is container ABCD1234568?"}]
+    key = make_cache_key(base, "gpt-4o", 0.0, 800)
+    assert key == make_cache_key(same, "gpt-4o", 0.0, 800)
+    assert key != make_cache_key(other, "gpt-4o", 0.0, 800)
+    assert key != make_cache_key(base, "gpt-4o-mini", 0.0, 800)
+
+
+def test_sqlite_cache_roundtrip_and_eviction(tmp_path):
+    cache = SQLiteLLMCache(str(tmp_path / "llm.sqlite"), max_entries=2, ttl_s=60)
+    cache.set("a", {"content": "A"})
+    cache.set("b", {"content": "B"})
+    cache.set("c", {"content": "C"})
+    assert cache.get("a") is None
+    assert cache.get("c") == {"content": "C"}
+
+    # A second handle on the same file sees the persisted entries.
+    reopened = SQLiteLLMCache(str(tmp_path / "llm.sqlite"), max_entries=2, ttl_s=60)
+    assert reopened.get("b") == {"content": "B"}
+
+
+@pytest.fixture
+def live_tool(monkeypatch):
+    monkeypatch.setenv("SHIPMENT_QNA_BOT_TEST_MODE", "0")
+    monkeypatch.setenv("AZURE_OPENAI_API_KEY", "key")
+    monkeypatch.setenv("AZURE_OPENAI_ENDPOINT", "https://example.invalid")
+    monkeypatch.setenv("AZURE_OPENAI_DEPLOYMENT", "gpt-4o")
+    monkeypatch.setenv("LLM_CACHE_BACKEND", "memory")
+    llm_cache.reset_llm_cache()
+
+    calls = []
+
+    def _create(**kwargs):
+        calls.append(kwargs)
+        return SimpleNamespace(
+            choices=[
+                SimpleNamespace(
+                    message=SimpleNamespace(content="cached answer", tool_calls=None)
+                )
+            ],
+            usage=SimpleNamespace(
+                prompt_tokens=12, completion_tokens=3, total_tokens=15
+            ),
+        )
+
+    tool = AzureOpenAIChatTool()
+    tool.client = SimpleNamespace(
+        chat=SimpleNamespace(completions=SimpleNamespace(create=_create))
+    )
+    yield tool, calls
+    llm_cache.reset_llm_cache()
+
+
+def test_chat_tool_serves_repeat_calls_from_cache(live_tool):
+    tool, calls = live_tool
+    messages = [{"role": "user", "content": "hi"}]
+
+    first = tool.chat_completion(messages, temperature=0.0)
+    assert first["usage"]["cache_misses"] == 1
+    assert first["usage"]["total_tokens"] == 15
+
+    second = tool.chat_completion(messages, temperature=0.0)
+    assert second["content"] == "cached answer"
+    assert second["usage"] == {
+        "prompt_tokens": 0,
+        "completion_tokens": 0,
+        "total_tokens": 0,
+        "cache_hits": 1,
+        "cache_misses": 0,
+    }
+    assert len(calls) == 1
+
+    # Sampling calls are never cached.
+    tool.chat_completion(messages, temperature=0.7)
+    tool.chat_completion(messages, temperature=0.7)
+    assert len(calls) == 3
+
+
+def test_response_format_is_part_of_the_key(live_tool):
+    tool, calls = live_tool
+    messages = [{"role": "user", "content": "hi"}]
+    json_format = {"type": "json_object"}
+
+    assert make_cache_key(messages, "gpt-4o", 0.0, 800) != make_cache_key(
+        messages, "gpt-4o", 0.0, 800, json_format
+    )
+    tool.chat_completion(messages)
+    structured = tool.chat_completion(messages, response_format=json_format)
+    assert structured["usage"]["cache_misses"] == 1
+    assert calls[-1]["response_format"] == json_format
+    assert (
+        tool.chat_completion(messages, response_format=json_format)["usage"][
+            "cache_hits"
+        ]
+        == 1
+    )
+    assert len(calls) == 2
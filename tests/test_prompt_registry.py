@@ -0,0 +1,67 @@
+import os
+
+import pytest
+
+from shipment_qna_bot.graph.nodes import analytics_planner, answer
+from shipment_qna_bot.tools.prompt_registry import PROMPTS, PromptRegistry
+
+
+def _touch(path, text, bump_ns):
+    path.write_text(text, encoding="utf-8")
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + bump_ns))
+
+
+def test_docs_and_renders_reload_only_on_change(tmp_path):
+    (tmp_path / "ready_ref.md").write_text("v1", encoding="utf-8")
+    registry = PromptRegistry(docs_dir=tmp_path)
+    calls = []
+
+    def _render(ready_ref, *, variant):
+        calls.append(variant)
+        return f"{ready_ref}:{variant}"
+
+    registry.register("t", _render, docs=("ready_ref.md",))
+    assert registry.render("t", variant="a") == "v1:a"
+    assert registry.render("t", variant="a") == "v1:a"
+    assert registry.render("t", variant="b") == "v1:b"
+    assert calls == ["a", "b"]
+    assert registry.stats()["doc_reads"] == 1
+
+    _touch(tmp_path / "ready_ref.md", "v2", 10_000_000)
+    assert registry.render("t", variant="a") == "v2:a"
+    assert registry.stats()["doc_reads"] == 2
+    assert calls == ["a", "b", "a"]
+
+
+def test_missing_doc_renders_empty(tmp_path):
+    registry = PromptRegistry(docs_dir=tmp_path)
+    registry.register("t", lambda ref: f"[{ref}]", docs=("ready_ref.md",))
+    assert registry.render("t") == "[]"
+
+
+@pytest.fixture
+def ready_ref(tmp_path, monkeypatch):
+    path = tmp_path / "ready_ref.md"
+    path.write_text("READY REF " * 500, encoding="utf-8")
+    monkeypatch.setenv("SHIPMENT_QNA_BOT_READY_REF_PATH", str(path))
+    PROMPTS.clear()
+    yield path
+    PROMPTS.clear()
+
+
+def test_answer_prompts_share_the_static_prefix(ready_ref):
+    dp = answer._build_system_prompt("when does TCLU2937251 arrive?")
+    fd = answer._build_system_prompt("when does it reach the final destination?")
+    assert dp != fd
+    common = os.path.commonprefix([dp, fd])
+    assert "READY REF" in common and "## Table Layout" in common
+    assert len(dp) - len(common) < 80
+    assert answer._build_system_prompt("eta of my PO?") is dp
+
+
+def test_analytics_prompt_leads_with_static_block(ready_ref):
+    assert "analytics.system" in analytics_planner.PROMPTS._templates
+    static = PROMPTS.render("analytics.system")
+    assert static.startswith("You are a Pandas Data Analyst")
+    assert static.rstrip().endswith("READY REF")
@@ -0,0 +1,47 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(__file__))
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src", "scripts"))
+
+import pytest
+from azure.core.exceptions import HttpResponseError
+from fake_search_client import SKIP_LIMIT, FakeSearchClient
+from reconcile_index import (_fetch_index_ids, _fetch_index_ids_by_skip,
+                             _partition_bounds)
+
+KEYS = [f"doc-{i:06d}" for i in range(2_500)] + ["o'brien", "zz-extra"]
+
+
+def test_partition_bounds_cover_the_key_space():
+    sample = sorted(KEYS[:2_000])
+    bounds = _partition_bounds(sample, 4)
+    assert bounds[0][0] is None and bounds[-1][1] is None
+    assert len(bounds) == 4
+    for (_, upper), (lower, _) in zip(bounds, bounds[1:]):
+        assert upper == lower
+    assert _partition_bounds([], 4) == [(None, None)]
+
+
+@pytest.mark.parametrize("partitions", [1, 3, 8])
+def test_range_scan_enumerates_every_key_once(partitions):
+    client = FakeSearchClient(KEYS)
+    # The sample is the local JSONL IDs; keys outside it are still found.
+    ids = _fetch_index_ids(
+        client, "document_id", 300, sample_ids=KEYS[:1_000], partitions=partitions
+    )
+    assert sorted(ids) == sorted(KEYS)
+    assert len(ids) == len(set(ids))
+
+
+def test_range_scan_is_not_capped_by_skip_limit():
+    keys = [f"k{i:07d}" for i in range(SKIP_LIMIT + 2_000)]
+    client = FakeSearchClient(keys)
+    with pytest.raises(HttpResponseError):
+        _fetch_index_ids_by_skip(client, "document_id", 1_000)
+    assert len(_fetch_index_ids(client, "document_id", 1_000, keys, 4)) == len(keys)
+
+
+def test_falls_back_to_skip_paging_when_key_is_not_sortable():
+    client = FakeSearchClient(KEYS, sortable=False)
+    assert sorted(_fetch_index_ids(client, "document_id", 500)) == sorted(KEYS)
@@ -0,0 +1,114 @@
+import asyncio
+import os
+
+import pytest
+
+from shipment_qna_bot.graph.nodes import retrieve
+from shipment_qna_bot.tools import retrieval_cache
+from shipment_qna_bot.tools.retrieval_cache import (DEFAULT_GENERATION_PATH,
+                                                    RetrievalCache,
+                                                    bump_index_generation,
+                                                    make_retrieval_key)
+from shipment_qna_bot.utils import metrics
+
+
+def _key(codes, query="eta of tclu2937251", extra_filter=None, **kwargs):
+    params = {"top_k": 8, "skip": None, "order_by": None, **kwargs}
+    return make_retrieval_key(codes, query, extra_filter, **params)
+
+
+def test_key_includes_scope_as_a_set():
+    assert _key(["0000866", "0001234"]) == _key(["0001234", "0000866", "0000866"])
+    assert _key(["0000866"]) != _key(["0001234"])
+    assert _key(["0000866"]) != _key(["0000866", "0001234"])
+
+
+def test_key_normalizes_text_and_filter_but_not_paging():
+    assert _key(["A"], "ETA of  TCLU2937251 ", "hot_container_flag eq  true") == _key(
+        ["A"], "eta of tclu2937251", "hot_container_flag eq true"
+    )
+    assert _key(["A"], skip=8) != _key(["A"])
+    assert _key(["A"], order_by="eta_dp_date asc") != _key(["A"])
+    assert _key(["A"], top_k=20) != _key(["A"])
+
+
+def test_generation_bump_invalidates(tmp_path):
+    marker = str(tmp_path / "index_generation")
+    cache = RetrievalCache(ttl_s=60, generation_path=marker, check_every_s=0)
+    cache.set("k", {"hits": [{"doc_id": "1"}]})
+    hit = cache.get("k")
+    hit["hits"].clear()  # callers get copies
+    assert cache.get("k") == {"hits": [{"doc_id": "1"}]}
+
+    bump_index_generation(marker)
+    assert cache.get("k") is None
+    assert cache.stats()["invalidations"] == 1
+
+
+class _CountingSearch:
+    def __init__(self):
+        self.calls = 0
+
+    def search(self, **kwargs):
+        self.calls += 1
+        return {"hits": [{"doc_id": "d1", "content": "x"}], "count": 1, "facets": None}
+
+    async def asearch(self, **kwargs):
+        return self.search(**kwargs)
+
+
+class _Embed:
+    def embed_query(self, text):
+        return [0.1]
+
+    async def aembed_query(self, text):
+        return [0.1]
+
+
+@pytest.fixture
+def live_retrieve(monkeypatch, tmp_path):
+    monkeypatch.setenv("SHIPMENT_QNA_BOT_TEST_MODE", "0")
+    monkeypatch.setenv("RETRIEVAL_CACHE_TTL_S", "60")
+    monkeypatch.setenv(
+        "RETRIEVAL_CACHE_GENERATION_PATH", str(tmp_path / "index_generation")
+    )
+    retrieval_cache.reset_retrieval_cache()
+    metrics.reset("retrieval_cache.")
+    search = _CountingSearch()
+    monkeypatch.setattr(retrieve, "_SEARCH", search)
+    monkeypatch.setattr(retrieve, "_EMBED", _Embed())
+    yield search
+    retrieval_cache.reset_retrieval_cache()
+
+
+def _state(codes):
+    return {
+        "conversation_id": "c1",
+        "consignee_codes": codes,
+        "intent": "retrieval",
+        "normalized_question": "eta of tclu2937251",
+        "retrieval_plan": {"query_text": "eta of tclu2937251", "top_k": 8},
+    }
+
+
+def test_retrieve_reuses_results_within_scope_only(live_retrieve):
+    retrieve.retrieve_node(_state(["0000866"]))
+    # A judge retry with an unchanged plan, sync and async.
+    retried = retrieve.retrieve_node(_state(["0000866"]))
+    asyncio.run(retrieve.aretrieve_node(_state(["0000866"])))
+    assert live_retrieve.calls == 1
+    assert [h["doc_id"] for h in retried["hits"]] == ["d1"]
+
+    retrieve.retrieve_node(_state(["0001234"]))
+    assert live_retrieve.calls == 2
+    assert metrics.ratio(
+        "retrieval_cache.hit", ["retrieval_cache.hit", "retrieval_cache.miss"]
+    ) == pytest.approx(0.5)
+
+
+def test_default_generation_path_does_not_depend_on_cwd(tmp_path, monkeypatch):
+    monkeypatch.delenv("RETRIEVAL_CACHE_GENERATION_PATH", raising=False)
+    monkeypatch.chdir(tmp_path)
+    assert retrieval_cache._generation_path() == DEFAULT_GENERATION_PATH
+    assert os.path.isabs(DEFAULT_GENERATION_PATH)
+    assert DEFAULT_GENERATION_PATH.endswith(os.path.join("data", "index_generation"))
@@ -13,7 +13,7 @@ def test_chat_endpoint_basic_flow(monkeypatch):
     Sanity check:
     - /api/chat accepts payload with comma-packed consignee_codes
     - resolve_allowed_scope is applied (on the route module symbol)
-    - run_graph result is mapped into ChatAnswer
+    - arun_graph result is mapped into ChatAnswer
     """
 
     # --- monkeypatch resolve_allowed_scope as seen by routes_chat ---
@@ -27,8 +27,8 @@ def test_chat_endpoint_basic_flow(monkeypatch):
         routes_module, "resolve_allowed_scope", fake_resolve_allowed_scope
     )
 
-    # --- monkeypatch run_graph as seen by routes_chat ---
-    def fake_run_graph(initial_state: dict):
+    # --- monkeypatch arun_graph as seen by routes_chat ---
+    async def fake_arun_graph(initial_state: dict):
         # Here we inspect what the route actually passes.
         assert initial_state["question_raw"].startswith("Show me")
         # Crucial: should be using allowed scope, not raw payload
@@ -58,7 +58,7 @@ def test_chat_endpoint_basic_flow(monkeypatch):
             },
         }
 
-    monkeypatch.setattr(routes_module, "run_graph", fake_run_graph)
+    monkeypatch.setattr(routes_module, "arun_graph", fake_arun_graph)
 
     # --- Call the API ---
     payload = {
@@ -74,7 +74,7 @@ def test_chat_endpoint_basic_flow(monkeypatch):
 
     # --- Basic checks on the response shape ---
     assert data["conversation_id"] == "test-conv-123"
-    # intent should come from our fake_run_graph
+    # intent should come from our fake_arun_graph
     assert data["intent"] == "status"
     assert data["answer"].startswith("Stubbed answer")
 
@@ -93,3 +93,64 @@ def test_chat_endpoint_basic_flow(monkeypatch):
 
     assert data["table"] is not None
     assert data["table"]["rows"][0]["status"] == "ON_TIME"
+
+
+def test_chat_stream_endpoint_emits_progress_tokens_and_final(monkeypatch):
+    import json
+
+    monkeypatch.setattr(
+        routes_module,
+        "resolve_allowed_scope",
+        lambda user_identity, payload_codes: payload_codes,
+    )
+
+    async def fake_astream_graph(initial_state: dict):
+        assert initial_state["consignee_codes"] == ["0000866"]
+        yield {"type": "node", "node": "normalizer"}
+        yield {"type": "token", "text": "Container "}
+        yield {"type": "token", "text": "TIIU5855662 is on the water."}
+        yield {"type": "node", "node": "answer"}
+        yield {
+            "type": "final",
+            "state": {
+                "intent": "retrieval",
+                "answer_text": "Container TIIU5855662 is on the water.",
+                "citations": [{"doc_id": "1", "container_number": "TIIU5855662"}],
+                "usage_metadata": {"total_tokens": 42},
+            },
+        }
+
+    monkeypatch.setattr(routes_module, "astream_graph", fake_astream_graph)
+
+    resp = client.post(
+        "/api/chat/stream",
+        json={
+            "question": "Where is TIIU5855662?",
+            "consignee_codes": ["0000866"],
+            "conversation_id": "test-conv-stream",
+        },
+    )
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/event-stream")
+
+    events = []
+    for block in resp.text.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+
+    assert [name for name, _ in events] == [
+        "start",
+        "node",
+        "token",
+        "token",
+        "node",
+        "final",
+    ]
+    assert "".join(d["text"] for name, d in events if name == "token") == (
+        "Container TIIU5855662 is on the water."
+    )
+    final = events[-1][1]
+    assert final["conversation_id"] == "test-conv-stream"
+    assert final["answer"] == "Container TIIU5855662 is on the water."
+    assert final["evidence"][0]["container_number"] == "TIIU5855662"
+    assert final["metadata"]["tokens"] == 42
@@ -0,0 +1,183 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(__file__))
+
+from fake_search_service import FakeSearchService
+
+from shipment_qna_bot.tools import search_transport
+from shipment_qna_bot.tools.azure_ai_search import (AzureAISearchTool,
+                                                    search_stats)
+from shipment_qna_bot.utils import metrics
+from shipment_qna_bot.utils.coalesce import InFlightCoalescer
+
+
+def test_coalescer_shares_one_call_and_copies_results():
+    calls = []
+
+    async def _factory():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"hits": [{"id": 1}]}
+
+    async def _main():
+        coalescer = InFlightCoalescer()
+        results = await asyncio.gather(
+            *[coalescer.run("k", _factory) for _ in range(5)]
+        )
+        assert coalescer.in_flight() == 0
+        await coalescer.run("k", _factory)  # completed calls are not reused
+        return coalescer, results
+
+    coalescer, results = asyncio.run(_main())
+    assert len(calls) == 2
+    assert coalescer.stats()["followers"] == 4
+    assert all(r == {"hits": [{"id": 1}]} for r in results)
+    assert len({id(r) for r in results}) == 5
+
+
+def test_coalescer_propagates_errors_to_followers():
+    async def _failing():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("503")
+
+    async def _main():
+        coalescer = InFlightCoalescer()
+        return await asyncio.gather(
+            *[coalescer.run("k", _failing) for _ in range(3)], return_exceptions=True
+        )
+
+    assert all(isinstance(r, RuntimeError) for r in asyncio.run(_main()))
+
+
+def test_cancelled_leader_does_not_cancel_followers():
+    calls = []
+
+    async def _factory():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"hits": [{"id": 1}]}
+
+    async def _main():
+        coalescer = InFlightCoalescer()
+        leader = asyncio.create_task(coalescer.run("k", _factory))
+        await asyncio.sleep(0)
+        followers = [
+            asyncio.create_task(coalescer.run("k", _factory)) for _ in range(2)
+        ]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        results = await asyncio.gather(leader, *followers, return_exceptions=True)
+        return coalescer, results
+
+    coalescer, results = asyncio.run(_main())
+    assert isinstance(results[0], asyncio.CancelledError)
+    assert results[1:] == [{"hits": [{"id": 1}]}] * 2
+    assert len(calls) == 1 and coalescer.in_flight() == 0
+
+
+@pytest.fixture
+def live_search(monkeypatch):
+    monkeypatch.setenv("SHIPMENT_QNA_BOT_TEST_MODE", "0")
+    monkeypatch.setenv("AZURE_SEARCH_API_KEY", "key")
+    monkeypatch.setenv("AZURE_SEARCH_INDEX_NAME", "shipments")
+    monkeypatch.setenv("AZURE_SEARCH_POOL_SIZE", "4")
+    monkeypatch.delenv("AZURE_SEARCH_COALESCE", raising=False)
+    search_transport.reset_search_transport()
+    metrics.reset("search.")
+    yield monkeypatch
+    search_transport.reset_search_transport()
+    metrics.reset("search.")
+
+
+def _run_against_fake(monkeypatch, calls):
+    async def _main():
+        service = FakeSearchService(latency_s=0.05)
+        monkeypatch.setenv("AZURE_SEARCH_ENDPOINT", await service.start())
+        tool = AzureAISearchTool()
+        try:
+            results = await calls(tool)
+        finally:
+            await search_transport.get_search_transport().aclose()
+            await service.stop()
+        return service, results
+
+    return asyncio.run(_main())
+
+
+def test_identical_searches_make_one_backend_call(live_search):
+    async def _burst(tool):
+        return await asyncio.gather(
+            *[
+                tool.asearch(query_text="hot containers", consignee_codes=["0000866"])
+                for _ in range(10)
+            ]
+        )
+
+    service, results = _run_against_fake(live_search, _burst)
+    assert service.requests == 1
+    assert all(r["hits"][0]["content"] == "hot containers" for r in results)
+    stats = search_stats()
+    assert stats["backend_calls"] == 1 and stats["coalesced"] == 9
+
+
+def test_scope_and_paging_are_part_of_the_key(live_search):
+    async def _mixed(tool):
+        return await asyncio.gather(
+            tool.asearch(query_text="eta", consignee_codes=["0000866"]),
+            tool.asearch(query_text="eta", consignee_codes=["0001234"]),
+            tool.asearch(query_text="eta", consignee_codes=["0000866"], skip=8),
+            tool.asearch(
+                query_text="eta", consignee_codes=["0000866"], vector=[0.1, 0.2]
+            ),
+        )
+
+    service, results = _run_against_fake(live_search, _mixed)
+    assert service.requests == 4
+    assert "0001234" in results[1]["hits"][0]["filter_seen"]
+    assert "0001234" not in results[0]["hits"][0]["filter_seen"]
+
+
+def test_pool_bounds_and_reuses_connections(live_search):
+    live_search.setenv("AZURE_SEARCH_COALESCE", "false")
+
+    async def _waves(tool):
+        for _ in range(3):
+            await asyncio.gather(
+                *[
+                    tool.asearch(query_text=f"q{i}", consignee_codes=["0000866"])
+                    for i in range(8)
+                ]
+            )
+
+    service, _ = _run_against_fake(live_search, _waves)
+    pool = search_stats()["pool"]
+    assert service.requests == 24
+    assert service.peak_in_flight <= 4
+    assert pool["limit"] == 4
+    assert pool["connections_created"] <= 4
+    assert pool["connections_reused"] >= 20
+    assert pool["queued"] > 0
+
+
+def test_sessions_of_finished_loops_are_closed(live_search):
+    pool = search_transport.get_search_transport()
+
+    async def _session():
+        pool.transport()
+        return pool._session
+
+    first = asyncio.run(_session())
+    second = asyncio.run(_session())
+    assert first.closed and not second.closed
+
+    async def _shutdown():
+        pool.transport()
+        await pool.aclose()
+
+    asyncio.run(_shutdown())
+    assert second.closed
+    assert search_stats()["pool"]["sessions"] == 3
@@ -8,8 +8,8 @@ client = TestClient(app)
 
 
 def test_session_persistence_and_exit(monkeypatch):
-    # Mock run_graph to avoid LLM calls
-    def fake_run_graph(initial_state: dict):
+    # Mock arun_graph to avoid LLM calls
+    async def fake_arun_graph(initial_state: dict):
         q = initial_state["question_raw"].lower()
         if any(w in q for w in ["bye", "exit"]):
             return {
@@ -22,7 +22,7 @@ def test_session_persistence_and_exit(monkeypatch):
             "conversation_id": initial_state.get("conversation_id"),
         }
 
-    monkeypatch.setattr(routes_module, "run_graph", fake_run_graph)
+    monkeypatch.setattr(routes_module, "arun_graph", fake_arun_graph)
 
     # 1. First request with consignee codes
     payload = {
@@ -0,0 +1,86 @@
+import copy
+import json
+from datetime import datetime, timezone
+
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from shipment_qna_bot.graph.nodes.answer import _bucket_counts
+from shipment_qna_bot.graph.nodes.grounding import GROUNDED, check_grounding
+from shipment_qna_bot.graph.nodes.retrieve import _post_filter_hits
+from shipment_qna_bot.models.shipment_hit import ShipmentHit
+
+_NOW = datetime(2025, 3, 10, 9, 0, tzinfo=timezone.utc)
+
+
+def _raw(container, **meta):
+    return {
+        "doc_id": f"doc-{container}",
+        "container_number": container,
+        "content": f"container {container}",
+        "metadata_json": json.dumps(meta),
+    }
+
+
+def test_from_raw_parses_metadata_once_and_hydrates():
+    hit = ShipmentHit.from_raw(
+        _raw(
+            "TCLU2937251",
+            eta_dp_date="2025-03-12T00:00:00Z",
+            dp_delayed_dur="4",
+            hot_container_flag=True,
+            milestones=[{"event": "gate in"}],
+        )
+    )
+    assert hit["eta_dp_date"] == "2025-03-12T00:00:00Z"  # hydrated field
+    assert hit.dates["eta_dp_date"] == datetime(2025, 3, 12, tzinfo=timezone.utc)
+    assert hit.delays["dp_delayed_dur"] == 4.0
+    assert hit.hot is True
+    assert "milestones" not in hit and hit.metadata["milestones"]
+    # Reads like the dict it replaces.
+    assert hit.get("container_number") == "TCLU2937251"
+    assert dict(hit) == hit.to_dict()
+    assert ShipmentHit.coerce(hit) is hit
+
+
+def test_unparseable_metadata_is_tolerated():
+    hit = ShipmentHit.from_raw({"doc_id": "1", "metadata_json": "{not json"})
+    assert hit.metadata == {} and hit.hot is False
+    assert hit.date("eta_dp_date") is None and hit.delay("dp_delayed_dur") == 0.0
+
+
+def test_nodes_consume_records():
+    hits = [
+        ShipmentHit.from_raw(
+            _raw("TCLU2937251", eta_dp_date="2025-03-12", hot_container_flag=True)
+        ),
+        ShipmentHit.from_raw(_raw("SEGU5935510", eta_dp_date="2025-03-30")),
+        ShipmentHit.from_raw(
+            _raw("MSCU1234567", eta_dp_date="2025-03-11", dp_delayed_dur=6)
+        ),
+    ]
+    window = {"date_window": {"fields": ["eta_dp_date"], "days": 7}}
+    assert [h["container_number"] for h in _post_filter_hits(hits, window, _NOW)] == [
+        "TCLU2937251",
+        "MSCU1234567",
+    ]
+    delayed = {"delay": {"field": "dp_delayed_dur", "days": 5}}
+    assert len(_post_filter_hits(hits, delayed, _NOW)) == 1
+
+    buckets = _bucket_counts(hits, "hot vs normal this week", _NOW)
+    week = next(r for r in buckets["rows"] if r["bucket"] == "this_week")
+    assert week["hot_count"] == 1 and week["normal_count"] == 1
+
+    answer = "Container TCLU2937251 arrives on 12-Mar-25."
+    assert check_grounding(answer, hits).verdict == GROUNDED
+
+
+def test_records_survive_copy_and_checkpoint_serde():
+    hit = ShipmentHit.from_raw(_raw("TCLU2937251", eta_dp_date="2025-03-12"))
+    assert copy.deepcopy(hit) == hit
+
+    serde = JsonPlusSerializer(
+        allowed_msgpack_modules=[(ShipmentHit.__module__, ShipmentHit.__name__)]
+    )
+    restored = serde.loads_typed(serde.dumps_typed({"hits": [hit]}))["hits"][0]
+    assert isinstance(restored, ShipmentHit)
+    assert restored.date("eta_dp_date") == hit.date("eta_dp_date")